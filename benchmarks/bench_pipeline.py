@@ -0,0 +1,120 @@
+"""
+Benchmark the profile pipeline against the equivalent sequence of stage calls
+
+Usage
+-----
+python benchmarks/bench_pipeline.py --rows 100000 --n-workers 4 [--with-enrich]
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, Tuple
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import generate_profiles  # noqa: E402
+
+def run_sequential(data: pd.DataFrame, with_enrich: bool) -> pd.DataFrame:
+    """
+    Today's sequence of public stage calls
+    """
+    from preprocessing_pgp.name.type.extractor import process_extract_type
+    from preprocessing_pgp.phone.extractor import extract_valid_phone
+    from preprocessing_pgp.email.validator import process_validate_email
+    from preprocessing_pgp.card.validation import verify_card
+    from preprocessing_pgp.address.extractor import extract_vi_address
+
+    data = process_extract_type(data, name_col='name')
+    if with_enrich:
+        from preprocessing_pgp.name.enrich_name import process_enrich
+        data = process_enrich(data, name_col='name')
+    data = extract_valid_phone(data, phone_col='phone', print_info=False)
+    data = process_validate_email(data, email_col='email')
+    data = verify_card(data, card_col='card_id', print_info=False)
+    data = extract_vi_address(data, address_col='address')
+
+    return data
+
+
+def run_pipeline(
+    data: pd.DataFrame,
+    with_enrich: bool,
+    n_workers: int
+) -> pd.DataFrame:
+    """
+    The same stages through the profile pipeline
+    """
+    from preprocessing_pgp.pipeline import ProfilePipeline
+
+    stages = [('type', 'name')]
+    if with_enrich:
+        stages.append(('enrich', 'name'))
+    stages.extend([
+        ('phone', 'phone'),
+        ('email', 'email'),
+        ('card', 'card_id'),
+        ('address', 'address')
+    ])
+
+    return ProfilePipeline(stages, n_workers=n_workers).run(data)
+
+
+def measure(mode: str, n_rows: int, with_enrich: bool, n_workers: int) -> Dict:
+    """
+    Run one mode in the current process and measure it
+    """
+    data = generate_profiles(n_rows)
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start_time = perf_counter()
+    if mode == 'sequential':
+        output = run_sequential(data, with_enrich)
+    else:
+        output = run_pipeline(data, with_enrich, n_workers)
+    elapsed = perf_counter() - start_time
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'mode': mode,
+        'rows': n_rows,
+        'n_workers': n_workers if mode == 'pipeline' else 1,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(n_rows / elapsed, 1),
+        'peak_rss_delta_mb': round((peak_rss - start_rss) / 1024, 1),
+        'output_shape': list(output.shape)
+    }
+
+
+def main(args: Tuple[str, ...] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--n-workers', type=int, default=4)
+    parser.add_argument('--with-enrich', action='store_true')
+    parsed = parser.parse_args(args)
+
+    results = []
+    for mode in ['sequential', 'pipeline']:
+        # * Each mode in a fresh process to isolate the peak memory
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(
+                measure, mode, parsed.rows,
+                parsed.with_enrich, parsed.n_workers
+            ).result())
+
+    for result in results:
+        sys.stdout.write(json.dumps(result) + '\n')
+
+    speedup = results[0]['seconds'] / results[1]['seconds']
+    sys.stdout.write(json.dumps({'speedup': round(speedup, 2)}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
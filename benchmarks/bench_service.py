@@ -0,0 +1,154 @@
+"""
+Load test of the micro-batching enrichment service with concurrent single-profile requests
+
+Usage
+-----
+python benchmarks/bench_service.py --requests 20000 --concurrency 64 --max-batch-size 256 --max-latency-ms 10 [--with-enrich] [--baseline-requests 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import generate_profiles  # noqa: E402
+
+PROFILE_STAGES = [
+    ('type', 'name'),
+    ('phone', 'phone'),
+    ('email', 'email'),
+    ('card', 'card_id'),
+    ('address', 'address')
+]
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict:
+    """
+    Percentiles of the request latencies (ms) & the throughput
+    """
+    latencies_ms = np.array(latencies) * 1000
+
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+        'max_ms': round(float(latencies_ms.max()), 2)
+    }
+
+
+async def run_service(
+    profiles: List[Dict],
+    stages: List[Tuple[str, str]],
+    concurrency: int,
+    max_batch_size: int,
+    max_latency_ms: float
+) -> Dict:
+    """
+    `concurrency` clients sending their profiles one after the other
+    """
+    from preprocessing_pgp.service import EnrichmentService
+
+    service = EnrichmentService(
+        stages,
+        max_batch_size=max_batch_size,
+        max_latency_ms=max_latency_ms
+    )
+    latencies: List[float] = []
+
+    async def client(client_profiles: List[Dict]) -> None:
+        for profile in client_profiles:
+            start_time = perf_counter()
+            await service.process(profile)
+            latencies.append(perf_counter() - start_time)
+
+    async with service:
+        start_time = perf_counter()
+        await asyncio.gather(*[
+            client(profiles[i::concurrency]) for i in range(concurrency)
+        ])
+        elapsed = perf_counter() - start_time
+
+    return {
+        'mode': 'service',
+        'concurrency': concurrency,
+        'max_batch_size': max_batch_size,
+        'max_latency_ms': max_latency_ms,
+        **latency_summary(latencies, elapsed),
+        'mean_batch_size': {
+            key: round(stats.mean_batch_size or 0, 1)
+            for key, stats in service.stats.items()
+        }
+    }
+
+
+def run_baseline(
+    profiles: List[Dict],
+    stages: List[Tuple[str, str]]
+) -> Dict:
+    """
+    Today's way: the DataFrame APIs called with a one-row frame per profile
+    """
+    from preprocessing_pgp.pipeline import ProfilePipeline
+
+    pipeline = ProfilePipeline(stages)
+    latencies: List[float] = []
+
+    start_time = perf_counter()
+    for profile in profiles:
+        request_time = perf_counter()
+        pipeline.run(pd.DataFrame([profile]))
+        latencies.append(perf_counter() - request_time)
+    elapsed = perf_counter() - start_time
+
+    return {
+        'mode': 'one-row dataframe',
+        'concurrency': 1,
+        **latency_summary(latencies, elapsed)
+    }
+
+
+def main(args: Tuple[str, ...] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-latency-ms', type=float, default=10.0)
+    parser.add_argument('--with-enrich', action='store_true')
+    parser.add_argument('--baseline-requests', type=int, default=0)
+    parsed = parser.parse_args(args)
+
+    stages = list(PROFILE_STAGES)
+    if parsed.with_enrich:
+        stages.append(('enrich', 'name'))
+
+    profiles = generate_profiles(parsed.requests)\
+        .astype(object)\
+        .to_dict('records')
+
+    results = [asyncio.run(run_service(
+        profiles, stages,
+        parsed.concurrency,
+        parsed.max_batch_size,
+        parsed.max_latency_ms
+    ))]
+    if parsed.baseline_requests > 0:
+        results.append(run_baseline(
+            profiles[:parsed.baseline_requests], stages
+        ))
+
+    for result in results:
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
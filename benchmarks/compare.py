@@ -0,0 +1,73 @@
+"""
+Compare two benchmark results files and report throughput regressions
+
+Usage
+-----
+python benchmarks/compare.py baseline.jsonl candidate.jsonl --threshold 0.1
+
+Exit with code 1 when any scenario is slower than the baseline by more than `threshold`
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from typing import Dict, List, Tuple
+
+ScenarioKey = Tuple[str, int, int]
+
+
+def load_results(path: str) -> Dict[ScenarioKey, float]:
+    """
+    Median throughput (rows/sec) of each (scenario, rows, n_cores) in the file
+    """
+    throughputs: Dict[ScenarioKey, List[float]] = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            if result.get('rows_per_sec') is None:
+                continue
+            key = (result['scenario'], result['rows'], result['n_cores'])
+            throughputs.setdefault(key, []).append(result['rows_per_sec'])
+
+    return {
+        key: statistics.median(values)
+        for key, values in throughputs.items()
+    }
+
+
+def main(args: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Compare the throughput of two benchmark results')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Allowed throughput drop ratio, by default 0.1')
+    parsed = parser.parse_args(args)
+
+    baseline = load_results(parsed.baseline)
+    candidate = load_results(parsed.candidate)
+
+    n_regressions = 0
+    print(f"{'scenario':<10}{'rows':>12}{'cores':>7}"
+          f"{'baseline':>14}{'candidate':>14}{'change':>9}")
+    for key in sorted(set(baseline) & set(candidate)):
+        scenario, n_rows, n_cores = key
+        change = candidate[key] / baseline[key] - 1
+        is_regression = change < -parsed.threshold
+        n_regressions += is_regression
+        print(f"{scenario:<10}{n_rows:>12}{n_cores:>7}"
+              f"{baseline[key]:>14.1f}{candidate[key]:>14.1f}{change:>+9.1%}"
+              f"{'  REGRESSION' if is_regression else ''}")
+
+    for key in sorted(set(baseline) ^ set(candidate)):
+        side = 'baseline' if key in baseline else 'candidate'
+        print(f"{key} only found in {side}")
+
+    return 1 if n_regressions > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
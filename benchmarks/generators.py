@@ -0,0 +1,261 @@
+"""
+Seeded generators of synthetic Vietnamese profiles for benchmarking
+
+* Names are built from the `name_split` & `rule_base` dictionaries
+* Phones from the head codes in `phone/const.py`
+* Card ids from the region codes in `card/const.py`
+* Addresses from the location code dictionary
+
+The same `seed` & `n_rows` always give the same data
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from preprocessing_pgp.deaccent import remove_accent, remove_accent_series
+from preprocessing_pgp.name.const import NAME_SPLIT_PATH, RULE_BASED_PATH
+
+EMAIL_DOMAINS = [
+    'gmail.com', 'gmail.com', 'gmail.com', 'yahoo.com', 'yahoo.com.vn',
+    'hotmail.com', 'outlook.com', 'fpt.com.vn', 'fpt.edu.vn', 'icloud.com'
+]
+BUSINESS_PREFIXES = [
+    'Công ty TNHH', 'Công ty cổ phần', 'Cửa hàng', 'Trường mầm non',
+    'Nhà thuốc', 'Phòng khám', 'Shop'
+]
+STREET_NAMES = [
+    'Trương Công Định', 'Lê Lợi', 'Nguyễn Huệ', 'Trần Hưng Đạo',
+    'Hai Bà Trưng', 'Lý Thường Kiệt', 'Kim Mã', 'Cách Mạng Tháng Tám'
+]
+ADDRESS_ABBREVS = {
+    'Phường': 'p.', 'Quận': 'q.', 'Thành phố': 'tp', 'Huyện': 'h.', 'Tỉnh': 't.'
+}
+
+
+def _choice(rng: np.random.Generator, values: List, n_rows: int) -> np.ndarray:
+    """
+    Sample `n_rows` values with replacement as an object array
+    """
+    return np.array(values, dtype=object)[rng.integers(0, len(values), n_rows)]
+
+
+def _digits(rng: np.random.Generator, n_rows: int, n_digits: int) -> np.ndarray:
+    """
+    Random zero-padded digit strings of a fixed length
+    """
+    numbers = rng.integers(0, 10 ** n_digits, n_rows)
+    return np.char.zfill(numbers.astype(str), n_digits).astype(object)
+
+
+def _apply_mask(values: np.ndarray, mask: np.ndarray, transform) -> np.ndarray:
+    """
+    Transform the values at the masked positions
+    """
+    values = values.copy()
+    values[mask] = [transform(value) for value in values[mask]]
+    return values
+
+
+def generate_names(n_rows: int, seed: int = 42) -> pd.Series:
+    """
+    Generate Vietnamese full names with realistic noise:
+    non-accented, upper/lower cased, spare spaces, business names and missing values
+    """
+    rng = np.random.default_rng(seed)
+
+    last_names = pd.read_parquet(
+        f'{NAME_SPLIT_PATH}/stats_lastname_vn.parquet')['Last_Name'].dropna().unique().tolist()
+    middle_names = pd.read_parquet(
+        f'{RULE_BASED_PATH}/middlename_dict.parquet')['with_accent'].dropna().unique().tolist()
+    first_names = pd.read_parquet(
+        f'{RULE_BASED_PATH}/firstname_dict.parquet')['with_accent'].dropna().unique().tolist()
+
+    names = _choice(rng, last_names, n_rows)\
+        + ' ' + _choice(rng, middle_names, n_rows)\
+        + ' ' + _choice(rng, first_names, n_rows)
+
+    noise = rng.random(n_rows)
+    names = _apply_mask(names, noise < 0.25, remove_accent)
+    names = _apply_mask(names, (noise >= 0.25) & (noise < 0.30), str.upper)
+    names = _apply_mask(names, (noise >= 0.30) & (noise < 0.35), str.lower)
+    names = _apply_mask(
+        names, (noise >= 0.35) & (noise < 0.40),
+        lambda name: name.replace(' ', '   ') + ' *')
+    business_mask = (noise >= 0.40) & (noise < 0.45)
+    names[business_mask] = _choice(rng, BUSINESS_PREFIXES, business_mask.sum())\
+        + ' ' + names[business_mask]
+    names[noise >= 0.97] = None
+
+    return pd.Series(names, name='name')
+
+
+def generate_phones(n_rows: int, seed: int = 42) -> pd.Series:
+    """
+    Generate phones from the valid head codes (new & old mobile, landline)
+    with formatting noise, invalid numbers and missing values
+    """
+    from preprocessing_pgp.phone.const import (
+        SUB_PHONE_10NUM,
+        SUB_PHONE_11NUM,
+        SUB_TELEPHONE_11NUM
+    )
+
+    rng = np.random.default_rng(seed)
+
+    kind = rng.random(n_rows)
+    phones = _choice(rng, SUB_PHONE_10NUM, n_rows) + _digits(rng, n_rows, 7)
+
+    old_mobi_mask = (kind >= 0.60) & (kind < 0.75)
+    phones[old_mobi_mask] = _choice(rng, SUB_PHONE_11NUM, old_mobi_mask.sum())\
+        + _digits(rng, old_mobi_mask.sum(), 7)
+
+    landline_mask = (kind >= 0.75) & (kind < 0.85)
+    landline_heads = _choice(rng, SUB_TELEPHONE_11NUM, landline_mask.sum())
+    phones[landline_mask] = [
+        head + tail[:11 - len(head)]
+        for head, tail in zip(landline_heads, _digits(rng, landline_mask.sum(), 8))
+    ]
+
+    phones = _apply_mask(
+        phones, (kind >= 0.85) & (kind < 0.90),
+        lambda phone: '+84 ' + phone[1:4] + ' ' + phone[4:])
+    phones = _apply_mask(
+        phones, (kind >= 0.90) & (kind < 0.95),
+        lambda phone: phone[:5])
+    phones[kind >= 0.97] = None
+
+    return pd.Series(phones, name='phone')
+
+
+def generate_emails(n_rows: int, seed: int = 42) -> pd.Series:
+    """
+    Generate emails from non-accented names, year of birth & common domains
+    with invalid and missing values
+    """
+    rng = np.random.default_rng(seed)
+
+    names = generate_names(n_rows, seed).fillna('user')
+    local_parts = remove_accent_series(names.str.lower())\
+        .str.replace(r'[^a-z ]', '', regex=True)\
+        .str.split()
+
+    style = rng.random(n_rows)
+    years = rng.integers(1960, 2010, n_rows).astype(str)
+    emails = []
+    for words, year, kind in zip(local_parts, years, style):
+        if len(words) == 0:
+            words = ['user']
+        if kind < 0.4:
+            local = ''.join(words) + year
+        elif kind < 0.7:
+            local = words[-1] + '.' + ''.join(words[:-1]) + year[2:]
+        elif kind < 0.9:
+            local = ''.join(word[0] for word in words[:-1]) + words[-1]
+        else:
+            local = words[-1]
+        emails.append(local)
+
+    emails = np.array(emails, dtype=object) + '@'\
+        + _choice(rng, EMAIL_DOMAINS, n_rows)
+
+    noise = rng.random(n_rows)
+    emails = _apply_mask(
+        emails, noise < 0.03,
+        lambda email: email.split('@')[0] + '_autoemail@gmail.com')
+    emails = _apply_mask(
+        emails, (noise >= 0.03) & (noise < 0.08),
+        lambda email: email.upper() + ' ')
+    emails = _apply_mask(
+        emails, (noise >= 0.08) & (noise < 0.12),
+        lambda email: email.replace('@', ''))
+    emails[noise >= 0.97] = None
+
+    return pd.Series(emails, name='email')
+
+
+def generate_card_ids(n_rows: int, seed: int = 42) -> pd.Series:
+    """
+    Generate personal ids (old & new), passports, driver licenses
+    with formatting noise, invalid ids and missing values
+    """
+    from preprocessing_pgp.card.const import (
+        OLD_PID_REGION_CODE_NUMS,
+        NEW_PID_REGION_CODE_NUMS
+    )
+
+    rng = np.random.default_rng(seed)
+
+    kind = rng.random(n_rows)
+    genders = _choice(rng, ['0', '1', '2', '3'], n_rows)
+    years = _digits(rng, n_rows, 2)
+    card_ids = _choice(rng, list(NEW_PID_REGION_CODE_NUMS), n_rows)\
+        + genders + years + _digits(rng, n_rows, 6)
+
+    old_mask = (kind >= 0.50) & (kind < 0.75)
+    card_ids[old_mask] = _choice(rng, list(OLD_PID_REGION_CODE_NUMS), old_mask.sum())\
+        + _digits(rng, old_mask.sum(), 7)
+
+    passport_mask = (kind >= 0.75) & (kind < 0.85)
+    card_ids[passport_mask] = _choice(rng, list('bcn'), passport_mask.sum())\
+        + _digits(rng, passport_mask.sum(), 7)
+
+    card_ids = _apply_mask(
+        card_ids, (kind >= 0.85) & (kind < 0.90),
+        lambda card_id: card_id[:3] + ' ' + card_id[3:] + '.')
+    card_ids = _apply_mask(
+        card_ids, (kind >= 0.90) & (kind < 0.95),
+        lambda card_id: card_id[:5])
+    card_ids[kind >= 0.97] = None
+
+    return pd.Series(card_ids, name='card_id')
+
+
+def generate_addresses(n_rows: int, seed: int = 42) -> pd.Series:
+    """
+    Generate addresses from the location dictionary with house numbers, streets,
+    non-accented & abbreviated variants and missing values
+    """
+    from preprocessing_pgp.address.const import LOCATION_CODE_DICT
+
+    rng = np.random.default_rng(seed)
+
+    locations = LOCATION_CODE_DICT[['ward_vi', 'district_vi', 'city_vi']]\
+        .dropna()\
+        .sample(n_rows, replace=True, random_state=seed)
+
+    addresses = rng.integers(1, 999, n_rows).astype(str).astype(object)\
+        + ' ' + _choice(rng, STREET_NAMES, n_rows)\
+        + ', ' + locations['ward_vi'].values.astype(object)\
+        + ', ' + locations['district_vi'].values.astype(object)\
+        + ', ' + locations['city_vi'].values.astype(object)
+
+    def abbreviate(address: str) -> str:
+        for full_term, abbrev in ADDRESS_ABBREVS.items():
+            address = address.replace(full_term, abbrev)
+        return address
+
+    noise = rng.random(n_rows)
+    addresses = _apply_mask(addresses, noise < 0.30, remove_accent)
+    addresses = _apply_mask(
+        addresses, (noise >= 0.30) & (noise < 0.50), abbreviate)
+    addresses = _apply_mask(
+        addresses, (noise >= 0.50) & (noise < 0.55), str.lower)
+    addresses[noise >= 0.97] = None
+
+    return pd.Series(addresses, name='address')
+
+
+def generate_profiles(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Generate a profile frame with all the columns:
+    `name`, `phone`, `email`, `card_id` and `address`
+    """
+    return pd.concat([
+        generate_names(n_rows, seed),
+        generate_phones(n_rows, seed + 1),
+        generate_emails(n_rows, seed + 2),
+        generate_card_ids(n_rows, seed + 3),
+        generate_addresses(n_rows, seed + 4)
+    ], axis=1)
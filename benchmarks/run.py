@@ -0,0 +1,225 @@
+"""
+Run the timed scenarios of every public entry point and write the results as JSON lines
+
+Usage
+-----
+python benchmarks/run.py --sizes 10k,1m,10m --cores 1,8 --output results.jsonl
+python benchmarks/run.py --scenarios phone,email --sizes 10k
+
+Each (scenario, size, cores) runs in a fresh Python process,
+so that the peak memory of one run does not leak into another
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generators import (  # noqa: E402
+    generate_names,
+    generate_phones,
+    generate_emails,
+    generate_card_ids,
+    generate_addresses
+)
+
+SIZE_ALIASES = {'k': 1_000, 'm': 1_000_000}
+
+
+def _run_phone(n_rows: int, n_cores: int) -> Callable[[], pd.DataFrame]:
+    from preprocessing_pgp.phone.extractor import extract_valid_phone
+
+    data = generate_phones(n_rows).to_frame()
+    return lambda: extract_valid_phone(data, phone_col='phone', print_info=False)
+
+
+def _run_email(n_rows: int, n_cores: int) -> Callable[[], pd.DataFrame]:
+    from preprocessing_pgp.email.validator import process_validate_email
+
+    data = generate_emails(n_rows).to_frame()
+    return lambda: process_validate_email(data, email_col='email', n_cores=n_cores)
+
+
+def _run_card(n_rows: int, n_cores: int) -> Callable[[], pd.DataFrame]:
+    from preprocessing_pgp.card.validation import verify_card
+
+    data = generate_card_ids(n_rows).to_frame()
+    return lambda: verify_card(data, card_col='card_id', print_info=False)
+
+
+def _run_type(n_rows: int, n_cores: int) -> Callable[[], pd.DataFrame]:
+    from preprocessing_pgp.name.type.extractor import process_extract_type
+
+    data = generate_names(n_rows).to_frame()
+    return lambda: process_extract_type(data, name_col='name', n_cores=n_cores)
+
+
+def _run_enrich(n_rows: int, n_cores: int) -> Callable[[], pd.DataFrame]:
+    from preprocessing_pgp.name.enrich_name import process_enrich
+
+    data = generate_names(n_rows).to_frame()
+    return lambda: process_enrich(data, name_col='name', n_cores=n_cores)
+
+
+def _run_address(n_rows: int, n_cores: int) -> Callable[[], pd.DataFrame]:
+    from preprocessing_pgp.address.extractor import extract_vi_address
+
+    data = generate_addresses(n_rows).to_frame()
+    return lambda: extract_vi_address(data, address_col='address', n_cores=n_cores)
+
+
+SCENARIOS: Dict[str, Callable[[int, int], Callable[[], pd.DataFrame]]] = {
+    'phone': _run_phone,
+    'email': _run_email,
+    'card': _run_card,
+    'type': _run_type,
+    'address': _run_address,
+    'enrich': _run_enrich
+}
+# * Entry points without multi-processing
+SINGLE_CORE_SCENARIOS = ['phone', 'card']
+
+
+def parse_size(size: str) -> int:
+    """
+    Parse the number of rows, e.g. '10k' -> 10000, '1m' -> 1000000
+    """
+    size = size.strip().lower()
+    if size[-1] in SIZE_ALIASES:
+        return int(float(size[:-1]) * SIZE_ALIASES[size[-1]])
+    return int(size)
+
+
+def _git_revision() -> str:
+    """
+    Current git commit of the repository, if any
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_scenario(scenario: str, n_rows: int, n_cores: int) -> Dict:
+    """
+    Generate the data and time one scenario in the current process
+    """
+    import preprocessing_pgp
+    from preprocessing_pgp.utils import METRIC_SINKS, MemorySink
+
+    run = SCENARIOS[scenario](n_rows, n_cores)
+
+    # * Collect the stage breakdown instead of printing it
+    stage_sink = MemorySink()
+    METRIC_SINKS[:] = [stage_sink]
+
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = perf_counter()
+    output = run()
+    elapsed = perf_counter() - start_time
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'scenario': scenario,
+        'rows': n_rows,
+        'n_cores': n_cores,
+        'seconds': round(elapsed, 4),
+        'rows_per_sec': round(n_rows / elapsed, 1) if elapsed > 0 else None,
+        'peak_rss_delta_mb': round((peak_rss - start_rss) / 1024, 1),
+        'rows_out': int(output.shape[0]),
+        'stages': [
+            {'stage': metrics.stage, 'seconds': round(metrics.wall_time, 4)}
+            for metrics in stage_sink.records
+        ],
+        'version': preprocessing_pgp.__version__,
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }
+
+
+def run_isolated(scenario: str, n_rows: int, n_cores: int) -> Dict:
+    """
+    Run one scenario in a fresh Python process
+    """
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--single',
+         scenario, str(n_rows), str(n_cores)],
+        capture_output=True, text=True, check=False
+    )
+    if completed.returncode != 0:
+        return {
+            'scenario': scenario,
+            'rows': n_rows,
+            'n_cores': n_cores,
+            'error': completed.stderr.strip().splitlines()[-1:]
+        }
+
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Timed scenarios of the preprocessing_pgp entry points')
+    parser.add_argument('--scenarios', default='phone,email,card,type,address',
+                        help=f'Comma separated scenarios from {list(SCENARIOS)}')
+    parser.add_argument('--sizes', default='10k',
+                        help='Comma separated number of rows, e.g. 10k,1m,10m')
+    parser.add_argument('--cores', default='1',
+                        help='Comma separated number of cores, e.g. 1,8')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Number of runs of each scenario')
+    parser.add_argument('--output', default=None,
+                        help='JSON lines file to append the results, by default stdout')
+    parser.add_argument('--single', nargs=3, default=None,
+                        metavar=('SCENARIO', 'ROWS', 'CORES'),
+                        help=argparse.SUPPRESS)
+    parsed = parser.parse_args(args)
+
+    if parsed.single is not None:
+        scenario, n_rows, n_cores = parsed.single
+        result = measure_scenario(scenario, int(n_rows), int(n_cores))
+        sys.stdout.write(json.dumps(result) + '\n')
+        return
+
+    scenarios = [scenario.strip() for scenario in parsed.scenarios.split(',')]
+    unknown_scenarios = [s for s in scenarios if s not in SCENARIOS]
+    if unknown_scenarios:
+        parser.error(f'Unknown scenarios: {unknown_scenarios}')
+    sizes = [parse_size(size) for size in parsed.sizes.split(',')]
+    cores = [int(n_cores) for n_cores in parsed.cores.split(',')]
+
+    output = open(parsed.output, 'a', encoding='utf-8')\
+        if parsed.output else sys.stdout
+    try:
+        for scenario in scenarios:
+            scenario_cores = [1] if scenario in SINGLE_CORE_SCENARIOS else cores
+            for n_rows in sizes:
+                for n_cores in scenario_cores:
+                    for _ in range(parsed.repeat):
+                        result = run_isolated(scenario, n_rows, n_cores)
+                        output.write(json.dumps(result) + '\n')
+                        output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,263 @@
 # __main__.py
+"""
+Command line running one stage or a chain of stages over Parquet, CSV or JSON-lines files,
+as a streaming batch job: the peak memory only depends on `--batch-rows`
+
+Usage
+-----
+python -m preprocessing_pgp phone --input profiles.parquet --output phones.parquet --column phone
+python -m preprocessing_pgp type:name phone:phone email:email --input profiles.csv --output profiles.jsonl --batch-rows 200000 --n-cores 4
+"""
 
-import sys
 import argparse
+import json
+import sys
+from time import perf_counter
+from typing import Iterator, List, Optional, Sequence
 
 import pandas as pd
 
+from preprocessing_pgp.const import (
+    DEFAULT_BATCH_ROWS,
+    STAGE_DEFAULT_COLUMN_DICT,
+    STAGE_FUNCTION_DICT
+)
+from preprocessing_pgp.pipeline import PipelineStage, ProfilePipeline
+from preprocessing_pgp.streaming import BatchWriter, read_batches, read_schema
+from preprocessing_pgp.utils import (
+    METRIC_SINKS,
+    ConsoleSink,
+    JsonLinesSink,
+    MemorySink,
+    StageMetrics,
+    add_metric_sink,
+    remove_metric_sink,
+    track_stage
+)
+
+FILE_FORMATS = ['parquet', 'csv', 'jsonl']
+
+
+def parse_stage(
+    spec: str,
+    column: Optional[str] = None,
+    level: Optional[str] = None
+) -> PipelineStage:
+    """
+    Parse a stage given as `<stage>` or `<stage>:<column>`,
+    without column the `--column` or the stage's default column is processed
+    """
+    name, _, stage_column = spec.partition(':')
+    if name not in STAGE_FUNCTION_DICT:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage '{name}', "
+            f"available stages: {list(STAGE_FUNCTION_DICT.keys())}"
+        )
+
+    options = {'level': level} if name == 'type' and level is not None else {}
+
+    return PipelineStage(
+        name,
+        stage_column or column or STAGE_DEFAULT_COLUMN_DICT[name],
+        options
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m preprocessing_pgp',
+        description='Run processing stages over a file as a streaming batch job'
+    )
+    parser.add_argument(
+        'stages', nargs='+', metavar='stage[:column]',
+        help=f'stage(s) to run in chain: {", ".join(STAGE_FUNCTION_DICT.keys())}'
+    )
+    parser.add_argument('--input', required=True, nargs='+',
+                        help='input file(s), or a Parquet directory')
+    parser.add_argument('--output', required=True, help='output file')
+    parser.add_argument('--column',
+                        help="column of the stages given without ':column'")
+    parser.add_argument('--input-format', choices=FILE_FORMATS,
+                        help='by default inferred from the extension')
+    parser.add_argument('--output-format', choices=FILE_FORMATS,
+                        help='by default inferred from the extension')
+    parser.add_argument('--columns', nargs='+',
+                        help='columns to read from the input, by default all')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f'rows per batch, by default {DEFAULT_BATCH_ROWS}')
+    parser.add_argument('--n-cores', type=int, default=1,
+                        help='cores of the stages running in parallel, by default 1')
+    parser.add_argument('--n-workers', type=int, default=1,
+                        help='independent stages run concurrently, by default 1')
+    parser.add_argument('--level', help="level of the 'type' stage (lv1, lv2)")
+    parser.add_argument('--metrics',
+                        help='JSON-lines file receiving the metrics of every stage run')
+    parser.add_argument('--summary',
+                        help='JSON file receiving the timing summary of the job')
+    parser.add_argument('--verbose', action='store_true',
+                        help='keep the console output of the stages')
+
+    return parser
+
+
+def _tracked_batches(
+    batches: Iterator[pd.DataFrame]
+) -> Iterator[pd.DataFrame]:
+    """
+    Helper to track the reading time of each batch
+    """
+    while True:
+        with track_stage('read', display=False) as metrics:
+            data = next(batches, None)
+            metrics.rows_in = metrics.rows_out =\
+                0 if data is None else data.shape[0]
+        if data is None:
+            return
+        yield data
+
+
+def summarize_metrics(
+    records: List[StageMetrics],
+    total_seconds: float
+) -> pd.DataFrame:
+    """
+    Total time & throughput of each stage over all the batches
+
+    Parameters
+    ----------
+    records : List[StageMetrics]
+        The metrics of every stage run of the job
+    total_seconds : float
+        The wall time of the whole job
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per stage, in the order of their first run:
+        `stage`, `batches`, `rows_in`, `rows_out`, `seconds`, `rows_per_sec` & `time_share`
+    """
+    metrics = pd.DataFrame([
+        {
+            'stage': record.stage,
+            'rows_in': record.rows_in or 0,
+            'rows_out': record.rows_out or 0,
+            'seconds': record.wall_time
+        }
+        for record in records
+    ], columns=['stage', 'rows_in', 'rows_out', 'seconds'])
+
+    summary = metrics.groupby('stage', sort=False)\
+        .agg(
+            batches=('seconds', 'size'),
+            rows_in=('rows_in', 'sum'),
+            rows_out=('rows_out', 'sum'),
+            seconds=('seconds', 'sum')
+        )\
+        .reset_index()
+    summary['rows_per_sec'] = (
+        summary['rows_in'] / summary['seconds'].where(summary['seconds'] > 0)
+    ).round(1)
+    summary['time_share'] = (summary['seconds'] / total_seconds).round(3)\
+        if total_seconds > 0 else None
+    summary['seconds'] = summary['seconds'].round(3)
+
+    return summary
+
+
+def run_job(parsed: argparse.Namespace) -> dict:
+    """
+    Stream the input through the chain of stages to the output,
+    returns the summary of the job
+    """
+    stages = [
+        parse_stage(spec, parsed.column, parsed.level)
+        for spec in parsed.stages
+    ]
+    pipeline = ProfilePipeline(
+        stages,
+        n_workers=parsed.n_workers,
+        n_cores=parsed.n_cores
+    )
+    stage_labels = ['read', *[f'{stage.name}:{stage.column}' for stage in stages], 'write']
+    input_path = parsed.input[0] if len(parsed.input) == 1 else parsed.input
+
+    memory_sink = MemorySink()
+    sinks: list = [memory_sink]
+    if parsed.metrics:
+        sinks.append(JsonLinesSink(parsed.metrics))
+    console_sinks = [] if parsed.verbose else [
+        sink for sink in METRIC_SINKS if isinstance(sink, ConsoleSink)
+    ]
+
+    for sink in sinks:
+        add_metric_sink(sink)
+    for sink in console_sinks:
+        remove_metric_sink(sink)
+
+    start_time = perf_counter()
+    try:
+        empty_schema = read_schema(input_path, parsed.input_format, parsed.columns)
+        with BatchWriter(parsed.output, parsed.output_format,
+                         empty_schema=empty_schema) as writer:
+            for data in _tracked_batches(iter(read_batches(
+                input_path,
+                file_format=parsed.input_format,
+                batch_rows=parsed.batch_rows,
+                columns=parsed.columns
+            ))):
+                processed_data = pipeline.run(data)
+                with track_stage('write', rows_in=processed_data.shape[0],
+                                 display=False) as metrics:
+                    metrics.rows_out = writer.write(processed_data)
+    finally:
+        for sink in sinks:
+            remove_metric_sink(sink)
+        for sink in console_sinks:
+            add_metric_sink(sink)
+    total_seconds = perf_counter() - start_time
+
+    summary = summarize_metrics(
+        [record for record in memory_sink.records
+         if record.stage in stage_labels],
+        total_seconds
+    )
+
+    return {
+        'stages': [f'{stage.name}:{stage.column}' for stage in stages],
+        'rows': writer.n_rows,
+        'seconds': round(total_seconds, 3),
+        'rows_per_sec': round(writer.n_rows / total_seconds, 1)
+        if total_seconds > 0 else None,
+        'by_stage': summary.to_dict('records')
+    }
+
+
+def main(args: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    parsed = parser.parse_args(args)
+    if parsed.batch_rows <= 0:
+        parser.error(f'--batch-rows must be positive, got {parsed.batch_rows}')
+    try:
+        for spec in parsed.stages:
+            parse_stage(spec)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+
+    summary = run_job(parsed)
+
+    sys.stderr.write(
+        f"{summary['rows']} rows in {summary['seconds']}s "
+        f"({summary['rows_per_sec']} rows/s)\n"
+    )
+    sys.stderr.write(
+        pd.DataFrame(summary['by_stage']).to_string(index=False) + '\n'
+    )
+    if parsed.summary:
+        with open(parsed.summary, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
 
-def main():
-    print("Project is on the way to update this feature...,\nThank you all for your support")
-    return
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
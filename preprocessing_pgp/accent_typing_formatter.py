@@ -1,7 +1,8 @@
 import string
 
 import regex as re
-import unidecode as decode
+
+from preprocessing_pgp.deaccent import remove_accent
 
 
 # REFORMATING ACCENT
@@ -144,7 +145,7 @@ def remove_accent_typing(sentence: str) -> str:
     if sentence is None:
         return None
 
-    return decode.unidecode(sentence)
+    return remove_accent(sentence)
 
 
 if __name__ == '__main__':
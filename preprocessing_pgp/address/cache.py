@@ -0,0 +1,211 @@
+"""
+Module contains the memo cache of full address parse results,
+keyed by the raw address string
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+# * (cleaned address, found patterns, remained address, best patterns, level codes)
+AddressParseResult = Tuple[str, Dict, str, Dict, Dict]
+
+
+class AddressParseCache:
+    """
+    Bounded & thread-safe LRU cache of the address parse results
+
+    * The least recently used address is evicted when the cache is full
+    * Lookups are counted as `hits` & `misses`
+    * The cache can be saved to & loaded from a local pickle file,
+    only load files created by yourself
+
+    Examples
+    --------
+    >>> cache = AddressParseCache(max_size=500_000, path='address_cache.pkl')
+    >>> extracted_data = extract_vi_address(data, 'address', cache=cache)
+    >>> cache.hit_rate
+    >>> cache.save()
+    """
+
+    def __init__(
+        self,
+        max_size: int = 100_000,
+        path: Optional[str] = None
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.__results: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self.__results)
+
+    def __contains__(self, address: Hashable) -> bool:
+        return address in self.__results
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """
+        Ratio of hits over all lookups
+        """
+        n_lookups = self.hits + self.misses
+        if n_lookups == 0:
+            return None
+        return self.hits / n_lookups
+
+    def get(self, address: Hashable) -> Optional[AddressParseResult]:
+        """
+        Get the parse result of the raw address, None if not cached
+
+        Parameters
+        ----------
+        address : Hashable
+            The raw address
+
+        Returns
+        -------
+        Optional[AddressParseResult]
+            The cached `(cleaned address, found patterns, remained address,
+            best patterns, level codes)`
+        """
+        with self.__lock:
+            result = self.__results.get(address)
+            if result is None:
+                self.misses += 1
+                return None
+
+            self.__results.move_to_end(address)
+            self.hits += 1
+
+        return result
+
+    def get_many(
+        self,
+        addresses: Iterable[Hashable]
+    ) -> Dict[Hashable, AddressParseResult]:
+        """
+        Get the cached parse results of the raw addresses
+
+        Parameters
+        ----------
+        addresses : Iterable[Hashable]
+            The raw addresses, should be unique
+
+        Returns
+        -------
+        Dict[Hashable, AddressParseResult]
+            The cached results, missing addresses are not included
+        """
+        cached_results = {}
+        with self.__lock:
+            for address in addresses:
+                result = self.__results.get(address)
+                if result is None:
+                    self.misses += 1
+                    continue
+
+                self.__results.move_to_end(address)
+                self.hits += 1
+                cached_results[address] = result
+
+        return cached_results
+
+    def put(
+        self,
+        address: Hashable,
+        result: AddressParseResult
+    ) -> None:
+        """
+        Cache the parse result of the raw address
+        """
+        with self.__lock:
+            self.__put(address, result)
+
+    def put_many(
+        self,
+        results: Dict[Hashable, AddressParseResult]
+    ) -> None:
+        """
+        Cache the parse results of multiple raw addresses
+        """
+        with self.__lock:
+            for address, result in results.items():
+                self.__put(address, result)
+
+    def __put(
+        self,
+        address: Hashable,
+        result: AddressParseResult
+    ) -> None:
+        """
+        Helper to insert one result & evict the least recently used ones,
+        the lock must be held
+        """
+        self.__results[address] = result
+        self.__results.move_to_end(address)
+
+        while len(self.__results) > self.max_size:
+            self.__results.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove all the cached results & reset the metrics
+        """
+        with self.__lock:
+            self.__results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Save the cached results to a local file, from the least to the most recently used
+
+        Parameters
+        ----------
+        path : Optional[str], optional
+            The file to save to, by default the `path` of the cache
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the address cache")
+
+        with self.__lock:
+            results = list(self.__results.items())
+
+        # * Write then rename so that a crash never leaves a partial file
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(results, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Load the cached results from a local file,
+        keeping only the most recently used ones if over `max_size`
+
+        Parameters
+        ----------
+        path : Optional[str], optional
+            The file to load from, by default the `path` of the cache
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to load the address cache")
+
+        with open(path, 'rb') as file:
+            results = pickle.load(file)
+
+        with self.__lock:
+            for address, result in results:
+                self.__put(address, result)
@@ -67,3 +67,16 @@ LEVEL_CODE_COLUMN_DICT = {
 }
 
 AVAIL_LEVELS = LEVEL_VI_COLUMN_DICT.keys()
+
+
+# ? FUZZY MATCHING
+# * Methods indexed for the fuzzy fallback of each level
+FUZZY_LEVEL_METHODS = {
+    1: ['lv1_norm', 'lv1_prefix_im'],
+    2: ['lv2_norm', 'lv2_prefix_im'],
+    3: ['lv3_norm', 'lv3_prefix_im']
+}
+FUZZY_MAX_EDIT_DISTANCE = 2
+FUZZY_PREFIX_LENGTH = 7
+# * Allowed edit distance by the minimum length of the matched text
+FUZZY_DISTANCE_BY_LENGTH = [(12, 2), (6, 1)]
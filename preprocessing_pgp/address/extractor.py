@@ -5,25 +5,156 @@ File containing logic to extract a full address into 3 levels:
 * Level 2: District
 * Level 3: Ward
 """
-from time import time
+from typing import Dict, Hashable
 
 import pandas as pd
 
+from preprocessing_pgp.address.cache import (
+    AddressParseCache,
+    AddressParseResult
+)
 from preprocessing_pgp.address.loc_process import generate_loc_code
 from preprocessing_pgp.address.level_extractor import extract_vi_address_by_level
 from preprocessing_pgp.address.preprocess import clean_vi_address
+from preprocessing_pgp.checkpoint import DEFAULT_CHUNK_ROWS, run_checkpointed
 from preprocessing_pgp.utils import (
-    sep_display,
     parallelize_dataframe,
-    extract_null_values
+    extract_null_values,
+    track_stage,
+    select_input_columns,
+    compact_new_columns
 )
 from preprocessing_pgp.address.const import AVAIL_LEVELS
 
 
-def extract_vi_address(
+def _parse_addresses(
     data: pd.DataFrame,
     address_col: str,
     n_cores: int = 1
+) -> pd.DataFrame:
+    """
+    Clean, extract the levels & generate the location codes of non-null addresses
+    """
+    # * Cleanse the address
+    with track_stage('Cleansing', rows_in=data.shape[0]) as metrics:
+        cleaned_data = clean_vi_address(data, address_col)
+        metrics.rows_out = cleaned_data.shape[0]
+
+    # * Feed the cleansed address to extract the level
+    with track_stage('Extracting', rows_in=cleaned_data.shape[0]) as metrics:
+        if n_cores == 1: # Not using multi-processing
+            extracted_data = extract_vi_address_by_level(
+                cleaned_data,
+                address_col=f'cleaned_{address_col}'
+            )
+        else:
+            extracted_data = parallelize_dataframe(
+                cleaned_data,
+                extract_vi_address_by_level,
+                n_cores=n_cores,
+                address_col=f'cleaned_{address_col}'
+            )
+        metrics.rows_out = extracted_data.shape[0]
+
+    # * Generate location code for best level found
+    with track_stage('Code generation', rows_in=extracted_data.shape[0]) as metrics:
+        best_lvl_cols = [f'best level {i}' for i in AVAIL_LEVELS]
+        if n_cores == 1:
+            generated_data = generate_loc_code(
+                extracted_data,
+                best_lvl_cols=best_lvl_cols
+            )
+        else:
+            generated_data = parallelize_dataframe(
+                extracted_data,
+                generate_loc_code,
+                n_cores=n_cores,
+                best_lvl_cols=best_lvl_cols
+            )
+        metrics.rows_out = generated_data.shape[0]
+
+    return generated_data
+
+
+def _parse_addresses_with_cache(
+    data: pd.DataFrame,
+    address_col: str,
+    cache: AddressParseCache,
+    n_cores: int = 1
+) -> pd.DataFrame:
+    """
+    Parse the non-null addresses, only the unique addresses missing from the cache are parsed
+    """
+    # * Look up the cache once for each unique address
+    with track_stage('Address cache', rows_in=data.shape[0]) as metrics:
+        unique_addresses = data[address_col].unique()
+        parse_results: Dict[Hashable, AddressParseResult] =\
+            cache.get_many(unique_addresses)
+        missing_addresses = [
+            address for address in unique_addresses
+            if address not in parse_results
+        ]
+        metrics.record_cache(
+            hits=len(parse_results),
+            misses=len(missing_addresses)
+        )
+        metrics.rows_out = len(missing_addresses)
+
+    if len(missing_addresses) > 0:
+        parsed_data = _parse_addresses(
+            pd.DataFrame({address_col: missing_addresses}),
+            address_col,
+            n_cores=n_cores
+        )
+        new_results = {
+            address: (
+                cleaned_address,
+                dict(zip(AVAIL_LEVELS, found_patterns)),
+                remained_address,
+                dict(zip(AVAIL_LEVELS, best_patterns)),
+                dict(zip(AVAIL_LEVELS, level_codes))
+            )
+            for address, cleaned_address, remained_address,
+            found_patterns, best_patterns, level_codes in zip(
+                parsed_data[address_col],
+                parsed_data[f'cleaned_{address_col}'],
+                parsed_data['remained address'],
+                parsed_data[[f'level {i}' for i in AVAIL_LEVELS]].values,
+                parsed_data[[f'best level {i}' for i in AVAIL_LEVELS]].values,
+                parsed_data[[f'level {i} code' for i in AVAIL_LEVELS]].values
+            )
+        }
+        cache.put_many(new_results)
+        parse_results.update(new_results)
+
+    # * Expand the results to all the records
+    row_results = [parse_results[address] for address in data[address_col]]
+
+    generated_data = data.copy()
+    generated_data[f'cleaned_{address_col}'] = [
+        result[0] for result in row_results]
+    for level in AVAIL_LEVELS:
+        generated_data[f'level {level}'] = [
+            result[1][level] for result in row_results]
+        generated_data[f'best level {level}'] = [
+            result[3][level] for result in row_results]
+    generated_data['remained address'] = [
+        result[2] for result in row_results]
+    for level in AVAIL_LEVELS:
+        generated_data[f'level {level} code'] = [
+            result[4][level] for result in row_results]
+
+    return generated_data
+
+
+def extract_vi_address(
+    data: pd.DataFrame,
+    address_col: str,
+    n_cores: int = 1,
+    return_only_new_columns: bool = False,
+    cache: AddressParseCache = None,
+    checkpoint_dir: str = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
 ) -> pd.DataFrame:
     """
     Extract Vietnamese address by pattern to find 3 levels of address
@@ -36,6 +167,17 @@ def extract_vi_address(
         The name of the column containing addresses
     n_cores : int, optional
         The number of cores used to run parallel, by default 1 core will be used
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns aligned to the input index,
+        with `category` levels & codes, by default False
+    cache : AddressParseCache, optional
+        The memo cache of the parse results by raw address,
+        consulted before cleaning & extracting, by default None (no cache)
+    checkpoint_dir : str, optional
+        The local directory where each finished chunk of `chunk_rows` addresses is checkpointed,
+        a re-run on the same data skips the finished chunks, by default None (no checkpoint)
+    chunk_rows : int, optional
+        The number of addresses per checkpointed chunk, by default `DEFAULT_CHUNK_ROWS`
 
     Returns
     -------
@@ -48,6 +190,21 @@ def extract_vi_address(
         * `level 3`: ward found
         * `remained address`: the remaining in the address
     """
+    if checkpoint_dir is not None:
+        return run_checkpointed(
+            data,
+            extract_vi_address,
+            checkpoint_dir,
+            chunk_rows=chunk_rows,
+            address_col=address_col,
+            n_cores=n_cores,
+            return_only_new_columns=return_only_new_columns,
+            cache=cache
+        )
+
+    if return_only_new_columns:
+        input_index = data.index
+        data = select_input_columns(data, [address_col])
 
     # * Removing na addresses
     clean_address_df, na_address_df =\
@@ -56,51 +213,37 @@ def extract_vi_address(
             by_col=address_col
         )
 
-    # * Cleanse the address
-    start_time = time()
-    cleaned_data = clean_vi_address(clean_address_df, address_col)
-    clean_time = time() - start_time
-    print(f"Cleansing takes {int(clean_time)//60}m{int(clean_time)%60}s")
-    sep_display()
-
-    # * Feed the cleansed address to extract the level
-    start_time = time()
-    if n_cores == 1: # Not using multi-processing
-        extracted_data = extract_vi_address_by_level(
-            cleaned_data,
-            address_col=f'cleaned_{address_col}'
+    if cache is None:
+        generated_data = _parse_addresses(
+            clean_address_df,
+            address_col,
+            n_cores=n_cores
         )
     else:
-        extracted_data = parallelize_dataframe(
-            cleaned_data,
-            extract_vi_address_by_level,
-            n_cores=n_cores,
-            address_col=f'cleaned_{address_col}'
+        generated_data = _parse_addresses_with_cache(
+            clean_address_df,
+            address_col,
+            cache,
+            n_cores=n_cores
         )
-    extract_time = time() - start_time
-    print(f"Extracting takes {int(extract_time)//60}m{int(extract_time)%60}s")
-    sep_display()
-
-    # * Generate location code for best level found
-    start_time = time()
-    best_lvl_cols = [f'best level {i}' for i in AVAIL_LEVELS]
-    if n_cores == 1:
-        generated_data = generate_loc_code(
-            extracted_data,
-            best_lvl_cols=best_lvl_cols
-        )
-    else:
-        generated_data = parallelize_dataframe(
-            extracted_data,
-            generate_loc_code,
-            n_cores=n_cores,
-            best_lvl_cols=best_lvl_cols
-        )
-    code_gen_time = time() - start_time
-    print(
-        f"Code generation takes {int(code_gen_time)//60}m{int(code_gen_time)%60}s")
 
     # * Concat to original data
     final_address_df = pd.concat([generated_data, na_address_df])
 
+    if return_only_new_columns:
+        level_cols = [
+            col
+            for level in AVAIL_LEVELS
+            for col in (f'level {level}', f'best level {level}', f'level {level} code')
+        ]
+        return compact_new_columns(
+            final_address_df,
+            input_index,
+            new_cols=[
+                col for col in final_address_df.columns
+                if col != address_col
+            ],
+            category_cols=level_cols
+        )
+
     return final_address_df
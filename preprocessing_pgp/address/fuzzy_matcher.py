@@ -0,0 +1,298 @@
+"""
+File containing the fuzzy fallback of the level extraction,
+matching misspelled address components with a symmetric-delete index (SymSpell)
+
+* E.g: 'tp ho chi mnh' -> 'ho chi minh', 'phuong nguyen an nnh' -> 'phuong nguyen an ninh'
+"""
+
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from preprocessing_pgp.address.const import (
+    LOCATION_ENRICH_DICT,
+    FUZZY_LEVEL_METHODS,
+    FUZZY_MAX_EDIT_DISTANCE,
+    FUZZY_PREFIX_LENGTH,
+    FUZZY_DISTANCE_BY_LENGTH
+)
+
+
+def edit_distance(
+    source: str,
+    target: str,
+    max_distance: int
+) -> int:
+    """
+    Optimal string alignment distance (Damerau-Levenshtein without repeated edits),
+    bounded by `max_distance`
+
+    Returns
+    -------
+    int
+        The distance, or `max_distance + 1` when over the bound
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    prev_prev_row = None
+    prev_row = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, start=1):
+        row = [i] + [0] * len(target)
+        for j, target_char in enumerate(target, start=1):
+            cost = 0 if source_char == target_char else 1
+            row[j] = min(
+                prev_row[j] + 1,
+                row[j - 1] + 1,
+                prev_row[j - 1] + cost
+            )
+            if (i > 1 and j > 1
+                    and source_char == target[j - 2]
+                    and source[i - 2] == target_char):
+                row[j] = min(row[j], prev_prev_row[j - 2] + 1)
+
+        if min(row) > max_distance:
+            return max_distance + 1
+        prev_prev_row, prev_row = prev_row, row
+
+    return min(prev_row[-1], max_distance + 1)
+
+
+@lru_cache(maxsize=2**16)
+def generate_deletes(prefix: str, max_distance: int) -> FrozenSet[str]:
+    """
+    Generate all the strings made by deleting up to `max_distance` characters from the prefix,
+    cached as the same prefixes are looked up again and again
+    """
+    deletes = {prefix}
+    for n_deletes in range(1, min(max_distance, len(prefix)) + 1):
+        for delete_ids in combinations(range(len(prefix)), n_deletes):
+            deletes.add(''.join(
+                char for i, char in enumerate(prefix)
+                if i not in delete_ids
+            ))
+
+    return frozenset(deletes)
+
+
+class SymmetricDeleteIndex:
+    """
+    Precomputed symmetric-delete index of terms:
+    each term is stored under all the deletes of its prefix up to `max_distance`,
+    so a lookup only probes the deletes of the query prefix instead of all terms
+    """
+
+    def __init__(
+        self,
+        terms: Iterable[str],
+        max_distance: int = FUZZY_MAX_EDIT_DISTANCE,
+        prefix_length: int = FUZZY_PREFIX_LENGTH
+    ) -> None:
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.terms: List[str] = []
+        self.delete_refer_dict: Dict[str, List[int]] = {}
+
+        for term in dict.fromkeys(terms):
+            term_id = len(self.terms)
+            self.terms.append(term)
+            for delete in generate_deletes(term[:prefix_length], max_distance):
+                self.delete_refer_dict.setdefault(delete, []).append(term_id)
+
+    def lookup(
+        self,
+        query: str,
+        max_distance: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Find the terms within `max_distance` edits of the query
+
+        Parameters
+        ----------
+        query : str
+            The text to look up
+        max_distance : Optional[int], optional
+            The maximum edit distance, by default the `max_distance` of the index
+
+        Returns
+        -------
+        List[Tuple[str, int]]
+            The matched terms with their edit distance, closest first
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+
+        candidate_ids = set()
+        for delete in generate_deletes(query[:self.prefix_length], self.max_distance):
+            candidate_ids.update(self.delete_refer_dict.get(delete, ()))
+
+        matches = []
+        for term_id in candidate_ids:
+            term = self.terms[term_id]
+            distance = edit_distance(query, term, max_distance)
+            if distance <= max_distance:
+                matches.append((term, distance))
+
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+
+class LevelFuzzyMatcher:
+    """
+    Fuzzy fallback of the level extraction over the location dictionary
+
+    * One symmetric-delete index for each level & each location of its parent levels,
+    so the candidates are pruned to the districts of the found city, the wards of the found district
+    * Levels 2 & 3 are only matched when a parent level is found
+    """
+
+    def __init__(
+        self,
+        location_dict: pd.DataFrame = LOCATION_ENRICH_DICT
+    ) -> None:
+        # * (level, parent level, parent best name) -> index of the level's terms
+        self.level_indexes: Dict[Tuple[int, int, Optional[str]], SymmetricDeleteIndex] = {}
+        self.level_max_words: Dict[int, int] = {}
+        # * (level, term) -> [(method, (best level 1, ..., best level n))]
+        self.term_refer_dict: Dict[Tuple[int, str], List[Tuple[str, Tuple]]] = {}
+
+        for level, methods in FUZZY_LEVEL_METHODS.items():
+            best_cols = [f'lv{i}' for i in range(1, level + 1)]
+            level_data = pd.concat([
+                location_dict[[method, *best_cols]]
+                .rename(columns={method: 'term'})
+                .assign(method=method)
+                for method in methods
+            ])
+            level_data = level_data[
+                level_data['term'].notna() & (level_data['term'] != '')
+            ].drop_duplicates()
+
+            for term, method, best_names in zip(
+                level_data['term'],
+                level_data['method'],
+                level_data[best_cols].itertuples(index=False, name=None)
+            ):
+                self.term_refer_dict.setdefault((level, term), [])\
+                    .append((method, best_names))
+
+            self.level_indexes[(level, 0, None)] =\
+                SymmetricDeleteIndex(level_data['term'])
+            for parent_level in range(1, level):
+                for parent, parent_data in level_data.groupby(f'lv{parent_level}'):
+                    self.level_indexes[(level, parent_level, parent)] =\
+                        SymmetricDeleteIndex(parent_data['term'])
+
+            self.level_max_words[level] = int(
+                level_data['term'].str.split().str.len().max()
+            ) if level_data.shape[0] > 0 else 0
+
+    def __max_distance(self, text: str) -> int:
+        """
+        Helper to get the allowed edit distance of the text by its length
+        """
+        for min_length, distance in FUZZY_DISTANCE_BY_LENGTH:
+            if len(text) >= min_length:
+                return distance
+        return 0
+
+    def __is_under_parents(
+        self,
+        best_names: Tuple,
+        parents: Dict[int, str]
+    ) -> bool:
+        """
+        Helper to check whether the location is under all the found parent levels
+        """
+        return all(
+            best_names[parent_level - 1] == parent
+            for parent_level, parent in parents.items()
+        )
+
+    def match(
+        self,
+        address: str,
+        level: int,
+        parents: Dict[int, Optional[str]] = None
+    ) -> Tuple[str, str, str, str]:
+        """
+        Find the closest dictionary term of the level in the address
+
+        Parameters
+        ----------
+        address : str
+            The remained address that has been `lowered` and `unidecode`
+        level : int
+            The level to match
+        parents : Dict[int, Optional[str]], optional
+            The `best pattern` found at each parent level, by default None
+
+        Returns
+        -------
+        Tuple[str, str, str, str]
+            The output contains:
+            * the corrected `pattern` in the dictionary
+            * `remained address` without the matched text
+            * `method` of the dictionary term
+            * `best pattern` of the term if unique under the parents
+        """
+        parents = {
+            parent_level: parent
+            for parent_level, parent in (parents or {}).items()
+            if parent_level < level and parent is not None
+        }
+        # * Without any parent found, lower levels are too ambiguous to guess
+        if level > 1 and len(parents) == 0:
+            return None, address, None, None
+
+        # * Search in the locations of the lowest parent found
+        parent_level = max(parents, default=0)
+        level_index = self.level_indexes.get(
+            (level, parent_level, parents.get(parent_level)))
+        if level_index is None:
+            return None, address, None, None
+
+        words = address.split()
+        best_match = None
+        best_rank = None
+        for n_words in range(1, self.level_max_words[level] + 1):
+            for start in range(len(words) - n_words + 1):
+                text = ' '.join(words[start:start + n_words])
+                max_distance = self.__max_distance(text)
+                if max_distance == 0:
+                    continue
+
+                for term, distance in level_index.lookup(text, max_distance):
+                    term_refers = [
+                        (method, best_names)
+                        for method, best_names in self.term_refer_dict[(level, term)]
+                        if self.__is_under_parents(best_names, parents)
+                    ]
+                    if len(term_refers) == 0:
+                        continue
+
+                    # * Closest first, then the longest and the last in the address
+                    rank = (distance, -len(text), -start)
+                    if best_rank is None or rank < best_rank:
+                        best_rank = rank
+                        best_match = (term, start, n_words, term_refers)
+
+        if best_match is None:
+            return None, address, None, None
+
+        term, start, n_words, term_refers = best_match
+        remained_address = ' '.join(words[:start] + words[start + n_words:])
+        best_patterns = {best_names[-1] for _, best_names in term_refers}
+        best_pattern = best_patterns.pop() if len(best_patterns) == 1 else None
+
+        return term, remained_address, term_refers[0][0], best_pattern
+
+
+@lru_cache(maxsize=1)
+def get_level_fuzzy_matcher() -> LevelFuzzyMatcher:
+    """
+    Build the fuzzy matcher of the location dictionary only once per process
+    """
+    return LevelFuzzyMatcher()
@@ -7,7 +7,6 @@ from copy import deepcopy
 
 import pandas as pd
 from flashtext import KeywordProcessor
-from halo import Halo
 
 from preprocessing_pgp.address.utils import (
     flatten_list,
@@ -18,6 +17,8 @@ from preprocessing_pgp.address.const import (
     METHOD_REFER_DICT,
     LOCATION_ENRICH_DICT
 )
+from preprocessing_pgp.address.fuzzy_matcher import get_level_fuzzy_matcher
+from preprocessing_pgp.utils import instrument_stage
 
 
 class LevelExtractor:
@@ -27,10 +28,15 @@ class LevelExtractor:
     * Level 1: City, Countryside
     * Level 2: District
     * Level 3: Ward
+
+    Levels not matched by the exact keywords fall back to the fuzzy matcher
+    (misspelled names within a few edits), unless `fuzzy_match` is False
     """
 
-    def __init__(self) -> None:
+    def __init__(self, fuzzy_match: bool = True) -> None:
         self.avail_levels = METHOD_REFER_DICT.keys()
+        self.fuzzy_matcher = get_level_fuzzy_matcher()\
+            if fuzzy_match else None
         self.avail_methods = flatten_list(METHOD_REFER_DICT.values())
         self.keyword_refer_dict =\
             dict(zip(
@@ -163,6 +169,14 @@ class LevelExtractor:
              level_best_pattern) =\
                 self._extract_by_level(remained_address, level, *dependents)
 
+            # * Fallback to the misspelled names under the found parent levels
+            if level_pattern is None and self.fuzzy_matcher is not None:
+                (level_pattern,
+                 remained_address,
+                 level_method,
+                 level_best_pattern) =\
+                    self.fuzzy_matcher.match(remained_address, level, best_patterns)
+
             found_patterns[level] = level_pattern
             best_patterns[level] = level_best_pattern
             dependents.append((level_pattern, level_method))
@@ -328,12 +342,7 @@ class LevelExtractor:
         return found_terms[0]
 
 
-@Halo(
-    text='Extracting address',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Extracting address')
 def extract_vi_address_by_level(
     data:  pd.DataFrame,
     address_col: str
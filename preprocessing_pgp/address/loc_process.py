@@ -4,7 +4,6 @@ File support extracting code for each location extracted in extractor
 from typing import List, Dict
 
 import pandas as pd
-from halo import Halo
 
 from preprocessing_pgp.address.const import (
     LOCATION_CODE_DICT,
@@ -16,6 +15,7 @@ from preprocessing_pgp.address.utils import (
     create_dependent_query,
     is_empty_string
 )
+from preprocessing_pgp.utils import instrument_stage
 
 
 class LocationCode:
@@ -118,12 +118,7 @@ class LocationCode:
         return level_codes
 
 
-@Halo(
-    text='Generating location code',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Generating location code')
 def generate_loc_code(
     data: pd.DataFrame,
     best_lvl_cols: List[str]
@@ -151,6 +146,12 @@ def generate_loc_code(
 
     generated_data = data.copy()
 
+    # * Row-wise apply of an empty frame does not give a series of codes
+    if generated_data.empty:
+        for level in AVAIL_LEVELS:
+            generated_data[f'level {level} code'] = None
+        return generated_data
+
     row_codes = generated_data.apply(
         lambda row: code_generator.get_level_code(
             dict(zip(
@@ -3,14 +3,13 @@ This module meant for preprocessing (cleansing and unifying) the address before
 """
 
 import re
-from typing import Dict
-from copy import deepcopy
+from typing import List, Tuple
 from string import punctuation
 
+import numpy as np
 import pandas as pd
-from unidecode import unidecode
-from halo import Halo
 
+from preprocessing_pgp.deaccent import remove_accent
 from preprocessing_pgp.address.utils import (
     number_pad_replace
 )
@@ -22,6 +21,7 @@ from preprocessing_pgp.address.const import (
     DICT_NORM_CITY_DASH_REGEX,
     ADDRESS_PUNCTUATIONS
 )
+from preprocessing_pgp.utils import instrument_stage
 
 
 class VietnameseAddressCleaner:
@@ -31,17 +31,36 @@ class VietnameseAddressCleaner:
     non_address_punctuation = ''.join([pun for pun in punctuation
                                        if pun not in ADDRESS_PUNCTUATIONS])
 
+    # * Precompiled patterns & tables shared by all the calls
+    non_address_punctuation_table = str.maketrans('', '', non_address_punctuation)
+    abbrev_keyword_regexes = [
+        (replace_txt, re.compile('|'.join(map(re.escape, target_subs))))
+        for replace_txt, target_subs in DICT_NORM_ABBREV_REGEX_KW.items()
+    ]
+    dash_keyword_regexes = [
+        (replace_txt, re.compile('|'.join(map(re.escape, target_subs))))
+        for replace_txt, target_subs in DICT_NORM_CITY_DASH_REGEX.items()
+    ]
+    spare_spaces_regex = re.compile(' +')
+    digit_group_regex = re.compile(r'(\d+)')
+    district_regex = re.compile(r'([^A|a]p [0-9]+)')
+    ward_regex = re.compile(r'(q [0-9]+)')
+
     # * PRIVATE
-    def __replace_with_keywords(self, address: str, keywords: Dict) -> str:
+    def __replace_with_keywords(
+        self,
+        address: str,
+        keyword_regexes: List[Tuple[str, re.Pattern]]
+    ) -> str:
         """
-        Helper function to replace sub-address with given dictionary of keywords
+        Helper function to replace sub-address with given list of keyword regexes
 
         Parameters
         ----------
         address : str
             The input address to replace with keywords
-        keywords : Dict
-            The dictionary with `str` key - 'target' and (list `str`) as value - 'keywords'
+        keyword_regexes : List[Tuple[str, re.Pattern]]
+            The list of `str` - 'target' and compiled regex of the 'keywords'
 
         Returns
         -------
@@ -49,24 +68,46 @@ class VietnameseAddressCleaner:
             The replaced address
         """
 
-        replaced_address = deepcopy(address)
-
-        for replace_txt, target_subs in keywords.items():
-            reg_target = re.compile('|'.join(map(re.escape, target_subs)))
-            replaced_address = re.sub(reg_target,
-                                      replace_txt,
-                                      replaced_address)
+        for replace_txt, reg_target in keyword_regexes:
+            replaced_address = reg_target.sub(replace_txt, address)
 
             if replaced_address != address:
                 return replaced_address
 
-        return replaced_address
+        return address
+
+    def __replace_with_keywords_series(
+        self,
+        addresses: pd.Series,
+        keyword_regexes: List[Tuple[str, re.Pattern]]
+    ) -> pd.Series:
+        """
+        Helper function to replace sub-address with given list of keyword regexes
+        over the whole series, only the first keyword changing the address is applied
+        """
+        replaced_addresses = addresses.copy()
+        unchanged_mask = pd.Series(True, index=addresses.index)
+
+        for replace_txt, reg_target in keyword_regexes:
+            candidates = addresses[unchanged_mask]
+            if candidates.empty:
+                break
+            replaced_candidates = candidates.str.replace(
+                reg_target, replace_txt, regex=True)
+            changed_mask = replaced_candidates != candidates
+            changed_index = changed_mask[changed_mask].index
+
+            replaced_addresses.loc[changed_index] =\
+                replaced_candidates.loc[changed_index]
+            unchanged_mask.loc[changed_index] = False
+
+        return replaced_addresses
 
-    def __clean_address_with_regex(self, address: str, regex: str) -> str:
+    def __clean_address_with_regex(self, address: str, regex: re.Pattern) -> str:
         """
         Helper function to clean any address with given non-grouping regex & removing spaces
         """
-        address_match = re.search(regex, address)
+        address_match = regex.search(address)
 
         if address_match is not None:
             sub_address = address_match.group(0).strip()
@@ -79,16 +120,38 @@ class VietnameseAddressCleaner:
 
         return cleaned_address
 
+    def __clean_addresses_with_regex(
+        self,
+        addresses: pd.Series,
+        regex: re.Pattern
+    ) -> pd.Series:
+        """
+        Helper function to clean the first match of the grouping regex
+        in the whole series by removing its spaces
+        """
+        sub_addresses = addresses\
+            .str.extract(regex, expand=False)\
+            .str.strip()
+        matched_mask = sub_addresses.notna()
+
+        cleaned_addresses = addresses.copy()
+        cleaned_addresses[matched_mask] = [
+            address.replace(sub_address, sub_address.replace(' ', ''))
+            for address, sub_address in zip(
+                addresses[matched_mask], sub_addresses[matched_mask]
+            )
+        ]
+
+        return cleaned_addresses
+
     def __clean_digit_district(self, address: str) -> str:
         """
         Helper function to clean district with digit
 
         * E.g: 'p 7' -> 'p7', and more
         """
-        district_regex = r'[^A|a]p [0-9]+'
-
         cleaned_address = self.__clean_address_with_regex(
-            address, district_regex)
+            address, self.district_regex)
 
         return cleaned_address
 
@@ -98,22 +161,17 @@ class VietnameseAddressCleaner:
 
         * E.g: 'q 7' -> 'q7', and more
         """
-        ward_regex = r'q [0-9]+'
-
-        cleaned_address = self.__clean_address_with_regex(address, ward_regex)
+        cleaned_address = self.__clean_address_with_regex(
+            address, self.ward_regex)
 
         return cleaned_address
 
     # * PROTECTED
     def _unify_address(self, address: str) -> str:
         """
-        Helper function to unify address to lower words and unidecode
+        Helper function to unify address to lower words and de-accent
         """
-        unified_address = deepcopy(address)
-        unified_address = unified_address.lower()
-        unified_address = unidecode(unified_address)
-
-        return unified_address
+        return remove_accent(address.lower())
 
     def _remove_spare_spaces(self, address: str) -> str:
         """
@@ -130,7 +188,7 @@ class VietnameseAddressCleaner:
             Clean address without any spare spaces
         """
 
-        cleaned_address = re.sub(' +', ' ', address)
+        cleaned_address = self.spare_spaces_regex.sub(' ', address)
         cleaned_address = cleaned_address.strip()
 
         return cleaned_address
@@ -140,11 +198,8 @@ class VietnameseAddressCleaner:
         Helper function to remove any number in string with padding zeros
         """
 
-        digit_group_regex = r'(\d+)'
-
-        cleaned_address = re.sub(digit_group_regex,
-                                 number_pad_replace,
-                                 address)
+        cleaned_address = self.digit_group_regex.sub(number_pad_replace,
+                                                     address)
 
         return cleaned_address
 
@@ -174,13 +229,13 @@ class VietnameseAddressCleaner:
         * E.g: 'ba ria vung tau' -> 'ba ria - vung tau', and more
         """
 
-        return self.__replace_with_keywords(address, DICT_NORM_CITY_DASH_REGEX)
+        return self.__replace_with_keywords(address, self.dash_keyword_regexes)
 
     def _clean_abbrev_address(self, address: str) -> str:
         """
         Helper function to clean & unify abbrev in address
         """
-        return self.__replace_with_keywords(address, DICT_NORM_ABBREV_REGEX_KW)
+        return self.__replace_with_keywords(address, self.abbrev_keyword_regexes)
 
     def _clean_full_address(self, address: str) -> str:
         """
@@ -197,8 +252,7 @@ class VietnameseAddressCleaner:
             The cleaned address
         """
         clean_address =\
-            address.translate(str.maketrans(
-                '', '', self.non_address_punctuation))
+            address.translate(self.non_address_punctuation_table)
 
         clean_address = remove_spare_spaces(clean_address)
 
@@ -235,13 +289,65 @@ class VietnameseAddressCleaner:
 
         return cleaned_address
 
+    def clean_addresses(self, addresses: pd.Series) -> pd.Series:
+        """
+        Method for cleansing and unifying a whole series of addresses,
+        giving the same output as `clean_address` on each address
+
+        * Each unique address is cleaned only once
+        * Each cleaning step runs as a vectorized string transform over the series
 
-@Halo(
-    text='Cleansing address',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+        Parameters
+        ----------
+        addresses : pd.Series
+            The raw addresses that need cleansing and unifying
+
+        Returns
+        -------
+        pd.Series
+            Unified and cleaned addresses with the same index as the input
+        """
+        address_codes, unique_addresses = pd.factorize(addresses)
+        cleaned_addresses = pd.Series(unique_addresses, dtype=object)
+
+        # * Unify address: lower & de-accent
+        cleaned_addresses = cleaned_addresses.str.lower().map(remove_accent)
+
+        cleaned_addresses = self.__replace_with_keywords_series(
+            cleaned_addresses, self.abbrev_keyword_regexes)
+
+        cleaned_addresses = cleaned_addresses\
+            .str.replace(self.spare_spaces_regex, ' ', regex=True)\
+            .str.strip()
+
+        cleaned_addresses = cleaned_addresses.str.replace(
+            self.digit_group_regex, number_pad_replace, regex=True)
+
+        cleaned_addresses = self.__clean_addresses_with_regex(
+            cleaned_addresses, self.district_regex)
+        cleaned_addresses = self.__clean_addresses_with_regex(
+            cleaned_addresses, self.ward_regex)
+
+        cleaned_addresses = self.__replace_with_keywords_series(
+            cleaned_addresses, self.dash_keyword_regexes)
+
+        cleaned_addresses = cleaned_addresses\
+            .str.translate(self.non_address_punctuation_table)\
+            .str.replace(self.spare_spaces_regex, ' ', regex=True)\
+            .str.strip()
+
+        # * Map back to all the records, missing addresses (code -1) stay missing
+        cleaned_values = np.append(cleaned_addresses.values, None)\
+            .take(address_codes)
+
+        return pd.Series(
+            cleaned_values,
+            index=addresses.index,
+            name=addresses.name
+        )
+
+
+@instrument_stage('Cleansing address')
 def clean_vi_address(
     data: pd.DataFrame,
     address_col: str
@@ -266,8 +372,6 @@ def clean_vi_address(
     cleaned_data = data.copy()
 
     cleaned_data[f'cleaned_{address_col}'] =\
-        cleaned_data[address_col].apply(
-            cleaner.clean_address
-    )
+        cleaner.clean_addresses(cleaned_data[address_col])
 
     return cleaned_data
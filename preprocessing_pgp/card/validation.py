@@ -2,8 +2,12 @@ import os
 import re
 from abc import ABC, abstractmethod
 
+from typing import Union
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import multiprocessing as mp
 from tqdm import tqdm
 
@@ -15,7 +19,14 @@ from preprocessing_pgp.utils import (
     sep_display,
     # apply_multi_process,
     apply_progress_bar,
-    extract_null_values
+    extract_null_values,
+    select_input_columns,
+    compact_new_columns,
+    is_arrow_data,
+    to_arrow_table,
+    arrow_string_column,
+    map_arrow_unique,
+    build_arrow_output
 )
 from preprocessing_pgp.card.const import (
     # Personal ID
@@ -338,27 +349,43 @@ class DriverLicenseValidator(CardValidator):
 
 
 def verify_card(
-    card_df: pd.DataFrame,
+    card_df: Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray],
     card_col: str = "card_id",
-    print_info: bool = True
+    print_info: bool = True,
+    return_only_new_columns: bool = False
 ) -> pd.DataFrame:
     """
     Verify whether the card ids are valid or not
 
     Parameters
     ----------
-    card_df : pd.DataFrame
-        The input DF containing card id
+    card_df : Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The input DF containing card id,
+        Arrow inputs are processed with Arrow kernels and give an Arrow `Table`
     card_col : str, optional
         The column contain card id, by default "card_id"
     print_info : bool, optional
         Whether to print the information of the run, by default True
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns aligned to the input index,
+        with `bool` indicators, by default False
 
     Returns
     -------
     pd.DataFrame
         The final DF contains the columns that verify whether the card id is valid or not
     """
+    if is_arrow_data(card_df):
+        return verify_card_arrow(
+            card_df,
+            card_col=card_col,
+            return_only_new_columns=return_only_new_columns
+        )
+
+    if return_only_new_columns:
+        input_index = card_df.index
+        card_df = select_input_columns(card_df, [card_col])
+
     orig_cols = card_df.columns.values.tolist()
 
     # ? CLEAN CARD ID
@@ -447,6 +474,77 @@ def verify_card(
 
     final_card_df[validator_cols] = final_card_df[validator_cols].fillna(False)
 
+    if return_only_new_columns:
+        return compact_new_columns(
+            final_card_df,
+            input_index,
+            new_cols=new_cols,
+            flag_cols=validator_cols
+        )
+
     final_card_df = final_card_df[orig_cols + new_cols]
 
     return final_card_df
+
+
+def verify_card_arrow(
+    card_df: Union[pa.Table, pa.RecordBatch, pa.ChunkedArray],
+    card_col: str = "card_id",
+    return_only_new_columns: bool = False
+) -> pa.Table:
+    """
+    Verify whether the card ids are valid or not on Arrow string arrays,
+    each unique clean card id is validated only once
+
+    Parameters
+    ----------
+    card_df : Union[pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The Arrow data containing card id
+    card_col : str, optional
+        The column contain card id, by default "card_id"
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns, by default False
+
+    Returns
+    -------
+    pa.Table
+        The data with `clean_<card_col>` & the validator columns
+        in the same row order as the input
+    """
+    card_table = to_arrow_table(card_df, card_col)
+
+    # ? CLEAN CARD ID: lower & remove spaces, special characters (RE2 version of `\W+`)
+    clean_card_ids = pc.replace_substring_regex(
+        pc.utf8_lower(arrow_string_column(card_table, card_col)),
+        pattern=r'[^\p{L}\p{N}_]+',
+        replacement=''
+    )
+
+    # ? VALIDATE CARD ID
+    validator_refer_dict = {
+        'is_personal_id': PersonalIDValidator.is_valid_card,
+        'is_passport': PassportValidator.is_valid_card,
+        'is_driver_license': DriverLicenseValidator.is_valid_card
+    }
+    validator_results = {
+        col: pc.fill_null(
+            map_arrow_unique(clean_card_ids, validator, pa.bool_()),
+            False
+        )
+        for col, validator in validator_refer_dict.items()
+    }
+    is_valid = pc.or_(
+        pc.or_(validator_results['is_personal_id'],
+               validator_results['is_passport']),
+        validator_results['is_driver_license']
+    )
+
+    return build_arrow_output(
+        card_table,
+        new_columns={
+            f'clean_{card_col}': clean_card_ids,
+            'is_valid': is_valid,
+            **validator_results
+        },
+        return_only_new_columns=return_only_new_columns
+    )
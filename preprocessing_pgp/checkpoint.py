@@ -0,0 +1,371 @@
+"""
+Module contains the checkpointed runner of the long batch jobs:
+
+* The input is processed by chunks of rows, each finished chunk is written
+to the work directory & recorded in a manifest
+* The manifest is keyed by the fingerprint of the input & the job,
+and by the row range of each chunk
+* A re-run of the same job skips the finished chunks and assembles
+the final output from the parts, so a failure only loses the running chunks
+"""
+
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import pickle
+import shutil
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from preprocessing_pgp.utils import track_stage
+
+DEFAULT_CHUNK_ROWS = 100_000
+MANIFEST_NAME = 'manifest.json'
+
+
+def fingerprint_data(data: pd.DataFrame) -> str:
+    """
+    Fingerprint of the content of the dataframe:
+    columns, dtypes, index & values of every row
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The input data
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 of the data
+    """
+    try:
+        row_hashes = pd.util.hash_pandas_object(data, index=True)
+    except TypeError:
+        # * Unhashable values (e.g. lists, dicts) are hashed by their text
+        row_hashes = pd.util.hash_pandas_object(data.astype(str), index=True)
+
+    hasher = hashlib.sha256()
+    hasher.update(repr(list(data.columns)).encode('utf-8'))
+    hasher.update(repr([str(dtype) for dtype in data.dtypes]).encode('utf-8'))
+    hasher.update(row_hashes.values.tobytes())
+
+    return hasher.hexdigest()
+
+
+def _describe_argument(value: Any) -> str:
+    """
+    Helper to describe an argument of the job,
+    only the plain values are described by their content
+    (objects such as caches would change the fingerprint at every run)
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return repr([_describe_argument(item) for item in value])
+    if isinstance(value, dict):
+        return repr({
+            str(key): _describe_argument(item)
+            for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))
+        })
+
+    return type(value).__qualname__
+
+
+def _describe_function(func: Callable) -> str:
+    """
+    Helper to describe the processing function, including the bound arguments
+    """
+    if isinstance(func, partial):
+        return f'{_describe_function(func.func)}'\
+            f'({_describe_argument(list(func.args))}, {_describe_argument(func.keywords)})'
+
+    return f'{getattr(func, "__module__", "")}.'\
+        f'{getattr(func, "__qualname__", type(func).__qualname__)}'
+
+
+def fingerprint_job(
+    data_fingerprint: str,
+    func: Callable,
+    kwargs: Dict
+) -> str:
+    """
+    Fingerprint of the job: the input data, the function & its arguments
+
+    Parameters
+    ----------
+    data_fingerprint : str
+        The fingerprint of the input data (`fingerprint_data`)
+    func : Callable
+        The processing function
+    kwargs : Dict
+        The additional arguments of the function
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 of the job
+    """
+    job_description = json.dumps({
+        'data': data_fingerprint,
+        'func': _describe_function(func),
+        'kwargs': _describe_argument(kwargs)
+    }, sort_keys=True)
+
+    return hashlib.sha256(job_description.encode('utf-8')).hexdigest()
+
+
+def _chunk_ranges(n_rows: int, chunk_rows: int) -> List[Tuple[int, int]]:
+    """
+    Helper to split the rows into contiguous ranges of `chunk_rows` rows
+    """
+    return [
+        (start, min(start + chunk_rows, n_rows))
+        for start in range(0, n_rows, chunk_rows)
+    ]
+
+
+def _range_key(start: int, stop: int) -> str:
+    return f'{start}-{stop}'
+
+
+class CheckpointManifest:
+    """
+    Record of the finished chunks of one job, saved as JSON in the job directory
+
+    * `chunks`: row range `<start>-<stop>` -> part file, number of rows & finish time
+    * Written through a temporary file & renamed, never left half-written
+    """
+
+    def __init__(
+        self,
+        job_dir: str,
+        job_fingerprint: str,
+        data_fingerprint: str,
+        n_rows: int
+    ) -> None:
+        self.path = os.path.join(job_dir, MANIFEST_NAME)
+        self.job_dir = job_dir
+        self.job_fingerprint = job_fingerprint
+        self.data_fingerprint = data_fingerprint
+        self.n_rows = n_rows
+        self.chunks: Dict[str, Dict] = {}
+
+        if os.path.exists(self.path):
+            self.load()
+
+    def load(self) -> None:
+        with open(self.path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+
+        if manifest.get('job') != self.job_fingerprint\
+                or manifest.get('data') != self.data_fingerprint:
+            # * Another job in the same directory, its parts are not reused
+            return
+
+        # * Chunks whose part file was removed are run again
+        self.chunks = {
+            range_key: chunk
+            for range_key, chunk in manifest.get('chunks', {}).items()
+            if os.path.exists(os.path.join(self.job_dir, chunk['file']))
+        }
+
+    def save(self) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'job': self.job_fingerprint,
+                'data': self.data_fingerprint,
+                'n_rows': self.n_rows,
+                'chunks': self.chunks
+            }, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, start: int, stop: int) -> bool:
+        return _range_key(start, stop) in self.chunks
+
+    def record(self, start: int, stop: int, file_name: str, n_rows: int) -> None:
+        """
+        Record a finished chunk & save the manifest
+        """
+        self.chunks[_range_key(start, stop)] = {
+            'file': file_name,
+            'rows': n_rows,
+            'finished_at': datetime.now().isoformat(timespec='seconds')
+        }
+        self.save()
+
+    def part_path(self, start: int, stop: int) -> str:
+        return os.path.join(
+            self.job_dir,
+            self.chunks[_range_key(start, stop)]['file']
+        )
+
+
+def _write_part(result: pd.DataFrame, job_dir: str, start: int, stop: int) -> str:
+    """
+    Helper to write the result of a chunk with its index,
+    as Arrow IPC or as pickle when Arrow cannot represent the data
+    """
+    try:
+        table = pa.Table.from_pandas(result, preserve_index=True)
+        file_name = f'part-{start}-{stop}.arrow'
+        tmp_path = os.path.join(job_dir, f'.{file_name}.tmp')
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        file_name = f'part-{start}-{stop}.pkl'
+        tmp_path = os.path.join(job_dir, f'.{file_name}.tmp')
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(result, file)
+
+    os.replace(tmp_path, os.path.join(job_dir, file_name))
+
+    return file_name
+
+
+def _read_part(path: str) -> pd.DataFrame:
+    """
+    Helper to read back the result of a chunk
+    """
+    if path.endswith('.pkl'):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def _concat_parts(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Helper to concatenate the parts in row order,
+    columns categorical in all the parts stay categorical
+    """
+    final_data = pd.concat(parts)
+    category_cols = [
+        col for col in final_data.columns
+        if all(
+            isinstance(part[col].dtype, pd.CategoricalDtype)
+            for part in parts if col in part.columns
+        )
+        and not isinstance(final_data[col].dtype, pd.CategoricalDtype)
+    ]
+    for col in category_cols:
+        final_data[col] = final_data[col].astype('category')
+
+    return final_data
+
+
+def _run_chunk(
+    task: Tuple[int, int, pd.DataFrame],
+    func: Callable,
+    job_dir: str,
+    **kwargs
+) -> Tuple[int, int, str, int]:
+    """
+    Process one chunk & write its part, returns the part to record
+    """
+    start, stop, chunk = task
+    result = func(chunk, **kwargs)
+
+    return start, stop, _write_part(result, job_dir, start, stop), len(result)
+
+
+def run_checkpointed(
+    data: pd.DataFrame,
+    func: Callable,
+    work_dir: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    n_cores: int = 1,
+    keep_parts: bool = False,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    Process the data by chunks with each finished chunk checkpointed,
+    a re-run of the same job only processes the chunks not finished yet
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Any dataframe
+    func : Callable
+        Function processing a chunk of the dataframe,
+        input must contains the `dataframe` as the required argument
+    work_dir : str
+        The local directory of the checkpoints, one sub-directory per job
+    chunk_rows : int, optional
+        The number of rows per chunk, by default `DEFAULT_CHUNK_ROWS`
+    n_cores : int, optional
+        The number of chunks processed in parallel, by default 1
+    keep_parts : bool, optional
+        Whether to keep the parts once the output is assembled,
+        by default False (the job directory is removed)
+    **kwargs
+        Additional arguments for the function
+
+    Returns
+    -------
+    pd.DataFrame
+        The results of all chunks concatenated in the row order,
+        same as `func` run on each chunk & concatenated
+    """
+    if chunk_rows <= 0:
+        raise ValueError(f"chunk_rows must be positive, got {chunk_rows}")
+
+    data_fingerprint = fingerprint_data(data)
+    job_fingerprint = fingerprint_job(data_fingerprint, func, kwargs)
+    job_dir = os.path.join(work_dir, job_fingerprint[:16])
+    os.makedirs(job_dir, exist_ok=True)
+
+    manifest = CheckpointManifest(
+        job_dir, job_fingerprint, data_fingerprint, data.shape[0]
+    )
+    chunk_ranges = _chunk_ranges(data.shape[0], chunk_rows)
+    pending_ranges = [
+        (start, stop) for start, stop in chunk_ranges
+        if not manifest.is_done(start, stop)
+    ]
+    if 0 < len(pending_ranges) < len(chunk_ranges):
+        print(
+            f"Resuming from checkpoint: {len(chunk_ranges) - len(pending_ranges)}"
+            f"/{len(chunk_ranges)} chunks already done"
+        )
+
+    with track_stage('Checkpointed chunks', rows_in=data.shape[0]) as metrics:
+        metrics.record_cache(
+            hits=len(chunk_ranges) - len(pending_ranges),
+            misses=len(pending_ranges)
+        )
+        tasks = (
+            (start, stop, data.iloc[start:stop])
+            for start, stop in pending_ranges
+        )
+        run_chunk = partial(_run_chunk, func=func, job_dir=job_dir, **kwargs)
+
+        # * Each chunk is recorded as soon as it is done
+        if n_cores == 1:
+            for task in tasks:
+                manifest.record(*run_chunk(task))
+        elif len(pending_ranges) > 0:
+            with mp.Pool(n_cores) as pool:
+                for done_chunk in pool.imap_unordered(run_chunk, tasks):
+                    manifest.record(*done_chunk)
+
+        if len(chunk_ranges) > 0:
+            final_data = _concat_parts([
+                _read_part(manifest.part_path(start, stop))
+                for start, stop in chunk_ranges
+            ])
+        else:
+            final_data = func(data, **kwargs)
+        metrics.rows_out = final_data.shape[0]
+
+    if not keep_parts:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    return final_data
@@ -1,3 +1,42 @@
 import os
 
 N_PROCESSES = os.cpu_count() // 2
+
+SHARED_MEMORY_DIR = '/dev/shm'
+
+# ? STREAMING STAGES
+STAGE_FUNCTION_DICT = {
+    'enrich': ('preprocessing_pgp.name.enrich_name', 'process_enrich'),
+    'address': ('preprocessing_pgp.address.extractor', 'extract_vi_address'),
+    'email': ('preprocessing_pgp.email.validator', 'process_validate_email'),
+    'phone': ('preprocessing_pgp.phone.extractor', 'extract_valid_phone'),
+    'card': ('preprocessing_pgp.card.validation', 'verify_card'),
+    'type': ('preprocessing_pgp.name.type.extractor', 'process_extract_type')
+}
+STAGE_COLUMN_ARG_DICT = {
+    'enrich': 'name_col',
+    'address': 'address_col',
+    'email': 'email_col',
+    'phone': 'phone_col',
+    'card': 'card_col',
+    'type': 'name_col'
+}
+STAGE_DEFAULT_COLUMN_DICT = {
+    'enrich': 'name',
+    'address': 'address',
+    'email': 'email',
+    'phone': 'phone',
+    'card': 'card_id',
+    'type': 'name'
+}
+DEFAULT_BATCH_ROWS = 1_000_000
+
+# ? FILE FORMATS
+FILE_FORMAT_EXTENSIONS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'jsonl'
+}
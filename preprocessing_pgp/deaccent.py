@@ -0,0 +1,156 @@
+"""
+Module contains the Vietnamese de-accent functions,
+a faster replacement of `unidecode` for the Vietnamese texts
+"""
+
+import unicodedata
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from unidecode import unidecode
+
+# * Vietnamese combining marks: tones (grave, acute, tilde, hook above, dot below),
+# * circumflex, breve & horn (+ the deprecated grave & acute tone marks)
+VI_COMBINING_MARKS = {
+    '\u0300', '\u0301', '\u0303', '\u0309', '\u0323',
+    '\u0302', '\u0306', '\u031b',
+    '\u0340', '\u0341'
+}
+
+VI_BASE_LETTERS = 'aeiouyAEIOUY'
+
+
+def _build_accent_table() -> Dict[int, str]:
+    """
+    Build the `str.translate` table of the Vietnamese letters:
+    composed vowels to their base letter, `đ` to `d`
+    & the decomposed combining marks removed
+    """
+    table = {ord(mark): '' for mark in VI_COMBINING_MARKS}
+    table[ord('đ')] = 'd'
+    table[ord('Đ')] = 'D'
+
+    # * Latin-1 Supplement, Latin Extended-A & B, Latin Extended Additional
+    code_points = [*range(0x00C0, 0x0250), *range(0x1EA0, 0x1F00)]
+    for code_point in code_points:
+        decomposed = unicodedata.normalize('NFD', chr(code_point))
+        if len(decomposed) > 1\
+                and decomposed[0] in VI_BASE_LETTERS\
+                and set(decomposed[1:]) <= VI_COMBINING_MARKS:
+            table[code_point] = decomposed[0]
+
+    return table
+
+
+VI_ACCENT_TABLE = _build_accent_table()
+
+
+def remove_accent(text: str) -> str:
+    """
+    Remove the accents of the text, same output as `unidecode`
+
+    * ASCII texts are returned as is
+    * Vietnamese letters (composed or decomposed) are translated by table
+    * Texts with any other non-ASCII character fall back to `unidecode`
+
+    Parameters
+    ----------
+    text : str
+        The input text
+
+    Returns
+    -------
+    str
+        The text without accents
+    """
+    if text.isascii():
+        return text
+
+    de_text = text.translate(VI_ACCENT_TABLE)
+    if not de_text.isascii():
+        de_text = unidecode(de_text)
+
+    return de_text
+
+
+def is_accented(text: str) -> bool:
+    """
+    Check whether the text has any accent,
+    same as `unidecode(text) != text` without decoding the text
+
+    Parameters
+    ----------
+    text : str
+        The input text
+
+    Returns
+    -------
+    bool
+        Whether the text is accented
+    """
+    return not text.isascii()
+
+
+def remove_accent_series(texts: pd.Series) -> pd.Series:
+    """
+    Remove the accents of a series of texts,
+    each unique text is decoded once & missing values stay `NaN`
+
+    Parameters
+    ----------
+    texts : pd.Series
+        The input texts
+
+    Returns
+    -------
+    pd.Series
+        The texts without accents, aligned to the input
+    """
+    texts = pd.Series(texts, dtype=object)
+    text_codes, unique_texts = pd.factorize(texts)
+
+    # * Code -1 of the missing values takes the last NaN
+    de_unique_texts = np.array(
+        [remove_accent(text) for text in unique_texts] + [np.nan],
+        dtype=object
+    )
+
+    return pd.Series(
+        de_unique_texts[text_codes],
+        index=texts.index,
+        name=texts.name
+    )
+
+
+def remove_accent_arrow(
+    texts: Union[pa.Array, pa.ChunkedArray]
+) -> Union[pa.Array, pa.ChunkedArray]:
+    """
+    Remove the accents of an Arrow string array,
+    each unique text is decoded once & null values stay null
+
+    Parameters
+    ----------
+    texts : Union[pa.Array, pa.ChunkedArray]
+        The input Arrow strings
+
+    Returns
+    -------
+    Union[pa.Array, pa.ChunkedArray]
+        The texts without accents, aligned to the input
+    """
+    is_ascii = pc.fill_null(pc.string_is_ascii(texts), True)
+    if pc.all(is_ascii).as_py() is not False:
+        return texts
+
+    unique_texts = pc.unique(texts.drop_null())
+    de_unique_texts = pa.array(
+        [remove_accent(text) for text in unique_texts.to_pylist()],
+        type=texts.type
+    )
+    text_ids = pc.index_in(texts, value_set=unique_texts)
+
+    return pc.take(de_unique_texts, text_ids)
@@ -4,7 +4,8 @@ Module to preprocess email before proceed more
 
 import re
 import pandas as pd
-from halo import Halo
+
+from preprocessing_pgp.utils import instrument_stage
 
 
 class EmailCleaner:
@@ -47,12 +48,7 @@ class EmailCleaner:
         return cleaned_email
 
 
-@Halo(
-    text='Cleansing email',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Cleansing email')
 def clean_email(
     data: pd.DataFrame,
     email_col: str = 'email'
@@ -3,7 +3,8 @@ Module contains utility functions to help the email's functions
 """
 
 from typing import List
-from unidecode import unidecode
+
+from preprocessing_pgp.deaccent import is_accented
 
 
 def split_email(email: str) -> List[str]:
@@ -44,4 +45,4 @@ def is_name_accented(name: str) -> bool:
     bool
         Whether the name is accented
     """
-    return unidecode(name) != name
+    return is_accented(name)
@@ -3,10 +3,11 @@ Module contains validator for email
 """
 
 import re
-from time import time
+from typing import Union
 
 import pandas as pd
-from halo import Halo
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from preprocessing_pgp.email.utils import (
     split_email,
@@ -23,8 +24,16 @@ from preprocessing_pgp.email.preprocess import (
     clean_email
 )
 from preprocessing_pgp.utils import (
-    sep_display,
-    parallelize_dataframe
+    instrument_stage,
+    parallelize_dataframe,
+    track_stage,
+    select_input_columns,
+    compact_new_columns,
+    is_arrow_data,
+    to_arrow_table,
+    arrow_string_column,
+    map_arrow_unique,
+    build_arrow_output
 )
 
 
@@ -177,12 +186,7 @@ class EmailValidator:
         return bool(re.match(AT_LEAST_ONE_CHAR_REGEX, email_name))
 
 
-@Halo(
-    text='Validating email',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Validating email')
 def validate_clean_email(
     data: pd.DataFrame,
     email_col: str = 'cleaned_email'
@@ -215,21 +219,26 @@ def validate_clean_email(
 
 
 def process_validate_email(
-    data: pd.DataFrame,
+    data: Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray],
     email_col: str = 'email',
-    n_cores: int = 1
+    n_cores: int = 1,
+    return_only_new_columns: bool = False
 ) -> pd.DataFrame:
     """
     Process validating email address
 
     Parameters
     ----------
-    data : pd.DataFrame
-        The dataframe contains email records
+    data : Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The dataframe contains email records,
+        Arrow inputs are processed with Arrow kernels and give an Arrow `Table`
     email_col : str, optional
         The column name that hold email records, by default 'email'
     n_cores : int, optional
         The number of cores used to run parallel, by default 1 core will be used
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns aligned to the input index,
+        with `bool` indicators, by default False
 
     Returns
     -------
@@ -237,48 +246,53 @@ def process_validate_email(
         The data with additional columns:
         * `is_email_valid`: indicator for whether the email is valid or not
     """
+    if is_arrow_data(data):
+        return process_validate_email_arrow(
+            data,
+            email_col=email_col,
+            return_only_new_columns=return_only_new_columns
+        )
+
+    if return_only_new_columns:
+        input_index = data.index
+        data = select_input_columns(data, [email_col])
 
     # * Separate na data
     na_data = data[data[email_col].isna()]
     cleaned_data = data[data[email_col].notna()]
 
     # * Cleansing email
-    start_time = time()
-    if n_cores == 1:
-        cleaned_data = clean_email(
-            cleaned_data,
-            email_col=email_col
-        )
-    else:
-        cleaned_data = parallelize_dataframe(
-            cleaned_data,
-            clean_email,
-            n_cores=n_cores,
-            email_col=email_col
-        )
-    clean_time = time() - start_time
-    print(f"Cleansing email takes {int(clean_time)//60}m{int(clean_time)%60}s")
-    sep_display()
+    with track_stage('Cleansing email', rows_in=cleaned_data.shape[0]) as metrics:
+        if n_cores == 1:
+            cleaned_data = clean_email(
+                cleaned_data,
+                email_col=email_col
+            )
+        else:
+            cleaned_data = parallelize_dataframe(
+                cleaned_data,
+                clean_email,
+                n_cores=n_cores,
+                email_col=email_col
+            )
+        metrics.rows_out = cleaned_data.shape[0]
 
     # * Validating email
-    start_time = time()
-    if n_cores == 1:
-        validated_data = validate_clean_email(
-            cleaned_data,
-            email_col=f'cleaned_{email_col}'
-        )
-    else:
-        validated_data = parallelize_dataframe(
-            cleaned_data,
-            validate_clean_email,
-            n_cores=n_cores,
-            email_col=f'cleaned_{email_col}'
-        )
-    validated_data = validated_data.drop(columns=[f'cleaned_{email_col}'])
-    validate_time = time() - start_time
-    print(
-        f"Validating email takes {int(validate_time)//60}m{int(validate_time)%60}s")
-    sep_display()
+    with track_stage('Validating email', rows_in=cleaned_data.shape[0]) as metrics:
+        if n_cores == 1:
+            validated_data = validate_clean_email(
+                cleaned_data,
+                email_col=f'cleaned_{email_col}'
+            )
+        else:
+            validated_data = parallelize_dataframe(
+                cleaned_data,
+                validate_clean_email,
+                n_cores=n_cores,
+                email_col=f'cleaned_{email_col}'
+            )
+        validated_data = validated_data.drop(columns=[f'cleaned_{email_col}'])
+        metrics.rows_out = validated_data.shape[0]
 
     # * Concat with the nan data
     final_data = pd.concat([validated_data, na_data])
@@ -286,4 +300,60 @@ def process_validate_email(
     # * Filling na data to invalid email
     final_data['is_email_valid'].fillna(False, inplace=True)
 
+    if return_only_new_columns:
+        return compact_new_columns(
+            final_data,
+            input_index,
+            new_cols=['is_email_valid'],
+            flag_cols=['is_email_valid']
+        )
+
     return final_data
+
+
+def process_validate_email_arrow(
+    data: Union[pa.Table, pa.RecordBatch, pa.ChunkedArray],
+    email_col: str = 'email',
+    return_only_new_columns: bool = False
+) -> pa.Table:
+    """
+    Process validating email address on Arrow string arrays,
+    each unique cleaned email is validated only once
+
+    Parameters
+    ----------
+    data : Union[pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The Arrow data contains email records
+    email_col : str, optional
+        The column name that hold email records, by default 'email'
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns, by default False
+
+    Returns
+    -------
+    pa.Table
+        The data with additional column `is_email_valid`
+        in the same row order as the input
+    """
+    email_table = to_arrow_table(data, email_col)
+
+    # * Cleansing email: removing spaces
+    cleaned_emails = pc.replace_substring(
+        arrow_string_column(email_table, email_col),
+        pattern=' ',
+        replacement=''
+    )
+
+    # * Validating email
+    validator = EmailValidator()
+    is_email_valid = map_arrow_unique(
+        cleaned_emails,
+        validator.is_valid_email,
+        pa.bool_()
+    )
+
+    return build_arrow_output(
+        email_table,
+        new_columns={'is_email_valid': pc.fill_null(is_email_valid, False)},
+        return_only_new_columns=return_only_new_columns
+    )
@@ -2,7 +2,8 @@
 Module to format the accent typing to old typing
 """
 import regex as re
-import unidecode as decode
+
+from preprocessing_pgp.deaccent import remove_accent
 
 
 # REFORMATING ACCENT
@@ -168,4 +169,4 @@ def remove_accent_typing(sentence):
         Input sentence to be reformatted
     """
 
-    return decode.unidecode(sentence)
+    return remove_accent(sentence)
@@ -7,19 +7,21 @@ import logging
 import pandas as pd
 from tensorflow import keras
 from tqdm import tqdm
-from halo import Halo
 
 from preprocessing_pgp.name.name_processing import NameProcessor
 from preprocessing_pgp.name.model.transformers import TransformerModel
 from preprocessing_pgp.name.preprocess import preprocess_df
+from preprocessing_pgp.checkpoint import DEFAULT_CHUNK_ROWS, run_checkpointed
 from preprocessing_pgp.name.const import (
     NAME_SPLIT_PATH,
     MODEL_PATH,
     RULE_BASED_PATH
 )
 from preprocessing_pgp.utils import (
+    instrument_stage,
     sep_display,
-    parallelize_dataframe
+    parallelize_dataframe,
+    track_stage
 )
 
 tqdm.pandas()
@@ -104,12 +106,32 @@ class EnrichName:
         })
 
 
-@Halo(
-    text='Enriching Names',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+def build_enricher() -> EnrichName:
+    """
+    Build the name enricher from the model & dictionaries of the package
+
+    Returns
+    -------
+    EnrichName
+        The enricher with the transformer model loaded
+    """
+    model_weight_path = f'{MODEL_PATH}/best_transformer_model.h5'
+    vectorization_paths = (
+        f'{MODEL_PATH}/vecs/source_vectorization_layer.pkl',
+        f'{MODEL_PATH}/vecs/target_vectorization_layer.pkl'
+    )
+    model_config_path = f'{MODEL_PATH}/hp.json'
+
+    return EnrichName(
+        model_weight_path=model_weight_path,
+        vectorization_paths=vectorization_paths,
+        model_config_path=model_config_path,
+        split_data_path=NAME_SPLIT_PATH,
+        name_rb_pth=RULE_BASED_PATH
+    )
+
+
+@instrument_stage('Enriching Names')
 def enrich_clean_data(
     clean_df: pd.DataFrame,
     name_col: str,
@@ -133,20 +155,7 @@ def enrich_clean_data(
         * `predict`: predicted names using model only
         * `final`: beautified version of prediction with additional rule-based approach
     """
-    model_weight_path = f'{MODEL_PATH}/best_transformer_model.h5'
-    vectorization_paths = (
-        f'{MODEL_PATH}/vecs/source_vectorization_layer.pkl',
-        f'{MODEL_PATH}/vecs/target_vectorization_layer.pkl'
-    )
-    model_config_path = f'{MODEL_PATH}/hp.json'
-
-    enricher = EnrichName(
-        model_weight_path=model_weight_path,
-        vectorization_paths=vectorization_paths,
-        model_config_path=model_config_path,
-        split_data_path=NAME_SPLIT_PATH,
-        name_rb_pth=RULE_BASED_PATH
-    )
+    enricher = build_enricher()
 
     final_df = enricher.refill_accent(
         clean_df,
@@ -159,7 +168,9 @@ def enrich_clean_data(
 def process_enrich(
     data: pd.DataFrame,
     name_col: str = 'name',
-    n_cores: int = 1
+    n_cores: int = 1,
+    checkpoint_dir: str = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
 ) -> pd.DataFrame:
     """
     Applying the model of filling accent to non-accent Vietnamese names
@@ -173,6 +184,11 @@ def process_enrich(
         The column name that holds the raw names, by default 'name'
     n_cores : int
         The number of cores used to run parallel, by default 1 core is used
+    checkpoint_dir : str, optional
+        The local directory where each finished chunk of `chunk_rows` names is checkpointed,
+        a re-run on the same data skips the finished chunks, by default None (no checkpoint)
+    chunk_rows : int, optional
+        The number of names per checkpointed chunk, by default `DEFAULT_CHUNK_ROWS`
 
     Returns
     -------
@@ -183,6 +199,16 @@ def process_enrich(
         * `predict`: predicted names using model only
         * `final`: beautified version of prediction with additional rule-based approach
     """
+    if checkpoint_dir is not None:
+        return run_checkpointed(
+            data,
+            process_enrich,
+            checkpoint_dir,
+            chunk_rows=chunk_rows,
+            name_col=name_col,
+            n_cores=n_cores
+        )
+
     sep_display()
 
     # * Na names
@@ -190,39 +216,36 @@ def process_enrich(
     cleaned_data = data[data[name_col].notna()].copy(deep=True)
 
     # Clean names
-    start_time = time()
-    if n_cores == 1:
-        cleaned_data = preprocess_df(
-            cleaned_data,
-            name_col=name_col
-        )
-    else:
-        cleaned_data = parallelize_dataframe(
-            cleaned_data,
-            preprocess_df,
-            n_cores=n_cores,
-            name_col=name_col
-        )
-    clean_time = time() - start_time
-    print(f"Cleansing takes {int(clean_time)//60}m{int(clean_time)%60}s")
-    sep_display()
+    with track_stage('Cleansing', rows_in=cleaned_data.shape[0]) as metrics:
+        if n_cores == 1:
+            cleaned_data = preprocess_df(
+                cleaned_data,
+                name_col=name_col
+            )
+        else:
+            cleaned_data = parallelize_dataframe(
+                cleaned_data,
+                preprocess_df,
+                n_cores=n_cores,
+                name_col=name_col
+            )
+        metrics.rows_out = cleaned_data.shape[0]
 
     # Enrich names
-    start_time = time()
-    if n_cores == 1:
-        enriched_data = enrich_clean_data(
-            cleaned_data,
-            name_col=name_col
-        )
-    else:
-        enriched_data = parallelize_dataframe(
-            cleaned_data,
-            enrich_clean_data,
-            n_cores=n_cores,
-            name_col=name_col
-        )
-    enrich_time = time() - start_time
-    print(f"Enrich names takes {int(enrich_time)//60}m{int(enrich_time)%60}s")
+    with track_stage('Enrich names', rows_in=cleaned_data.shape[0]) as metrics:
+        if n_cores == 1:
+            enriched_data = enrich_clean_data(
+                cleaned_data,
+                name_col=name_col
+            )
+        else:
+            enriched_data = parallelize_dataframe(
+                cleaned_data,
+                enrich_clean_data,
+                n_cores=n_cores,
+                name_col=name_col
+            )
+        metrics.rows_out = enriched_data.shape[0]
 
     # * Concat na data
     final_data = pd.concat([enriched_data, na_data])
@@ -8,9 +8,9 @@ import multiprocessing as mp
 
 import pandas as pd
 from tqdm import tqdm
-from unidecode import unidecode
 from tensorflow import keras
 
+from preprocessing_pgp.deaccent import is_accented, remove_accent
 from preprocessing_pgp.name.split_name import NameProcess
 from preprocessing_pgp.name.model.transformers import TransformerModel
 from preprocessing_pgp.name.rulebase_name import rule_base_name
@@ -31,10 +31,8 @@ class NameProcessor:
         self.name_process = NameProcess(base_path)
 
     def predict_non_accent(self, name: str):
-        de_name = unidecode(name)
-
         # Keep case already have accent
-        if name != de_name:
+        if is_accented(name):
             return name
 
         # Only apply to case not having accent
@@ -63,7 +61,7 @@ class NameProcessor:
         # start_time = time()
         predicted_name['final'] = predicted_name.apply(
             lambda row: rule_base_name(
-                row['predict'], unidecode(row[name_col]), self.name_dicts),
+                row['predict'], remove_accent(row[name_col]), self.name_dicts),
             axis=1
         )
         # mean_rb_time = (time() - start_time) / n_names
@@ -7,11 +7,11 @@ from typing import Tuple
 
 import pandas as pd
 from tqdm import tqdm
-from halo import Halo
 
 from preprocessing_pgp.accent_typing_formatter import reformat_vi_sentence_accent
 from preprocessing_pgp.name.unicode_converter import minimal_convert_unicode
 from preprocessing_pgp.name.extract_human import replace_non_human_reg
+from preprocessing_pgp.utils import instrument_stage
 
 _dir = "/".join(os.path.split(os.getcwd()))
 if _dir not in sys.path:
@@ -139,12 +139,7 @@ def clean_name_cdp(name: str) -> str:
     return clean_name
 
 
-@Halo(
-    text='Preprocessing Names',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Preprocessing Names')
 def preprocess_df(
     data: pd.DataFrame,
     # human_extractor: HumanNameExtractor,
@@ -1,9 +1,10 @@
 from typing import Tuple
 
 import pandas as pd
-from unidecode import unidecode
 from tqdm import tqdm
 
+from preprocessing_pgp.deaccent import remove_accent
+
 # CONFIG
 tqdm.pandas()
 
@@ -53,8 +54,8 @@ def rule_base_middlename(middlename: str,
 
     middle_words = middlename.split()
     base_middle_words = [
-        unidecode(word) for word in base_middlename.split() if unidecode(word) != '']
-    de_middle_words = [unidecode(word) for word in middle_words]
+        remove_accent(word) for word in base_middlename.split() if remove_accent(word) != '']
+    de_middle_words = [remove_accent(word) for word in middle_words]
 
     try:
         final_middle_words = base_middle_words
@@ -101,7 +102,7 @@ def rule_base_word(word: str, word_base: str, name_dict_df: pd.DataFrame) -> str
     str
         The best name found in the dictionary
     """
-    de_word = unidecode(word)
+    de_word = remove_accent(word)
     if de_word != word_base:
         return find_match_word(word_base, name_dict_df)
     return word
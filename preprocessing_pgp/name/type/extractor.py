@@ -2,17 +2,26 @@
 Module to extract type from name
 """
 
-from time import time
+from typing import Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from flashtext import KeywordProcessor
-from halo import Halo
 
 from preprocessing_pgp.name.preprocess import preprocess_df
-from preprocessing_pgp.name.accent_typing_formatter import remove_accent_typing
+from preprocessing_pgp.deaccent import remove_accent_series
 from preprocessing_pgp.utils import (
+    instrument_stage,
     parallelize_dataframe,
-    sep_display
+    track_stage,
+    select_input_columns,
+    compact_new_columns,
+    is_arrow_data,
+    to_arrow_table,
+    arrow_string_column,
+    build_arrow_output
 )
 from preprocessing_pgp.name.type.const import (
     NAME_TYPE_DATA
@@ -92,12 +101,7 @@ class TypeExtractor:
         return results[0]
 
 
-@Halo(
-    text='Formatting names',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Formatting names')
 def format_names(
     data: pd.DataFrame,
     name_col: str = 'name'
@@ -120,19 +124,13 @@ def format_names(
         * `de_<name_col>` contains decoded & lowered name derived from `name`
     """
     clean_data = preprocess_df(data, name_col)
-    clean_data[f'de_{name_col}'] = clean_data[name_col].apply(
-        remove_accent_typing)
+    clean_data[f'de_{name_col}'] = remove_accent_series(clean_data[name_col])
     clean_data[f'de_{name_col}'] = clean_data[f'de_{name_col}'].str.lower()
 
     return clean_data
 
 
-@Halo(
-    text='Extracting customer type',
-    color='cyan',
-    spinner='dots7',
-    text_color='magenta'
-)
+@instrument_stage('Extracting customer type')
 def extract_ctype(
     data: pd.DataFrame,
     name_col: str = 'de_name',
@@ -168,10 +166,11 @@ def extract_ctype(
 
 
 def process_extract_type(
-    data: pd.DataFrame,
+    data: Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray],
     name_col: str = 'name',
     level: str = 'lv1',
-    n_cores: int = 1
+    n_cores: int = 1,
+    return_only_new_columns: bool = False
 ) -> pd.DataFrame:
     """
     Extract types from name records inputted from data
@@ -186,6 +185,9 @@ def process_extract_type(
         The level to process type extraction, by default 'lv1'
     n_cores : int
         The number of cores used to run parallel, by default 1 core will be used
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns aligned to the input index,
+        with `category` customer types, by default False
 
     Returns
     -------
@@ -194,48 +196,55 @@ def process_extract_type(
 
         * `customer_type` contains type of customer extracted from `name` column
     """
+    if is_arrow_data(data):
+        return process_extract_type_arrow(
+            data,
+            name_col=name_col,
+            level=level,
+            n_cores=n_cores,
+            return_only_new_columns=return_only_new_columns
+        )
+
+    if return_only_new_columns:
+        input_index = data.index
+        data = select_input_columns(data, [name_col])
+
     na_data = data[data[name_col].isna()].copy(deep=True)
     cleaned_data = data[data[name_col].notna()].copy(deep=True)
 
     # ? Format name
-    start_time = time()
-    if n_cores == 1:
-        formatted_data = format_names(
-            cleaned_data,
-            name_col=name_col
-        )
-    else:
-        formatted_data = parallelize_dataframe(
-            cleaned_data,
-            format_names,
-            n_cores=n_cores,
-            name_col=name_col
-        )
-    format_time = time() - start_time
-    print(
-        f"Formatting names takes {int(format_time)//60}m{int(format_time)%60}s")
-    sep_display()
+    with track_stage('Formatting names', rows_in=cleaned_data.shape[0]) as metrics:
+        if n_cores == 1:
+            formatted_data = format_names(
+                cleaned_data,
+                name_col=name_col
+            )
+        else:
+            formatted_data = parallelize_dataframe(
+                cleaned_data,
+                format_names,
+                n_cores=n_cores,
+                name_col=name_col
+            )
+        metrics.rows_out = formatted_data.shape[0]
 
     # ? Extract name type
-    start_time = time()
-    if n_cores == 1:
-        extracted_data = extract_ctype(
-            formatted_data,
-            name_col=f'de_{name_col}',
-            level=level
-        )
-    else:
-        extracted_data = parallelize_dataframe(
-            formatted_data,
-            extract_ctype,
-            n_cores=n_cores,
-            level=level,
-            name_col=f'de_{name_col}',
-        )
-    extract_time = time() - start_time
-    print(
-        f"Extracting customer's type takes {int(extract_time)//60}m{int(extract_time)%60}s")
-    sep_display()
+    with track_stage("Extracting customer's type", rows_in=formatted_data.shape[0]) as metrics:
+        if n_cores == 1:
+            extracted_data = extract_ctype(
+                formatted_data,
+                name_col=f'de_{name_col}',
+                level=level
+            )
+        else:
+            extracted_data = parallelize_dataframe(
+                formatted_data,
+                extract_ctype,
+                n_cores=n_cores,
+                level=level,
+                name_col=f'de_{name_col}',
+            )
+        metrics.rows_out = extracted_data.shape[0]
 
     # ? Drop clean_name column
     extracted_data = extracted_data.drop(columns=[f'de_{name_col}'])
@@ -243,4 +252,71 @@ def process_extract_type(
     # ? Combined with Na data
     final_data = pd.concat([extracted_data, na_data])
 
+    if return_only_new_columns:
+        return compact_new_columns(
+            final_data,
+            input_index,
+            new_cols=['customer_type'],
+            category_cols=['customer_type']
+        )
+
     return final_data
+
+
+def process_extract_type_arrow(
+    data: Union[pa.Table, pa.RecordBatch, pa.ChunkedArray],
+    name_col: str = 'name',
+    level: str = 'lv1',
+    n_cores: int = 1,
+    return_only_new_columns: bool = False
+) -> pa.Table:
+    """
+    Extract types from name records of Arrow data,
+    only the unique names are converted to Python & processed
+
+    Parameters
+    ----------
+    data : Union[pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The Arrow data contains the name records
+    name_col : str, optional
+        The column name in data holds the name records, by default 'name'
+    level : str, optional
+        The level to process type extraction, by default 'lv1'
+    n_cores : int
+        The number of cores used to run parallel, by default 1 core will be used
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns, by default False
+
+    Returns
+    -------
+    pa.Table
+        The data with cleaned `name_col` & additional column `customer_type`
+        in the same row order as the input
+    """
+    name_table = to_arrow_table(data, name_col)
+    names = arrow_string_column(name_table, name_col)
+    unique_names = pc.unique(names.drop_null())
+
+    unique_data = process_extract_type(
+        pd.DataFrame({name_col: unique_names.to_pylist()}),
+        name_col=name_col,
+        level=level,
+        n_cores=n_cores
+    ).reindex(np.arange(len(unique_names)))
+
+    name_ids = pc.index_in(names, value_set=unique_names)
+    clean_names = pc.take(
+        pa.array(unique_data[name_col], type=pa.string(), from_pandas=True),
+        name_ids
+    )
+    customer_types = pc.take(
+        pa.array(unique_data['customer_type'], type=pa.string(), from_pandas=True),
+        name_ids
+    )
+
+    return build_arrow_output(
+        name_table,
+        new_columns={'customer_type': customer_types.dictionary_encode()},
+        replaced_columns={name_col: clean_names},
+        return_only_new_columns=return_only_new_columns
+    )
@@ -63,3 +63,10 @@ PHONE_LENGTH = {
     "old_landline": 10,
     "new_landline": 11
 }
+
+# ? ARROW PREPROCESSING
+# * RE2 version of Python's `\s`, as the phone cleaning only removes the spaces
+PHONE_SPACES_REGEX = (
+    r'[\t\n\x{0b}\f\r\x{1c}-\x{1f} \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}'
+    r'\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]+'
+)
@@ -0,0 +1,337 @@
+"""
+Module contains the integer-packed representation of the phones
+and the sorted index to join & look up the phones by their packed value
+
+* A phone of `n` digits (n <= 15) is packed into an uint64 as `n << 60 | int(phone)`,
+so the leading zeros are kept and the decoding is exact
+* `0` is reserved for the missing & non-encodable phones
+"""
+
+import os
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+PhoneInput = Union[pd.Series, np.ndarray, list, pa.Array, pa.ChunkedArray]
+
+MAX_PHONE_DIGITS = 15
+LENGTH_SHIFT = np.uint64(60)
+VALUE_MASK = np.uint64((1 << 60) - 1)
+MISSING_PHONE_CODE = np.uint64(0)
+
+
+def _to_arrow_strings(phones: PhoneInput) -> pa.ChunkedArray:
+    """
+    Helper to convert the phones to Arrow strings without Python objects when possible
+    """
+    if isinstance(phones, pa.Array):
+        phones = pa.chunked_array([phones])
+    elif not isinstance(phones, pa.ChunkedArray):
+        phones = pa.chunked_array([
+            pa.array(np.asarray(phones, dtype=object), type=pa.string(), from_pandas=True)
+        ])
+
+    if pa.types.is_dictionary(phones.type):
+        phones = phones.cast(phones.type.value_type)
+
+    return phones.cast(pa.string())
+
+
+def encode_phones(phones: PhoneInput) -> np.ndarray:
+    """
+    Pack the phones into uint64 codes
+
+    Parameters
+    ----------
+    phones : PhoneInput
+        The phones, should be the validated & converted phones (digits only)
+
+    Returns
+    -------
+    np.ndarray
+        The uint64 codes, `0` for missing phones
+        and phones not made of 1 to 15 digits
+    """
+    phones = _to_arrow_strings(phones)
+
+    is_encodable = pc.fill_null(
+        pc.match_substring_regex(phones, f'^[0-9]{{1,{MAX_PHONE_DIGITS}}}$'),
+        False
+    )
+    encodable_phones = pc.if_else(is_encodable, phones, '0')
+
+    phone_values = pc.cast(encodable_phones, pa.uint64())\
+        .to_numpy()
+    phone_lengths = pc.utf8_length(encodable_phones)\
+        .to_numpy()\
+        .astype(np.uint64)
+
+    codes = (phone_lengths << LENGTH_SHIFT) | phone_values
+    codes[~is_encodable.to_numpy()] = MISSING_PHONE_CODE
+
+    return codes
+
+
+def _digits_to_strings(
+    values: np.ndarray,
+    n_digits: int
+) -> np.ndarray:
+    """
+    Helper to format the values as zero-padded strings of `n_digits` digits
+    through a fixed-width byte buffer
+    """
+    digit_bytes = np.empty((values.shape[0], n_digits), dtype=np.uint8)
+    remained_values = values.copy()
+    for i in range(n_digits - 1, -1, -1):
+        digit_bytes[:, i] = remained_values % 10 + ord('0')
+        remained_values //= 10
+
+    fixed_strings = pa.Array.from_buffers(
+        pa.binary(n_digits), values.shape[0],
+        [None, pa.py_buffer(digit_bytes.tobytes())]
+    )
+
+    return fixed_strings.cast(pa.binary())\
+        .cast(pa.string())\
+        .to_numpy(zero_copy_only=False)
+
+
+def decode_phones(codes: Union[np.ndarray, pd.Series]) -> pd.Series:
+    """
+    Unpack the uint64 codes back to the phones
+
+    Parameters
+    ----------
+    codes : Union[np.ndarray, pd.Series]
+        The uint64 codes
+
+    Returns
+    -------
+    pd.Series
+        The phones, None for the missing code `0`
+    """
+    codes = np.asarray(codes, dtype=np.uint64)
+    phone_lengths = (codes >> LENGTH_SHIFT).astype(np.int64)
+    phone_values = codes & VALUE_MASK
+
+    phones = np.full(codes.shape[0], None, dtype=object)
+    # * Write the digits of each group of the same phone length at once
+    for phone_length in np.unique(phone_lengths[phone_lengths > 0]):
+        length_mask = phone_lengths == phone_length
+        phones[length_mask] = _digits_to_strings(
+            phone_values[length_mask], phone_length
+        )
+
+    return pd.Series(phones, dtype=object)
+
+
+class PhoneIndex:
+    """
+    Sorted key -> row index of the packed phones
+
+    * Batch look ups & joins with `np.searchsorted`
+    * Saved as `.npy` files, loaded back memory-mapped
+
+    Examples
+    --------
+    >>> phone_index = PhoneIndex.from_phones(valid_phone['phone'])
+    >>> phone_index.save('valid_phone_index')
+    >>> phone_index = PhoneIndex.load('valid_phone_index')
+    >>> profile_rows, valid_phone_rows = phone_index.join(profile['phone'])
+    """
+
+    def __init__(
+        self,
+        keys: np.ndarray,
+        rows: np.ndarray
+    ) -> None:
+        """
+        Parameters
+        ----------
+        keys : np.ndarray
+            The sorted uint64 codes
+        rows : np.ndarray
+            The row of each code in the source data
+        """
+        self.keys = keys
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return self.keys.shape[0]
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray) -> 'PhoneIndex':
+        """
+        Build the index from the uint64 codes of the source rows,
+        the missing codes are not indexed
+        """
+        codes = np.asarray(codes, dtype=np.uint64)
+        rows = np.flatnonzero(codes != MISSING_PHONE_CODE)
+        order = np.argsort(codes[rows], kind='stable')
+
+        return cls(codes[rows][order], rows[order].astype(np.int64))
+
+    @classmethod
+    def from_phones(cls, phones: PhoneInput) -> 'PhoneIndex':
+        """
+        Build the index from the phones of the source rows
+        """
+        return cls.from_codes(encode_phones(phones))
+
+    def save(self, path: str) -> None:
+        """
+        Save the index as `keys.npy` & `rows.npy` in the directory
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'keys.npy'), self.keys)
+        np.save(os.path.join(path, 'rows.npy'), self.rows)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'PhoneIndex':
+        """
+        Load the index from the directory, memory-mapped by default
+        """
+        mmap_mode = 'r' if mmap else None
+
+        return cls(
+            np.load(os.path.join(path, 'keys.npy'), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, 'rows.npy'), mmap_mode=mmap_mode)
+        )
+
+    def __as_codes(self, phones: Union[PhoneInput, np.ndarray]) -> np.ndarray:
+        """
+        Helper to accept both the phones & their uint64 codes
+        """
+        if isinstance(phones, np.ndarray) and phones.dtype == np.uint64:
+            return phones
+        return encode_phones(phones)
+
+    def contains(self, phones: Union[PhoneInput, np.ndarray]) -> np.ndarray:
+        """
+        Membership test of a batch of phones (or uint64 codes)
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask of the phones found in the index
+        """
+        return self.lookup(phones) >= 0
+
+    def lookup(self, phones: Union[PhoneInput, np.ndarray]) -> np.ndarray:
+        """
+        Find the first source row of each phone (or uint64 code)
+
+        Returns
+        -------
+        np.ndarray
+            The source rows, `-1` for phones not found
+        """
+        codes = self.__as_codes(phones)
+        if len(self) == 0:
+            return np.full(codes.shape[0], -1, dtype=np.int64)
+
+        positions = np.searchsorted(self.keys, codes, side='left')
+        clipped_positions = np.minimum(positions, len(self) - 1)
+        is_found = (self.keys[clipped_positions] == codes)\
+            & (codes != MISSING_PHONE_CODE)
+
+        return np.where(is_found, self.rows[clipped_positions], -1)
+
+    def join(
+        self,
+        phones: Union[PhoneInput, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Inner join a batch of phones (or uint64 codes) with the index,
+        all the source rows of duplicated keys are matched
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The positions in the batch & the matched source rows
+        """
+        codes = self.__as_codes(phones)
+        starts = np.searchsorted(self.keys, codes, side='left')
+        ends = np.searchsorted(self.keys, codes, side='right')
+        ends[codes == MISSING_PHONE_CODE] = starts[codes == MISSING_PHONE_CODE]
+        n_matches = ends - starts
+
+        batch_positions = np.repeat(np.arange(codes.shape[0]), n_matches)
+        match_offsets = np.arange(n_matches.sum())\
+            - np.repeat(np.cumsum(n_matches) - n_matches, n_matches)
+        index_positions = np.repeat(starts, n_matches) + match_offsets
+
+        return batch_positions, np.asarray(self.rows[index_positions])
+
+
+def merge_on_phone(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_on: str = 'phone',
+    right_on: str = 'phone',
+    phone_index: PhoneIndex = None
+) -> pd.DataFrame:
+    """
+    Left merge two DataFrames on their validated phones
+    through the packed phones instead of a string hash join
+
+    Parameters
+    ----------
+    left : pd.DataFrame
+        The left data
+    right : pd.DataFrame
+        The right data
+    left_on : str, optional
+        The phone column of the left data, by default 'phone'
+    right_on : str, optional
+        The phone column of the right data, by default 'phone'
+    phone_index : PhoneIndex, optional
+        The prebuilt index of `right[right_on]`, by default built on the fly
+
+    Returns
+    -------
+    pd.DataFrame
+        The left data with the columns of the right data, in the order of the left data,
+        like `left.merge(right, how='left', left_on=left_on, right_on=right_on)`
+        for phones encodable as digits
+    """
+    if phone_index is None:
+        phone_index = PhoneIndex.from_phones(right[right_on])
+
+    left_positions, right_rows = phone_index.join(left[left_on])
+
+    # * Keep the unmatched left rows
+    is_matched = np.zeros(left.shape[0], dtype=bool)
+    is_matched[left_positions] = True
+    unmatched_positions = np.flatnonzero(~is_matched)
+
+    all_left_positions = np.concatenate([left_positions, unmatched_positions])
+    all_right_rows = np.concatenate([
+        right_rows, np.full(unmatched_positions.shape[0], -1, dtype=np.int64)
+    ])
+    order = np.argsort(all_left_positions, kind='stable')
+    all_left_positions = all_left_positions[order]
+    all_right_rows = all_right_rows[order]
+
+    right_cols = [
+        col for col in right.columns
+        if col not in left.columns or col == right_on
+    ]
+    right_data = right[right_cols]\
+        .reset_index(drop=True)\
+        .reindex(all_right_rows)
+    if right_on == left_on:
+        right_data = right_data.drop(columns=[right_on])
+
+    merged_data = pd.concat(
+        [
+            left.iloc[all_left_positions].reset_index(drop=True),
+            right_data.reset_index(drop=True)
+        ],
+        axis=1
+    )
+
+    return merged_data
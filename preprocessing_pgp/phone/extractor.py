@@ -1,8 +1,10 @@
 import multiprocessing as mp
+from typing import Dict, Union
 
 import pandas as pd
 import numpy as np
-from unidecode import unidecode
+import pyarrow as pa
+import pyarrow.compute as pc
 from tqdm import tqdm
 
 from preprocessing_pgp.phone.const import (
@@ -10,8 +12,21 @@ from preprocessing_pgp.phone.const import (
     SUB_PHONE_11NUM,
     SUB_TELEPHONE_10NUM,
     SUB_TELEPHONE_11NUM,
+    DICT_4_SUB_PHONE,
+    DICT_4_SUB_TELEPHONE,
+    DICT_NEW_MOBI_PHONE_VENDOR,
+    DICT_NEW_TELEPHONE_VENDOR,
+    PHONE_SPACES_REGEX
 )
 from preprocessing_pgp.phone.utils import basic_phone_preprocess
+from preprocessing_pgp.utils import (
+    select_input_columns,
+    compact_new_columns,
+    is_arrow_data,
+    to_arrow_table,
+    arrow_string_column,
+    build_arrow_output
+)
 from preprocessing_pgp.phone.converter import (
     convert_mobi_phone,
     convert_phone_region,
@@ -25,27 +40,43 @@ tqdm.pandas()
 
 # ? CHECK & EXTRACT FOR VALID PHONE
 def extract_valid_phone(
-    phones: pd.DataFrame,
+    phones: Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray],
     phone_col: str = "phone",
-    print_info: bool = True
+    print_info: bool = True,
+    return_only_new_columns: bool = False
 ) -> pd.DataFrame:
     """
     Check for valid phone by pattern of head-code and convert the valid-old-code to new-code phone
 
     Parameters
     ----------
-    phones : pd.DataFrame
-        The DataFrame contains the phones
+    phones : Union[pd.DataFrame, pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The DataFrame contains the phones,
+        Arrow inputs are processed with Arrow kernels and give an Arrow `Table`
     phone_col : str, optional
         The columns which direct to the phones, by default "phone"
     print_info : bool, optional
         Whether to print the information of the run
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns aligned to the input index,
+        with `bool` indicators and `category` vendors, by default False
 
     Returns
     -------
     pd.DataFrame
         The DataFrame with converted phone column and check if valid or not
     """
+    if is_arrow_data(phones):
+        return extract_valid_phone_arrow(
+            phones,
+            phone_col=phone_col,
+            return_only_new_columns=return_only_new_columns
+        )
+
+    if return_only_new_columns:
+        input_index = phones.index
+        phones = select_input_columns(phones, [phone_col])
+
     # * Split na phone
     na_phones = phones[phones[phone_col].isna()].copy(deep=True)
     #! Prevent override the origin DF
@@ -103,6 +134,7 @@ def extract_valid_phone(
             end="\n\n\n",
         )
 
+    valid_phone_index = f_phones.index
     f_phones = f_phones.reset_index(drop=True)
 
     # ? Correct phone numbers with old phone number format.
@@ -204,6 +236,10 @@ def extract_valid_phone(
     # if print_info:
     #     print(f_phones[~f_phones["is_phone_valid"]].head(10))
 
+    if return_only_new_columns:
+        # * Keep the row positions to align back to the input
+        f_phones.index = valid_phone_index
+
     final_phones = pd.concat([f_phones, na_phones])
     final_phones[fill_cols] = final_phones[fill_cols].fillna(False)
 
@@ -228,4 +264,162 @@ def extract_valid_phone(
         'phone_convert'
     ].apply(convert_tele_phone_vendor)
 
+    if return_only_new_columns:
+        return compact_new_columns(
+            final_phones,
+            input_index,
+            new_cols=[*fill_cols, 'phone_convert', 'phone_vendor'],
+            flag_cols=fill_cols,
+            category_cols=['phone_vendor']
+        )
+
     return final_phones
+
+
+def _map_head_codes(
+    heads: pa.ChunkedArray,
+    head_code_dict: Dict[str, str]
+) -> pa.ChunkedArray:
+    """
+    Helper to map the phone heads with the dictionary, null if not found
+    """
+    head_codes = pa.array(list(head_code_dict.keys()), type=pa.string())
+    mapped_codes = pa.array(list(head_code_dict.values()), type=pa.string())
+
+    return pc.take(mapped_codes, pc.index_in(heads, value_set=head_codes))
+
+
+def extract_valid_phone_arrow(
+    phones: Union[pa.Table, pa.RecordBatch, pa.ChunkedArray],
+    phone_col: str = "phone",
+    return_only_new_columns: bool = False
+) -> pa.Table:
+    """
+    Check for valid phone & convert the valid-old-code to new-code phone
+    on Arrow string arrays, with the same rules as `extract_valid_phone`
+
+    Parameters
+    ----------
+    phones : Union[pa.Table, pa.RecordBatch, pa.ChunkedArray]
+        The Arrow data contains the phones
+    phone_col : str, optional
+        The columns which direct to the phones, by default "phone"
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns, by default False
+
+    Returns
+    -------
+    pa.Table
+        The table with cleaned phone column, the indicators, `phone_convert` & `phone_vendor`
+        in the same row order as the input
+    """
+    phone_table = to_arrow_table(phones, phone_col)
+
+    # ? Preprocess phone with basic phone string clean up
+    clean_phones = pc.replace_substring_regex(
+        arrow_string_column(phone_table, phone_col),
+        pattern=PHONE_SPACES_REGEX,
+        replacement=''
+    )
+    phone_lengths = pc.utf8_length(clean_phones)
+    heads = {
+        n_digits: pc.utf8_slice_codeunits(clean_phones, 0, n_digits)
+        for n_digits in (2, 3, 4)
+    }
+
+    def is_head_in(n_digits: int, head_codes) -> pa.ChunkedArray:
+        return pc.is_in(
+            heads[n_digits],
+            value_set=pa.array(list(head_codes), type=pa.string())
+        )
+
+    # ? Phone length & head code validation
+    is_new_mobi = pc.and_(
+        pc.equal(phone_lengths, 10), is_head_in(3, SUB_PHONE_10NUM))
+    is_old_mobi = pc.and_(
+        pc.equal(phone_lengths, 11), is_head_in(4, SUB_PHONE_11NUM))
+    is_mobi = pc.or_(is_new_mobi, is_old_mobi)
+
+    is_new_landline = pc.and_(
+        pc.and_(
+            pc.equal(phone_lengths, 11),
+            pc.or_(is_head_in(3, SUB_TELEPHONE_11NUM),
+                   is_head_in(4, SUB_TELEPHONE_11NUM))
+        ),
+        pc.invert(is_mobi)
+    )
+    is_old_landline = pc.and_(
+        pc.and_(
+            pc.equal(phone_lengths, 10),
+            pc.or_(
+                pc.or_(is_head_in(3, SUB_TELEPHONE_10NUM),
+                       is_head_in(2, SUB_TELEPHONE_10NUM)),
+                is_head_in(4, SUB_TELEPHONE_10NUM)
+            )
+        ),
+        pc.invert(is_mobi)
+    )
+    is_phone_valid = pc.or_(
+        pc.or_(is_mobi, is_new_landline), is_old_landline)
+
+    # ? Convert old mobi & old region head codes to the new ones
+    def convert_head(n_digits: int, head_code_dict: Dict) -> pa.ChunkedArray:
+        return pc.binary_join_element_wise(
+            _map_head_codes(heads[n_digits], head_code_dict),
+            pc.utf8_slice_codeunits(clean_phones, n_digits, 2**31 - 1),
+            ''
+        )
+
+    mobi_converts = convert_head(4, DICT_4_SUB_PHONE)
+    region_converts = pc.coalesce(
+        convert_head(2, DICT_4_SUB_TELEPHONE),
+        convert_head(3, DICT_4_SUB_TELEPHONE),
+        convert_head(4, DICT_4_SUB_TELEPHONE)
+    )
+    null_phones = pa.nulls(len(clean_phones), type=pa.string())
+    phone_converts = pc.if_else(
+        pc.fill_null(is_old_mobi, False),
+        mobi_converts,
+        pc.if_else(pc.fill_null(is_old_landline, False),
+                   region_converts, null_phones)
+    )
+    phone_converts = pc.if_else(
+        pc.fill_null(is_phone_valid, False),
+        pc.coalesce(phone_converts, clean_phones),
+        null_phones
+    )
+
+    # ? Add Vendor
+    mobi_vendors = _map_head_codes(
+        pc.utf8_slice_codeunits(phone_converts, 0, 3),
+        DICT_NEW_MOBI_PHONE_VENDOR
+    )
+    tele_vendors = pc.coalesce(
+        _map_head_codes(pc.utf8_slice_codeunits(phone_converts, 0, 4),
+                        DICT_NEW_TELEPHONE_VENDOR),
+        _map_head_codes(pc.utf8_slice_codeunits(phone_converts, 0, 3),
+                        DICT_NEW_TELEPHONE_VENDOR)
+    )
+    phone_vendors = pc.if_else(
+        pc.fill_null(is_mobi, False), mobi_vendors, tele_vendors)
+
+    indicators = {
+        'is_phone_valid': is_phone_valid,
+        'is_mobi': is_mobi,
+        'is_new_mobi': is_new_mobi,
+        'is_old_mobi': is_old_mobi,
+        'is_new_landline': is_new_landline,
+        'is_old_landline': is_old_landline
+    }
+
+    return build_arrow_output(
+        phone_table,
+        new_columns={
+            **{col: pc.fill_null(values, False)
+               for col, values in indicators.items()},
+            'phone_convert': phone_converts,
+            'phone_vendor': phone_vendors.dictionary_encode()
+        },
+        replaced_columns={phone_col: clean_phones},
+        return_only_new_columns=return_only_new_columns
+    )
@@ -0,0 +1,260 @@
+"""
+Module contains the vectorized metadata of the phones:
+type (mobile / landline), vendor or region & class of the tail digits
+
+* All the metadata are derived in one pass from the packed phones (`encoding.py`)
+* Prefixes are looked up in integer arrays indexed by the prefix value
+* Tail classes are detected with the digit runs of the packed value
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from preprocessing_pgp.phone.const import (
+    DICT_NEW_MOBI_PHONE_VENDOR,
+    DICT_NEW_TELEPHONE_VENDOR
+)
+from preprocessing_pgp.phone.encoding import (
+    LENGTH_SHIFT,
+    MAX_PHONE_DIGITS,
+    VALUE_MASK,
+    PhoneInput,
+    encode_phones
+)
+
+MOBILE_PHONE_TYPE = 'mobile phone'
+LANDLINE_PHONE_TYPE = 'landline'
+PHONE_TYPES = [MOBILE_PHONE_TYPE, LANDLINE_PHONE_TYPE]
+
+# * Tail classes in priority order: (name, kind of run, minimum run length)
+TAIL_PHONE_CLASSES = [
+    ('Ngũ Quý', 'same', 5),
+    ('Tứ Quý', 'same', 4),
+    ('Tam Hoa', 'same', 3),
+    ('Số Tiến', 'ascending', 4),
+    ('Số Lùi', 'descending', 4)
+]
+NORMAL_TAIL_PHONE_CLASS = 'Số Thường'
+TAIL_PHONE_TYPES = [name for name, _, _ in TAIL_PHONE_CLASSES]\
+    + [NORMAL_TAIL_PHONE_CLASS]
+
+MAX_PREFIX_DIGITS = 6
+MAX_TAIL_DIGITS = max(run_length for _, _, run_length in TAIL_PHONE_CLASSES)
+
+POWERS_OF_TEN = 10 ** np.arange(MAX_PHONE_DIGITS + 1, dtype=np.uint64)
+
+
+class PrefixTable:
+    """
+    Longest prefix match of the phones on a `prefix -> value` dictionary
+
+    * One lookup array of `10 ** k` codes for the prefixes of `k` digits
+    * A phone of `n` digits has the prefix `value // 10 ** (n - k)`
+    """
+
+    def __init__(
+        self,
+        prefix_values: Dict[str, str],
+        categories: List[str]
+    ) -> None:
+        """
+        Parameters
+        ----------
+        prefix_values : Dict[str, str]
+            The digit prefixes and their values
+        categories : List[str]
+            The categories of the values, the lookups store their positions
+        """
+        category_codes = {
+            category: code
+            for code, category in enumerate(categories)
+        }
+
+        self.lookups: Dict[int, np.ndarray] = {}
+        for prefix, value in prefix_values.items():
+            prefix = str(prefix)
+            if not prefix.isdigit() or len(prefix) > MAX_PREFIX_DIGITS:
+                raise ValueError(
+                    f'Prefix should be 1 to {MAX_PREFIX_DIGITS} digits, got {prefix!r}'
+                )
+            if len(prefix) not in self.lookups:
+                self.lookups[len(prefix)] = np.full(
+                    10 ** len(prefix), -1, dtype=np.int32
+                )
+            self.lookups[len(prefix)][int(prefix)] = category_codes[value]
+
+    def match(
+        self,
+        phone_lengths: np.ndarray,
+        phone_values: np.ndarray
+    ) -> np.ndarray:
+        """
+        Find the value code of the longest prefix of each phone
+
+        Parameters
+        ----------
+        phone_lengths : np.ndarray
+            The number of digits of the phones, `0` for missing phones
+        phone_values : np.ndarray
+            The uint64 values of the phones
+
+        Returns
+        -------
+        np.ndarray
+            The category codes, `-1` for phones without any known prefix
+        """
+        codes = np.full(phone_lengths.shape[0], -1, dtype=np.int32)
+        for n_digits in sorted(self.lookups, reverse=True):
+            is_candidate = (codes == -1) & (phone_lengths >= n_digits)
+            prefixes = phone_values[is_candidate]\
+                // POWERS_OF_TEN[phone_lengths[is_candidate] - n_digits]
+            codes[is_candidate] = self.lookups[n_digits][prefixes.astype(np.int64)]
+
+        return codes
+
+
+def _tail_runs(
+    phone_lengths: np.ndarray,
+    phone_values: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Helper to compute the lengths of the same, ascending & descending
+    digit runs ending at the last digit, capped at `MAX_TAIL_DIGITS`
+    """
+    # * digits[i] is the (i + 1)-th digit from the end
+    digits = [
+        ((phone_values // POWERS_OF_TEN[i]) % 10).astype(np.int8)
+        for i in range(MAX_TAIL_DIGITS)
+    ]
+    steps = {'same': 0, 'ascending': 1, 'descending': -1}
+
+    runs = {}
+    for kind, step in steps.items():
+        run_lengths = (phone_lengths > 0).astype(np.int8)
+        is_running = phone_lengths > 0
+        for i in range(1, MAX_TAIL_DIGITS):
+            is_running &= (phone_lengths > i)\
+                & (digits[i] + step == digits[i - 1])
+            run_lengths += is_running
+        runs[kind] = run_lengths
+
+    return runs
+
+
+class PhoneMetadataEngine:
+    """
+    Type, vendor or region & tail class of the phones in one vectorized pass
+
+    * Landline prefixes are matched before the mobile ones
+    * Vendors of the mobiles & regions of the landlines share one categorical
+
+    Examples
+    --------
+    >>> engine = PhoneMetadataEngine.from_default_tables()
+    >>> metadata = engine.extract(valid_phone['phone'])
+    >>> valid_phone[metadata.columns] = metadata
+    """
+
+    def __init__(
+        self,
+        mobile_vendors: Dict[str, str],
+        landline_regions: Dict[str, str]
+    ) -> None:
+        """
+        Parameters
+        ----------
+        mobile_vendors : Dict[str, str]
+            The mobile prefixes (leading zero included) and their vendors
+        landline_regions : Dict[str, str]
+            The landline prefixes (leading zero included) and their regions
+        """
+        self.vendors = sorted(
+            {*mobile_vendors.values(), *landline_regions.values()}
+        )
+        self.mobile_table = PrefixTable(mobile_vendors, self.vendors)
+        self.landline_table = PrefixTable(landline_regions, self.vendors)
+
+    @classmethod
+    def from_default_tables(cls) -> 'PhoneMetadataEngine':
+        """
+        Build the engine from the head codes of the package
+        """
+        return cls(
+            mobile_vendors=DICT_NEW_MOBI_PHONE_VENDOR,
+            landline_regions=DICT_NEW_TELEPHONE_VENDOR
+        )
+
+    def extract_codes(self, codes: np.ndarray) -> pd.DataFrame:
+        """
+        Extract the metadata of the packed phones
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            The uint64 codes of the phones (`encode_phones`)
+
+        Returns
+        -------
+        pd.DataFrame
+            The categorical columns `phone_type`, `phone_vendor` & `tail_phone_type`,
+            missing for the missing phones & the phones without known prefix
+        """
+        codes = np.asarray(codes, dtype=np.uint64)
+        phone_lengths = (codes >> LENGTH_SHIFT).astype(np.int64)
+        phone_values = codes & VALUE_MASK
+
+        # * Type & vendor
+        landline_codes = self.landline_table.match(phone_lengths, phone_values)
+        mobile_codes = self.mobile_table.match(phone_lengths, phone_values)
+        is_landline = landline_codes != -1
+
+        type_codes = np.select(
+            [is_landline, mobile_codes != -1],
+            [PHONE_TYPES.index(LANDLINE_PHONE_TYPE),
+             PHONE_TYPES.index(MOBILE_PHONE_TYPE)],
+            default=-1
+        )
+        vendor_codes = np.where(is_landline, landline_codes, mobile_codes)
+
+        # * Tail class
+        runs = _tail_runs(phone_lengths, phone_values)
+        tail_codes = np.select(
+            [
+                runs[kind] >= run_length
+                for _, kind, run_length in TAIL_PHONE_CLASSES
+            ] + [phone_lengths > 0],
+            list(range(len(TAIL_PHONE_TYPES))),
+            default=-1
+        )
+
+        return pd.DataFrame({
+            'phone_type': pd.Categorical.from_codes(
+                type_codes, PHONE_TYPES),
+            'phone_vendor': pd.Categorical.from_codes(
+                vendor_codes, self.vendors),
+            'tail_phone_type': pd.Categorical.from_codes(
+                tail_codes, TAIL_PHONE_TYPES)
+        })
+
+    def extract(self, phones: PhoneInput) -> pd.DataFrame:
+        """
+        Extract the metadata of the phones
+
+        Parameters
+        ----------
+        phones : PhoneInput
+            The validated & converted phones (digits only)
+
+        Returns
+        -------
+        pd.DataFrame
+            The categorical columns `phone_type`, `phone_vendor` & `tail_phone_type`,
+            aligned to the index of the input series
+        """
+        metadata = self.extract_codes(encode_phones(phones))
+        if isinstance(phones, pd.Series):
+            metadata.index = phones.index
+
+        return metadata
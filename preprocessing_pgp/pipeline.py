@@ -0,0 +1,384 @@
+"""
+Module contains the multi-stage profile pipeline,
+running several processing stages over named columns with:
+
+* Shared intermediate artifacts (cleaned name, de-accented name)
+* Concurrent run of the independent stages
+* Only one materialization of the output data
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from preprocessing_pgp.const import (
+    STAGE_FUNCTION_DICT,
+    STAGE_COLUMN_ARG_DICT
+)
+from preprocessing_pgp.deaccent import remove_accent_series
+from preprocessing_pgp.streaming import get_stage_function
+from preprocessing_pgp.utils import track_stage
+
+ROW_ID_COL = '__row_id'
+
+
+@dataclass
+class PipelineStage:
+    """
+    Declaration of one stage in the pipeline
+
+    * `name`: the stage in `STAGE_FUNCTION_DICT`
+    ('enrich', 'address', 'email', 'phone', 'card', 'type')
+    * `column`: the column the stage processes
+    * `options`: additional arguments of the stage (e.g. `level` for 'type')
+    """
+    name: str
+    column: str
+    options: Dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.name not in STAGE_FUNCTION_DICT:
+            raise ValueError(
+                f"Unknown stage '{self.name}', "
+                f"available stages: {list(STAGE_FUNCTION_DICT.keys())}"
+            )
+
+
+class ProfilePipeline:
+    """
+    Declarative pipeline processing multiple profile columns at once
+
+    * Every stage reads the input columns, never the output of another stage,
+    so the stages are independent and may run concurrently (`n_workers`)
+    * When several stages emit the same output column
+    (e.g. 'type' & 'enrich' both give back the cleaned `name`,
+    two 'phone' stages both give `is_phone_valid`),
+    the stage declared last wins, whatever the order the stages finish in
+
+    Examples
+    --------
+    >>> pipeline = ProfilePipeline([
+    ...     ('type', 'name'),
+    ...     ('enrich', 'name'),
+    ...     ('phone', 'phone'),
+    ...     ('email', 'email'),
+    ...     PipelineStage('card', 'card_id'),
+    ...     PipelineStage('address', 'address'),
+    ... ], n_workers=4)
+    >>> processed_data = pipeline.run(data)
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Union[PipelineStage, Tuple[str, str]]],
+        n_workers: int = 1,
+        n_cores: int = 1
+    ) -> None:
+        self.stages = [
+            stage if isinstance(stage, PipelineStage)
+            else PipelineStage(*stage)
+            for stage in stages
+        ]
+        self.n_workers = n_workers
+        self.n_cores = n_cores
+        self.stage_runners: Dict[str, Callable] = {
+            'type': self._run_type,
+            'enrich': self._run_enrich,
+            'phone': self._run_phone,
+            'email': self._run_email,
+            'card': self._run_card,
+            'address': self._run_address
+        }
+        self.__artifacts = {}
+        self.__artifact_locks = {}
+        self.__lock = threading.Lock()
+
+    # * ARTIFACTS
+    def __get_artifact(
+        self,
+        key: Tuple[str, str],
+        compute: Callable[[], pd.Series]
+    ) -> pd.Series:
+        """
+        Helper to compute an artifact only once, shared between the stages
+        """
+        with self.__lock:
+            key_lock = self.__artifact_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self.__artifacts:
+                self.__artifacts[key] = compute()
+
+        return self.__artifacts[key]
+
+    def __column_frame(
+        self,
+        data: pd.DataFrame,
+        column: str
+    ) -> pd.DataFrame:
+        """
+        Helper to make a light frame of the column with the row positions
+        """
+        return pd.DataFrame({
+            column: data[column].values,
+            ROW_ID_COL: np.arange(data.shape[0])
+        })
+
+    def __align_rows(
+        self,
+        result: pd.DataFrame,
+        n_rows: int
+    ) -> pd.DataFrame:
+        """
+        Helper to align the stage's output back to the row positions
+        """
+        return result\
+            .set_index(ROW_ID_COL)\
+            .reindex(np.arange(n_rows))
+
+    def _clean_names(
+        self,
+        data: pd.DataFrame,
+        name_col: str
+    ) -> pd.Series:
+        """
+        Cleaned names of non-null records, indexed by row positions
+        """
+        from preprocessing_pgp.name.preprocess import preprocess_df
+
+        def compute() -> pd.Series:
+            name_data = self.__column_frame(data, name_col)
+            name_data = name_data[name_data[name_col].notna()]
+            clean_data = preprocess_df(name_data, name_col=name_col)
+
+            return clean_data.set_index(ROW_ID_COL)[name_col]
+
+        return self.__get_artifact(('clean_name', name_col), compute)
+
+    def _de_names(
+        self,
+        data: pd.DataFrame,
+        name_col: str
+    ) -> pd.Series:
+        """
+        De-accented & lowered cleaned names, indexed by row positions
+        """
+        def compute() -> pd.Series:
+            return remove_accent_series(self._clean_names(data, name_col))\
+                .str.lower()
+
+        return self.__get_artifact(('de_name', name_col), compute)
+
+    # * STAGES
+    def _run_type(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Customer type extraction from the shared de-accented names
+        """
+        from preprocessing_pgp.name.type.extractor import TypeExtractor
+
+        name_col = stage.column
+        level = stage.options.get('level', 'lv1')
+        de_names = self._de_names(data, name_col)
+
+        # * Each unique name is typed once, then mapped back to the rows
+        type_extractor = TypeExtractor()
+        unique_names = de_names.dropna().unique()
+        name_types = pd.Series(
+            [type_extractor.extract_type(name, level) for name in unique_names],
+            index=unique_names,
+            dtype=object
+        )
+        customer_types = de_names.map(name_types)
+
+        return pd.DataFrame({
+            name_col: self._clean_names(data, name_col),
+            'customer_type': customer_types
+        }).reindex(np.arange(data.shape[0]))
+
+    def _run_enrich(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Accent enrichment from the shared cleaned names
+        """
+        from preprocessing_pgp.name.enrich_name import enrich_clean_data
+
+        name_col = stage.column
+        clean_data = self._clean_names(data, name_col)\
+            .rename_axis(ROW_ID_COL)\
+            .reset_index()
+        enriched_data = enrich_clean_data(clean_data, name_col=name_col)
+
+        return self.__align_rows(enriched_data, data.shape[0])
+
+    def _run_phone(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Phone validation & conversion
+        """
+        options = {'print_info': False, **stage.options}
+
+        return self.__run_stage_function(data, stage, options)
+
+    def _run_email(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Email validation
+        """
+        options = {'n_cores': self.n_cores, **stage.options}
+
+        return self.__run_stage_function(data, stage, options)
+
+    def _run_card(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Card id validation
+        """
+        options = {'print_info': False, **stage.options}
+
+        return self.__run_stage_function(data, stage, options)
+
+    def _run_address(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Address level extraction
+        """
+        options = {'n_cores': self.n_cores, **stage.options}
+
+        return self.__run_stage_function(data, stage, options)
+
+    def __run_stage_function(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage,
+        options: Dict
+    ) -> pd.DataFrame:
+        """
+        Helper to run the stage's public function on the light column frame
+        """
+        stage_func = get_stage_function(stage.name)
+        column_arg = STAGE_COLUMN_ARG_DICT[stage.name]
+
+        result = stage_func(
+            self.__column_frame(data, stage.column),
+            **{column_arg: stage.column},
+            **options
+        )
+
+        return self.__align_rows(result, data.shape[0])
+
+    # * PUBLIC
+    def run(
+        self,
+        data: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Run all the stages of the pipeline on the data
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The input data containing all the columns of the stages
+
+        Returns
+        -------
+        pd.DataFrame
+            The input data with the output columns of all stages,
+            in the same row order & index as the input data.
+            Processed columns (e.g. `name`, `phone`) are replaced by their cleaned version,
+            an output column of several stages is taken from the last declared one
+        """
+        missing_cols = [
+            stage.column for stage in self.stages
+            if stage.column not in data.columns
+        ]
+        if len(missing_cols) > 0:
+            raise KeyError(f"Columns not found in data: {missing_cols}")
+
+        self.__artifacts = {}
+        self.__artifact_locks = {}
+
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = [
+                executor.submit(self.__track_run, data, stage)
+                for stage in self.stages
+            ]
+            stage_outputs: List[pd.DataFrame] = [
+                future.result() for future in futures
+            ]
+
+        self.__artifacts = {}
+
+        return self.__materialize(data, stage_outputs)
+
+    def __track_run(
+        self,
+        data: pd.DataFrame,
+        stage: PipelineStage
+    ) -> pd.DataFrame:
+        """
+        Helper to run one stage with its performance tracked
+        """
+        with track_stage(
+            f'{stage.name}:{stage.column}',
+            rows_in=data.shape[0],
+            display=False
+        ) as metrics:
+            output = self.stage_runners[stage.name](data, stage)
+            metrics.rows_out = output.shape[0]
+
+        return output
+
+    def __materialize(
+        self,
+        data: pd.DataFrame,
+        stage_outputs: List[pd.DataFrame]
+    ) -> pd.DataFrame:
+        """
+        Helper to build the final data in one go,
+        `stage_outputs` are in the declaration order of the stages:
+        later stages take priority on duplicated output columns
+        """
+        output_columns: Dict[str, np.ndarray] = {}
+        for output in stage_outputs:
+            for col in output.columns:
+                output_columns[col] = output[col].values
+
+        replaced_cols = [col for col in data.columns if col in output_columns]
+        new_cols = [col for col in output_columns if col not in data.columns]
+
+        final_data = pd.concat(
+            [
+                data.drop(columns=replaced_cols),
+                pd.DataFrame(
+                    {col: output_columns[col]
+                     for col in [*replaced_cols, *new_cols]},
+                    index=data.index
+                )
+            ],
+            axis=1
+        )
+
+        return final_data[[*data.columns, *new_cols]]
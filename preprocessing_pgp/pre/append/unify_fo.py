@@ -1,217 +1,16 @@
-
-import pandas as pd
-from glob import glob
-import numpy as np
-from unidecode import unidecode
-from string import punctuation
-from datetime import datetime, timedelta
-from difflib import SequenceMatcher
-import multiprocessing as mp
-import html
 import sys
+from datetime import datetime, timedelta
 
-import os
-import subprocess
+import pandas as pd
 from pyarrow import fs
-import pyarrow.parquet as pq
-os.environ['HADOOP_CONF_DIR'] = "/etc/hadoop/conf/"
-os.environ['JAVA_HOME'] = "/usr/jdk64/jdk1.8.0_112"
-os.environ['HADOOP_HOME'] = "/usr/hdp/3.1.0.0-78/hadoop"
-os.environ['ARROW_LIBHDFS_DIR'] = "/usr/hdp/3.1.0.0-78/usr/lib/"
-os.environ['CLASSPATH'] = subprocess.check_output("$HADOOP_HOME/bin/hadoop classpath --glob", shell=True).decode('utf-8')
-hdfs = fs.HadoopFileSystem(host="hdfs://hdfs-cluster.datalake.bigdata.local", port=8020)
 
 sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
-import preprocess_lib
-
-sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/fill_accent_name/scripts')
-from preprocess import clean_name_cdp
-
-ROOT_PATH = '/data/fpt/ftel/cads/dep_solution/sa/cdp/core'
-
-# function get profile change/new
-def DifferenceProfile(now_df, yesterday_df):
-    difference_df = now_df[~now_df.apply(tuple,1).isin(yesterday_df.apply(tuple,1))].copy()
-    return difference_df
-
-# function unify profile
-def UnifyFo(profile_fo, date_str='2022-07-01'):
-    # VARIABLE
-    dict_trash = {'': None, 'Nan': None, 'nan': None, 'None': None, 'none': None, 'Null': None, 'null': None, "''": None}
-    
-    # phone, email (valid)
-    valid_phone = pd.read_parquet(ROOT_PATH + '/utils/valid_phone_latest.parquet',
-                                  filesystem=hdfs, columns=['phone_raw', 'phone', 'is_phone_valid'])
-    valid_email = pd.read_parquet(ROOT_PATH + '/utils/valid_email_latest.parquet',
-                                  filesystem=hdfs, columns=['email_raw', 'email', 'is_email_valid'])
-
-    # info
-    profile_fo = profile_fo.rename(columns={'vne_id_fo': 'vne_id'})
-    profile_fo = profile_fo.sort_values(by=['vne_id', 'last_active', 'active_date'], ascending=False)
-    profile_fo = profile_fo.drop_duplicates(subset=['vne_id'], keep='first')
-    profile_fo = profile_fo.drop(columns=['last_active', 'active_date'])
-    
-    # merge get phone, email (valid)
-    profile_fo = profile_fo.rename(columns={'phone': 'phone_raw', 'email': 'email_raw'})
-    profile_fo = profile_fo.merge(valid_phone, how='left', on=['phone_raw'])
-    profile_fo = profile_fo.merge(valid_email, how='left', on=['email_raw'])
-
-    # birthday
-    now_year = datetime.today().year
-    profile_fo.loc[profile_fo['age'] < 0, 'age'] = np.nan
-    # profile_fo.loc[profile_fo['age'] > profile_fo['age'].quantile(0.99), 'age'] = np.nan
-    profile_fo.loc[profile_fo['age'] > 72, 'age'] = np.nan
-    profile_fo.loc[profile_fo['age'].notna(), 'birthday'] = '0/0/' + (now_year - profile_fo['age']).astype(str).str.replace('.0', '', regex=False)
-    profile_fo = profile_fo.drop(columns=['age'])
-    profile_fo.loc[profile_fo['birthday'].isna(), 'birthday'] = None
-
-    # gender
-    profile_fo['gender'] = profile_fo['gender'].replace({'Female': 'F', 'Male': 'M', 'Other': None})
-
-    # customer_type
-    condition_name = profile_fo['name'].notna()
-    profile_fo.loc[condition_name, 'name'] = profile_fo.loc[condition_name, 'name'].apply(clean_name_cdp)
-    
-    name_fo = profile_fo[profile_fo['name'].notna()][['name']].copy().drop_duplicates()
-    name_fo = preprocess_lib.ExtractCustomerType(name_fo)
-    profile_fo = profile_fo.merge(name_fo, how='left', on=['name'])
-    profile_fo.loc[profile_fo['customer_type'].isna(), 'customer_type'] = None
-#     profile_fo.loc[profile_fo['customer_type_detail'].isna(), 'customer_type_detail'] = None
-
-    # drop name is username_email
-    profile_fo['username_email'] = profile_fo['email'].str.split('@').str[0]
-    profile_fo.loc[profile_fo['name'] == profile_fo['username_email'], 'name'] = None
-    profile_fo = profile_fo.drop(columns=['username_email'])
+import unify_engine
+from unify_engine import hdfs, ROOT_PATH
 
-    # clean name
-    condition_name = profile_fo['customer_type'].isna() & profile_fo['name'].notna()
-    profile_fo.loc[
-        condition_name,
-        ['clean_name', 'pronoun']
-    ] = profile_fo.loc[condition_name, ].apply(lambda row: preprocess_lib.CleanName(row['name'], row['email']), axis=1).tolist()
-    profile_fo.loc[profile_fo['customer_type'].isna(), 'name'] = profile_fo['clean_name']
-    profile_fo = profile_fo.drop(columns=['clean_name'])
-    
-    # skip pronoun
-    profile_fo['name'] = profile_fo['name'].str.strip().str.title()
-    skip_names = ['Vợ', 'Vo', 'Anh', 'Chị', 'Chi', 'Mẹ', 'Me', 'Em', 'Ba', 'Chú', 'Chu', 'Bác', 'Bac', 'Ông', 'Ong', 'Cô', 'Co', 'Cha', 'Dì', 'Dượng']
-    profile_fo.loc[profile_fo['name'].isin(skip_names), 'name'] = None
-
-    # format name
-    with mp.Pool(8) as pool:
-        profile_fo[['last_name', 'middle_name', 'first_name']] = pool.map(preprocess_lib.SplitName, profile_fo['name'])
-    columns = ['last_name', 'middle_name', 'first_name']
-    profile_fo.loc[condition_name, 'name'] = profile_fo[columns].fillna('').agg(' '.join, axis=1).str.replace('(?<![a-zA-Z0-9]),', '', regex=True).str.replace('-(?![a-zA-Z0-9])', '', regex=True)
-    profile_fo['name'] = profile_fo['name'].str.strip().replace(dict_trash)
-    
-    # is full name
-    profile_fo.loc[profile_fo['last_name'].notna() & profile_fo['first_name'].notna(), 'is_full_name'] = True
-    profile_fo['is_full_name'] = profile_fo['is_full_name'].fillna(False)
-    profile_fo = profile_fo.drop(columns=['last_name', 'middle_name', 'first_name'])
-    profile_fo['name'] = profile_fo['name'].str.strip().str.title()
-
-    # valid gender by model
-    profile_fo.loc[profile_fo['customer_type'].notna(), 'gender'] = None
-    # profile_fo.loc[profile_fo['gender'].notna() & profile_fo['name'].isna(), 'gender'] = None
-    profile_fo_1 = profile_fo[profile_fo['name'].notna()].copy()
-    profile_fo_2 = profile_fo[profile_fo['name'].isna()].copy()
-    profile_fo_1 = preprocess_lib.Name2Gender(profile_fo_1, name_col='name')
-    profile_fo_1.loc[profile_fo_1['gender'].notna() & 
-                     (profile_fo_1['gender'] != profile_fo_1['predict_gender']), 'gender'] = None
-    profile_fo_1 = profile_fo_1.drop(columns=['predict_gender'])
-    profile_fo = pd.concat([profile_fo_1, profile_fo_2], ignore_index=True).sample(frac=1)
-
-    # address, city
-    norm_fo_city = pd.read_parquet('/data/fpt/ftel/cads/dep_solution/user/namdp11/scross_fill/runner/refactor/material/ftel_provinces.parquet', 
-                                   filesystem=hdfs)
-    norm_fo_city.columns = ['city', 'norm_city']
-    profile_fo.loc[profile_fo['address'] == 'Not set', 'address'] = None
-    profile_fo.loc[profile_fo['address'].notna(), 'city'] = profile_fo.loc[profile_fo['address'].notna(), 'address'].apply(unidecode)
-    profile_fo['city'] = profile_fo['city'].replace({'Ba Ria - Vung Tau': 'Vung Tau', 'Thua Thien Hue': 'Hue',
-                                                     'Bac Kan': 'Bac Can', 'Dak Nong': 'Dac Nong'})
-    profile_fo = profile_fo.merge(norm_fo_city, how='left', on='city')
-    profile_fo['city'] = profile_fo['norm_city']
-    profile_fo = profile_fo.drop(columns=['norm_city'])
-    profile_fo.loc[profile_fo['city'].isna(), 'city'] = None
-    profile_fo['address'] = None
-
-    # add info
-    profile_fo['unit_address'] = None
-    profile_fo['ward'] = None
-    profile_fo['district'] = None
-    columns = ['vne_id', 'phone_raw', 'phone', 'is_phone_valid', 
-               'email_raw', 'email', 'is_email_valid',
-               'name', 'pronoun', 'is_full_name', 'gender', 
-               'birthday', 'customer_type', # 'customer_type_detail',
-               'address', 'unit_address', 'ward', 'district', 'city']
-    profile_fo = profile_fo[columns]
-    profile_fo = profile_fo.rename(columns = {'vne_id': 'vne_id_fo'})
-    
-    # Fill 'Ca nhan'
-    profile_fo.loc[profile_fo['name'].notna() & profile_fo['customer_type'].isna(), 'customer_type'] = 'Ca nhan'
-    
-    # return
-    return profile_fo
-
-# function update profile (unify)
+# function update profile (unify): shared pipeline of utils/unify_engine.py, spec in config/fo.ini [unify]
 def UpdateUnifyFo(now_str):
-    # VARIABLES
-    raw_path = ROOT_PATH + '/raw'
-    unify_path = ROOT_PATH + '/pre'
-    f_group = 'fo'
-    yesterday_str = (datetime.strptime(now_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
-
-    # load profile (yesterday, now)
-    info_columns = ['vne_id_fo', 'phone', 'email', 'name', 'gender', 'age', 'address', 'last_active', 'active_date']
-    now_profile = pd.read_parquet(f'{raw_path}/{f_group}.parquet/d={now_str}', 
-                                  filesystem=hdfs, columns=info_columns).drop_duplicates()
-    yesterday_profile = pd.read_parquet(f'{raw_path}/{f_group}.parquet/d={yesterday_str}', 
-                                        filesystem=hdfs, columns=info_columns).drop_duplicates()
-    
-    # get profile change/new
-    difference_profile = DifferenceProfile(now_profile, yesterday_profile)
-    
-    # update profile
-    profile_unify = pd.DataFrame()
-    if difference_profile.empty:
-        profile_unify = pd.read_parquet(f'{unify_path}/{f_group}.parquet/d={yesterday_str}', filesystem=hdfs).drop_duplicates()
-    else:
-        # get profile unify (old + new)
-        old_profile_unify = pd.read_parquet(f'{unify_path}/{f_group}.parquet/d={yesterday_str}', filesystem=hdfs)
-        new_profile_unify = UnifyFo(difference_profile, date_str=yesterday_str)
-
-        # synthetic profile
-        profile_unify = new_profile_unify.append(old_profile_unify, ignore_index=True)
-
-    # update valid: phone & email
-    profile_unify = profile_unify.drop(columns=['phone', 'email', 'is_phone_valid', 'is_email_valid'])
-
-    valid_phone = pd.read_parquet(ROOT_PATH + '/utils/valid_phone_latest.parquet',
-                                  filesystem=hdfs, columns=['phone_raw', 'phone', 'is_phone_valid'])
-    valid_email = pd.read_parquet(ROOT_PATH + '/utils/valid_email_latest.parquet',
-                                  filesystem=hdfs, columns=['email_raw', 'email', 'is_email_valid'])
-
-    profile_unify = profile_unify.merge(valid_phone, how='left', on=['phone_raw'])
-    profile_unify = profile_unify.merge(valid_email, how='left', on=['email_raw'])
-    profile_unify['is_phone_valid'] = profile_unify['is_phone_valid'].fillna(False)
-    profile_unify['is_email_valid'] = profile_unify['is_email_valid'].fillna(False)
-        
-    # arrange columns
-    columns = ['vne_id_fo', 'phone_raw', 'phone', 'is_phone_valid', 
-               'email_raw', 'email', 'is_email_valid',
-               'name', 'pronoun', 'is_full_name', 'gender', 
-               'birthday', 'customer_type', # 'customer_type_detail',
-               'address', 'unit_address', 'ward', 'district', 'city']
-    
-    profile_unify = profile_unify[columns].copy()
-    profile_unify = profile_unify.drop_duplicates(subset=['vne_id_fo', 'phone_raw', 'email_raw'], keep='first')
-        
-    # save
-    profile_unify['d'] = now_str
-    profile_unify.drop_duplicates().to_parquet(f'{unify_path}/{f_group}.parquet', 
-                                               filesystem=hdfs,
-                                               index=False,
-                                               partition_cols='d')
+    unify_engine.UpdateUnify('fo', now_str)
 
 # function update ip (most)
 def UnifyLocationIpFo():
@@ -0,0 +1,152 @@
+import re
+from collections import deque
+
+from deaccent import remove_accent
+
+# Customer type of the names in one scan:
+# Aho-Corasick automaton over the keywords of all the types (& their exclusion keywords),
+# the type is the first one (by priority) matched & not excluded
+
+CTYPE_PRIORITY = ['company', 'biz', 'edu', 'medical']
+
+CTYPE_NAMES = {
+    'company': 'Cong ty',
+    'biz': 'Ho kinh doanh',
+    'edu': 'Giao duc',
+    'medical': 'Benh vien - Phong kham'
+}
+
+EXCLUDE_KWS = {
+    'company': ['benh vien', 'ngan hang']
+}
+
+# types only given to names of at least n words
+MIN_WORDS = {
+    'edu': 4
+}
+
+# keyword only matched when not at the end of the name, e.g. 'dai hoc(?!$)'
+NOT_END_SUFFIX = '(?!$)'
+
+REGEX_CHARS = set('.^$*+?{}[]\\|()')
+
+
+class CustomerTypeMatcher:
+    def __init__(self, type_kws, exclude_kws=None, min_words=None, type_names=None):
+        # type_kws: {type: [keyword]}, ordered by priority
+        self.types = list(type_kws.keys())
+        self.type_names = type_names or {ctype: ctype for ctype in self.types}
+        self.min_words = [(min_words or {}).get(ctype, 0) for ctype in self.types]
+
+        # automaton: transitions & (bit, is_exclude, not_end) outputs by state
+        self.transitions = [{}]
+        self.outputs = [[]]
+        # keywords which are not plain text: regex by type
+        self.regexes = {}
+        self.plain_kws = []
+
+        for type_index, ctype in enumerate(self.types):
+            regex_kws = []
+            for kw in type_kws[ctype]:
+                if not self.__AddKeyword(kw, type_index, is_exclude=False):
+                    regex_kws.append(kw)
+            if regex_kws:
+                self.regexes[type_index] = re.compile('|'.join(regex_kws), re.IGNORECASE)
+
+            for kw in (exclude_kws or {}).get(ctype, []):
+                if not self.__AddKeyword(kw, type_index, is_exclude=True):
+                    raise ValueError(f'Exclusion keyword should be plain text: {kw}')
+
+        self.__BuildAutomaton()
+
+        # prefilter in C: names without any type keyword (most personal names) skip the scan
+        self.any_regex = re.compile('|'.join(
+            [re.escape(kw) for kw in self.plain_kws] + [regex.pattern for regex in self.regexes.values()]
+        ), re.IGNORECASE)
+
+    @classmethod
+    def FromConfig(cls, config):
+        # keywords of the config de-accented, as the names they are matched in
+        type_kws = {ctype: [remove_accent(kw) for kw in config.get('ct', ctype, 'lv1')] for ctype in CTYPE_PRIORITY}
+        return cls(type_kws, exclude_kws=EXCLUDE_KWS, min_words=MIN_WORDS, type_names=CTYPE_NAMES)
+
+    def __AddKeyword(self, kw, type_index, is_exclude):
+        kw = kw.lower()
+        not_end = kw.endswith(NOT_END_SUFFIX)
+        if not_end:
+            kw = kw[:-len(NOT_END_SUFFIX)]
+        if kw == '' or REGEX_CHARS & set(kw):
+            return False
+
+        state = 0
+        for char in kw:
+            if char not in self.transitions[state]:
+                self.transitions.append({})
+                self.outputs.append([])
+                self.transitions[state][char] = len(self.transitions) - 1
+            state = self.transitions[state][char]
+        self.outputs[state].append((1 << type_index, is_exclude, not_end))
+        if not is_exclude:
+            self.plain_kws.append(kw)
+
+        return True
+
+    def __BuildAutomaton(self):
+        # breadth first: failure of a state is the longest proper suffix in the trie,
+        # its outputs & transitions are merged -> deterministic automaton, no failure walk in the scan
+        failures = [0] * len(self.transitions)
+        trie = [dict(transitions) for transitions in self.transitions]
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            if state:
+                self.transitions[state] = {**self.transitions[failures[state]], **trie[state]}
+            for char, next_state in trie[state].items():
+                failures[next_state] = self.transitions[failures[state]].get(char, 0) if state else 0
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[failures[next_state]]
+                queue.append(next_state)
+
+    def Scan(self, text):
+        # bit masks of the types matched & excluded in text
+        transitions, outputs = self.transitions, self.outputs
+        matched, excluded = 0, 0
+        last_position = len(text) - 1
+
+        state = 0
+        for position, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            if not outputs[state]:
+                continue
+
+            for bit, is_exclude, not_end in outputs[state]:
+                if is_exclude:
+                    excluded |= bit
+                elif not not_end or position < last_position:
+                    matched |= bit
+
+        return matched, excluded
+
+    def Match(self, text, n_words=None):
+        # type name of text (None if no type)
+        if not isinstance(text, str):
+            return None
+        if n_words is None:
+            n_words = len(text.split(' '))
+
+        if not self.any_regex.search(text):
+            return None
+
+        matched, excluded = self.Scan(text)
+        for type_index, ctype in enumerate(self.types):
+            bit = 1 << type_index
+            if excluded & bit or n_words < self.min_words[type_index]:
+                continue
+            if matched & bit or (type_index in self.regexes and self.regexes[type_index].search(text)):
+                return self.type_names[ctype]
+
+        return None
+
+    def MatchMany(self, texts, n_words=None):
+        if n_words is None:
+            return [self.Match(text) for text in texts]
+        return [self.Match(text, n) for text, n in zip(texts, n_words)]
@@ -8,7 +8,6 @@ import glob
 import re
 from tqdm import tqdm
 import traceback
-import unidecode
 import itertools
 import json
 import pickle
@@ -25,6 +24,14 @@ from functools import partial
 
 import pandas as pd
 
+from name_segmenter import NameSegmenter
+from username_assembler import assemble_usernames
+from email_info_scanner import EmailInfoScanner, ONEPASS_INFO
+
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
+import gender_models
+from deaccent import remove_accent_series
+
 import string
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
@@ -90,6 +97,7 @@ class Email2Username:
         self.fname_list = None
         self.wordcost = None
         self.maxword = None
+        self.segmenter = None
         
     def collect_last_name(self, last_name_list):
         spec_last_name = SPEC_LAST_NAME
@@ -126,11 +134,11 @@ class Email2Username:
         df_names = pd.DataFrame({'name': lname_list_o+fname_list_o})
         df_names['length'] = df_names['name'].str.len()
         df_names = df_names.sort_values(by='length', ascending=False)
-        df_names['name'] = df_names['name'].apply(unidecode.unidecode)
+        df_names['name'] = remove_accent_series(df_names['name'])
         df_names['name_clean'] = df_names['name'].str.lower().str.replace(' ','')
         
-        self.fname_list = pd.Series(fname_list_o).apply(unidecode.unidecode).str.lower().str.replace(' ','')
-        self.lname_list = pd.Series(lname_list_o).apply(unidecode.unidecode).str.lower().str.replace(' ','')
+        self.fname_list = remove_accent_series(pd.Series(fname_list_o)).str.lower().str.replace(' ','')
+        self.lname_list = remove_accent_series(pd.Series(lname_list_o)).str.lower().str.replace(' ','')
         self.name_list = df_names['name_clean'].unique().tolist()
         self.name_w_acc = pd.Series(df_names['name'].values, index = df_names['name_clean']).to_dict()
 
@@ -143,6 +151,7 @@ class Email2Username:
             return -1
         self.wordcost = dict((k, log((i+1)*log(len(self.name_list)))) for i,k in enumerate(self.name_list))
         self.maxword = max(len(x) for x in self.name_list)
+        self.segmenter = NameSegmenter(self.wordcost)
         
         return 1
     
@@ -157,36 +166,24 @@ class Email2Username:
     def extract_name_component(self, s):
         """Uses dynamic programming to infer the location of spaces in a string
         without spaces."""
-        # Find the best match for the i first characters, assuming cost has
-        # been built for the i-1 first characters.
-        # Returns a pair (match_cost, match_length).
-        if self.wordcost is None or self.maxword is None:
+        # The words ending at each position are found by walking a trie of the names
+        # forward from each start, the best last word of each prefix is kept for the backtrack.
+        # Results are memoized by string.
+        if self.segmenter is None:
             raise ValueError("Cost Dict of names NA !")
-        wordcost = self.wordcost
-        maxword = self.maxword
-        
-        def best_match(i):
-            candidates = enumerate(reversed(cost[max(0, i-maxword):i]))
-            return min((c + wordcost.get(s[i-k-1:i], 9e999), k+1) for k,c in candidates)
-
-        # Build the cost array.
-        cost = [0]
-        for i in range(1,len(s)+1):
-            c,k = best_match(i)
-            cost.append(c)
-
-        # Backtrack to recover the minimal-cost string.
-        out = []
-        i = len(s)
-        while i>0:
-            c,k = best_match(i)
-            assert c == cost[i]
-            out.append(s[i-k:i])
-            i -= k
-
-        return " ".join(reversed(out))
+
+        return self.segmenter.segment(s)
     
 
+    def extract_usernames(self, email_names):
+        """Segment the email names (without dots) then reorder the name components into usernames."""
+        if self.segmenter is None:
+            raise ValueError("Cost Dict of names NA !")
+        username_candidates = self.segmenter.segment_many(email_names)
+        # Reorder the name components (last names first, first names found before them at the end)
+        # on the exploded tokens of all the rows at once.
+        return assemble_usernames(username_candidates, self.lname_list, self.fname_list, self.name_w_acc)
+
     def get_username(self, df, key_col, input_col, merge_col = 'key'):
         """Use built dictionary to extract name component from email name and then reorder based on rule-based."""
         # Find the best match for the names component in each dataframe row,
@@ -200,35 +197,7 @@ class Email2Username:
             return -1
         
         df[input_col] = df[input_col].str.replace('.','')
-        df['username_candidate'] = df.apply(lambda x: self.extract_name_component(x[input_col]), axis=1)
-        df['username'] = ''
-        df['last_name_fill'] = False
-        df['first_name_found'] = np.nan
-        test = df['username_candidate'].astype(str).str.split(' ', expand=True)
-        for col in test.columns:
-            username_valid = test[col].str.len()>1
-            lastname_condition = ((test[col].isin(lastname_list)))
-            #Find lastname for the first time
-            lastname_case_1 = username_valid & lastname_condition & ((df['username'].str.len() == 0) | (df['last_name_fill'] == False))
-            #Find another last name
-            lastname_case_2 = username_valid & lastname_condition & (df['username'].str.len() != 0) & (df['last_name_fill'] == True)
-
-            firstname_condition = (test[col].isin(firstname_list)) & (~lastname_condition)
-            #Find firstname before lastname found
-            firstname_case_1 = username_valid & firstname_condition & (df['last_name_fill']== False)
-            #Find firstname after lastname
-            firstname_case_2 = username_valid & firstname_condition & (df['last_name_fill']== True)
-            test.loc[username_valid, col] = test.loc[username_valid, col].map(norm_name_dict)
-            df.loc[lastname_case_1, 'username'] = test.loc[lastname_case_1, col] + df.loc[lastname_case_1, 'username']
-            df.loc[lastname_case_2, 'username'] +=  ' ' + test.loc[lastname_case_2, col]
-            df.loc[lastname_case_1, 'last_name_fill'] = True
-            df.loc[firstname_case_1 & (df['first_name_found'].notna()), 'first_name_found'] += ' ' + test.loc[firstname_case_1 & (df['first_name_found'].notna()),col]
-            
-            df.loc[firstname_case_1 & (df['first_name_found'].isna()), 'first_name_found'] = test.loc[firstname_case_1 & (df['first_name_found'].isna()), col]
-            df.loc[firstname_case_2, 'username'] = df.loc[firstname_case_2, 'username'] + ' ' + test.loc[firstname_case_2, col]
-        df.loc[df['first_name_found'].notna(), 'username'] += ' ' + df.loc[df['first_name_found'].notna(), 'first_name_found']
-        df['username'] = df['username'].astype(str).str.strip()
-        df.loc[df['username'].astype(str).str.len() <= 1, 'username'] = np.nan
+        df['username'] = self.extract_usernames(df[input_col]).values
         return df[[merge_col, key_col, input_col, 'username']]
     
 class Email2YearOfBirth:
@@ -419,6 +388,18 @@ class Email2Address:
 
         return lv1_list.copy()
 
+    def get_norm_address_dict(self):
+        # Map the matched location name (Ex. 'nghean', 'na') to its norm name (Ex. 'Tinh Nghe An').
+        df_dvhc = self.df_dvhc
+        df_dvhc['LV1_MAP'] = df_dvhc['DVHC_LV1_NORM_NAME'].str.lower().str.replace(' ','')
+        dvhc_lv1_add = df_dvhc['LV1_MAP'].to_list() + df_dvhc['DVHC_LV1_ACRON_NAME'].to_list()
+        dvhc_lv1_norm_add = df_dvhc['DVHC_LV1_NORM'].to_list() + df_dvhc['DVHC_LV1_NORM'].to_list()
+        df_norm_address = pd.DataFrame({'LV1_ADDRESS':dvhc_lv1_add, 'LV1_NORM': dvhc_lv1_norm_add})
+        df_norm_address = df_norm_address.drop_duplicates().reset_index(drop=True)
+        norm_address = pd.Series(df_norm_address['LV1_NORM'].values, index = df_norm_address.LV1_ADDRESS).to_dict()
+
+        return norm_address
+
     def get_address(self, df, key_col, input_col, merge_col = 'key'):
         """Uses built VN location dict to extract location in email."""
         # Returns a df with filled column (Address).
@@ -427,12 +408,7 @@ class Email2Address:
         df_dvhc = self.df_dvhc
         province_list = self.get_province_ref_dict(df_dvhc.copy())
         
-        df_dvhc['LV1_MAP'] = df_dvhc['DVHC_LV1_NORM_NAME'].str.lower().str.replace(' ','')
-        dvhc_lv1_add = df_dvhc['LV1_MAP'].to_list() + df_dvhc['DVHC_LV1_ACRON_NAME'].to_list()
-        dvhc_lv1_norm_add = df_dvhc['DVHC_LV1_NORM'].to_list() + df_dvhc['DVHC_LV1_NORM'].to_list()
-        df_norm_address = pd.DataFrame({'LV1_ADDRESS':dvhc_lv1_add, 'LV1_NORM': dvhc_lv1_norm_add})
-        df_norm_address = df_norm_address.drop_duplicates().reset_index(drop=True)
-        norm_address = pd.Series(df_norm_address['LV1_NORM'].values, index = df_norm_address.LV1_ADDRESS).to_dict()
+        norm_address = self.get_norm_address_dict()
         
         pat_pronvince_add = '\\b|'.join(r"{}".format(x) for x in province_list) + '\\b'
         address_province_extract = df[input_col].str.extractall('(?=('+ pat_pronvince_add + '))').unstack(-1).droplevel(0, axis=1)
@@ -449,8 +425,9 @@ class Email2Gender:
         self.df_dvhc = None
     
     def load_model(self, file_path, module='pickle'):
+        # Loaded once per process (NBSVM folded), kept in the gender model registry.
         if module == 'pickle':
-            model = pickle.load(open(file_path, 'rb'))
+            model = gender_models.LoadModel(file_path)
         return model
 
     def preprocess_fromName(self, df, name_col='username', max_length=None):
@@ -466,7 +443,10 @@ class Email2Gender:
         prep_df = self.preprocess_fromName(df.copy(), name_col)
         pipeline = self.load_model(self.path_obj.gpred_model)
         
-        predictions = pipeline.predict(prep_df['CleanName'].values)
+        # Predict on the unique clean names only.
+        unique_names = prep_df['CleanName'].unique()
+        map_prediction = dict(zip(unique_names, pipeline.predict(unique_names)))
+        predictions = prep_df['CleanName'].map(map_prediction)
         predictions = list(map(lambda x: 'M' if x == 1 else 'F', predictions))
 
         df['gender'] = pd.Series(predictions)
@@ -481,6 +461,7 @@ class EmailCDP:
         self.email_phone = Email2Phone()
         self.email_address = Email2Address(self.path_list)
         self.email_gender = Email2Gender(self.path_list)
+        self.scanner = None
         self.info_list={'username':self.extract_username, 'yob':self.extract_yob, 'phone':self.extract_phone,
                         'address':self.extract_address, 'gender':self.extract_gender, 'group':self.extract_group, 'automail':self.extract_automail}
 
@@ -542,6 +523,15 @@ class EmailCDP:
     def extract_information(self, df, information_list, key_col='email', input_col = 'email_name', merge_col='key'):
         """Uses built VN location dict to extract information in list."""
         # Returns a df.
+        # One pass over the unique email names when only scanned information is asked
+        if (len(information_list) > 0
+                and set(information_list) <= set(ONEPASS_INFO)
+                and sorted(df.columns) == sorted([merge_col, key_col, input_col])
+                and df[merge_col].is_unique):
+            if self.scanner is None:
+                self.scanner = EmailInfoScanner(self)
+            return self.scanner.scan(df, information_list, key_col, input_col, merge_col)
+
         df_info_full = df.copy()
         for info in information_list:
             df_info = self.info_list[info](df.copy(), key_col, input_col, merge_col)
@@ -0,0 +1,163 @@
+import re
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+PHONE_PATTERN = '((0|84)[3|5|7|8|9|16|12][0-9]{8})'
+ONEPASS_INFO = ['username', 'yob', 'phone', 'address', 'group', 'automail']
+
+
+def is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class KeywordAutomaton:
+    def __init__(self, keywords):
+        """Aho-Corasick automaton of the keywords, each state knows all the keywords ending there."""
+        self.keywords = list(keywords)
+        self.transitions = [{}]
+        self.outputs = [[]]
+        for index, keyword in enumerate(self.keywords):
+            if keyword == '':
+                continue
+            state = 0
+            for char in keyword:
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.outputs.append([])
+                    self.transitions[state][char] = len(self.transitions) - 1
+                state = self.transitions[state][char]
+            self.outputs[state].append((index, len(keyword)))
+
+        # Breadth first: merge the transitions & outputs of the failure state (longest proper suffix).
+        failures = [0] * len(self.transitions)
+        trie = [dict(transitions) for transitions in self.transitions]
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            if state:
+                self.transitions[state] = {**self.transitions[failures[state]], **trie[state]}
+            for char, next_state in trie[state].items():
+                failures[next_state] = self.transitions[failures[state]].get(char, 0) if state else 0
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[failures[next_state]]
+                queue.append(next_state)
+
+    def first_match(self, text):
+        """Keyword of the leftmost match followed by a word boundary (`keyword\\b`),
+        the first keyword in the list when several start at the same position."""
+        transitions, outputs = self.transitions, self.outputs
+        best = None
+        state = 0
+        for end, char in enumerate(text, start=1):
+            state = transitions[state].get(char, 0)
+            for index, length in outputs[state]:
+                start = end - length
+                if best is not None and (start, index) >= best:
+                    continue
+                next_is_word = end < len(text) and is_word_char(text[end])
+                if is_word_char(text[end - 1]) != next_is_word:
+                    best = (start, index)
+
+        return None if best is None else self.keywords[best[1]]
+
+
+class EmailInfoScanner:
+    def __init__(self, email_cdp):
+        """Compile once the scanners of the username, yob, phone, address & group extraction."""
+        self.email_uname = email_cdp.email_uname
+
+        # YOB: patterns by number of digits, in the order they are tried.
+        email_yob = email_cdp.email_yob
+        if email_yob.dnum_list is None:
+            raise ValueError("Cost Dict of names NA !")
+        self.yob_patterns = {}
+        for num, pat in zip(email_yob.dnum_list, email_yob.dpat_list):
+            self.yob_patterns.setdefault(num, []).append(re.compile(pat))
+
+        self.phone_pattern = re.compile(PHONE_PATTERN)
+
+        # Address: province keywords matched by one automaton.
+        email_address = email_cdp.email_address
+        if email_address.df_dvhc is None:
+            email_address.create_address_dict()
+        province_list = email_address.get_province_ref_dict(email_address.df_dvhc.copy())
+        self.province_automaton = KeywordAutomaton(province_list)
+        self.norm_address = email_address.get_norm_address_dict()
+
+        df_group_dict = pd.read_parquet(email_cdp.path_list.group_dict)
+        self.map_group = pd.Series(df_group_dict['EmailGroup'].values, index=df_group_dict['Domain']).to_dict()
+
+    def scan_name(self, name):
+        """Year of birth, phone & address of one email name."""
+        if not isinstance(name, str):
+            return np.nan, np.nan, np.nan
+
+        year_of_birth = np.nan
+        num_digits = sum(character.isdigit() for character in name)
+        for pattern in self.yob_patterns.get(num_digits, []):
+            match = pattern.search(name)
+            if match:
+                year_of_birth = float(match.groups()[-1])
+                if year_of_birth < 100:
+                    year_of_birth += 1900
+                break
+
+        phone = np.nan
+        if num_digits >= 9:
+            match = self.phone_pattern.search(name)
+            if match:
+                phone = match.group(1)
+
+        province = self.province_automaton.first_match(name)
+        address = self.norm_address.get(province, np.nan) if province is not None else np.nan
+
+        return year_of_birth, phone, address
+
+    def scan(self, df, information_list, key_col='email', input_col='email_name', merge_col='key'):
+        """Same frame as the extraction one info after the other with merges,
+        each unique email name is scanned once."""
+        email_names = df[input_col]
+        unique_names = pd.Series(email_names.dropna().unique())
+
+        columns = {}
+        if 'username' in information_list:
+            no_dot_names = email_names.str.replace('.', '', regex=False)
+            unique_no_dot_names = pd.Series(no_dot_names.dropna().unique())
+            map_username = dict(zip(unique_no_dot_names, self.email_uname.extract_usernames(unique_no_dot_names)))
+            columns['username'] = no_dot_names.map(map_username)
+
+        if {'yob', 'phone', 'address'} & set(information_list):
+            scanned = pd.DataFrame(
+                [self.scan_name(name) for name in unique_names],
+                columns=['year_of_birth', 'phone', 'address'],
+                index=unique_names
+            )
+            scanned = scanned.astype({'year_of_birth': float, 'phone': object, 'address': object})
+            scanned = scanned.reindex(email_names.values)
+            columns['yob'] = scanned['year_of_birth'].values
+            columns['phone'] = scanned['phone'].values
+            columns['address'] = scanned['address'].values
+            if scanned['address'].isna().all():
+                columns['address'] = np.full(df.shape[0], np.nan)
+
+        if 'group' in information_list:
+            columns['group'] = df[key_col].str.split('@').str[1].map(self.map_group)
+
+        if 'automail' in information_list:
+            columns['automail'] = df[key_col].astype(str).str.contains('_autoemail', na=False)
+
+        # Columns in the order of the merges: email & email name are moved before the last info.
+        info_names = {'username': 'username', 'yob': 'year_of_birth', 'phone': 'phone',
+                      'address': 'address', 'group': 'email_group', 'automail': 'is_autoemail'}
+        df_info_full = df[[merge_col]].copy()
+        for info in information_list[:-1]:
+            df_info_full[info_names[info]] = np.asarray(columns[info])
+        df_info_full[key_col] = df[key_col].values
+        if information_list[-1] == 'username':
+            df_info_full[input_col] = email_names.str.replace('.', '', regex=False).values
+        else:
+            df_info_full[input_col] = email_names.values
+        df_info_full[info_names[information_list[-1]]] = np.asarray(columns[information_list[-1]])
+
+        return df_info_full.reset_index(drop=True)
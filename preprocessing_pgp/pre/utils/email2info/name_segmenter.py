@@ -0,0 +1,64 @@
+import pandas as pd
+
+# End-of-word marker in the trie nodes (characters are never empty).
+WORD_END = ''
+NO_WORD_COST = 9e999
+
+
+class NameSegmenter:
+    def __init__(self, wordcost, max_cache_size=1000000):
+        """Segment strings without spaces into the words of wordcost (minimal total cost)."""
+        self.trie = {}
+        for word, word_cost in wordcost.items():
+            node = self.trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[WORD_END] = word_cost
+
+        self.cache = {}
+        self.max_cache_size = max_cache_size
+
+    def segment(self, s):
+        """Same segmentation as the Zipf dynamic programming over substrings,
+        the words are found by walking the trie forward from each start."""
+        if s in self.cache:
+            return self.cache[s]
+
+        n = len(s)
+        # (cost, length of the last word) of the best segmentation of s[:i],
+        # a character not covered by any word is a word of its own at an infinite cost.
+        best = [(0, 0)] + [(NO_WORD_COST, 1)] * n
+        for start in range(n):
+            start_cost = best[start][0]
+            node = self.trie
+            for end in range(start + 1, n + 1):
+                node = node.get(s[end - 1])
+                if node is None:
+                    break
+                if WORD_END in node:
+                    candidate = (start_cost + node[WORD_END], end - start)
+                    if candidate < best[end]:
+                        best[end] = candidate
+
+        # Backtrack through the stored lengths.
+        out = []
+        i = n
+        while i > 0:
+            k = best[i][1]
+            out.append(s[i-k:i])
+            i -= k
+
+        segmented = " ".join(reversed(out))
+        if len(self.cache) >= self.max_cache_size:
+            self.cache.clear()
+        self.cache[s] = segmented
+
+        return segmented
+
+    def segment_many(self, strings):
+        """Segment a batch of strings, each unique string is segmented once."""
+        strings = pd.Series(strings)
+        unique_strings = strings.dropna().unique()
+        segmented = {s: self.segment(s) for s in unique_strings}
+
+        return strings.map(segmented)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+def join_by_row(rows, names):
+    """Join the names of each row with spaces, rows are sorted."""
+    if rows.shape[0] == 0:
+        return pd.Series([], dtype=object)
+
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    joined = np.add.reduceat((' ' + pd.Series(names, dtype=object)).to_numpy(), starts)
+
+    return pd.Series(joined, index=rows[starts]).str[1:]
+
+
+def assemble_usernames(candidates, lastname_list, firstname_list, norm_name_dict):
+    """Reorder the segmented name components of each candidate into a username:
+    the components from the first last name on, then the first names found before it."""
+    # Exploded (row, position, token) arrays of all the candidates.
+    candidates = pd.Series(candidates).astype(str)
+    n_rows = candidates.shape[0]
+    tokens = candidates.str.split(' ')
+    n_tokens = tokens.str.len().to_numpy()
+    token = pd.Series(np.concatenate(tokens.to_numpy()) if n_rows else np.array([], dtype=object), dtype=object)
+    row = np.repeat(np.arange(n_rows), n_tokens)
+    position = np.arange(token.shape[0]) - np.repeat(np.cumsum(n_tokens) - n_tokens, n_tokens)
+
+    # Token classes: last name, first name (not also a last name) or other.
+    is_last = token.isin(lastname_list).to_numpy()
+    is_first = token.isin(firstname_list).to_numpy() & ~is_last
+    is_kept = (token.str.len() > 1).to_numpy() & (is_last | is_first)
+
+    components = pd.DataFrame({
+        'row': row[is_kept],
+        'position': position[is_kept],
+        'is_last': is_last[is_kept],
+        'name': token[is_kept].map(norm_name_dict).to_numpy()
+    })
+
+    # Position of the first last name of each row (inf if none).
+    first_last_position = components['position'].where(components['is_last'], np.inf)\
+        .groupby(components['row']).transform('min')
+    is_main = components['position'] >= first_last_position
+
+    main_names = join_by_row(components.loc[is_main, 'row'].to_numpy(), components.loc[is_main, 'name'])
+    first_names = join_by_row(components.loc[~is_main, 'row'].to_numpy(), components.loc[~is_main, 'name'])
+
+    usernames = main_names.reindex(np.arange(n_rows), fill_value='')
+    has_first_names = np.isin(np.arange(n_rows), first_names.index)
+    usernames[has_first_names] = usernames[has_first_names] + ' ' + first_names
+    usernames = usernames.str.strip()
+    usernames[usernames.str.len() <= 1] = np.nan
+
+    return pd.Series(usernames.to_numpy(), index=candidates.index)
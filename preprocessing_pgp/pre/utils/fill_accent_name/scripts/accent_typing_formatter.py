@@ -1,7 +1,10 @@
+import sys
 import string
 
 import regex as re
-import unidecode as decode
+
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
+from deaccent import remove_accent
 
 # from unicode_converter import convert_unicode
 
@@ -142,7 +145,7 @@ def remove_accent_typing(sentence):
         Input sentence to be reformatted
     """
 
-    return decode.unidecode(sentence)
+    return remove_accent(sentence)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import argparse
 from string import capwords
@@ -6,9 +7,11 @@ from typing import List
 
 import pandas as pd
 from tqdm import tqdm
-from unidecode import unidecode
 from tensorflow import keras
 
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
+from deaccent import is_accented, remove_accent
+
 try:
     from split_name import NameProcess
     from train_script.models.transformers import TransformerModel
@@ -34,10 +37,8 @@ class NameProcessor:
         self.name_process = NameProcess(base_path)
 
     def predict_non_accent(self, name: str):
-        de_name = unidecode(name)
-
         # Keep case already have accent
-        if name != de_name:
+        if is_accented(name):
             return name
 
         # Only apply to case not having accent
@@ -59,7 +60,7 @@ class NameProcessor:
         print("Applying rule-based postprocess...")
         predicted_name['final'] = predicted_name.progress_apply(
             lambda row: rule_base_name(
-                row['predict'], unidecode(row[name_col]), self.name_dicts),
+                row['predict'], remove_accent(row[name_col]), self.name_dicts),
             axis=1
         )
 
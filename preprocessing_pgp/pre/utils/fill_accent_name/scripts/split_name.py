@@ -1,11 +1,14 @@
 import re
+import sys
 
-from unidecode import unidecode
 import numpy as np
 
 import pandas as pd
 import multiprocessing as mp
 
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
+from deaccent import is_accented, remove_accent, remove_accent_series
+
 
 def BuildLastName(base_path):
     # load stats lastname
@@ -46,14 +49,12 @@ def BuildWordName(base_path):
         'full_name', 'gender', 'first_name', 'last_name_group', 'last_name']].copy()
 
     # stats freq
-    ext_data_name1['full_name_unicecode'] = ext_data_name1['full_name'].str.lower(
-    ).apply(unidecode)
+    ext_data_name1['full_name_unicecode'] = remove_accent_series(ext_data_name1['full_name'].str.lower())
     stats_word_name1 = ext_data_name1['full_name_unicecode'].str.split(
         expand=True).stack().value_counts().reset_index()
     stats_word_name1.columns = ['Word', 'Frequency']
 
-    ext_data_name2['full_name_unicecode'] = ext_data_name2['full_name'].str.lower(
-    ).apply(unidecode)
+    ext_data_name2['full_name_unicecode'] = remove_accent_series(ext_data_name2['full_name'].str.lower())
     stats_word_name2 = ext_data_name2['full_name_unicecode'].str.split(
         expand=True).stack().value_counts().reset_index()
     stats_word_name2.columns = ['Word', 'Frequency']
@@ -84,7 +85,7 @@ class NameProcess:
 
     def CountNameVN(self, text):
         try:
-            text = unidecode(text.lower())
+            text = remove_accent(text.lower())
 
             # Contains 1 char
             if len(text) == 1:
@@ -201,11 +202,11 @@ class NameProcess:
                     key_vi = key_vi + ' '
 
                     is_case11 = (full_name.find(key_vi) == 0)
-                    is_case12 = (full_name.find(unidecode(key_vi)) == 0)
+                    is_case12 = (full_name.find(remove_accent(key_vi)) == 0)
                     is_case1 = is_case11 or is_case12
                     if is_case1:
                         # print('Case 1')
-                        key = key_vi if is_case11 else unidecode(key_vi)
+                        key = key_vi if is_case11 else remove_accent(key_vi)
 
                         last_name = (last_name + ' ' + key).strip()
                         full_name = full_name.replace(key, '', 1).strip()
@@ -226,13 +227,13 @@ class NameProcess:
 
                         is_case21 = (len(full_name)-full_name.rfind(key_vi)
                                      == len(key_vi)) & (full_name.rfind(key_vi) != -1)
-                        is_case22 = (len(full_name)-full_name.rfind(unidecode(key_vi)) == len(
-                            unidecode(key_vi))) & (full_name.rfind(unidecode(key_vi)) != -1)
+                        is_case22 = (len(full_name)-full_name.rfind(remove_accent(key_vi)) == len(
+                            remove_accent(key_vi))) & (full_name.rfind(remove_accent(key_vi)) != -1)
 
                         is_case2 = is_case21 or is_case22
                         if is_case2:
                             # print('Case 2')
-                            key = key_vi if is_case21 else unidecode(key_vi)
+                            key = key_vi if is_case21 else remove_accent(key_vi)
 
                             last_name = (key + ' ' + last_name).strip()
                             full_name = ''.join(
@@ -259,11 +260,11 @@ class NameProcess:
 
                         is_case31 = (temp_full_name.find(key_vi) == 0)
                         is_case32 = (temp_full_name.find(
-                            unidecode(key_vi)) == 0)
+                            remove_accent(key_vi)) == 0)
                         is_case3 = is_case31 or is_case32
                         if is_case3:
                             # print('Case 3')
-                            key = key_vi if is_case31 else unidecode(key_vi)
+                            key = key_vi if is_case31 else remove_accent(key_vi)
 
                             last_name = (last_name + ' ' + key).strip()
                             temp_full_name = temp_full_name.replace(
@@ -327,15 +328,14 @@ class NameProcess:
         names_df = names_df.merge(map_split_name, how='left', on=['raw_name'])
         
         # Create group_id -> by firstname
-        names_df['unidecode_first_name'] = names_df['first_name'].apply(
-            unidecode)
+        names_df['unidecode_first_name'] = remove_accent_series(names_df['first_name'])
         names_df['group_id'] = names_df[key_col] + \
             '-' + names_df['unidecode_first_name']
         names_df = names_df.drop(columns=['unidecode_first_name'])
         
         # Split case process best_name
         names_df.loc[names_df['last_name'].notna(),
-                     'unidecode_last_name'] = names_df.loc[names_df['last_name'].notna(), 'last_name'].apply(unidecode)
+                     'unidecode_last_name'] = remove_accent_series(names_df.loc[names_df['last_name'].notna(), 'last_name'])
         names_df['num_last_name'] = names_df.groupby(
             by=['group_id'])['unidecode_last_name'].transform('nunique')
         
@@ -365,8 +365,7 @@ class NameProcess:
         map_names_n_df['num_char'] = map_names_n_df['raw_name'].str.len()
         map_names_n_df['num_word'] = map_names_n_df['raw_name'].str.split(
             ' ').str.len()
-        map_names_n_df['accented'] = map_names_n_df['raw_name'] != map_names_n_df['raw_name'].apply(
-            unidecode)
+        map_names_n_df['accented'] = map_names_n_df['raw_name'].map(is_accented)
         map_names_n_df = map_names_n_df.sort_values(
             by=['group_id', 'num_word', 'num_char', 'accented'], ascending=False)
         map_names_n_df = map_names_n_df.groupby(by=['group_id']).head(1)
@@ -390,8 +389,7 @@ class NameProcess:
             map_element_name = names_1_df[names_1_df[element_name].notna(
             )][['group_id', element_name]].copy().drop_duplicates()
             # create features
-            map_element_name[f'unidecode_{element_name}'] = map_element_name[element_name].apply(
-                unidecode)
+            map_element_name[f'unidecode_{element_name}'] = remove_accent_series(map_element_name[element_name])
             map_element_name['num_overall'] = map_element_name.groupby(
                 by=['group_id', f'unidecode_{element_name}'])[element_name].transform('count')
             map_element_name = map_element_name.drop(
@@ -399,8 +397,7 @@ class NameProcess:
             map_element_name['num_char'] = map_element_name[element_name].str.len()
             map_element_name['num_word'] = map_element_name[element_name].str.split(
                 ' ').str.len()
-            map_element_name['accented'] = map_element_name[element_name] != map_element_name[element_name].apply(
-                unidecode)
+            map_element_name['accented'] = map_element_name[element_name].map(is_accented)
             # approach to choice best
             # map_element_name = map_element_name.sort_values(by=['group_id', 'num_overall', 'num_char', 'num_word', 'accented'], ascending=False)
 #             map_element_name = map_element_name.sort_values(
@@ -469,8 +466,7 @@ class NameProcess:
             compare_names_df = names_df[condition_compare].copy()
             not_compare_names_df = names_df[~condition_compare].copy()
             # compare raw with best
-            compare_names_df[f'similar_{element_name}'] = compare_names_df[f'raw_{element_name}'].apply(
-                unidecode) == compare_names_df[f'best_{element_name}'].apply(unidecode)
+            compare_names_df[f'similar_{element_name}'] = remove_accent_series(compare_names_df[f'raw_{element_name}']) == remove_accent_series(compare_names_df[f'best_{element_name}'])
             compare_names_df[f'similar_{element_name}'] = compare_names_df[f'similar_{element_name}'].astype(
                 int)
             not_compare_names_df[f'similar_{element_name}'] = 1
@@ -3,9 +3,13 @@
 # import seaborn as sns
 import pandas as pd
 # import wordcloud as wc
-from unidecode import unidecode
+import sys
+
 from tqdm import tqdm
 
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
+from deaccent import remove_accent_series
+
 tqdm.pandas()
 
 
@@ -141,7 +145,7 @@ def remove_non_accent_names(names_df: pd.DataFrame, name_col='name', remove_sing
     """
     print("Decoding names...")
     names = names_df[name_col].copy()
-    de_names = names.progress_apply(unidecode)
+    de_names = remove_accent_series(names)
 
     with_accent_mask = names != de_names
 
@@ -0,0 +1,49 @@
+import copy
+import pickle
+
+# Gender models loaded once per process (by path) & kept in memory:
+# the NBSVM classifiers are folded at load -> plain logistic regression on the TF-IDF matrix
+
+MODELS = {}
+
+
+def ReadLocalFile(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def FoldModel(model):
+    # NBSVM (alone or last step of a pipeline) -> logistic regression with r folded in the coefficients
+    # the model given is left as it is: a pipeline is folded into a copy sharing the other steps
+    if hasattr(model, 'steps'):
+        step_name, estimator = model.steps[-1]
+        if hasattr(estimator, 'fold'):
+            model = copy.copy(model)
+            model.steps = model.steps[:-1] + [(step_name, estimator.fold())]
+        return model
+
+    if hasattr(model, 'fold'):
+        return model.fold()
+
+    return model
+
+
+def LoadModel(path, opener=None, fold=True):
+    # opener: path -> bytes (e.g. lambda path: hdfs.open_input_file(path).read()), local file by default
+    key = (path, fold)
+    if key not in MODELS:
+        model = pickle.loads((opener or ReadLocalFile)(path))
+        MODELS[key] = FoldModel(model) if fold else model
+
+    return MODELS[key]
+
+
+def ExportFoldedModel(path, export_path, opener=None):
+    # save the folded model, loaded back without the NBSVM class
+    model = LoadModel(path, opener=opener, fold=True)
+    with open(export_path, 'wb') as file:
+        pickle.dump(model, file)
+
+
+def ClearModels():
+    MODELS.clear()
@@ -1,5 +1,7 @@
+import copy
 import pickle
 import string
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.utils.validation import check_X_y, check_is_fitted
@@ -22,6 +24,14 @@ class NBSVMClassifier(BaseEstimator, ClassifierMixin):
         check_is_fitted(self, ['_r', '_clf'])
         return self._clf.predict_proba(x.multiply(self._r))
 
+    def fold(self):
+        # r folded into the coefficients: (x * r) . w == x . (r * w),
+        # the returned logistic regression predicts on the TF-IDF matrix in a single sparse dot
+        check_is_fitted(self, ['_r', '_clf'])
+        folded_clf = copy.deepcopy(self._clf)
+        folded_clf.coef_ = np.asarray(self._clf.coef_ * self._r.toarray())
+        return folded_clf
+
     def fit(self, x, y):
         # Check that X and y have correct shape
         x, y = check_X_y(x, y, accept_sparse=True)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Phone type, vendor / region & tail class in one vectorized pass (tail classes as in preprocessing_pgp.phone.metadata):
+#   phone packed as (n_digits, value) -> prefix of k digits = value // 10 ** (n_digits - k)
+#   heads looked up in integer arrays (1 array of 10 ** k codes per code length)
+#   tail classes from the runs of the last digits (value // 10 ** i % 10)
+# type & vendor follow the string rules of MetaDataPhone:
+#   landline: phone[:3] is a landline code (or 024), mobile: phone[:3] is a mobile code
+#   region of a landline: the code phone[:4], else the region of 024 / 028
+
+MOBILE_PHONE_TYPE = 'mobile phone'
+LANDLINE_PHONE_TYPE = 'landline'
+PHONE_TYPES = [MOBILE_PHONE_TYPE, LANDLINE_PHONE_TYPE]
+
+# priority order: (name, kind of run, minimum run length)
+TAIL_PHONE_CLASSES = [
+    ('Ngũ Quý', 'same', 5),
+    ('Tứ Quý', 'same', 4),
+    ('Tam Hoa', 'same', 3),
+    ('Số Tiến', 'ascending', 4),
+    ('Số Lùi', 'descending', 4)
+]
+NORMAL_TAIL_PHONE_CLASS = 'Số Thường'
+TAIL_PHONE_TYPES = [name for name, _, _ in TAIL_PHONE_CLASSES] + [NORMAL_TAIL_PHONE_CLASS]
+
+# landline whatever the codes of the table, regions of the landlines without a code of 4 digits
+LANDLINE_TYPE_HEADS = ['024']
+DEFAULT_LANDLINE_REGIONS = {'024': 'Hà Nội', '028': 'Thành phố Hồ Chí Minh'}
+TYPE_HEAD_DIGITS = 3
+REGION_HEAD_DIGITS = 4
+
+MAX_PHONE_DIGITS = 15
+MAX_PREFIX_DIGITS = 6
+MAX_TAIL_DIGITS = 5
+POWERS_OF_TEN = 10 ** np.arange(MAX_PHONE_DIGITS + 1, dtype=np.uint64)
+
+
+def PackPhones(phones):
+    # phones of 1 to 15 digits -> (n_digits, value), n_digits = 0 for the others
+    phones = pa.array(np.asarray(phones, dtype=object), type=pa.string(), from_pandas=True)
+    is_packable = pc.fill_null(pc.match_substring_regex(phones, f'^[0-9]{{1,{MAX_PHONE_DIGITS}}}$'), False)
+    packable_phones = pc.if_else(is_packable, phones, '0')
+
+    phone_values = pc.cast(packable_phones, pa.uint64()).to_numpy()
+    phone_lengths = pc.utf8_length(packable_phones).to_numpy().astype(np.int64)
+    phone_lengths[~is_packable.to_numpy(zero_copy_only=False)] = 0
+
+    return phone_lengths, phone_values
+
+
+def PrefixLookups(prefix_values, categories):
+    # {n_digits: array of 10 ** n_digits category codes (-1: unknown prefix)}
+    category_codes = {category: code for code, category in enumerate(categories)}
+    lookups = {}
+    for prefix, value in prefix_values.items():
+        prefix = str(prefix)
+        if not prefix.isdigit() or len(prefix) > MAX_PREFIX_DIGITS:
+            raise ValueError(f'Prefix should be 1 to {MAX_PREFIX_DIGITS} digits, got {prefix!r}')
+        if len(prefix) not in lookups:
+            lookups[len(prefix)] = np.full(10 ** len(prefix), -1, dtype=np.int32)
+        lookups[len(prefix)][int(prefix)] = category_codes[value]
+
+    return lookups
+
+
+def HeadLookups(head_values, n_chars, categories):
+    # lookups of the codes which can be equal to phone[:n_chars] (digits, at most n_chars)
+    return PrefixLookups({head: value for head, value in head_values.items()
+                          if str(head).isdigit() and len(str(head)) <= n_chars}, categories)
+
+
+def MatchHead(lookups, n_chars, phone_lengths, phone_values):
+    # category code of phone[:n_chars]: its prefix of n_chars digits, or the whole phone if shorter (-1: unknown)
+    codes = np.full(phone_lengths.shape[0], -1, dtype=np.int32)
+    head_lengths = np.minimum(phone_lengths, n_chars)
+    for n_digits, lookup in lookups.items():
+        is_candidate = (phone_lengths > 0) & (head_lengths == n_digits)
+        heads = phone_values[is_candidate] // POWERS_OF_TEN[phone_lengths[is_candidate] - n_digits]
+        codes[is_candidate] = lookup[heads.astype(np.int64)]
+
+    return codes
+
+
+def TailRuns(phone_lengths, phone_values):
+    # lengths of the same / ascending / descending runs ending at the last digit (capped at MAX_TAIL_DIGITS)
+    digits = [((phone_values // POWERS_OF_TEN[i]) % 10).astype(np.int8) for i in range(MAX_TAIL_DIGITS)]
+
+    runs = {}
+    for kind, step in {'same': 0, 'ascending': 1, 'descending': -1}.items():
+        run_lengths = (phone_lengths > 0).astype(np.int8)
+        is_running = phone_lengths > 0
+        for i in range(1, MAX_TAIL_DIGITS):
+            is_running &= (phone_lengths > i) & (digits[i] + step == digits[i - 1])
+            run_lengths += is_running
+        runs[kind] = run_lengths
+
+    return runs
+
+
+def PhoneMetadata(phones, mobile_vendors, landline_regions):
+    # categorical columns aligned to the phones
+    vendors = sorted({*mobile_vendors.values(), *landline_regions.values(), *DEFAULT_LANDLINE_REGIONS.values()})
+    phone_lengths, phone_values = PackPhones(phones)
+
+    # type: landline code (or 024) on the 3 first digits, then mobile code
+    landline_types = dict.fromkeys([*landline_regions, *LANDLINE_TYPE_HEADS], vendors[0])
+    is_landline = MatchHead(HeadLookups(landline_types, TYPE_HEAD_DIGITS, vendors), TYPE_HEAD_DIGITS, phone_lengths, phone_values) != -1
+    mobile_codes = MatchHead(HeadLookups(mobile_vendors, TYPE_HEAD_DIGITS, vendors), TYPE_HEAD_DIGITS, phone_lengths, phone_values)
+    type_codes = np.select([is_landline, mobile_codes != -1],
+                           [PHONE_TYPES.index(LANDLINE_PHONE_TYPE), PHONE_TYPES.index(MOBILE_PHONE_TYPE)],
+                           default=-1)
+
+    # vendor: region of the 4 first digits (else of 024 / 028) for the landlines, vendor for the mobiles
+    region_codes = MatchHead(HeadLookups(landline_regions, REGION_HEAD_DIGITS, vendors), REGION_HEAD_DIGITS, phone_lengths, phone_values)
+    default_codes = MatchHead(HeadLookups(DEFAULT_LANDLINE_REGIONS, TYPE_HEAD_DIGITS, vendors), TYPE_HEAD_DIGITS, phone_lengths, phone_values)
+    region_codes = np.where(region_codes != -1, region_codes, default_codes)
+    vendor_codes = np.where(is_landline, region_codes, mobile_codes)
+
+    # tail class
+    runs = TailRuns(phone_lengths, phone_values)
+    tail_codes = np.select([runs[kind] >= run_length for _, kind, run_length in TAIL_PHONE_CLASSES] + [phone_lengths > 0],
+                           list(range(len(TAIL_PHONE_TYPES))),
+                           default=-1)
+
+    return pd.DataFrame({
+        'phone_type': pd.Categorical.from_codes(type_codes, PHONE_TYPES),
+        'phone_vendor': pd.Categorical.from_codes(vendor_codes, vendors),
+        'tail_phone_type': pd.Categorical.from_codes(tail_codes, TAIL_PHONE_TYPES)
+    }, index=phones.index if isinstance(phones, pd.Series) else None)
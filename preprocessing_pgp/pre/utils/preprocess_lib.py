@@ -6,6 +6,7 @@ from config.cfg import Config
 import unicodedata
 from string import punctuation
 import pyarrow.parquet as pq
+import pyarrow.dataset as ds
 from pyarrow import fs
 import subprocess
 import os
@@ -15,12 +16,15 @@ import re
 import numpy as np
 import pandas as pd
 import multiprocessing as mp
-from unidecode import unidecode
 from multiprocessing import Pool
 from difflib import SequenceMatcher
 from datetime import datetime, timedelta
 from preprocess import clean_name_cdp
 from enrich_name import process_enrich, fill_accent
+from semi_join import KeyFilter, ScanSemiJoin
+from customer_type_matcher import CustomerTypeMatcher
+from deaccent import is_accented, remove_accent, remove_accent_series
+import gender_models
 import sys
 sys.path.append(
     '/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/fill_accent_name/scripts')
@@ -64,14 +68,12 @@ def BuildWordName():
         'full_name', 'gender', 'first_name', 'last_name_group', 'last_name']].copy()
 
     # stats freq
-    ext_data_name1['full_name_unicecode'] = ext_data_name1['full_name'].str.lower(
-    ).apply(unidecode)
+    ext_data_name1['full_name_unicecode'] = remove_accent_series(ext_data_name1['full_name'].str.lower())
     stats_word_name1 = ext_data_name1['full_name_unicecode'].str.split(
         expand=True).stack().value_counts().reset_index()
     stats_word_name1.columns = ['Word', 'Frequency']
 
-    ext_data_name2['full_name_unicecode'] = ext_data_name2['full_name'].str.lower(
-    ).apply(unidecode)
+    ext_data_name2['full_name_unicecode'] = remove_accent_series(ext_data_name2['full_name'].str.lower())
     stats_word_name2 = ext_data_name2['full_name_unicecode'].str.split(
         expand=True).stack().value_counts().reset_index()
     stats_word_name2.columns = ['Word', 'Frequency']
@@ -114,7 +116,7 @@ last_name_list1, last_name_list2, last_name_list3, last_name_list = BuildLastNam
 
 def CountNameVN(text, word_name=word_name):
     try:
-        text = unidecode(text.lower())
+        text = remove_accent(text.lower())
 
         # Check in word_name
         word_text = set(text.split())
@@ -218,10 +220,10 @@ def SplitName(full_name):
                 key_vi = key_vi + ' '
 
                 is_case11 = (full_name.find(key_vi) == 0)
-                is_case12 = (full_name.find(unidecode(key_vi)) == 0)
+                is_case12 = (full_name.find(remove_accent(key_vi)) == 0)
                 is_case1 = is_case11 or is_case12
                 if is_case1:
-                    key = key_vi if is_case11 else unidecode(key_vi)
+                    key = key_vi if is_case11 else remove_accent(key_vi)
 
                     last_name = (last_name + ' ' + key).strip()
                     full_name = full_name.replace(key, '', 1).strip()
@@ -242,12 +244,12 @@ def SplitName(full_name):
 
                     is_case21 = (len(full_name)-full_name.rfind(key_vi)
                                  == len(key_vi)) & (full_name.rfind(key_vi) != -1)
-                    is_case22 = (len(full_name)-full_name.rfind(unidecode(key_vi)) == len(
-                        unidecode(key_vi))) & (full_name.rfind(unidecode(key_vi)) != -1)
+                    is_case22 = (len(full_name)-full_name.rfind(remove_accent(key_vi)) == len(
+                        remove_accent(key_vi))) & (full_name.rfind(remove_accent(key_vi)) != -1)
 
                     is_case2 = is_case21 or is_case22
                     if is_case2:
-                        key = key_vi if is_case21 else unidecode(key_vi)
+                        key = key_vi if is_case21 else remove_accent(key_vi)
 
                         last_name = (key + ' ' + last_name).strip()
                         full_name = ''.join(full_name.rsplit(key, 1)).strip()
@@ -271,10 +273,10 @@ def SplitName(full_name):
                     key_vi = key_vi + ' '
 
                     is_case31 = (temp_full_name.find(key_vi) == 0)
-                    is_case32 = (temp_full_name.find(unidecode(key_vi)) == 0)
+                    is_case32 = (temp_full_name.find(remove_accent(key_vi)) == 0)
                     is_case3 = is_case31 or is_case32
                     if is_case3:
-                        key = key_vi if is_case31 else unidecode(key_vi)
+                        key = key_vi if is_case31 else remove_accent(key_vi)
 
                         last_name = (last_name + ' ' + key).strip()
                         temp_full_name = temp_full_name.replace(
@@ -317,106 +319,32 @@ sys.path.insert(1, '/bigdata/fdp/cdp/script/')
 
 config = Config()
 config.load_cfg('/bigdata/fdp/cdp/script/config/customer_type.ini', 'ct')
-
-
-def RunExtractCustomerType(profile,
-                           type_name,
-                           lv1_kws,
-                           lv2_kws,
-                           lv2_kws_map=None,
-                           name_col='name',
-                           exclude_regex=None
-                           ):
-
-    profile_opt = profile.copy()
-
-    conditions = profile_opt['{}_en'.format(name_col)].str.contains(
-        '|'.join([unidecode(kw) for kw in lv1_kws]), regex=True, na=False, case=False)
-    if exclude_regex:
-        conditions = conditions & ~profile_opt['{}_en'.format(name_col)].str.contains(
-            exclude_regex, regex=True, na=False, case=False)
-
-    profile = profile[~conditions]
-    profile_opt = profile_opt[conditions]
-    profile_opt['{}_en_clean'.format(name_col)] = profile_opt['{}_en'.format(
-        name_col)].str.replace(rf'[{punctuation}]', '', regex=True)
-
-    def kw_in_lv2(name):
-        if lv2_kws_map:
-            return [
-                lv2_kws_map[lv2.lower()]
-                for lv2 in lv2_kws
-                if lv2.lower() in name.lower()
-            ]
-
-        return [
-            lv2
-            for lv2 in lv2_kws
-            if lv2.lower() in name.lower()
-        ]
-    profile_opt['customer_type'] = type_name
-#     profile_opt['customer_type_detail'] = profile_opt['{}_en_clean'.format(name_col)].apply(kw_in_lv2).apply(', '.join).replace('', np.nan)
-
-    profile_after = pd.concat([
-        profile,
-        profile_opt
-    ], ignore_index=True)
-
-    return profile_after
+ctype_matcher = CustomerTypeMatcher.FromConfig(config)
 
 
 def ExtractCustomerType(profile):
     name_col = 'name'
 
-    profile['{}_en'.format(name_col)] = profile[name_col].apply(lambda name: unidecode(
-        unicodedata.normalize('NFKD', ' '.join(name.split()))).lower() if isinstance(name, str) else name)
+    # de-accented name: each unique name decoded once
+    unique_names = profile[name_col].dropna().unique()
+    map_name_en = {name: remove_accent(unicodedata.normalize('NFKD', ' '.join(name.split()))).lower()
+                   for name in unique_names if isinstance(name, str)}
+    profile['{}_en'.format(name_col)] = profile[name_col].map(map_name_en)
     profile['{}_len'.format(name_col)] = profile['{}_en'.format(name_col)].apply(
         lambda name: len(name.split(' ')) if isinstance(name, str) else 0)
 
-    EXCLUDE_REGEXES = {
-        'company': 'benh vien|ngan hang',
-        'biz': None,
-        'edu': None,
-        'medical': None
-    }
-
-    CTYPE_NAMES = {
-        'company': 'Cong ty',
-        'biz': 'Ho kinh doanh',
-        'edu': 'Giao duc',
-        'medical': 'Benh vien - Phong kham'
-    }
-
-    profile_opt = (
-        profile
-        .assign(customer_type=None)
-        .copy()
-    )
-
-    for ctype in ['company', 'biz', 'edu', 'medical']:
-
-        lv1_kws = config.get('ct', ctype, 'lv1')
-        lv2_kws = config.get('ct', ctype, 'lv2')
-        lv2_kws_map = config.get('ct', ctype, 'lv2_map')
-
-        # Exclude extracted profiles.
-        exclude_cond = profile_opt['customer_type'].notna()
-        if ctype == 'edu':
-            exclude_cond = exclude_cond | (profile_opt['name_len'] < 4)
-
-        profile_exclude = profile_opt[exclude_cond]
-        profile_opt = profile_opt[~exclude_cond]
-
-        profile_opt = pd.concat([
-            RunExtractCustomerType(
-                profile_opt, CTYPE_NAMES[ctype], lv1_kws, lv2_kws, lv2_kws_map, exclude_regex=EXCLUDE_REGEXES[ctype]),
-            profile_exclude,
-        ], ignore_index=True)
+    # all types in one scan of each unique name (priority: company, biz, edu, medical)
+    map_type = profile[['{}_en'.format(name_col), '{}_len'.format(name_col)]].dropna().drop_duplicates()
+    map_type['customer_type'] = ctype_matcher.MatchMany(
+        map_type['{}_en'.format(name_col)], map_type['{}_len'.format(name_col)])
 
     profile_opt_final = (
-        profile_opt
+        profile
+        .drop(columns=['customer_type'], errors='ignore')
+        .merge(map_type, how='left', on=['{}_en'.format(name_col), '{}_len'.format(name_col)])
         .loc[:, ['name', 'customer_type']]  # , 'customer_type_detail']]
     )
+    profile_opt_final.loc[profile_opt_final['customer_type'].isna(), 'customer_type'] = None
 
     return profile_opt_final
 
@@ -432,34 +360,26 @@ def Name2Gender(df, name_col='name'):
         r'\s+', ' ').str.strip()
 
     # check have_accented
-    have_accented = (process_df['processed_name'].apply(
-        unidecode) != process_df['processed_name'])
-
-    # load model
-    accented_model = pickle.loads(hdfs.open_input_file(
-        f'/data/fpt/ftel/cads/dep_solution/user/namdp11/name2gender/accented/logistic_pipeline.pkl').read())
-    non_accented_model = pickle.loads(hdfs.open_input_file(
-        f'/data/fpt/ftel/cads/dep_solution/user/namdp11/name2gender/not_accented/logistic_pipeline.pkl').read())
-
-    # predict gender (accented)
-    accented_process_df = process_df[have_accented].copy()
-    if (accented_process_df.empty == False):
-        accented_predict_gender = accented_model.predict(
-            accented_process_df['processed_name'].values)
-        process_df.loc[accented_process_df.index,
-                       'predict_gender'] = accented_predict_gender
-
-    # predict gender (non accented)
-    non_accented_process_df = process_df[~have_accented].copy()
-    if (non_accented_process_df.empty == False):
-        non_accented_predict_gender = non_accented_model.predict(
-            non_accented_process_df['processed_name'].values)
-        process_df.loc[non_accented_process_df.index,
-                       'predict_gender'] = non_accented_predict_gender
+    have_accented = process_df['processed_name'].map(is_accented)
+
+    # load model (once per process)
+    accented_model = gender_models.LoadModel(
+        '/data/fpt/ftel/cads/dep_solution/user/namdp11/name2gender/accented/logistic_pipeline.pkl',
+        opener=lambda path: hdfs.open_input_file(path).read())
+    non_accented_model = gender_models.LoadModel(
+        '/data/fpt/ftel/cads/dep_solution/user/namdp11/name2gender/not_accented/logistic_pipeline.pkl',
+        opener=lambda path: hdfs.open_input_file(path).read())
+
+    # predict gender on the unique names (accented vs non accented)
+    map_gender = {}
+    for is_accented, model in [(True, accented_model), (False, non_accented_model)]:
+        unique_names = process_df.loc[have_accented == is_accented, 'processed_name'].unique()
+        if len(unique_names) > 0:
+            map_gender.update(zip(unique_names, model.predict(unique_names)))
 
     # replace
-    process_df['predict_gender'] = process_df['predict_gender'].map({
-                                                                    1: 'M', 0: 'F'})
+    process_df['predict_gender'] = process_df['processed_name'].map(map_gender).map({
+                                                                                     1: 'M', 0: 'F'})
     process_df = process_df.drop(columns=['processed_name'])
 
     # return
@@ -473,8 +393,7 @@ def UpdateDictName(date_str):
     # dict name
     dict_name_cdp = pd.read_parquet(
         ROOT_PATH + '/utils/dict_name_latest.parquet', filesystem=hdfs)
-    dict_name_cdp['unidecode_full_name'] = dict_name_cdp['full_name'].apply(
-        unidecode)
+    dict_name_cdp['unidecode_full_name'] = remove_accent_series(dict_name_cdp['full_name'])
 
     # Load data CDP
     pre_path = ROOT_PATH + '/pre'
@@ -506,7 +425,7 @@ def UpdateDictName(date_str):
     raw_names = raw_names.drop_duplicates()
 
     # Filters: name accent and not accent
-    raw_names['unidecode_full_name'] = raw_names['name'].apply(unidecode)
+    raw_names['unidecode_full_name'] = remove_accent_series(raw_names['name'])
     accent_raw_names = raw_names[raw_names['name'] !=
                                  raw_names['unidecode_full_name']][['name']].copy()
     not_accent_raw_names = raw_names[raw_names['name'] ==
@@ -556,8 +475,7 @@ def UpdateDictName(date_str):
 
     # Post-process
     # split data
-    dict_name_cdp['unidecode_full_name'] = dict_name_cdp['full_name'].apply(
-        unidecode)
+    dict_name_cdp['unidecode_full_name'] = remove_accent_series(dict_name_cdp['full_name'])
     only_name = dict_name_cdp[dict_name_cdp['full_name'].str.split(
         ' ').str.len() == 1].copy()
     full_name = dict_name_cdp[dict_name_cdp['full_name'].str.split(
@@ -613,8 +531,7 @@ def LoadNameGender(date_str, key='phone'):
     # load name (with accent)
     dict_name_cdp = pd.read_parquet(ROOT_PATH + '/utils/dict_name_latest.parquet',
                                     filesystem=hdfs, columns=['full_name', 'd', 'source'])
-    dict_name_cdp['unidecode_full_name'] = dict_name_cdp['full_name'].apply(
-        unidecode)
+    dict_name_cdp['unidecode_full_name'] = remove_accent_series(dict_name_cdp['full_name'])
     dict_name_cdp = dict_name_cdp.sort_values(
         by=['unidecode_full_name', 'source'], ascending=False)
 #     dict_name_cdp = dict_name_cdp.drop_duplicates(subset=['unidecode_full_name'], keep='last')
@@ -660,14 +577,14 @@ def CoreBestName(raw_names_n, key='phone'):
     names_df = names_df.merge(map_split_name, how='left', on=['raw_name'])
 
     # Create group_id
-    names_df['unidecode_first_name'] = names_df['first_name'].apply(unidecode)
+    names_df['unidecode_first_name'] = remove_accent_series(names_df['first_name'])
     names_df['group_id'] = names_df[key] + \
         '-' + names_df['unidecode_first_name']
     names_df = names_df.drop(columns=['unidecode_first_name'])
 
     # Split case process best_name
     names_df.loc[names_df['last_name'].notna(
-    ), 'unidecode_last_name'] = names_df.loc[names_df['last_name'].notna(), 'last_name'].apply(unidecode)
+    ), 'unidecode_last_name'] = remove_accent_series(names_df.loc[names_df['last_name'].notna(), 'last_name'])
     names_df['num_last_name'] = names_df.groupby(
         by=['group_id'])['unidecode_last_name'].transform('nunique')
 
@@ -688,8 +605,7 @@ def CoreBestName(raw_names_n, key='phone'):
     map_names_n_df['num_char'] = map_names_n_df['raw_name'].str.len()
     map_names_n_df['num_word'] = map_names_n_df['raw_name'].str.split(
         ' ').str.len()
-    map_names_n_df['accented'] = map_names_n_df['raw_name'] != map_names_n_df['raw_name'].apply(
-        unidecode)
+    map_names_n_df['accented'] = map_names_n_df['raw_name'].map(is_accented)
     map_names_n_df = map_names_n_df.sort_values(
         by=['group_id', 'num_word', 'num_char', 'accented'], ascending=False)
     map_names_n_df = map_names_n_df.groupby(by=['group_id']).head(1)
@@ -716,8 +632,7 @@ def CoreBestName(raw_names_n, key='phone'):
         )][['group_id', element_name]].copy().drop_duplicates()
 
         # create features
-        map_element_name[f'unidecode_{element_name}'] = map_element_name[element_name].apply(
-            unidecode)
+        map_element_name[f'unidecode_{element_name}'] = remove_accent_series(map_element_name[element_name])
         map_element_name['num_overall'] = map_element_name.groupby(
             by=['group_id', f'unidecode_{element_name}'])[element_name].transform('count')
         map_element_name = map_element_name.drop(
@@ -726,8 +641,7 @@ def CoreBestName(raw_names_n, key='phone'):
         map_element_name['num_char'] = map_element_name[element_name].str.len()
         map_element_name['num_word'] = map_element_name[element_name].str.split(
             ' ').str.len()
-        map_element_name['accented'] = map_element_name[element_name] != map_element_name[element_name].apply(
-            unidecode)
+        map_element_name['accented'] = map_element_name[element_name].map(is_accented)
 
         # approach to choice best
         # map_element_name = map_element_name.sort_values(by=['group_id', 'num_overall', 'num_char', 'num_word', 'accented'], ascending=False)
@@ -788,8 +702,8 @@ def CoreBestName(raw_names_n, key='phone'):
         not_compare_names_df = names_df[~condition_compare].copy()
 
         # compare raw with best
-        compare_names_df[f'similar_{element_name}'] = compare_names_df[f'raw_{element_name}'].apply(
-            unidecode) == compare_names_df[f'best_{element_name}'].apply(unidecode)
+        compare_names_df[f'similar_{element_name}'] = remove_accent_series(
+            compare_names_df[f'raw_{element_name}']) == remove_accent_series(compare_names_df[f'best_{element_name}'])
         compare_names_df[f'similar_{element_name}'] = compare_names_df[f'similar_{element_name}'].astype(
             int)
 
@@ -865,6 +779,12 @@ def FindUniqueName(name_gender_by_key, date_str, key='phone'):
     raw_path = ROOT_PATH + '/raw'
     utils_path = ROOT_PATH + '/utils'
 
+    # semi-join: key sets built once, sources scanned by batch (no giant 'in' filter)
+    valid_key = ScanSemiJoin(f'{utils_path}/valid_{key}_latest.parquet', key, KeyFilter(dup_key_s),
+                             columns=[f'{key}_raw', key],
+                             filter=ds.field(f'is_{key}_valid') == True, filesystem=hdfs)
+    valid_key_filter = KeyFilter(valid_key[f'{key}_raw'])
+
     raw_name = pd.DataFrame(
         columns=[key, 'raw_name', 'active_date', 'last_active', 'f_group', 'priority'])
     priority_index = 1
@@ -872,15 +792,8 @@ def FindUniqueName(name_gender_by_key, date_str, key='phone'):
         # print(name_cttv)
 
         # load data
-        valid_key = pd.read_parquet(f'{utils_path}/valid_{key}_latest.parquet',
-                                    filters=[
-                                        (f'is_{key}_valid', '=', True), (key, 'in', dup_key_s)],
-                                    columns=[f'{key}_raw', key], filesystem=hdfs)
-        value_valid_key = valid_key[valid_key[f'{key}_raw'].notna(
-        )][f'{key}_raw'].unique()
-        data = pd.read_parquet(f'{raw_path}/{name_cttv}.parquet/d={date_str}',
-                               filters=[(key, 'in', value_valid_key)],
-                               columns=[key]+info_columns, filesystem=hdfs)
+        data = ScanSemiJoin(f'{raw_path}/{name_cttv}.parquet/d={date_str}', key, valid_key_filter,
+                            columns=[key]+info_columns, filesystem=hdfs)
 
         data = data.rename(columns={key: f'{key}_raw', 'name': 'raw_name'})
         data = data.merge(valid_key, how='inner', on=[f'{key}_raw'])
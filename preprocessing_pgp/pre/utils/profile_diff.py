@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Row fingerprints of the daily raw snapshots:
+# one uint64 hash per row over the info columns, saved as a sorted Parquet sidecar
+# so the previous snapshot never has to be read again to find the new/changed profiles
+
+FINGERPRINT_COL = 'fingerprint'
+INFO_COLUMNS_KEY = b'info_columns'
+VERSION_KEY = b'fingerprint_version'
+# version 2: numbers hashed by value (exact integers as Int64) instead of as float64
+FINGERPRINT_VERSION = 2
+MAX_INT64_FLOAT = 2.0 ** 63
+
+
+def NumberColumns(values):
+    # (integer part, fraction part) of a number column: integral values as exact Int64, the others as float
+    # -> same hash for the same value in an integer column or a float one (integer column read with nulls)
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype('Int64'), pd.Series(np.nan, index=values.index)
+
+    values = values.astype('float64')
+    is_integral = np.isfinite(values) & (values == np.floor(values)) & (values.abs() < MAX_INT64_FLOAT)
+    integers = pd.Series(pd.array(np.where(is_integral, values, 0).astype(np.int64), dtype='Int64'),
+                         index=values.index).where(is_integral)
+
+    return integers, values.where(~is_integral)
+
+
+def FingerprintProfile(profile, info_columns):
+    # hash of the values of each row (not the index), order of columns matters
+    # numbers by value (see NumberColumns): same hash whether a batch of the snapshot has nulls or not,
+    # distinct integers stay distinct (float64 would merge the ids above 2 ** 53)
+    profile = profile[info_columns]
+    hashed_columns = {}
+    for i in range(len(info_columns)):
+        values = profile.iloc[:, i]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            hashed_columns[(i, 'integer')], hashed_columns[(i, 'fraction')] = NumberColumns(values)
+        else:
+            hashed_columns[(i, 'value')] = values
+    fingerprints = pd.util.hash_pandas_object(pd.DataFrame(hashed_columns, index=profile.index), index=False)
+
+    return fingerprints.to_numpy(dtype=np.uint64)
+
+
+def SaveFingerprint(fingerprints, path, info_columns, filesystem=None):
+    # sorted & unique -> compact sidecar, ready for the sort-merge differencing
+    fingerprints = np.unique(np.asarray(fingerprints, dtype=np.uint64))
+
+    table = pa.table({FINGERPRINT_COL: pa.array(fingerprints, type=pa.uint64())})
+    table = table.replace_schema_metadata({
+        INFO_COLUMNS_KEY: json.dumps(list(info_columns)),
+        VERSION_KEY: str(FINGERPRINT_VERSION)
+    })
+
+    parent_dir = os.path.dirname(path)
+    if filesystem is None:
+        os.makedirs(parent_dir, exist_ok=True)
+    else:
+        filesystem.create_dir(parent_dir, recursive=True)
+    pq.write_table(table, path, filesystem=filesystem)
+
+
+def LoadFingerprint(path, info_columns, filesystem=None):
+    # None if no sidecar, built on other columns or by another version -> fingerprint the snapshot instead
+    try:
+        table = pq.read_table(path, filesystem=filesystem)
+    except OSError:
+        return None
+
+    metadata = table.schema.metadata or {}
+    saved_columns = json.loads(metadata.get(INFO_COLUMNS_KEY, b'null'))
+    if saved_columns != list(info_columns) or metadata.get(VERSION_KEY) != str(FINGERPRINT_VERSION).encode():
+        return None
+
+    return table.column(FINGERPRINT_COL).to_numpy()
+
+
+def DifferenceFingerprint(now_fingerprints, yesterday_fingerprints, method='hash'):
+    # mask of the fingerprints not seen yesterday
+    now_fingerprints = np.asarray(now_fingerprints, dtype=np.uint64)
+    yesterday_fingerprints = np.asarray(yesterday_fingerprints, dtype=np.uint64)
+
+    if method == 'hash':
+        is_old = pd.Series(now_fingerprints).isin(yesterday_fingerprints).to_numpy()
+
+    elif method == 'sort':
+        # sidecars are already sorted, np.sort is cheap on sorted input
+        yesterday_fingerprints = np.sort(yesterday_fingerprints)
+        if yesterday_fingerprints.shape[0] == 0:
+            return np.ones(now_fingerprints.shape[0], dtype=bool)
+
+        positions = np.searchsorted(yesterday_fingerprints, now_fingerprints)
+        positions = np.minimum(positions, yesterday_fingerprints.shape[0] - 1)
+        is_old = yesterday_fingerprints[positions] == now_fingerprints
+
+    else:
+        raise ValueError(f"Unknown method {method}, should be 'hash' or 'sort'")
+
+    return ~is_old
+
+
+def DifferenceProfile(now_df, yesterday_fingerprints, now_fingerprints=None, info_columns=None, method='hash'):
+    # profile change/new: rows of today whose fingerprint is not in yesterday's
+    if now_fingerprints is None:
+        now_fingerprints = FingerprintProfile(now_df, info_columns or list(now_df.columns))
+
+    is_new = DifferenceFingerprint(now_fingerprints, yesterday_fingerprints, method=method)
+    difference_df = now_df[is_new].copy()
+
+    return difference_df
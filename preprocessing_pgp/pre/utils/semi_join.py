@@ -0,0 +1,160 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# Semi-join of big parquet sources with a (big) set of keys:
+# the key set is built once, the sources are scanned by record batch,
+# prefiltered by a Bloom filter (or the sorted hashes of the keys) then confirmed exactly
+# instead of pushing a `(key, 'in', [millions of keys])` filter down to the reader
+
+HASH_BASE = np.uint64(0x100000001b3)
+HASH_SEED = np.uint64(0x9e3779b97f4a7c15)
+
+
+def ToArrowString(values):
+    # keys as one Arrow string array (no python object when already Arrow)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    elif not isinstance(values, pa.Array):
+        values = pa.array(np.asarray(values, dtype=object), type=pa.string(), from_pandas=True)
+
+    if pa.types.is_dictionary(values.type):
+        values = values.cast(values.type.value_type)
+    if not pa.types.is_string(values.type):
+        values = values.cast(pa.string())
+
+    return values
+
+
+def MixHash(hashes):
+    # splitmix64 finalizer
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xbf58476d1ce4e5b9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94d049bb133111eb)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def HashKeys(values):
+    # uint64 hash of each string, vectorized over the Arrow buffers:
+    # polynomial hash of the bytes (prefix sums mod 2^64) mixed with the length
+    values = ToArrowString(values)
+    n_values = len(values)
+    offsets = np.frombuffer(values.buffers()[1], dtype=np.int32)[values.offset: values.offset + n_values + 1]
+    data = values.buffers()[2]
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+
+    lengths = np.diff(offsets)
+    first_byte, last_byte = offsets[0], offsets[-1]
+    byte_position = np.arange(last_byte - first_byte) - np.repeat(offsets[:-1] - first_byte, lengths)
+
+    max_length = lengths.max() if n_values > 0 else 0
+    powers = np.cumprod(np.full(max(max_length, 1), HASH_BASE, dtype=np.uint64))
+    byte_hashes = (data[first_byte: last_byte].astype(np.uint64) + np.uint64(1)) * powers[byte_position]
+    prefix_hashes = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(byte_hashes, dtype=np.uint64)])
+
+    hashes = prefix_hashes[offsets[1:] - first_byte] - prefix_hashes[offsets[:-1] - first_byte]
+    hashes = MixHash(hashes ^ (lengths.astype(np.uint64) * HASH_SEED))
+
+    return hashes
+
+
+class KeyFilter:
+    def __init__(self, keys, method='bloom', bits_per_key=10, n_hashes=7):
+        if method not in ['bloom', 'sorted']:
+            raise ValueError(f"Unknown method {method}, should be 'bloom' or 'sorted'")
+
+        keys = pc.unique(ToArrowString(keys).drop_null())
+        hashes = HashKeys(keys)
+        order = np.argsort(hashes)
+
+        self.method = method
+        self.n_hashes = n_hashes
+        # exact membership: keys sorted by hash, compared with the candidates
+        self.hashes = hashes[order]
+        self.keys = keys.take(pa.array(order))
+        # distinct keys of the same hash (rare): confirmed by a python set
+        is_collided = np.zeros(len(self.hashes), dtype=bool)
+        is_collided[1:] = self.hashes[1:] == self.hashes[:-1]
+        is_collided[:-1] |= is_collided[1:]
+        self.collided_hashes = np.unique(self.hashes[is_collided])
+        self.collided_keys = set(self.keys.filter(pa.array(is_collided)).to_pylist())
+
+        if method == 'bloom':
+            # number of bits: power of 2 -> position by mask instead of modulo
+            n_bits = max(64, int(len(keys) * bits_per_key))
+            self.n_bits = 1 << int(np.ceil(np.log2(n_bits)))
+            self.bits = np.zeros(self.n_bits, dtype=bool)
+            self.bits[self.__Positions(hashes).ravel()] = True
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __Positions(self, hashes):
+        # double hashing: position i = h1 + i * h2 (mod n_bits)
+        mask = np.uint64(self.n_bits - 1)
+        second_hashes = MixHash(hashes ^ HASH_SEED) | np.uint64(1)
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+
+        return (hashes[:, None] + steps[None, :] * second_hashes[:, None]) & mask
+
+    def __Search(self, hashes):
+        positions = np.searchsorted(self.hashes, hashes)
+        positions = np.minimum(positions, len(self) - 1)
+        return positions, self.hashes[positions] == hashes
+
+    def MayContain(self, values, hashes=None):
+        # prefilter: no false negative, few false positives
+        if hashes is None:
+            hashes = HashKeys(values)
+        if len(self) == 0 or hashes.shape[0] == 0:
+            return np.zeros(hashes.shape[0], dtype=bool)
+
+        if self.method == 'bloom':
+            return self.bits[self.__Positions(hashes)].all(axis=1)
+
+        return self.__Search(hashes)[1]
+
+    def Contains(self, values):
+        # exact membership, only the prefiltered values are compared
+        values = ToArrowString(values)
+        hashes = HashKeys(values)
+        is_member = self.MayContain(values, hashes) & values.is_valid().to_numpy(zero_copy_only=False)
+
+        candidates = np.flatnonzero(is_member)
+        positions, is_found = self.__Search(hashes[candidates])
+        is_equal = pc.equal(
+            self.keys.take(pa.array(positions)),
+            values.take(pa.array(candidates))
+        ).to_numpy(zero_copy_only=False)
+        is_member[candidates] = is_found & is_equal
+
+        # candidates hidden behind another key of the same hash
+        if self.collided_hashes.shape[0] > 0:
+            collided = candidates[np.isin(hashes[candidates], self.collided_hashes)]
+            is_member[collided] = [value in self.collided_keys for value in values.take(pa.array(collided)).to_pylist()]
+
+        return is_member
+
+
+def ScanSemiJoin(path, key, key_filter, columns=None, filter=None, filesystem=None, schema=None, batch_rows=1000000):
+    # rows of the parquet source whose key is in key_filter, read batch by batch
+    # schema: unified schema of the files (default: schema of the first file)
+    dataset = ds.dataset(path, format='parquet', filesystem=filesystem, schema=schema)
+    if columns is not None and key not in columns:
+        columns = [key] + columns
+
+    tables = []
+    for batch in dataset.to_batches(columns=columns, filter=filter, batch_size=batch_rows):
+        if batch.num_rows == 0:
+            continue
+        is_member = key_filter.Contains(batch.column(batch.schema.get_field_index(key)))
+        if is_member.any():
+            tables.append(pa.Table.from_batches([batch]).filter(pa.array(is_member)))
+
+    if len(tables) == 0:
+        schema = dataset.schema if columns is None else pa.schema([dataset.schema.field(col) for col in columns])
+        return schema.empty_table().to_pandas()
+
+    return pa.concat_tables(tables).to_pandas()
@@ -0,0 +1,354 @@
+import sys
+import os
+import subprocess
+import uuid
+import multiprocessing as mp
+from functools import partial
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+os.environ['HADOOP_CONF_DIR'] = "/etc/hadoop/conf/"
+os.environ['JAVA_HOME'] = "/usr/jdk64/jdk1.8.0_112"
+os.environ['HADOOP_HOME'] = "/usr/hdp/3.1.0.0-78/hadoop"
+os.environ['ARROW_LIBHDFS_DIR'] = "/usr/hdp/3.1.0.0-78/usr/lib/"
+os.environ['CLASSPATH'] = subprocess.check_output("$HADOOP_HOME/bin/hadoop classpath --glob", shell=True).decode('utf-8')
+hdfs = fs.HadoopFileSystem(host="hdfs://hdfs-cluster.datalake.bigdata.local", port=8020)
+
+sys.path.insert(1, '/bigdata/fdp/cdp/script/')
+from config.cfg import Config
+
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
+import preprocess_lib
+import profile_diff
+from unify_stages import (
+    AddPhoneKey, FinalizeProfile, IsCustomerType, KeepLatest, LatestBatches, LatestRowPositions,
+    LoadTables, MergeSchemas, MergeValid, RunHook, UnifyBatches
+)
+
+sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/fill_accent_name/scripts')
+from preprocess import clean_name_cdp
+
+# Unify engine: one pipeline for all the sources (fo, fplay, fshop, longchau, sendo, ftel)
+# driven by the [unify] section of pre/config/<source>.ini
+#
+# raw (projected, batched) -> [prepare] -> valid phone/email -> [info] -> customer type
+# -> username -> clean name -> [name] -> split name -> gender by model -> [location] -> final columns
+#
+# [...]: source-specific stages, functions of unify_sources.py named in the `hooks` option,
+# their side tables loaded once per run by the `tables` hook (spec['tables'])
+# stages without I/O: unify_stages.py
+
+ROOT_PATH = '/data/fpt/ftel/cads/dep_solution/sa/cdp/core'
+
+DICT_TRASH = {'': None, 'Nan': None, 'nan': None, 'None': None, 'none': None, 'Null': None, 'null': None, "''": None}
+SKIP_NAMES = ['Vợ', 'Vo', 'Anh', 'Chị', 'Chi', 'Mẹ', 'Me', 'Em', 'Ba', 'Chú', 'Chu', 'Bác', 'Bac', 'Ông', 'Ong', 'Cô', 'Co', 'Cha', 'Dì', 'Dượng']
+VALID_COLUMNS = ['phone', 'email', 'is_phone_valid', 'is_email_valid']
+
+UNIFY_DEFAULTS = {
+    'latest_by': None,
+    'customer_type_fallback': None,
+    'clean_name_types': None,
+    'gender_types': None,
+    'gender_unnamed': True,
+    'empty_columns': [],
+    'phone_key_column': None,
+    'hooks': {},
+    'batch_rows': 500000,
+    'n_cores': 8
+}
+
+config = Config()
+
+
+# SPEC
+def LoadUnifySpec(f_group):
+    spec = {'f_group': f_group}
+    for option in config.get(f_group, 'unify'):
+        spec[option] = config.get(f_group, 'unify', option)
+
+    for option, default in UNIFY_DEFAULTS.items():
+        spec.setdefault(option, default)
+
+    return spec
+
+
+def LoadHooks(spec):
+    import unify_sources
+
+    return {stage: getattr(unify_sources, hook_name)
+            for stage, hook_name in spec['hooks'].items()}
+
+
+# READ
+def ReadRawBatches(path, columns, batch_rows):
+    # projection pushed down to the parquet reader, one bounded batch at a time
+    dataset = ds.dataset(path, filesystem=hdfs, format='parquet')
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_rows):
+        if batch.num_rows > 0:
+            yield batch.to_pandas()
+
+
+def LoadValidPhoneEmail():
+    # validation results of all the raw values seen, exported from the store by valid_email_phone.ValidPhoneEmail
+    # (the store itself is on the local disk of the validation host)
+    utils_path = ROOT_PATH + '/utils'
+    valid_phone = pd.read_parquet(f'{utils_path}/valid_phone_latest.parquet', filesystem=hdfs,
+                                  columns=['phone_raw', 'phone', 'is_phone_valid'])
+    valid_email = pd.read_parquet(f'{utils_path}/valid_email_latest.parquet', filesystem=hdfs,
+                                  columns=['email_raw', 'email', 'is_email_valid'])
+
+    return valid_phone, valid_email
+
+
+# SHARED STAGES
+def ExtractType(profile, spec):
+    # clean name & customer type on the unique names only
+    condition_name = profile['name'].notna()
+    unique_names = pd.Series(profile.loc[condition_name, 'name'].unique())
+    clean_names = dict(zip(unique_names, unique_names.apply(clean_name_cdp)))
+    profile.loc[condition_name, 'name'] = profile.loc[condition_name, 'name'].map(clean_names)
+
+    name_type = profile[profile['name'].notna()][['name']].copy().drop_duplicates()
+    name_type = preprocess_lib.ExtractCustomerType(name_type)
+    profile = profile.merge(name_type, how='left', on=['name'])
+
+    fallback_col = spec['customer_type_fallback']
+    if fallback_col is not None:
+        profile.loc[profile['customer_type'].isna(), 'customer_type'] = profile[fallback_col]
+        profile = profile.drop(columns=[fallback_col])
+    profile.loc[profile['customer_type'].isna(), 'customer_type'] = None
+
+    # drop name is username_email
+    profile['username_email'] = profile['email'].str.split('@').str[0]
+    profile.loc[profile['name'] == profile['username_email'], 'name'] = None
+    profile = profile.drop(columns=['username_email'])
+
+    return profile, condition_name
+
+
+def CleanNameStage(profile, spec, condition_name):
+    if spec['clean_name_types'] is None:
+        profile['pronoun'] = None
+        return profile, condition_name
+
+    condition_type = IsCustomerType(profile, spec['clean_name_types'])
+    condition_name = condition_type & profile['name'].notna()
+    profile['clean_name'] = None
+    profile['pronoun'] = None
+    if condition_name.any():
+        profile.loc[
+            condition_name,
+            ['clean_name', 'pronoun']
+        ] = profile.loc[condition_name, ].apply(lambda row: preprocess_lib.CleanName(row['name'], row['email']), axis=1).tolist()
+    profile.loc[condition_type, 'name'] = profile['clean_name']
+    profile = profile.drop(columns=['clean_name'])
+
+    return profile, condition_name
+
+
+def SplitNameStage(profile, spec, condition_name):
+    # skip pronoun
+    profile['name'] = profile['name'].str.strip().str.title()
+    profile.loc[profile['name'].isin(SKIP_NAMES), 'name'] = None
+
+    # format name
+    columns = ['last_name', 'middle_name', 'first_name']
+    with mp.Pool(spec['n_cores']) as pool:
+        profile[columns] = pool.map(preprocess_lib.SplitName, profile['name'])
+    profile.loc[condition_name, 'name'] = profile[columns].fillna('').agg(' '.join, axis=1).str.replace('(?<![a-zA-Z0-9]),', '', regex=True).str.replace('-(?![a-zA-Z0-9])', '', regex=True)
+    profile['name'] = profile['name'].str.strip().replace(DICT_TRASH)
+    profile.loc[profile['name'].isna(), 'name'] = None
+
+    # is full name
+    profile.loc[profile['last_name'].notna() & profile['first_name'].notna(), 'is_full_name'] = True
+    profile['is_full_name'] = profile['is_full_name'].fillna(False)
+    profile = profile.drop(columns=columns)
+    profile['name'] = profile['name'].str.strip().str.title()
+
+    return profile
+
+
+def ValidGender(profile, spec):
+    # keep the source gender only if the model agrees
+    if spec['gender_types'] is None:
+        return profile
+
+    profile.loc[~IsCustomerType(profile, spec['gender_types']), 'gender'] = None
+    profile_1 = profile[profile['name'].notna()].copy()
+    profile_2 = profile[profile['name'].isna()].copy()
+    profile_1 = preprocess_lib.Name2Gender(profile_1, name_col='name')
+    profile_1.loc[profile_1['gender'].notna() &
+                  (profile_1['gender'] != profile_1['predict_gender']), 'gender'] = None
+    profile_1 = profile_1.drop(columns=['predict_gender'])
+    if not spec['gender_unnamed']:
+        profile_2['gender'] = None
+    profile = pd.concat([profile_1, profile_2], ignore_index=True)
+
+    return profile
+
+
+# PIPELINE
+def UnifyProfile(profile, spec, hooks, valid_phone, valid_email):
+    profile = RunHook(profile, spec, hooks, 'prepare')
+
+    # merge get phone, email (valid)
+    profile = profile.rename(columns={'phone': 'phone_raw', 'email': 'email_raw'})
+    profile = MergeValid(profile, valid_phone, valid_email)
+    profile = RunHook(profile, spec, hooks, 'info')
+
+    # name
+    profile, condition_name = ExtractType(profile, spec)
+    profile, condition_name = CleanNameStage(profile, spec, condition_name)
+    profile = RunHook(profile, spec, hooks, 'name')
+    profile = SplitNameStage(profile, spec, condition_name)
+
+    # gender, location
+    profile = ValidGender(profile, spec)
+    profile = RunHook(profile, spec, hooks, 'location')
+
+    return FinalizeProfile(profile, spec)
+
+
+def SaveUnify(profile_unify, spec, date_str):
+    unify_path = ROOT_PATH + '/pre'
+
+    profile_unify['d'] = date_str
+    profile_unify.drop_duplicates().to_parquet(f"{unify_path}/{spec['f_group']}.parquet",
+                                               filesystem=hdfs,
+                                               index=False,
+                                               partition_cols='d')
+
+
+def LatestRows(path, spec):
+    # found on the id & latest_by columns only -> the full rows never have to be in memory together
+    keys = pd.concat(ReadRawBatches(path, [spec['id_column']] + spec['latest_by'], spec['batch_rows']), ignore_index=True)
+
+    return LatestRowPositions(keys, spec)
+
+
+def UnifyRawBatches(path, spec, hooks, valid_phone, valid_email):
+    # unify profile of each raw batch, the latest row of each id only
+    latest_rows = None if spec['latest_by'] is None else LatestRows(path, spec)
+
+    for batch in LatestBatches(ReadRawBatches(path, spec['info_columns'], spec['batch_rows']), spec, latest_rows):
+        yield UnifyProfile(batch, spec, hooks, valid_phone, valid_email)
+
+
+def SaveUnifyBatches(batches, spec, date_str):
+    # each batch to a temporary file, then one file with the schema of all the batches
+    # (1 batch in memory at a time, the rows already written by a previous batch are dropped)
+    unify_path = ROOT_PATH + '/pre'
+    dataset_path = f"{unify_path}/{spec['f_group']}.parquet"
+    tmp_dir = f'{dataset_path}/_tmp_d={date_str}'
+    hdfs.create_dir(tmp_dir, recursive=True)
+
+    tmp_paths = []
+    schemas = []
+    written_fingerprints = np.array([], dtype=np.uint64)
+    for profile_unify in batches:
+        fingerprints = profile_diff.FingerprintProfile(profile_unify, list(profile_unify.columns))
+        is_first = np.zeros(fingerprints.shape[0], dtype=bool)
+        is_first[np.unique(fingerprints, return_index=True)[1]] = True
+        is_first &= ~np.isin(fingerprints, written_fingerprints)
+        written_fingerprints = np.union1d(written_fingerprints, fingerprints[is_first])
+
+        table = pa.Table.from_pandas(profile_unify[is_first], preserve_index=False)
+        tmp_paths.append(f'{tmp_dir}/part-{len(tmp_paths):05d}.parquet')
+        schemas.append(table.schema)
+        pq.write_table(table, tmp_paths[-1], filesystem=hdfs)
+        del table
+
+    if len(tmp_paths) > 0:
+        schema = MergeSchemas(schemas)
+        hdfs.create_dir(f'{dataset_path}/d={date_str}', recursive=True)
+        with pq.ParquetWriter(f'{dataset_path}/d={date_str}/{uuid.uuid4().hex}-0.parquet', schema,
+                              filesystem=hdfs) as writer:
+            for tmp_path in tmp_paths:
+                writer.write_table(pq.read_table(tmp_path, filesystem=hdfs).select(schema.names).cast(schema))
+    hdfs.delete_dir(tmp_dir)
+
+
+# function init profile (unify)
+def InitUnify(f_group, date_str):
+    spec = LoadUnifySpec(f_group)
+    hooks = LoadHooks(spec)
+    raw_path = ROOT_PATH + '/raw'
+
+    valid_phone, valid_email = LoadValidPhoneEmail()
+    spec['tables'] = LoadTables(spec, hooks)
+    SaveUnifyBatches(UnifyRawBatches(f'{raw_path}/{f_group}.parquet/d={date_str}', spec, hooks, valid_phone, valid_email),
+                     spec, date_str)
+
+
+# function update profile (unify)
+def UpdateUnify(f_group, now_str):
+    # VARIABLES
+    spec = LoadUnifySpec(f_group)
+    hooks = LoadHooks(spec)
+    info_columns = spec['info_columns']
+    raw_path = ROOT_PATH + '/raw'
+    unify_path = ROOT_PATH + '/pre'
+    fingerprint_path = ROOT_PATH + f'/utils/fingerprint/{f_group}'
+    yesterday_str = (datetime.strptime(now_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+
+    # fingerprint profile (yesterday: sidecar, else the snapshot batch by batch)
+    yesterday_fingerprints = profile_diff.LoadFingerprint(f'{fingerprint_path}/d={yesterday_str}.parquet',
+                                                          info_columns, filesystem=hdfs)
+    if yesterday_fingerprints is None:
+        yesterday_fingerprints = np.concatenate([
+            profile_diff.FingerprintProfile(batch, info_columns)
+            for batch in ReadRawBatches(f'{raw_path}/{f_group}.parquet/d={yesterday_str}',
+                                        info_columns, spec['batch_rows'])
+        ] + [np.array([], dtype=np.uint64)])
+
+    # get profile change/new, only those rows are kept in memory
+    now_fingerprints = []
+    difference_profile = []
+    for batch in ReadRawBatches(f'{raw_path}/{f_group}.parquet/d={now_str}', info_columns, spec['batch_rows']):
+        batch_fingerprints = profile_diff.FingerprintProfile(batch, info_columns)
+        now_fingerprints.append(batch_fingerprints)
+        difference_profile.append(
+            profile_diff.DifferenceProfile(batch, yesterday_fingerprints, batch_fingerprints))
+    now_fingerprints = np.concatenate(now_fingerprints + [np.array([], dtype=np.uint64)])
+    difference_profile = pd.DataFrame(columns=info_columns) if len(difference_profile) == 0 else\
+        pd.concat(difference_profile, ignore_index=True).drop_duplicates()
+
+    # update profile
+    valid_phone, valid_email = LoadValidPhoneEmail()
+    unify_dataset = ds.dataset(f'{unify_path}/{f_group}.parquet/d={yesterday_str}', filesystem=hdfs, format='parquet')
+    skip_columns = VALID_COLUMNS + [spec['phone_key_column']]
+    profile_unify = unify_dataset.to_table(columns=[col for col in unify_dataset.schema.names
+                                                    if col not in skip_columns]).to_pandas()
+    if not difference_profile.empty:
+        # get profile unify (new + old)
+        spec['tables'] = LoadTables(spec, hooks)
+        new_profile_unify = UnifyBatches(difference_profile, spec,
+                                         partial(UnifyProfile, spec=spec, hooks=hooks,
+                                                 valid_phone=valid_phone, valid_email=valid_email))
+        new_profile_unify = new_profile_unify.drop(columns=[col for col in skip_columns
+                                                            if col in new_profile_unify.columns])
+        profile_unify = pd.concat([new_profile_unify, profile_unify], ignore_index=True)
+
+    # update valid: phone & email
+    profile_unify = MergeValid(profile_unify, valid_phone, valid_email)
+    profile_unify['is_phone_valid'] = profile_unify['is_phone_valid'].fillna(False)
+    profile_unify['is_email_valid'] = profile_unify['is_email_valid'].fillna(False)
+    profile_unify = AddPhoneKey(profile_unify, spec)
+    profile_unify = RunHook(profile_unify, spec, hooks, 'update')
+
+    # arrange columns
+    columns = spec['unify_columns'] + ([spec['phone_key_column']] if spec['phone_key_column'] else [])
+    profile_unify = profile_unify[columns].copy()
+    profile_unify = profile_unify.drop_duplicates(subset=[spec['id_column'], 'phone_raw', 'email_raw'], keep='first')
+
+    # save
+    SaveUnify(profile_unify, spec, now_str)
+
+    # save fingerprint (for tomorrow)
+    profile_diff.SaveFingerprint(now_fingerprints, f'{fingerprint_path}/d={now_str}.parquet',
+                                 info_columns, filesystem=hdfs)
@@ -0,0 +1,738 @@
+import html
+from difflib import SequenceMatcher
+from glob import glob
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pyarrow import fs
+
+from deaccent import remove_accent, remove_accent_series
+from unify_engine import DICT_TRASH, hdfs
+
+# Source-specific stages of the unify engine (see unify_engine.py),
+# plugged by name through the `hooks` option of the [unify] section of each source .ini
+# hook(profile, spec) -> profile
+# tables hook(spec) -> {name: table}: side tables read (& written) once per run, in spec['tables'] for the batches
+
+dict_trash = DICT_TRASH
+MATERIAL_PATH = '/data/fpt/ftel/cads/dep_solution/user/namdp11/scross_fill/runner/refactor/material'
+
+
+def ReadProvinces():
+    norm_city = pd.read_parquet(f'{MATERIAL_PATH}/ftel_provinces.parquet', filesystem=hdfs)
+    norm_city.columns = ['city', 'norm_city']
+
+    return norm_city
+
+
+# FO
+def InfoFo(profile_fo, spec):
+    # birthday
+    now_year = datetime.today().year
+    profile_fo.loc[profile_fo['age'] < 0, 'age'] = np.nan
+    # profile_fo.loc[profile_fo['age'] > profile_fo['age'].quantile(0.99), 'age'] = np.nan
+    profile_fo.loc[profile_fo['age'] > 72, 'age'] = np.nan
+    profile_fo.loc[profile_fo['age'].notna(), 'birthday'] = '0/0/' + (now_year - profile_fo['age']).astype(str).str.replace('.0', '', regex=False)
+    profile_fo = profile_fo.drop(columns=['age'])
+    profile_fo.loc[profile_fo['birthday'].isna(), 'birthday'] = None
+
+    # gender
+    profile_fo['gender'] = profile_fo['gender'].replace({'Female': 'F', 'Male': 'M', 'Other': None})
+
+    return profile_fo
+
+
+def TablesFo(spec):
+    return {'norm_city': ReadProvinces()}
+
+
+def LocationFo(profile_fo, spec):
+    # address, city
+    norm_fo_city = spec['tables']['norm_city']
+    profile_fo.loc[profile_fo['address'] == 'Not set', 'address'] = None
+    profile_fo.loc[profile_fo['address'].notna(), 'city'] = remove_accent_series(profile_fo.loc[profile_fo['address'].notna(), 'address'])
+    profile_fo['city'] = profile_fo['city'].replace({'Ba Ria - Vung Tau': 'Vung Tau', 'Thua Thien Hue': 'Hue',
+                                                     'Bac Kan': 'Bac Can', 'Dak Nong': 'Dac Nong'})
+    profile_fo = profile_fo.merge(norm_fo_city, how='left', on='city')
+    profile_fo['city'] = profile_fo['norm_city']
+    profile_fo = profile_fo.drop(columns=['norm_city'])
+    profile_fo.loc[profile_fo['city'].isna(), 'city'] = None
+    profile_fo['address'] = None
+
+    return profile_fo
+
+
+# FSHOP, LONGCHAU
+def PrepareFrt(profile_frt, spec):
+    fallback_col = spec['customer_type_fallback']
+    profile_frt = profile_frt.rename(columns={'customer_type': fallback_col})
+    profile_frt.loc[profile_frt['gender'] == '-1', 'gender'] = None
+    profile_frt.loc[profile_frt['address'].isin(['', 'Null', 'None', 'Test']), 'address'] = None
+    profile_frt.loc[profile_frt['address'].notna() & profile_frt['address'].str.isnumeric(), 'address'] = None
+    profile_frt.loc[profile_frt['address'].str.len() < 5, 'address'] = None
+    profile_frt[fallback_col] = profile_frt[fallback_col].replace({'Individual': 'Ca nhan', 
+                                                                   'Company': 'Cong ty', 
+                                                                   'Other': None})
+
+    return profile_frt
+
+
+def TablesFrt(spec):
+    # location of each profile: from the profile, completed by the latest shop of the transactions
+    f_group = spec['f_group']
+    id_col = spec['id_column']
+    source_name = spec['location_source']
+
+    # location of shop
+#     shop_frt = pd.read_parquet(f'/data/fpt/ftel/cads/dep_solution/user/namdp11/scross_fill/runner/refactor/material/{f_group}_shop_khanhhb3.parquet',
+#                                  filesystem=hdfs, columns = ['ShopCode', 'LV1_NORM', 'LV2_NORM', 'LV3_NORM']).drop_duplicates()
+
+    path_shop = [f.path
+                 for f in hdfs.get_file_info(fs.FileSelector(f"/data/fpt/ftel/cads/dep_solution/user/namdp11/scross_fill/runner/refactor/material/{f_group}_shop_khanhhb3_ver2.parquet/"))
+                ][-1]
+    shop_frt = pd.read_parquet(path_shop, filesystem=hdfs, columns = ['ShopCode', 'Level1Norm', 'Level2Norm', 'Level3Norm']).drop_duplicates()
+    shop_frt.columns = ['shop_code', 'city', 'district', 'ward']
+    shop_frt['shop_code'] = shop_frt['shop_code'].astype(str)
+
+    transaction_paths = sorted(glob(spec['transaction_glob']))
+    transaction_frt = pd.DataFrame()
+    for path in transaction_paths:
+        df = pd.read_parquet(path)
+        df = df[['CardCode', 'ShopCode', 'Source']].drop_duplicates()
+        df.columns = ['cardcode', 'shop_code', 'source']
+        df['shop_code'] = df['shop_code'].astype(str)
+
+        df = df.merge(shop_frt, how='left', on='shop_code')
+        df = df.sort_values(by=['cardcode', 'source'], ascending=True)
+        df = df.drop_duplicates(subset=['cardcode'], keep='last')
+        df = df[['cardcode', 'city', 'district', 'ward', 'source']].reset_index(drop=True)
+        transaction_frt = transaction_frt.append(df, ignore_index=True)
+
+    transaction_frt = transaction_frt.sort_values(by=['cardcode', 'source'], ascending=True)
+    transaction_frt = transaction_frt.drop_duplicates(subset=['cardcode'], keep='last')
+    transaction_frt.to_parquet(f'/data/fpt/ftel/cads/dep_solution/user/namdp11/scross_fill/runner/refactor/material/{f_group}_location_latest_khanhhb3.parquet', 
+                                 index=False, filesystem=hdfs)
+
+    # location of profile
+    profile_location_frt = pd.read_parquet(f'/data/fpt/ftel/cads/dep_solution/sa/cdp/data/{f_group}_address_latest.parquet', 
+                                             columns=['CardCode', 'Address', 'Ward', 'District', 'City', 'Street'], filesystem=hdfs)
+    profile_location_frt.columns = ['cardcode', 'address', 'ward', 'district', 'city', 'street']
+    profile_location_frt = profile_location_frt.rename(columns={'cardcode': id_col})
+    profile_location_frt.loc[profile_location_frt['address'].isin(['', 'Null', 'None', 'Test']), 'address'] = None
+    profile_location_frt.loc[profile_location_frt['address'].str.len() < 5, 'address'] = None
+    profile_location_frt['address'] = profile_location_frt['address'].str.strip().replace(dict_trash)
+    profile_location_frt = profile_location_frt.drop_duplicates(subset=[id_col], keep='first')
+
+    latest_location_frt = pd.read_parquet(f'/data/fpt/ftel/cads/dep_solution/user/namdp11/scross_fill/runner/refactor/material/{f_group}_location_latest_khanhhb3.parquet', 
+                                            filesystem=hdfs)
+    latest_location_frt = latest_location_frt.drop(columns=['source'])
+    latest_location_frt = latest_location_frt.rename(columns={'cardcode': id_col})
+    latest_location_frt['ward'] = None
+
+    # source address
+    latest_location_frt.loc[latest_location_frt['city'].notna(), 'source_city'] = f'{source_name} from shop'
+    latest_location_frt.loc[latest_location_frt['district'].notna(), 'source_district'] = f'{source_name} from shop'
+    latest_location_frt.loc[latest_location_frt['ward'].notna(), 'source_ward'] = f'{source_name} from shop'
+
+    profile_location_frt.loc[profile_location_frt['city'].notna(), 'source_city'] = f'{source_name} from profile'
+    profile_location_frt.loc[profile_location_frt['district'].notna(), 'source_district'] = f'{source_name} from profile'
+    profile_location_frt.loc[profile_location_frt['ward'].notna(), 'source_ward'] = f'{source_name} from profile'
+
+    ## from shop: miss ward & district & city
+    profile_location_frt_bug = profile_location_frt[profile_location_frt['city'].isna() & 
+                                                        profile_location_frt['district'].isna() & 
+                                                        profile_location_frt['ward'].isna()].copy()
+    profile_location_frt_bug = profile_location_frt_bug[[id_col, 'address']].copy()
+    profile_location_frt_bug = profile_location_frt_bug.merge(latest_location_frt, how='left',
+                                                                  on=[id_col])
+    profile_location_frt = profile_location_frt[~profile_location_frt[id_col].isin(profile_location_frt_bug[id_col])]
+    profile_location_frt = profile_location_frt.append(profile_location_frt_bug, 
+                                                           ignore_index=True)
+
+    ## from shop: miss district & city
+    profile_location_frt_bug = profile_location_frt[profile_location_frt['city'].isna() & 
+                                                        profile_location_frt['district'].isna()].copy()
+    profile_location_frt_bug = profile_location_frt_bug.drop(columns=['city', 'source_city',
+                                                                          'district', 'source_district'])
+    temp_latest_location_frt = latest_location_frt[[id_col, 'city', 'source_city',
+                                                        'district', 'source_district']]
+    profile_location_frt_bug = profile_location_frt_bug.merge(temp_latest_location_frt, how='left', 
+                                                                  on=[id_col])
+    profile_location_frt = profile_location_frt[~profile_location_frt[id_col].isin(profile_location_frt_bug[id_col])]
+    profile_location_frt = profile_location_frt.append(profile_location_frt_bug, 
+                                                           ignore_index=True)
+
+    ## from shop: miss city
+    profile_location_frt_bug = profile_location_frt[profile_location_frt['city'].isna() & 
+                                                        profile_location_frt['district'].notna()].copy()
+    profile_location_frt_bug = profile_location_frt_bug.drop(columns=['city', 'source_city'])
+    temp_latest_location_frt = latest_location_frt[[id_col, 'district', 'city', 'source_city']]
+    profile_location_frt_bug = profile_location_frt_bug.merge(temp_latest_location_frt, how='left', 
+                                                                  on=[id_col, 'district'])
+    profile_location_frt = profile_location_frt[~profile_location_frt[id_col].isin(profile_location_frt_bug[id_col])]
+    profile_location_frt = profile_location_frt.append(profile_location_frt_bug, 
+                                                           ignore_index=True)
+
+    ## from shop: miss district
+    profile_location_frt_bug = profile_location_frt[profile_location_frt['city'].notna() & 
+                                                        profile_location_frt['district'].isna()].copy()
+    profile_location_frt_bug = profile_location_frt_bug.drop(columns=['district', 'source_district'])
+    temp_latest_location_frt = latest_location_frt[[id_col, 'city', 'district', 'source_district']]
+    profile_location_frt_bug = profile_location_frt_bug.merge(temp_latest_location_frt, how='left', 
+                                                                  on=[id_col, 'city'])
+    profile_location_frt = profile_location_frt[~profile_location_frt[id_col].isin(profile_location_frt_bug[id_col])]
+    profile_location_frt = profile_location_frt.append(profile_location_frt_bug, 
+                                                           ignore_index=True)
+
+    return {'location': profile_location_frt}
+
+
+def LocationFrt(profile_frt, spec):
+    id_col = spec['id_column']
+    profile_location_frt = spec['tables']['location']
+
+    # normlize address
+    profile_frt['address'] = profile_frt['address'].str.strip().replace(dict_trash)
+    profile_frt = profile_frt.drop(columns=['city'])
+    profile_frt = profile_frt.merge(profile_location_frt, how='left', on=[id_col, 'address'])
+
+    profile_frt.loc[profile_frt['street'].isna(), 'street'] = None
+    profile_frt.loc[profile_frt['ward'].isna(), 'ward'] = None
+    profile_frt.loc[profile_frt['district'].isna(), 'district'] = None
+    profile_frt.loc[profile_frt['city'].isna(), 'city'] = None
+
+    ## full address
+    columns = ['street', 'ward', 'district', 'city']
+    profile_frt['address'] = profile_frt[columns].fillna('').agg(', '.join, axis=1).str.replace('(?<![a-zA-Z0-9]),', '', regex=True).str.replace('-(?![a-zA-Z0-9])', '', regex=True)
+    profile_frt['address'] = profile_frt['address'].str.strip(', ').str.strip(',').str.strip()
+    profile_frt['address'] = profile_frt['address'].str.strip().replace(dict_trash)
+    profile_frt.loc[profile_frt['address'].notna(), 'source_address'] = profile_frt['source_city']
+
+    ## unit_address
+    profile_frt = profile_frt.rename(columns={'street': 'unit_address'})
+    profile_frt.loc[profile_frt['unit_address'].notna(), 'source_unit_address'] = 'FSHOP from profile'
+
+    return profile_frt
+
+
+# SENDO
+def TablesSendo(spec):
+    return {
+        'dict_location': pd.read_parquet(f'{MATERIAL_PATH}/dict_location.parquet', filesystem=hdfs),
+        'norm_city': ReadProvinces()
+    }
+
+
+def LocationSendo(profile_sendo, spec):
+    dict_location = spec['tables']['dict_location']
+
+    ## spare unit_address
+    def SparseUnitAddress(address, ward, district, city):
+        result = address.title()
+
+        if ward != None:
+            ward = ward.title()
+
+            if 'Xa' in ward:
+                for key in ['Xa ', 'Xa', ',', '.', '']:
+                    key_ward = ward.replace('Xa ', key).strip()
+                    result = result.split(key_ward)[0]
+            if 'Phuong' in ward:
+                for key in ['Phuong ', 'Phuong', 'P', 'F', 'P.', 'F.', 'F ', 'P ', ',', '.', '']:
+                    key_ward = ward.replace('Phuong ', key).strip().replace('0', '')
+                    if key_ward.isdigit():
+                        continue
+                    result = result.split(key_ward)[0]
+            elif 'Thi Tran' in ward:
+                for key in ['Thi Tran ', 'Thi Tran', 'Tt ', 'Tt.', ',', '.', '']:
+                    key_ward = ward.replace('Thi Tran ', key).strip()
+                    result = result.split(key_ward)[0]
+
+        # district
+        if district != None:
+            district = district.title()
+
+            if 'Huyen' in district:
+                for key in ['Huyen ', 'Huyen', 'H ', 'H.', ',', '.', '']:
+                    key_district = district.replace('Huyen ', key).strip()
+                    result = result.split(key_district)[0] 
+            elif 'Thi Xa' in district:
+                for key in ['Thi Xa ', 'Thi xa', 'Tx ', 'Tx.', ',', '.', '']:
+                    key_district = district.replace('Thi Xa ', key).strip()
+                    result = result.split(key_district)[0]
+            elif 'Quan' in district:
+                for key in ['Quan ', 'Quan', 'Q', 'Q.', ',', '.', '']:
+                    key_district = district.replace('Quan ', key).strip().replace('0', '')
+                    if key_district.isdigit():
+                        continue
+                    result = result.split(key_district)[0]
+            elif 'Thanh Pho' in district:
+                for key in ['Thanh Pho ', 'Thanh Pho', 'Tp ', 'Tp.', ',', '.', '']:
+                    key_district = district.replace('Thanh Pho ', key).strip()
+                    result = result.split(key_district)[0]
+
+        # city
+        if city != None:
+            city = city.title()
+            for key in ['Tinh ', 'Tinh', 'Thanh Pho ', 'Thanh Pho', 'T.', 'Tp', 'Tp.', ',', '.', '']:
+                key_city = (key + city).strip()
+                result = result.split(key_city)[0]
+
+        # Normalize
+        result = result.strip()
+        if result in [None, '']:
+            result = None
+        else:
+            result = result[:-1].strip() if (result[-1] in [',', '.']) else result
+
+        # Fix UnitAdress is FullAddress
+        if (result != None) & (district != None) & (city != None):
+            have_district = False
+            for key_district in [' Huyen ', ' Thi Xa ', ' Quan ', ' Thanh Pho ']:
+                if key_district.lower() in result.lower():
+                    have_district = True
+                    break
+
+            have_city = False
+            for key_city in [' Tinh ', ' Thanh Pho ']:
+                if key_city.lower() in result.lower():
+                    have_city = True
+                    break
+
+            if (have_district == True) & (have_city == True):
+                result = None
+
+        if (result != None) & (district != None):
+            for key_district in [' Huyen ', ' Thi Xa ', ' Quan ', ' Thanh Pho ']:
+                if key_district.lower() in result.lower():
+                    result = result.split(',')[0].strip()
+                    if len(result.split(' ')) > 5:
+                        result = None
+                    break
+
+        return result
+
+    def UltimatelyUnescape(s: str) -> str:
+        unescaped = ""
+        while unescaped != s:
+            s = html.unescape(s)
+            unescaped = html.unescape(s)
+
+        return s
+
+    condition_address = profile_sendo['address'].notna()
+    profile_sendo.loc[condition_address, 'address'] = profile_sendo.loc[condition_address, 'address'].str.lower().apply(UltimatelyUnescape).str.title()
+    profile_sendo['address'] = profile_sendo['address'].replace({'[0-9]{6,}': ''}, regex=True)
+
+    profile_sendo.loc[condition_address, 'unit_address'] = profile_sendo[condition_address].apply(lambda x: SparseUnitAddress(x.address, x.ward, x.district, x.city), axis=1)
+    profile_sendo.loc[profile_sendo['unit_address'].isna(), 'unit_address'] = None
+    # profile_sendo['unit_address'] = profile_sendo['unit_address'].str.replace('. ', ', ').str.replace('; ', ',')
+
+    # unify city
+    profile_sendo['city'] = profile_sendo['city'].replace({'Ba Ria-Vung Tau': 'Vung Tau', 
+                                                           'Dak Nong': 'Dac Nong', 
+                                                           'Bac Kan': 'Bac Can'})
+
+    norm_sendo_city = spec['tables']['norm_city']
+    profile_sendo = profile_sendo.merge(norm_sendo_city, how='left', on='city')
+    profile_sendo['city'] = profile_sendo['norm_city']
+    profile_sendo = profile_sendo.drop(columns=['norm_city'])
+
+    # unify district
+    def UnifyDistrictSendo(dict_location, district, city):
+        if district == None:
+            return None
+
+        district = remove_accent(district)
+        location = dict_location[['district', 'city']].drop_duplicates().copy()
+
+        if city != None:
+            location = location[location['city'] == city]
+        if district in ['Quan Thu Duc', 'Quan 9', 'Quan 2', 'Thanh pho Thu Duc']:
+            return district
+
+        temp_district = district.title().replace('Huyen ', '').replace('Thi Xa ', '').replace('Thanh Pho ', '').strip()
+        location['district_temp'] = location['district'].str.title().replace({'Huyen ': '', 
+                                                                              'Thi Xa': '',
+                                                                              'Thanh Pho ': '', 
+                                                                              'Quan ': ''}, regex=True).str.strip()
+        location['similar'] = location['district_temp'].apply(lambda x: SequenceMatcher(None, temp_district.lower(), x.lower()).ratio())
+
+        location = location[(location['similar'] == location['similar'].max()) & 
+                            (location['similar'] >= 0.8)]
+
+        unify_district = None
+        if location.empty == False:
+            unify_district = location['district'].values[0]
+
+        if unify_district == None:
+            unify_district = district
+
+        return unify_district
+
+    stats_district_sendo = profile_sendo.groupby(by=['district', 'city'])['id_sendo'].agg(num_customer='count').reset_index()
+    dict_district = dict_location[['district', 'city']].drop_duplicates().copy()
+    dict_district['new_district'] = dict_district['district']
+    stats_district_sendo = stats_district_sendo.merge(dict_district, how='left', on=['district', 'city'])
+
+    condition_district = stats_district_sendo['new_district'].isna()
+    stats_district_sendo.loc[condition_district, 'new_district'] = stats_district_sendo[condition_district].apply(lambda x: UnifyDistrictSendo(dict_location, x.district, x.city), axis=1)
+    stats_district_sendo = stats_district_sendo.drop(columns=['num_customer'])
+
+    profile_sendo = profile_sendo.merge(stats_district_sendo, how='left', on=['district', 'city'])
+    profile_sendo['district'] = profile_sendo['new_district']
+    profile_sendo = profile_sendo.drop(columns=['new_district'])
+
+    # unify ward
+    def UnifyWardSendo(dict_location, ward, district, city):
+        if ward == None:
+            return None
+
+        ward = remove_accent(ward).title()
+        location = dict_location[['ward', 'district', 'city']].drop_duplicates().copy()
+
+        if city != None:
+            location = location[location['city'] == city]
+        if district != None:
+            if district in ['Quan Thu Duc', 'Quan 9', 'Quan 2']:
+                district = 'Thanh pho Thu Duc'
+            location = location[location['district'] == district]
+
+        temp_ward = ward.title().replace('Xa ', '').replace('Phuong ', '').replace('Thi Tran ', '').replace('0', '').strip()
+        location['ward_temp'] = location['ward'].str.title().replace({'Xa ': '',
+                                                                      'Phuong ': '',
+                                                                      'Thi Tran ': '',
+                                                                      '0': ''}, regex=True).str.strip()
+        location['similar'] = location['ward_temp'].apply(lambda x: SequenceMatcher(None, temp_ward.lower(), x.lower()).ratio())
+
+        location = location[(location['similar'] == location['similar'].max()) & 
+                            (location['similar'] >= 0.8)]
+
+        unify_ward = None
+        if location.empty == False:
+            unify_ward = location['ward'].values[0]
+
+        if unify_ward == None:
+            unify_ward = ward
+
+        return unify_ward
+
+    stats_ward_sendo = profile_sendo.groupby(by=['ward', 'district', 'city'])['id_sendo'].agg(num_customer='count').reset_index()
+
+    dict_ward = dict_location[['ward', 'district', 'city']].drop_duplicates().copy()
+    dict_ward['new_ward'] = dict_ward['ward']
+    stats_ward_sendo = stats_ward_sendo.merge(dict_ward, how='left', on=['ward', 'district', 'city'])
+
+    condition_ward = stats_ward_sendo['new_ward'].isna()
+    stats_ward_sendo.loc[condition_ward, 'new_ward'] = stats_ward_sendo[condition_ward].apply(lambda x: UnifyWardSendo(dict_location, x.ward, x.district, x.city), axis=1)
+    stats_ward_sendo = stats_ward_sendo.drop(columns=['num_customer'])
+
+    profile_sendo = profile_sendo.merge(stats_ward_sendo, how='left', on=['ward', 'district', 'city'])
+    profile_sendo['ward'] = profile_sendo['new_ward']
+    profile_sendo = profile_sendo.drop(columns=['new_ward'])
+
+    condition_ward_error = profile_sendo['ward'].str.contains('0[1-9]', case=False, na=False)
+    profile_sendo.loc[condition_ward_error, 'ward'] = profile_sendo.loc[condition_ward_error, 'ward'].str.replace('0', '')
+    
+    # full_address
+    profile_sendo['address'] = None
+    columns = ['unit_address', 'ward', 'district', 'city']
+    profile_sendo['address'] = profile_sendo[columns].fillna('').agg(', '.join, axis=1).str.replace('(?<![a-zA-Z0-9]),', '', regex=True).str.replace('-(?![a-zA-Z0-9])', '', regex=True)
+
+    return profile_sendo
+
+
+# FTEL
+def TablesFtel(spec):
+    # datapay => customer type
+    ds_contract = pd.read_parquet('/data/fpt/ftel/isc/dwh/ds_contract.parquet', 
+                                  columns=['contract', 'net_customer_type'],
+                                  filesystem=hdfs).drop_duplicates(subset=['contract'], keep='last')
+    ds_contract.columns = ['contract', 'datapay_customer_type']
+
+    # location
+    norm_ftel_district = pd.read_parquet(f'{MATERIAL_PATH}/ftel_districts.parquet', filesystem=hdfs)
+    norm_ftel_district.columns = ['district', 'norm_city', 'norm_district', 'new_norm_district']
+    location_dict = pd.read_parquet(f'{MATERIAL_PATH}/location_dict.parquet', filesystem=hdfs)
+    location_dict.columns = ['city', 'district', 'norm_city', 'norm_district']
+
+    return {
+        'ds_contract': ds_contract,
+        'dict_location': pd.read_parquet(f'{MATERIAL_PATH}/dict_location.parquet', filesystem=hdfs),
+        'norm_city': ReadProvinces(),
+        'norm_district': norm_ftel_district,
+        'location_dict': location_dict
+    }
+
+
+def InfoFtel(profile_ftel, spec):
+    # info
+    profile_ftel = profile_ftel.rename(columns={'contract_ftel': 'contract'})
+    # datapay => customer type
+    ds_contract = spec['tables']['ds_contract']
+    profile_ftel = profile_ftel.merge(ds_contract, how='left', on='contract')
+    profile_ftel.loc[profile_ftel['source'] == 'multi', 'datapay_customer_type'] = None
+    profile_ftel.loc[profile_ftel['source'] == 'multi', 'city'] = None
+
+    # birthday
+    condition_birthday = profile_ftel['birthday'].notna()
+    profile_ftel.loc[condition_birthday, 'birthday'] = pd.to_datetime(profile_ftel[condition_birthday]['birthday'].astype(str), 
+                                                                      errors='coerce').dt.strftime('%d/%m/%Y')
+
+    return profile_ftel
+
+
+def NameFtel(profile_ftel, spec):
+    # skip name (multi)
+    profile_ftel.loc[profile_ftel['source'] == 'multi', 'name'] = None
+
+    return profile_ftel
+
+
+def LocationFtel(profile_ftel, spec):
+    dict_location = spec['tables']['dict_location']
+
+    # unify location
+    norm_ftel_city = spec['tables']['norm_city']
+    norm_ftel_district = spec['tables']['norm_district']
+
+    ## update miss district
+    district_update = list(set(profile_ftel['district']) - set(norm_ftel_district['district']))
+    location_dict = spec['tables']['location_dict']
+    district_list = list(location_dict['norm_district'].unique())
+
+    def fix_miss_district(district_list, district):
+        df = pd.DataFrame()
+        df['district'] = district_list
+        df['similar'] = df['district'].apply(lambda x: SequenceMatcher(None, district.lower(), x.lower()).ratio())
+
+        df = df[df.similar == df.similar.max()]
+        result = df['district'].values[0]
+        return result
+
+    miss_district = {}
+    for district in district_update:
+        if district != None:
+            result = fix_miss_district(district_list, district)
+            miss_district[district] = result
+
+    ## merge city, district
+    profile_ftel = profile_ftel.merge(norm_ftel_city, how='left', on='city')
+    profile_ftel = profile_ftel.merge(norm_ftel_district[['district', 'norm_city', 'new_norm_district']], 
+                                      how='left', on=['district', 'norm_city'])
+
+    ## fix bugs location
+    profile_ftel.loc[profile_ftel['contract'].notna() &
+                     profile_ftel['phone'].notna(), 'contract_phone_ftel'] = profile_ftel['phone'] + '-' + profile_ftel['contract']
+    profile_ftel.loc[profile_ftel['contract'].notna() &
+                     profile_ftel['phone'].isna(), 'contract_phone_ftel'] = profile_ftel['contract']
+
+    
+    bug_location_ftel = profile_ftel[profile_ftel['norm_city'].isna() | profile_ftel['new_norm_district'].isna()]
+    bug_location_ftel1 = bug_location_ftel[bug_location_ftel['norm_city'].notna()]
+    bug_location_ftel2 = bug_location_ftel[~bug_location_ftel['contract_phone_ftel'].isin(bug_location_ftel1['contract_phone_ftel'])]
+
+    bug_location_ftel1 = bug_location_ftel1.drop(columns=['new_norm_district'])
+    bug_location_ftel1 = bug_location_ftel1.merge(norm_ftel_district[['district', 'new_norm_district']],
+                                                  how='left', on=['district'])
+
+    bug_location_ftel2 = bug_location_ftel2.drop(columns=['norm_city', 'new_norm_district'])
+    bug_location_ftel2 = bug_location_ftel2.merge(norm_ftel_district[['district', 'norm_city', 'new_norm_district']],
+                                                  how='left', on=['district'])
+
+    bug_location_ftel = bug_location_ftel1.append(bug_location_ftel2, ignore_index=True)
+
+    profile_ftel = profile_ftel[~profile_ftel['contract_phone_ftel'].isin(bug_location_ftel['contract_phone_ftel'])]
+    profile_ftel = profile_ftel.append(bug_location_ftel, ignore_index=True)
+
+    profile_ftel.loc[profile_ftel['district'].isin(miss_district.keys()), 'new_norm_district'] = profile_ftel['district'].map(miss_district)
+
+    profile_ftel['city'] = profile_ftel['norm_city']
+    profile_ftel['district'] = profile_ftel['new_norm_district']
+    profile_ftel = profile_ftel.drop(columns=['norm_city', 'new_norm_district'])
+
+    ## fix distric-city
+    dict_district = dict_location[['district', 'city']].drop_duplicates().copy()
+    stats_district = dict_district.groupby(by=['district'])['city'].agg(num_city='count').reset_index()
+    stats_district = stats_district[stats_district['num_city'] == 1]
+    dict_district = dict_district[dict_district['district'].isin(stats_district['district'])]
+    dict_district = dict_district.rename(columns={'city': 'new_city'})
+    dict_district = dict_district.append([{'district': 'Quan Thu Duc', 'new_city': 'Thanh pho Ho Chi Minh'}, 
+                                          {'district': 'Quan 9', 'new_city': 'Thanh pho Ho Chi Minh'}, 
+                                          {'district': 'Quan 2', 'new_city': 'Thanh pho Ho Chi Minh'}], 
+                                         ignore_index=True)
+
+    profile_ftel = profile_ftel.merge(dict_district, how='left', on='district')
+    profile_ftel.loc[profile_ftel['new_city'].notna(), 'city'] = profile_ftel['new_city']
+    profile_ftel = profile_ftel.drop(columns=['new_city'])
+
+    ## unify ward
+    def UnifyWardFTel1(dict_location, ward, district, city):
+        if ward == None:
+            return None
+
+        ward = remove_accent(ward)
+        location = dict_location[['ward', 'district', 'city']].drop_duplicates().copy()
+
+        if city != None:
+            location = location[location['city'] == city]
+        if district != None:
+            if district in ['Quan Thu Duc', 'Quan 9', 'Quan 2']:
+                district = 'Thanh pho Thu Duc'
+            location = location[location['district'] == district]
+
+        location['ward_temp'] = location['ward'].str.replace('Phuong 0', 'Phuong ')
+
+        location['similar'] = location['ward_temp'].apply(lambda x: SequenceMatcher(None, ward.lower(), x.lower()).ratio())
+
+        location = location[(location['similar'] == location['similar'].max()) & 
+                            (location['similar'] >= 0.8)]
+
+        unify_ward = None
+        if location.empty == False:
+            unify_ward = location['ward'].values[0]
+
+        return unify_ward
+
+    def UnifyWardFTel2(dict_location, ward, district):
+        if ward == None:
+            return None
+
+        ward = remove_accent(ward)
+        location = dict_location[['ward', 'district']].drop_duplicates().copy()
+
+        ward = ward.title().replace('P.', 'Phuong ').replace('F.', 'Phuong ')
+        ward = ward.title().replace('T.Tran', 'Thi Tran ').replace('T.T', 'Thi Tran ').replace('Tt', 'Thi Tran ')
+        ward = ward.title().replace('Tx', 'Thi Xa ')
+
+        if district != None:
+            location = location[location['district'] == district]
+
+        location['ward_temp'] = location['ward'].str.replace('Phuong 0', 'Phuong ')
+
+        location['similar'] = location['ward_temp'].apply(lambda x: SequenceMatcher(None, ward.lower(), x.lower()).ratio())
+
+        location = location[(location['similar'] == location['similar'].max()) & 
+                            (location['similar'] >= 0.8)]
+
+        unify_ward = None
+        if location.empty == False:
+            unify_ward = location['ward'].values[0]
+
+        return unify_ward
+
+    def UnifyWardFTel3(dict_location, ward, district):
+        if ward == None:
+            return None
+
+        ward = remove_accent(ward)
+        location = dict_location[['ward', 'district']].drop_duplicates().copy()
+
+        if district != None:
+            location = location[location['district'] == district]
+
+        ward = ward.title().replace('P.', '').replace('F.', '')
+        ward = ward.title().replace('T.Tran', '').replace('T.T', '').replace('Tt', '')
+        ward = ward.title().replace('Tx', '')
+
+        location['ward_temp'] = location['ward'].str.replace('Phuong 0', 'Phuong ')
+        location['ward_temp'] = location['ward_temp'].replace({'Phuong ': '', 
+                                                               'Xa ': '', 
+                                                               'Thi Tran ': '', 
+                                                               'Thi Xa ': ''}, regex=True)
+
+        location['similar'] = location['ward_temp'].apply(lambda x: SequenceMatcher(None, ward.lower(), x.lower()).ratio())
+
+        location = location[(location['similar'] == location['similar'].max()) & 
+                            (location['similar'] >= 0.8)]
+
+        unify_ward = None
+        if location.empty == False:
+            unify_ward = location['ward'].values[0]
+
+        return unify_ward
+
+
+    def UnifyWardFTel4(ward):
+        if ward == None:
+            return None
+
+        ward = remove_accent(ward)
+        ward = ward.title()
+        unify_ward = None
+        for key in ['Xa', 'Phuong', 'Huyen', 'Thi Tran', 'T.Tran', 'Tt', 'T.T', 'P.', 'F.', 'Thi Xa', 'Tx']:
+            check_idx = ward.find(key)
+            if check_idx == 0:
+                if key in ['Xa', 'Phuong', 'Huyen']:
+                    unify_ward = ward
+                elif key in ['Thi Tran', 'T.Tran', 'Tt', 'T.T']:
+                    unify_ward = ward.replace(key, 'Thi tran')
+                elif key in ['P.', 'F.']:
+                    unify_ward = ward.replace(key, 'Phuong ')
+                elif key in ['Thi Xa', 'Tx']:
+                    unify_ward = ward.replace(key, 'Thi xa')
+
+                break
+
+        if unify_ward != None:       
+            if len(unify_ward.split(' ')) < 2:
+                unify_ward = None
+
+        return unify_ward
+
+    def UnifyWardFTel(dict_location, ward, district, city):
+        unify_ward = UnifyWardFTel1(dict_location, ward, district, city)
+
+        if unify_ward == None:
+             unify_ward = UnifyWardFTel2(dict_location, ward, district)
+
+        if unify_ward == None:
+             unify_ward = UnifyWardFTel3(dict_location, ward, district)
+
+        if unify_ward == None:
+            unify_ward = UnifyWardFTel4(ward)
+
+        return unify_ward
+
+    stats_ward = profile_ftel.groupby(by=['ward', 'district', 'city'], 
+                                      dropna=False)['contract'].agg(num_customer='count').reset_index()
+    stats_ward.loc[stats_ward['ward'].isna(), 'ward'] = None
+    stats_ward.loc[stats_ward['district'].isna(), 'district'] = None
+    stats_ward.loc[stats_ward['city'].isna(), 'city'] = None
+
+    stats_ward['unify_ward'] = stats_ward.apply(lambda x: 
+                                                UnifyWardFTel(dict_location, x.ward, x.district, x.city), 
+                                                axis=1)
+
+    profile_ftel = profile_ftel.merge(stats_ward[['ward', 'district', 'city', 'unify_ward']],
+                                      how='left', on=['ward', 'district', 'city'])
+    profile_ftel['ward'] = profile_ftel['unify_ward']
+    profile_ftel = profile_ftel.drop(columns=['unify_ward'])
+
+    ## unit_address
+    columns = ['house_number', 'street']
+    profile_ftel['unit_address'] = profile_ftel[columns].fillna('').agg(' '.join, axis=1).str.replace('(?<![a-zA-Z0-9]),', '', regex=True).str.replace('-(?![a-zA-Z0-9])', '', regex=True)
+    profile_ftel['unit_address'] = profile_ftel['unit_address'].str.strip().replace(dict_trash)
+    profile_ftel['unit_address'] = profile_ftel['unit_address'].str.title()
+
+    ## full_address
+    columns = ['unit_address', 'ward', 'district', 'city']
+    profile_ftel['address'] = None
+    profile_ftel['address'] = profile_ftel[columns].fillna('').agg(', '.join, axis=1).str.replace('(?<![a-zA-Z0-9]),', '', regex=True).str.replace('-(?![a-zA-Z0-9])', '', regex=True)
+    profile_ftel['address'] = profile_ftel['address'].str.strip().replace(dict_trash)
+    profile_ftel = profile_ftel.drop(columns=['house_number', 'street'])
+
+    profile_ftel = profile_ftel.drop(columns=['contract_phone_ftel'])
+    profile_ftel = profile_ftel.rename(columns={'contract': 'contract_ftel'})
+
+    return profile_ftel
+
+
+def UpdateFtel(profile_unify, spec):
+    profile_unify['birthday'] = profile_unify['birthday'].astype(str)
+
+    # skip name (multi)
+    profile_unify.loc[profile_unify['source'] == 'multi', 'name'] = None
+
+    return profile_unify
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Stages of the unify engine without I/O (see unify_engine.py):
+# hooks, latest row of each id, batch loop & final columns
+
+# HOOKS
+def RunHook(profile, spec, hooks, stage):
+    if stage not in hooks:
+        return profile
+    return hooks[stage](profile, spec)
+
+
+def LoadTables(spec, hooks):
+    # side tables of the hooks: read (& written) once per run, before the batch loop
+    if 'tables' not in hooks:
+        return {}
+    return hooks['tables'](spec)
+
+
+# SHARED STAGES
+def KeepLatest(profile, spec):
+    # 1 row per id: the latest active
+    if spec['latest_by'] is None:
+        return profile
+
+    profile = profile.sort_values(by=[spec['id_column']] + spec['latest_by'], ascending=False)
+    profile = profile.drop_duplicates(subset=[spec['id_column']], keep='first')
+    profile = profile.drop(columns=spec['latest_by'])
+
+    return profile
+
+
+def MergeValid(profile, valid_phone, valid_email):
+    profile = profile.merge(valid_phone, how='left', on=['phone_raw'])
+    profile = profile.merge(valid_email, how='left', on=['email_raw'])
+
+    return profile
+
+
+def IsCustomerType(profile, types):
+    # null in the types matches both None & NaN
+    condition_type = profile['customer_type'].isin([t for t in types if t is not None])
+    if None in types:
+        condition_type = condition_type | profile['customer_type'].isna()
+
+    return condition_type
+
+
+def AddPhoneKey(profile, spec):
+    # <id>-<phone>, <id> if no phone
+    key_col = spec['phone_key_column']
+    if key_col is None:
+        return profile
+
+    id_col = spec['id_column']
+    profile.loc[profile[id_col].notna() &
+                profile['phone'].notna(), key_col] = profile[id_col] + '-' + profile['phone']
+    profile.loc[profile[id_col].notna() &
+                profile['phone'].isna(), key_col] = profile[id_col]
+
+    return profile
+
+
+def FinalizeProfile(profile, spec):
+    for col in spec['empty_columns']:
+        profile[col] = None
+    profile = profile[spec['unify_columns']].copy()
+
+    # Fill 'Ca nhan'
+    profile.loc[profile['name'].notna() & profile['customer_type'].isna(), 'customer_type'] = 'Ca nhan'
+
+    profile = AddPhoneKey(profile, spec)
+
+    return profile
+
+
+# BATCHES
+def UnifyBatches(profile, spec, unify_batch):
+    # bounded memory: unify_batch(batch) runs on batch_rows rows at a time
+    profile = KeepLatest(profile, spec).reset_index(drop=True)
+    batch_rows = spec['batch_rows']
+
+    profile_unify = [
+        unify_batch(profile.iloc[start:start + batch_rows].copy())
+        for start in range(0, profile.shape[0], batch_rows)
+    ]
+    if len(profile_unify) == 0:
+        return pd.DataFrame(columns=spec['unify_columns'])
+
+    return pd.concat(profile_unify, ignore_index=True)
+
+
+def LatestRowPositions(keys, spec):
+    # scan positions of the latest row of each id (same order as KeepLatest)
+    id_col = spec['id_column']
+    keys = keys.reset_index(drop=True)
+    keys = keys.sort_values(by=[id_col] + spec['latest_by'], ascending=False)
+    keys = keys.drop_duplicates(subset=[id_col], keep='first')
+
+    return np.sort(keys.index.to_numpy())
+
+
+def LatestBatches(batches, spec, latest_rows=None):
+    # rows of each raw batch that are the latest of their id (all the rows if latest_rows is None)
+    batch_start = 0
+    for batch in batches:
+        batch_stop = batch_start + batch.shape[0]
+        if latest_rows is not None:
+            rows = latest_rows[(latest_rows >= batch_start) & (latest_rows < batch_stop)] - batch_start
+            batch = batch.iloc[rows].drop(columns=spec['latest_by'])
+        batch_start = batch_stop
+        if batch.empty:
+            continue
+
+        yield batch.reset_index(drop=True)
+
+
+def MergeSchemas(schemas):
+    # type of each column over all the batches: the non-null one,
+    # float64 when integers & floats are mixed, string when always null
+    fields = {}
+    for schema in schemas:
+        for field in schema:
+            known_field = fields.get(field.name)
+            if known_field is None or pa.types.is_null(known_field.type):
+                fields[field.name] = field
+            elif pa.types.is_integer(known_field.type) and pa.types.is_floating(field.type):
+                fields[field.name] = field.with_type(pa.float64())
+
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                      for field in fields.values()])
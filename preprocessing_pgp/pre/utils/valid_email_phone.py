@@ -5,7 +5,6 @@ from functools import partial
 from itertools import repeat
 from multiprocessing import Pool
 from datetime import datetime, timedelta
-from unidecode import unidecode
 import multiprocessing as mp
 import string
 
@@ -14,6 +13,7 @@ import os
 import subprocess
 from pyarrow import fs
 import pyarrow.parquet as pq
+import pyarrow.dataset as ds
 os.environ['HADOOP_CONF_DIR'] = "/etc/hadoop/conf/"
 os.environ['JAVA_HOME'] = "/usr/jdk64/jdk1.8.0_112"
 os.environ['HADOOP_HOME'] = "/usr/hdp/3.1.0.0-78/hadoop"
@@ -27,6 +27,9 @@ import email_get_info
 
 sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/')
 import preprocess_lib
+import validity_store
+import phone_metadata
+from deaccent import remove_accent
 
 import sys
 sys.path.append('/bigdata/fdp/cdp/cdp_pages/scripts_hdfs/pre/utils/fill_accent_name/scripts')
@@ -227,57 +230,21 @@ def MetaDataPhone(valid_phone):
                                   filesystem=hdfs, columns=['NewSubPhone', 'PhoneVendor'])
     subphone_vn.columns = ['sub_phone', 'phone_vendor']
     subphone_vn['sub_phone'] = '0' + subphone_vn['sub_phone'].astype(str)
-    subphone_vn = subphone_vn.drop_duplicates()
+    subphone_vn = subphone_vn.drop_duplicates(subset=['sub_phone'])
 
     df_subtele_vn = pd.read_parquet('/data/fpt/ftel/cads/dep_solution/sa/cdp/data/vn_sub_telephone.parquet',
                                     filesystem=hdfs, columns=['MaVung', 'TinhThanh'])
     df_subtele_vn.columns = ['sub_phone', 'phone_vendor']
     df_subtele_vn['sub_phone'] = df_subtele_vn['sub_phone'].astype(str)
-    df_subtele_vn = df_subtele_vn.drop_duplicates()
-    
-    # phone_type
-    valid_phone.loc[valid_phone['phone'].str[:3] == '024', 'phone_type'] = 'landline'
-    valid_phone.loc[valid_phone['phone'].str[:3].isin(df_subtele_vn['sub_phone'].unique()), 'phone_type'] = 'landline'
-    valid_phone.loc[valid_phone['phone'].str[:3].isin(subphone_vn['sub_phone'].unique()) & 
-                    valid_phone['phone_type'].isna(), 'phone_type'] = 'mobile phone'
-    
-    # add vender
-    valid_phone_landline = valid_phone[valid_phone['phone_type'] == 'landline'].copy()
-    valid_phone_mobile = valid_phone[valid_phone['phone_type'] == 'mobile phone'].copy()
-    valid_phone_none = valid_phone[valid_phone['phone_type'].isna()].copy()
-
-
-    valid_phone_landline['sub_phone'] = valid_phone_landline['phone'].str[:4].astype(str)
-    valid_phone_landline = valid_phone_landline.merge(df_subtele_vn, how='left', on=['sub_phone'])
-    valid_phone_landline.loc[(valid_phone_landline['phone'].str[:3] == '024') & 
-                             valid_phone_landline['phone_vendor'].isna(), 'phone_vendor'] = 'Hà Nội'
-    valid_phone_landline.loc[(valid_phone_landline['phone'].str[:3] == '028') & 
-                             valid_phone_landline['phone_vendor'].isna(), 'phone_vendor'] = 'Thành phố Hồ Chí Minh'
- 
-    valid_phone_mobile['sub_phone'] = valid_phone_mobile['phone'].str[:3]
-    valid_phone_mobile = valid_phone_mobile.merge(subphone_vn, how='left', on=['sub_phone'])
-
-    valid_phone = pd.concat([valid_phone_landline, valid_phone_mobile, valid_phone_none], ignore_index=True)
-    valid_phone = valid_phone.drop(columns=['sub_phone']).sample(frac=1)
-    
-    # beauty phone
-    dict_beauty_phone = {
-        'Ngũ Quý': ['00000', '11111', '22222', '33333', '44444', '55555', '66666', '77777', '88888', '99999'], 
-        'Tứ Quý': ['0000', '1111', '2222', '3333', '4444', '5555', '6666', '7777', '8888', '9999'],
-        'Tam Hoa': ['000', '111', '222', '333', '444', '555', '666', '777', '888', '999'], 
-        'Số Tiến': ['0123', '1234', '2345', '3456', '4567', '5678', '6789'], 
-        'Số Lùi': ['3210', '4321', '5432', '6543', '7654', '8765', '9876']
-    }
-
-    valid_phone['tail_phone_type'] = None
-    for name_case, format_case in dict_beauty_phone.items():
-        size_case = len(format_case[0])
+    df_subtele_vn = df_subtele_vn.drop_duplicates(subset=['sub_phone'])
 
-        # assign
-        valid_phone.loc[valid_phone['tail_phone_type'].isna() & 
-                        valid_phone['phone'].str[-size_case:].isin(format_case), 'tail_phone_type'] = name_case
-
-    valid_phone.loc[valid_phone['tail_phone_type'].isna() & valid_phone['phone'].notna(), 'tail_phone_type'] = 'Số Thường'
+    mobile_vendors = dict(zip(subphone_vn['sub_phone'], subphone_vn['phone_vendor']))
+    landline_regions = dict(zip(df_subtele_vn['sub_phone'], df_subtele_vn['phone_vendor']))
+    
+    # phone_type, phone_vendor & tail_phone_type: 1 vectorized pass, row order kept
+    metadata = phone_metadata.PhoneMetadata(valid_phone['phone'], mobile_vendors, landline_regions)
+    for col in metadata.columns:
+        valid_phone[col] = metadata[col].astype(object).where(metadata[col].notna(), None)
 
     # return
     return valid_phone
@@ -338,6 +305,15 @@ def FormatName(valid_email):
     # return
     return valid_email
 
+def OpenValidityStore(name, utils_path):
+    # first run: the store starts from the latest validated file
+    store = validity_store.OpenStore(name)
+    if len(store.Runs()) == 0:
+        latest_check = pd.read_parquet(f'{utils_path}/valid_{name}_latest.parquet', filesystem=hdfs)
+        store.Append(latest_check, 'init')
+
+    return store
+
 def ValidPhoneEmail(date_str):
     raw_path = ROOT_PATH + '/raw'
     utils_path = ROOT_PATH + '/utils'
@@ -345,7 +321,6 @@ def ValidPhoneEmail(date_str):
     today = date_str
 
     # VALID EMAIL
-    emails_bank = pd.DataFrame()
     # Create emails bank from all companies.
     def load_email(cttv, key):
         emails = pd.read_parquet(f'{raw_path}/{cttv}.parquet/d={today}', 
@@ -365,11 +340,10 @@ def ValidPhoneEmail(date_str):
                  'sendo': 'id_sendo'
                 }
         
-    for cttv, key in dict_cttv.items():
-        emails_bank = emails_bank.append(load_email(cttv, key), ignore_index=True)
+    emails_bank = pd.concat([load_email(cttv, key) for cttv, key in dict_cttv.items()], ignore_index=True)
     
-    latest_check_emails = pd.read_parquet(f'{utils_path}/valid_email_latest.parquet', filesystem=hdfs)
-    emails_bank = emails_bank.loc[~emails_bank['email'].isin(latest_check_emails['email_raw'])] # Only check new emails
+    email_store = OpenValidityStore('email', utils_path)
+    emails_bank = emails_bank.loc[emails_bank['email'].isin(email_store.NewValues(emails_bank['email']))] # Only check new emails
     
     if emails_bank.empty == False:
         # Regex syntax
@@ -510,8 +484,8 @@ def ValidPhoneEmail(date_str):
         word_name = pd.read_parquet('/data/fpt/ftel/cads/dep_solution/user/namdp11/name2gender/dataset/word_name.parquet',
                                     filesystem=hdfs)['word_name'].tolist()
         def CheckName(text):
-            text = unidecode(text).lower()
-            words_text = unidecode(text).split(' ')
+            text = remove_accent(text).lower()
+            words_text = remove_accent(text).split(' ')
             for word_text in words_text:
                 if word_text in word_name:
                     return True
@@ -582,8 +556,6 @@ def ValidPhoneEmail(date_str):
         check_emails = pd.DataFrame()
 
     # VALID PHONE
-    phones_bank = pd.DataFrame()
-
     # Create phone bank from all companies.
     def load_phone(cttv, key):
         phones = pd.read_parquet(f'{raw_path}/{cttv}.parquet/d={today}', 
@@ -602,13 +574,10 @@ def ValidPhoneEmail(date_str):
                  'sendo': 'id_sendo'
                 }
         
-    for cttv, key in dict_cttv.items():
-        phones_bank = phones_bank.append(load_phone(cttv, key), ignore_index=True)
+    phones_bank = pd.concat([load_phone(cttv, key) for cttv, key in dict_cttv.items()], ignore_index=True)
 
-    phones_bank = phones_bank[phones_bank['phone'].notna()][['phone']].drop_duplicates().copy()
-    
-    latest_check_phones = pd.read_parquet(f'{utils_path}/valid_phone_latest.parquet', filesystem=hdfs)
-    phones_bank = phones_bank[~phones_bank['phone'].isin(latest_check_phones['phone_raw'].unique())] # # Only check new phones
+    phone_store = OpenValidityStore('phone', utils_path)
+    phones_bank = pd.DataFrame({'phone': phone_store.NewValues(phones_bank['phone'])}) # Only check new phones
     
     if phones_bank.empty == False:
         check_phones = check_valid_phone(phones_bank, 'phone')
@@ -639,44 +608,38 @@ def ValidPhoneEmail(date_str):
         new_check_emails['username_iscertain'] = new_check_emails['username_iscertain'].fillna(False)
         new_check_emails['is_autoemail'] = new_check_emails['is_autoemail'].fillna(False)
         new_check_emails['export_date'] = today
-        
-        latest_check_emails = pd.concat([latest_check_emails, new_check_emails], ignore_index=True)
-        latest_check_emails.loc[latest_check_emails['is_email_valid'] == False, 'username_iscertain'] = False
-#         latest_check_emails = FormatName(latest_check_emails)
+        new_check_emails.loc[new_check_emails['is_email_valid'] == False, 'username_iscertain'] = False
         
     if new_check_phones.empty == False:
         new_check_phones = MetaDataPhone(new_check_phones)
         new_check_phones['export_date'] = today
         
-        latest_check_phones = pd.concat([latest_check_phones, new_check_phones], ignore_index=True)
-        
-    # SAVE (lastest)
-#     latest_check_emails.loc[latest_check_emails['customer_type'] != 'Ca nhan', 'gender'] = None
-    latest_check_emails = latest_check_emails.drop_duplicates(subset=['email_raw'], keep='first')
-    latest_check_emails.to_parquet(f'{utils_path}/valid_email_latest.parquet', filesystem=hdfs, index=False)
+    # SAVE (only the new values, the store keeps the first result of each raw value)
+    if new_check_emails.empty == False:
+        email_store.Append(new_check_emails, today)
+    if new_check_phones.empty == False:
+        phone_store.Append(new_check_phones, today)
     
-    latest_check_phones = latest_check_phones.drop_duplicates(subset=['phone_raw'], keep='first')
-    latest_check_phones.to_parquet(f'{utils_path}/valid_phone_latest.parquet', filesystem=hdfs, index=False)
+    # SAVE (lastest): full snapshot on HDFS for the readers of the other hosts (FindUniqueName, unify)
+    # each export is rewritten only if the store changed since its last export, the rerun keys are hashed once per store
+    email_store.Export(f'{utils_path}/valid_email_latest.parquet', filesystem=hdfs)
+    phone_store.Export(f'{utils_path}/valid_phone_latest.parquet', filesystem=hdfs)
     
-    # PRODUCT
+    # PRODUCT (streamed from the store)
     product_path = '/data/fpt/ftel/cads/dep_solution/sa/cdp/data'
     
     # emails
-    pro_check_emails = latest_check_emails[(latest_check_emails['is_email_valid'] == True)]
-    pro_check_emails = pro_check_emails.drop(columns=['email_raw', 'description', 'is_email_valid', 'email_name', 'export_date'])
-
     columns_email = [
         'email', 'username_iscertain', 'username', 'year_of_birth', 'phone', 'address', 
         'email_group', 'is_autoemail', 'gender', 'customer_type', # 'customer_type_detail'
     ]
-    pro_check_emails = pro_check_emails[columns_email]
-
-    pro_check_emails.to_parquet(f'{product_path}/valid_email_latest.parquet', filesystem=hdfs, index=False)
+    email_store.Export(f'{product_path}/valid_email_latest.parquet', columns=columns_email,
+                       filter=ds.field('is_email_valid') == True, filesystem=hdfs)
 
     # phones
-    pro_check_phones = latest_check_phones[latest_check_phones['is_phone_valid'] == True]
-    pro_check_phones = pro_check_phones.drop(columns=['is_phone_valid', 'export_date'])
-    pro_check_phones.to_parquet(f'{product_path}/valid_phone_latest.parquet', filesystem=hdfs, index=False)
+    columns_phone = [col for col in phone_store.Schema().names if col not in ['is_phone_valid', 'export_date']]
+    phone_store.Export(f'{product_path}/valid_phone_latest.parquet', columns=columns_phone,
+                       filter=ds.field('is_phone_valid') == True, filesystem=hdfs)
 
 if __name__ == '__main__':
     date_str = sys.argv[1]
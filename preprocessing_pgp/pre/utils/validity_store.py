@@ -0,0 +1,346 @@
+import json
+import os
+from glob import glob
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+
+from semi_join import HashKeys, KeyFilter, ScanSemiJoin, ToArrowString
+
+# Validation results kept across the daily runs, keyed by the raw value:
+#   {path}/data/{run}-{n}.parquet               results of the values first seen in the run
+#   {path}/index/bucket={b}/{run}-{n}.arrow     (hash, key) of these values sorted by hash, Arrow IPC
+#   {path}/schema.arrow                         schema of the results (new columns added at the end)
+#   {path}/exports.json                         data files of the last snapshot of each export
+# a run only probes the memory-mapped index with its own unique values (binary search)
+# & writes the results of the new ones -> cost of a run ~ number of new values, not of the history
+# the store is on the local disk of the validation host: the other hosts read the snapshots it exports to HDFS,
+# rewritten only when data files were added since the last export
+
+STORE_ROOT = '/bigdata/fdp/cdp/cdp_pages/validity_store'
+STORE_KEYS = {
+    'phone': 'phone_raw',
+    'email': 'email_raw'
+}
+
+HASH_COL = 'hash'
+KEY_COL = 'key'
+
+
+def OpenStore(name, root=STORE_ROOT):
+    return ValidityStore(f'{root}/{name}', STORE_KEYS[name])
+
+
+def WritableSchema(schema):
+    # columns full of null in the first run: string, so that the values of the next runs can be written
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                      for field in schema])
+
+
+def EvolvedSchema(schema, results):
+    # schema of the store + the columns of the results it does not have yet (old data files: null)
+    new_columns = [col for col in results.columns if col not in schema.names]
+    if len(new_columns) == 0:
+        return schema
+    new_fields = WritableSchema(pa.Schema.from_pandas(results[new_columns], preserve_index=False))
+
+    return pa.schema(list(schema) + list(new_fields))
+
+
+def FileExists(path, filesystem=None):
+    if filesystem is None:
+        return os.path.exists(path)
+    return filesystem.get_file_info(path).type != fs.FileType.NotFound
+
+
+class ValidityStore:
+    def __init__(self, path, key, n_buckets=16, max_runs=32):
+        # n_buckets: power of 2, bucket = top bits of the hash
+        # max_runs: index files of a bucket merged into one above this number
+        if n_buckets & (n_buckets - 1):
+            raise ValueError(f'n_buckets should be a power of 2, got {n_buckets}')
+
+        self.path = path
+        self.key = key
+        self.n_buckets = n_buckets
+        self.max_runs = max_runs
+        self.bucket_shift = np.uint64(64 - int(np.log2(n_buckets))) if n_buckets > 1 else None
+        # (data files, hashes of the rerun keys): 1 pass on the keys per state of the store
+        self.rerun_keys = None
+
+    # LAYOUT
+    def __DataDir(self):
+        return f'{self.path}/data'
+
+    def __IndexDir(self, bucket):
+        return f'{self.path}/index/bucket={bucket:02d}'
+
+    def __SchemaPath(self):
+        return f'{self.path}/schema.arrow'
+
+    def __ExportsPath(self):
+        return f'{self.path}/exports.json'
+
+    def __Buckets(self, hashes):
+        if self.bucket_shift is None:
+            return np.zeros(hashes.shape[0], dtype=np.int64)
+        return (hashes >> self.bucket_shift).astype(np.int64)
+
+    def __NextName(self, directory, run, extension):
+        # a run can append several times (rerun of the day)
+        n_parts = len(glob(f'{directory}/{run}-*.{extension}'))
+        return f'{directory}/{run}-{n_parts:03d}.{extension}'
+
+    def __TmpPath(self, path):
+        # hidden file (skipped by the dataset discovery) until complete
+        directory, name = os.path.split(path)
+        return f'{directory}/.{name}.tmp'
+
+    def __ReadIndex(self, index_path):
+        # memory-mapped: only the pages of the probed hashes are read
+        return pa.ipc.open_file(pa.memory_map(index_path)).read_all()
+
+    def __WriteIndex(self, index_path, hashes, keys):
+        order = np.argsort(hashes, kind='stable')
+        table = pa.table({
+            HASH_COL: pa.array(hashes[order], type=pa.uint64()),
+            KEY_COL: keys.take(pa.array(order))
+        })
+
+        tmp_path = self.__TmpPath(index_path)
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+        os.replace(tmp_path, index_path)
+
+    def __WriteSchema(self, schema):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self.__TmpPath(self.__SchemaPath())
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, schema):
+                pass
+        os.replace(tmp_path, self.__SchemaPath())
+
+    def Schema(self):
+        if not os.path.exists(self.__SchemaPath()):
+            return None
+        with pa.memory_map(self.__SchemaPath()) as source:
+            return pa.ipc.open_file(source).schema
+
+    def DataFiles(self):
+        # data files are never rewritten: their names are the state of the store
+        return sorted(os.path.basename(path) for path in glob(f'{self.__DataDir()}/*.parquet'))
+
+    def Runs(self):
+        names = [os.path.basename(path) for path in glob(f'{self.__DataDir()}/*.parquet')]
+        return sorted({name.rsplit('-', 1)[0] for name in names})
+
+    # MEMBERSHIP
+    def __ProbeIndex(self, index, hashes, keys):
+        # exact membership of (hashes, keys) in one sorted index file
+        index_hashes = index.column(HASH_COL).chunk(0).to_numpy() if index.num_rows > 0 else np.zeros(0, dtype=np.uint64)
+        is_member = np.zeros(hashes.shape[0], dtype=bool)
+        if index_hashes.shape[0] == 0 or hashes.shape[0] == 0:
+            return is_member
+
+        index_keys = index.column(KEY_COL).chunk(0)
+        positions = np.searchsorted(index_hashes, hashes)
+        # distinct keys of the same hash (rare) are next to each other
+        candidates = np.arange(hashes.shape[0])
+        while candidates.shape[0] > 0:
+            in_range = positions < index_hashes.shape[0]
+            candidates, positions = candidates[in_range], positions[in_range]
+            same_hash = index_hashes[positions] == hashes[candidates]
+            candidates, positions = candidates[same_hash], positions[same_hash]
+            if candidates.shape[0] == 0:
+                break
+
+            is_equal = pc.equal(
+                index_keys.take(pa.array(positions)),
+                keys.take(pa.array(candidates))
+            ).to_numpy(zero_copy_only=False)
+            is_member[candidates[is_equal]] = True
+            candidates, positions = candidates[~is_equal], positions[~is_equal] + 1
+
+        return is_member
+
+    def Contains(self, values):
+        # exact membership of each value (null -> False)
+        values = ToArrowString(values)
+        hashes = HashKeys(values)
+        buckets = self.__Buckets(hashes)
+        is_valid = values.is_valid().to_numpy(zero_copy_only=False)
+
+        is_member = np.zeros(len(values), dtype=bool)
+        for bucket in np.unique(buckets[is_valid]):
+            rows = np.flatnonzero((buckets == bucket) & is_valid)
+            bucket_hashes, bucket_keys = hashes[rows], values.take(pa.array(rows))
+            for index_path in glob(f'{self.__IndexDir(bucket)}/*.arrow'):
+                remained = ~is_member[rows]
+                is_member[rows[remained]] = self.__ProbeIndex(
+                    self.__ReadIndex(index_path),
+                    bucket_hashes[remained],
+                    bucket_keys.filter(pa.array(remained))
+                )
+
+        return is_member
+
+    def NewValues(self, values):
+        # unique non-null values never stored
+        unique_values = pc.unique(ToArrowString(values).drop_null())
+        is_stored = self.Contains(unique_values)
+
+        return pd.Series(unique_values.filter(pa.array(~is_stored)).to_pandas(), dtype=object)
+
+    # WRITE
+    def Append(self, results, run):
+        # results: 1 row per raw value (first one kept), values already stored are skipped
+        results = results[results[self.key].notna()].drop_duplicates(subset=[self.key], keep='first')
+        results = results[~self.Contains(results[self.key])]
+        if results.empty:
+            return 0
+
+        schema = self.Schema()
+        if schema is None:
+            schema = WritableSchema(pa.Schema.from_pandas(results, preserve_index=False))
+            self.__WriteSchema(schema)
+        elif not set(results.columns) <= set(schema.names):
+            schema = EvolvedSchema(schema, results)
+            self.__WriteSchema(schema)
+        table = pa.Table.from_pandas(results.reindex(columns=schema.names), schema=schema, preserve_index=False)
+
+        # data first: an interrupted run is recomputed, never lost
+        os.makedirs(self.__DataDir(), exist_ok=True)
+        data_path = self.__NextName(self.__DataDir(), run, 'parquet')
+        pq.write_table(table, self.__TmpPath(data_path))
+        os.replace(self.__TmpPath(data_path), data_path)
+
+        keys = ToArrowString(table.column(self.key))
+        hashes = HashKeys(keys)
+        buckets = self.__Buckets(hashes)
+        for bucket in np.unique(buckets):
+            rows = np.flatnonzero(buckets == bucket)
+            index_dir = self.__IndexDir(bucket)
+            os.makedirs(index_dir, exist_ok=True)
+            self.__WriteIndex(self.__NextName(index_dir, run, 'arrow'), hashes[rows], keys.take(pa.array(rows)))
+
+            if len(glob(f'{index_dir}/*.arrow')) > self.max_runs:
+                self.Compact(bucket)
+
+        return table.num_rows
+
+    def Compact(self, bucket=None):
+        # merge the index files of the bucket(s) into one
+        buckets = range(self.n_buckets) if bucket is None else [bucket]
+        for bucket in buckets:
+            index_paths = sorted(glob(f'{self.__IndexDir(bucket)}/*.arrow'))
+            if len(index_paths) <= 1:
+                continue
+
+            indexes = [self.__ReadIndex(index_path) for index_path in index_paths]
+            hashes = np.concatenate([index.column(HASH_COL).to_numpy() for index in indexes])
+            keys = pa.concat_arrays([chunk for index in indexes for chunk in index.column(KEY_COL).chunks])
+            n_compacts = [int(os.path.basename(path)[len('compact-'):-len('.arrow')])
+                          for path in index_paths if os.path.basename(path).startswith('compact-')]
+            compact_path = f'{self.__IndexDir(bucket)}/compact-{max(n_compacts, default=0) + 1:06d}.arrow'
+            self.__WriteIndex(compact_path, hashes, keys)
+            del indexes
+
+            for index_path in index_paths:
+                os.remove(index_path)
+
+    # READ
+    def __DropRerun(self, rows):
+        # rows written twice by a run interrupted between the data & the index
+        if self.key not in rows.columns:
+            return rows
+        return rows.drop_duplicates(subset=[self.key], keep='first')
+
+    def Dataset(self):
+        return ds.dataset(self.__DataDir(), format='parquet', schema=self.Schema())
+
+    def Read(self, columns=None, filter=None):
+        if self.Schema() is None:
+            return pd.DataFrame(columns=columns)
+        rows = self.Dataset().to_table(columns=columns, filter=filter).to_pandas()
+
+        return self.__DropRerun(rows)
+
+    def Lookup(self, values, columns=None):
+        # stored rows of the given raw values only
+        if self.Schema() is None:
+            return pd.DataFrame(columns=columns)
+        rows = ScanSemiJoin(self.__DataDir(), self.key, KeyFilter(values), columns=columns, schema=self.Schema())
+
+        return self.__DropRerun(rows)
+
+    def __RerunKeys(self, batch_rows=1000000):
+        # hashes of the keys stored more than once (rows of an interrupted run), 1st pass on the key only,
+        # computed once per state of the store (all the exports of a run share it)
+        data_files = self.DataFiles()
+        if self.rerun_keys is not None and self.rerun_keys[0] == data_files:
+            return self.rerun_keys[1]
+
+        hashes = [HashKeys(batch.column(0))
+                  for batch in self.Dataset().to_batches(columns=[self.key], batch_size=batch_rows)]
+        hashes = np.concatenate(hashes) if len(hashes) > 0 else np.zeros(0, dtype=np.uint64)
+        unique_hashes, counts = np.unique(hashes, return_counts=True)
+        self.rerun_keys = (data_files, unique_hashes[counts > 1])
+
+        return self.rerun_keys[1]
+
+    def __ReadExports(self):
+        if not os.path.exists(self.__ExportsPath()):
+            return {}
+        with open(self.__ExportsPath()) as f:
+            return json.load(f)
+
+    def __WriteExports(self, exports):
+        tmp_path = self.__TmpPath(self.__ExportsPath())
+        with open(tmp_path, 'w') as f:
+            json.dump(exports, f)
+        os.replace(tmp_path, self.__ExportsPath())
+
+    def Export(self, path, columns=None, filter=None, filesystem=None, batch_rows=1000000):
+        # snapshot of the stored rows written batch by batch (no full table in memory),
+        # 1 row per key as in Read: the rows of an interrupted run are dropped
+        # skipped when no data file was added since the last export of the same snapshot (returns False)
+        dataset = self.Dataset()
+        columns = dataset.schema.names if columns is None else columns
+        export_id = json.dumps([path, columns, None if filter is None else str(filter)])
+        data_files = self.DataFiles()
+        exports = self.__ReadExports()
+        if exports.get(export_id) == data_files and FileExists(path, filesystem):
+            return False
+
+        scan_columns = columns if self.key in columns else columns + [self.key]
+        rerun_hashes = self.__RerunKeys(batch_rows)
+        exported_keys = set()
+
+        scanner = dataset.scanner(columns=scan_columns, filter=filter, batch_size=batch_rows)
+        schema = pa.schema([scanner.projected_schema.field(col) for col in columns])
+        with pq.ParquetWriter(path, schema, filesystem=filesystem) as writer:
+            for batch in scanner.to_batches():
+                if batch.num_rows == 0:
+                    continue
+                table = pa.Table.from_batches([batch])
+
+                # keys of the same hash as a rerun key: only the 1st row of each key is kept
+                keys = ToArrowString(table.column(self.key))
+                is_kept = np.ones(table.num_rows, dtype=bool)
+                for row in np.flatnonzero(np.isin(HashKeys(keys), rerun_hashes)):
+                    key = keys[row].as_py()
+                    is_kept[row] = key not in exported_keys
+                    exported_keys.add(key)
+
+                writer.write_table(table.filter(pa.array(is_kept)).select(columns))
+
+        exports[export_id] = data_files
+        self.__WriteExports(exports)
+
+        return True
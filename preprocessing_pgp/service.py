@@ -0,0 +1,516 @@
+"""
+Module contains the local enrichment service of the online profile writes:
+
+* The engines of the stages are built once & kept warm in the process
+* Concurrent single-record requests are coalesced into micro-batches,
+flushed when full or at the max-latency deadline of their first request
+* Each micro-batch runs through the batched DataFrame path of the stage
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from preprocessing_pgp.const import STAGE_COLUMN_ARG_DICT
+from preprocessing_pgp.pipeline import ROW_ID_COL, PipelineStage
+from preprocessing_pgp.streaming import get_stage_function
+
+Record = Dict[str, Any]
+BatchHandler = Callable[[pd.DataFrame], pd.DataFrame]
+
+# * Values run through each stage at warm-up
+WARM_UP_VALUES = {
+    'type': 'Công ty TNHH Nguyễn Văn An',
+    'enrich': 'Nguyen Van An',
+    'phone': '0912345678',
+    'email': 'nguyenvanan@gmail.com',
+    'card': '001099012345',
+    'address': '12 Nguyễn Huệ, Quận 1, Thành phố Hồ Chí Minh'
+}
+
+
+@dataclass
+class BatchStats:
+    """
+    Counters of the micro-batches run by one stage
+    """
+    n_batches: int = 0
+    n_records: int = 0
+    max_batch_size: int = 0
+    total_seconds: float = 0.0
+
+    @property
+    def mean_batch_size(self) -> Optional[float]:
+        """
+        Mean number of records per micro-batch, None if nothing has run
+        """
+        if self.n_batches == 0:
+            return None
+        return self.n_records / self.n_batches
+
+
+class _StageBatcher:
+    """
+    Queue of the pending values of one stage, flushed by micro-batches
+    """
+
+    def __init__(
+        self,
+        stage: PipelineStage,
+        handler: BatchHandler,
+        max_batch_size: int,
+        max_latency: float
+    ) -> None:
+        self.stage = stage
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.stats = BatchStats()
+        self.running: List[Tuple[Any, asyncio.Future]] = []
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self, executor: ThreadPoolExecutor) -> None:
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(
+            self.__run(executor)
+        )
+
+    async def stop(self) -> None:
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+        # * Requests still running or queued are never answered
+        pending = list(self.running)
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.cancel()
+
+    async def submit(self, value: Any) -> Record:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((value, future))
+
+        return await future
+
+    async def __collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """
+        Helper to wait for the first request, then gather the next ones
+        until the batch is full or the deadline of the first one is reached
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_latency
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(self.queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def __run(self, executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.__collect()
+            batch = [(value, future) for value, future in batch
+                     if not future.done()]
+            if len(batch) == 0:
+                continue
+            self.running = batch
+
+            data = pd.DataFrame({
+                self.stage.column: pd.Series(
+                    [value for value, _ in batch], dtype=object
+                ),
+                ROW_ID_COL: np.arange(len(batch))
+            })
+            start_time = perf_counter()
+            try:
+                output = await loop.run_in_executor(
+                    executor, self.handler, data
+                )
+                records = _to_records(output, len(batch))
+            except Exception as error:  # pylint: disable=broad-except
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                self.running = []
+                continue
+            finally:
+                self.__record_stats(len(batch), perf_counter() - start_time)
+
+            for (_, future), record in zip(batch, records):
+                if not future.done():
+                    future.set_result(record)
+            self.running = []
+
+    def __record_stats(self, batch_size: int, seconds: float) -> None:
+        self.stats.n_batches += 1
+        self.stats.n_records += batch_size
+        self.stats.max_batch_size = max(self.stats.max_batch_size, batch_size)
+        self.stats.total_seconds += seconds
+
+
+def _to_records(output: pd.DataFrame, n_rows: int) -> List[Record]:
+    """
+    Helper to split the stage's output back to one record per request,
+    missing values are given as None
+    """
+    output = output\
+        .set_index(ROW_ID_COL)\
+        .reindex(np.arange(n_rows))
+    output = output.astype(object).where(output.notna(), None)
+
+    return output.to_dict('records')
+
+
+class EnrichmentService:
+    """
+    Local asyncio service enriching single profiles through micro-batches
+
+    * One queue per stage, the stages of a profile run concurrently
+    * A micro-batch is flushed at `max_batch_size` records
+    or `max_latency_ms` after its first request
+    * Each micro-batch runs in a worker thread, off the event loop
+
+    Examples
+    --------
+    >>> service = EnrichmentService([
+    ...     ('type', 'name'),
+    ...     ('phone', 'phone'),
+    ...     ('email', 'email'),
+    ...     ('address', 'address')
+    ... ], max_batch_size=256, max_latency_ms=5)
+    >>> async with service:
+    ...     profile = await service.process({'name': ..., 'phone': ...})
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Union[PipelineStage, Tuple[str, str]]],
+        max_batch_size: int = 256,
+        max_latency_ms: float = 10.0,
+        n_workers: Optional[int] = None,
+        address_cache_size: int = 100_000
+    ) -> None:
+        """
+        Parameters
+        ----------
+        stages : Sequence[Union[PipelineStage, Tuple[str, str]]]
+            The stages to run on each profile, as in `ProfilePipeline`
+        max_batch_size : int, optional
+            The maximum number of records per micro-batch, by default 256
+        max_latency_ms : float, optional
+            The maximum wait of a request for its micro-batch to fill,
+            by default 10 ms
+        n_workers : Optional[int], optional
+            The number of worker threads running the micro-batches,
+            by default one per stage
+        address_cache_size : int, optional
+            The size of the address parse cache kept by the service,
+            by default 100,000 addresses
+        """
+        if max_batch_size <= 0:
+            raise ValueError(
+                f"max_batch_size must be positive, got {max_batch_size}")
+        if max_latency_ms < 0:
+            raise ValueError(
+                f"max_latency_ms must be non-negative, got {max_latency_ms}")
+
+        self.stages = [
+            stage if isinstance(stage, PipelineStage)
+            else PipelineStage(*stage)
+            for stage in stages
+        ]
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.n_workers = n_workers or len(self.stages)
+        self.address_cache_size = address_cache_size
+        self.handler_builders: Dict[str, Callable[[PipelineStage], BatchHandler]] = {
+            'type': self._type_handler,
+            'enrich': self._enrich_handler,
+            'address': self._address_handler
+        }
+        self.__batchers: Dict[str, _StageBatcher] = {}
+        self.__executor: Optional[ThreadPoolExecutor] = None
+
+    # * ENGINES
+    def _stage_function_handler(
+        self,
+        stage: PipelineStage,
+        **defaults
+    ) -> BatchHandler:
+        """
+        Run the stage's public function on the micro-batch
+        """
+        stage_func = get_stage_function(stage.name)
+        options = {
+            STAGE_COLUMN_ARG_DICT[stage.name]: stage.column,
+            **defaults,
+            **stage.options
+        }
+
+        def handle(data: pd.DataFrame) -> pd.DataFrame:
+            return stage_func(data, **options)
+
+        return handle
+
+    def _type_handler(self, stage: PipelineStage) -> BatchHandler:
+        """
+        Customer type extraction with the keyword processors built once
+        """
+        from preprocessing_pgp.name.type.extractor import (
+            TypeExtractor,
+            format_names
+        )
+
+        name_col = stage.column
+        level = stage.options.get('level', 'lv1')
+        type_extractor = TypeExtractor()
+
+        def handle(data: pd.DataFrame) -> pd.DataFrame:
+            formatted_data = format_names(
+                data[data[name_col].notna()].copy(),
+                name_col=name_col
+            )
+            formatted_data['customer_type'] = formatted_data[f'de_{name_col}']\
+                .apply(lambda name: type_extractor.extract_type(name, level))
+
+            return formatted_data.drop(columns=[f'de_{name_col}'])
+
+        return handle
+
+    def _enrich_handler(self, stage: PipelineStage) -> BatchHandler:
+        """
+        Accent enrichment with the transformer model loaded once
+        """
+        from preprocessing_pgp.name.enrich_name import build_enricher
+        from preprocessing_pgp.name.preprocess import preprocess_df
+
+        name_col = stage.column
+        enricher = build_enricher()
+
+        def handle(data: pd.DataFrame) -> pd.DataFrame:
+            clean_data = preprocess_df(
+                data[data[name_col].notna()].copy(),
+                name_col=name_col
+            )
+
+            return enricher.refill_accent(clean_data, name_col)
+
+        return handle
+
+    def _address_handler(self, stage: PipelineStage) -> BatchHandler:
+        """
+        Address extraction with a parse cache kept across the micro-batches
+        """
+        from preprocessing_pgp.address.cache import AddressParseCache
+
+        return self._stage_function_handler(
+            stage,
+            cache=AddressParseCache(max_size=self.address_cache_size)
+        )
+
+    def __build_handler(self, stage: PipelineStage) -> BatchHandler:
+        if stage.name in self.handler_builders:
+            return self.handler_builders[stage.name](stage)
+        if stage.name in ('phone', 'card'):
+            return self._stage_function_handler(stage, print_info=False)
+
+        return self._stage_function_handler(stage)
+
+    def warm_up(self) -> None:
+        """
+        Build the engines of all stages & run each one on an empty batch,
+        so that the first requests do not pay the loading time
+        """
+        for stage in self.stages:
+            key = f'{stage.name}:{stage.column}'
+            if key in self.__batchers:
+                continue
+
+            handler = self.__build_handler(stage)
+            handler(pd.DataFrame({
+                stage.column: [WARM_UP_VALUES[stage.name], None],
+                ROW_ID_COL: [0, 1]
+            }))
+            self.__batchers[key] = _StageBatcher(
+                stage,
+                handler,
+                max_batch_size=self.max_batch_size,
+                max_latency=self.max_latency
+            )
+
+    # * LIFECYCLE
+    async def start(self) -> None:
+        """
+        Warm up the engines & start the micro-batching of each stage
+        """
+        if self.__executor is not None:
+            return
+
+        self.__executor = ThreadPoolExecutor(max_workers=self.n_workers)
+        await asyncio.get_running_loop().run_in_executor(
+            self.__executor, self.warm_up
+        )
+        for batcher in self.__batchers.values():
+            batcher.start(self.__executor)
+
+    async def stop(self) -> None:
+        """
+        Stop the micro-batching, the pending requests are cancelled
+        """
+        if self.__executor is None:
+            return
+
+        for batcher in self.__batchers.values():
+            await batcher.stop()
+        self.__executor.shutdown(wait=True)
+        self.__executor = None
+
+    async def __aenter__(self) -> 'EnrichmentService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    # * PUBLIC
+    @property
+    def stats(self) -> Dict[str, BatchStats]:
+        """
+        The micro-batch counters of each stage, keyed by `<stage>:<column>`
+        """
+        return {
+            key: batcher.stats
+            for key, batcher in self.__batchers.items()
+        }
+
+    async def process(self, profile: Record) -> Record:
+        """
+        Enrich one profile, batched with the concurrent requests
+
+        Parameters
+        ----------
+        profile : Record
+            The profile fields, stages whose column is missing are skipped
+
+        Returns
+        -------
+        Record
+            The profile with the output fields of all stages,
+            processed fields (e.g. `name`, `phone`) are replaced by their cleaned version
+            & later stages take priority on duplicated output fields
+        """
+        if self.__executor is None:
+            raise RuntimeError("The service is not started")
+
+        batchers = [
+            batcher for batcher in self.__batchers.values()
+            if batcher.stage.column in profile
+        ]
+        outputs = await asyncio.gather(*[
+            batcher.submit(profile[batcher.stage.column])
+            for batcher in batchers
+        ])
+
+        enriched_profile = dict(profile)
+        for output in outputs:
+            enriched_profile.update(output)
+
+        return enriched_profile
+
+
+class LocalServiceClient:
+    """
+    Synchronous in-process client of the service,
+    the service runs on the client's own event loop thread
+
+    Examples
+    --------
+    >>> with LocalServiceClient(EnrichmentService([('phone', 'phone')])) as client:
+    ...     profiles = client.process_many([{'phone': '0912345678'}, ...])
+    """
+
+    def __init__(self, service: EnrichmentService) -> None:
+        self.service = service
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    def __call(self, coroutine, timeout: Optional[float] = None) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop)\
+            .result(timeout)
+
+    def start(self) -> None:
+        if self.__loop is not None:
+            return
+
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(
+            target=self.__loop.run_forever,
+            name='enrichment-service',
+            daemon=True
+        )
+        self.__thread.start()
+        self.__call(self.service.start())
+
+    def close(self) -> None:
+        if self.__loop is None:
+            return
+
+        self.__call(self.service.stop())
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+        self.__loop = None
+        self.__thread = None
+
+    def __enter__(self) -> 'LocalServiceClient':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def process(
+        self,
+        profile: Record,
+        timeout: Optional[float] = None
+    ) -> Record:
+        """
+        Enrich one profile & wait for the result
+        """
+        return self.__call(self.service.process(profile), timeout)
+
+    def process_many(
+        self,
+        profiles: Sequence[Record],
+        timeout: Optional[float] = None
+    ) -> List[Record]:
+        """
+        Send the profiles as concurrent requests & wait for all the results,
+        in the same order as the profiles
+        """
+        async def gather() -> List[Record]:
+            return await asyncio.gather(*[
+                self.service.process(profile) for profile in profiles
+            ])
+
+        return self.__call(gather(), timeout)
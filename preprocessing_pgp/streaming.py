@@ -0,0 +1,589 @@
+"""
+Module to stream large Parquet, CSV & JSON-lines data through the processing stages
+batch by batch, so the peak memory only depends on the batch size and not on the input size
+"""
+
+import os
+from functools import partial
+from importlib import import_module
+from typing import Callable, Iterator, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow.fs import FileSystem
+
+from preprocessing_pgp.const import (
+    STAGE_FUNCTION_DICT,
+    STAGE_COLUMN_ARG_DICT,
+    DEFAULT_BATCH_ROWS,
+    FILE_FORMAT_EXTENSIONS
+)
+
+
+def get_stage_function(stage: str) -> Callable:
+    """
+    Get back the processing function of the stage,
+    the stage's module is only imported when requested
+
+    Parameters
+    ----------
+    stage : str
+        The name of the stage, one of the keys in `STAGE_FUNCTION_DICT`
+
+    Returns
+    -------
+    Callable
+        The function processing the dataframe of the stage
+    """
+    if stage not in STAGE_FUNCTION_DICT:
+        raise ValueError(
+            f"Unknown stage '{stage}', "
+            f"available stages: {list(STAGE_FUNCTION_DICT.keys())}"
+        )
+
+    module_name, func_name = STAGE_FUNCTION_DICT[stage]
+
+    return getattr(import_module(module_name), func_name)
+
+
+def _writable_schema(schema: pa.Schema) -> pa.Schema:
+    """
+    Replace the `null` typed fields -- columns full of NaN in the first batch --
+    by `string` so that the following batches can be casted to the schema
+    """
+    return pa.schema([
+        field.with_type(pa.string()) if pa.types.is_null(field.type)
+        else field
+        for field in schema
+    ])
+
+
+def _is_number(data_type: pa.DataType) -> bool:
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+
+def _widen_type(
+    data_type: pa.DataType,
+    new_type: pa.DataType
+) -> pa.DataType:
+    """
+    Type holding the values of both types:
+    integers -> int64, integers & floats -> float64, other mixes -> string
+    """
+    if data_type == new_type or pa.types.is_null(new_type):
+        return data_type
+    if pa.types.is_null(data_type):
+        return new_type
+    if pa.types.is_integer(data_type) and pa.types.is_integer(new_type):
+        return pa.int64()
+    if _is_number(data_type) and _is_number(new_type):
+        return pa.float64()
+
+    return pa.string()
+
+
+def _widen_schema(
+    schema: pa.Schema,
+    new_schema: pa.Schema
+) -> pa.Schema:
+    """
+    Schema holding the batches of both schemas,
+    the columns first seen in `new_schema` are added at the end
+    """
+    fields = [
+        field.with_type(_widen_type(field.type, new_schema.field(field.name).type))
+        if field.name in new_schema.names else field
+        for field in schema
+    ] + [
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+        for field in new_schema
+        if field.name not in schema.names
+    ]
+
+    return pa.schema(fields)
+
+
+def _conform_table(
+    table: pa.Table,
+    schema: pa.Schema
+) -> pa.Table:
+    """
+    Cast the table to the schema, the missing columns are filled with nulls
+    """
+    return pa.Table.from_arrays([
+        table.column(field.name).cast(field.type)
+        if field.name in table.column_names
+        else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ], schema=schema)
+
+
+def _to_output_table(
+    data: pd.DataFrame,
+    schema: Optional[pa.Schema] = None
+) -> pa.Table:
+    """
+    Convert a processed batch to Arrow table conformed with the output `schema`,
+    widened when the batch holds values or columns the schema cannot hold
+    """
+    table = pa.Table.from_pandas(data, preserve_index=False)
+
+    if schema is None:
+        return table.cast(_writable_schema(table.schema))
+
+    return _conform_table(table, _widen_schema(schema, table.schema))
+
+
+def read_schema(
+    input_path: Union[str, List[str]],
+    file_format: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    filesystem: Optional[FileSystem] = None
+) -> pa.Schema:
+    """
+    Schema of the input without reading its rows:
+    the Parquet schema, the header of a CSV file (as strings),
+    nothing for JSON-lines
+
+    Parameters
+    ----------
+    input_path : Union[str, List[str]]
+        The file, directory (Parquet only) or list of files
+    file_format : Optional[str], optional
+        The format of the input, by default inferred from the extension
+    columns : Optional[List[str]], optional
+        The columns read from the input, by default all columns
+    filesystem : Optional[FileSystem], optional
+        The filesystem of the input paths, by default the local filesystem
+
+    Returns
+    -------
+    pa.Schema
+        The schema of the input columns
+    """
+    file_format = file_format or infer_file_format(input_path)
+
+    if file_format == 'parquet':
+        schema = ds.dataset(input_path, format='parquet', filesystem=filesystem).schema
+    elif file_format == 'csv':
+        path = input_path[0] if isinstance(input_path, (list, tuple)) else input_path
+        with _open_input(path, filesystem) as file:
+            header = pd.read_csv(file, dtype=str, nrows=0).columns
+        schema = pa.schema([(col, pa.string()) for col in header])
+    else:
+        schema = pa.schema([])
+
+    if columns is not None:
+        schema = pa.schema([schema.field(col) for col in columns if col in schema.names])
+
+    return schema
+
+
+def stream_parquet(
+    input_path: Union[str, List[str]],
+    output_path: str,
+    stage: Union[str, Callable],
+    column: Optional[str] = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    columns: Optional[List[str]] = None,
+    filesystem: Optional[FileSystem] = None,
+    **stage_kwargs
+) -> int:
+    """
+    Process Parquet data by record batches and write the results incrementally
+
+    Parameters
+    ----------
+    input_path : Union[str, List[str]]
+        The Parquet file, directory or list of files to read from
+    output_path : str
+        The Parquet file to write the processed data to
+    stage : Union[str, Callable]
+        The name of the stage in `STAGE_FUNCTION_DICT`
+        ('enrich', 'address', 'email', 'phone', 'card', 'type')
+        or any function receiving and returning a dataframe
+    column : Optional[str], optional
+        The column to process, passed to the stage's column argument
+        (e.g. `name_col`, `phone_col`), by default the stage's default column
+    batch_rows : int, optional
+        The maximum number of rows per batch, by default `DEFAULT_BATCH_ROWS`
+    columns : Optional[List[str]], optional
+        The columns to read from the input, by default all columns are read
+    filesystem : Optional[FileSystem], optional
+        The filesystem of the input & output paths (e.g. `HadoopFileSystem`),
+        by default the local filesystem
+    **stage_kwargs
+        Additional arguments for the stage function
+
+    Returns
+    -------
+    int
+        The number of processed rows written to `output_path`
+    """
+    if isinstance(stage, str):
+        if column is not None:
+            stage_kwargs[STAGE_COLUMN_ARG_DICT[stage]] = column
+        stage_func = get_stage_function(stage)
+    else:
+        stage_func = stage
+
+    return stream_file(
+        input_path,
+        output_path,
+        partial(stage_func, **stage_kwargs),
+        input_format='parquet',
+        output_format='parquet',
+        batch_rows=batch_rows,
+        columns=columns,
+        filesystem=filesystem
+    )
+
+
+def infer_file_format(path: Union[str, List[str]]) -> str:
+    """
+    Infer the format of the file(s) from the extension,
+    directories are read as Parquet datasets
+
+    Parameters
+    ----------
+    path : Union[str, List[str]]
+        The file, directory or list of files
+
+    Returns
+    -------
+    str
+        The format in `FILE_FORMAT_EXTENSIONS` ('parquet', 'csv' or 'jsonl')
+    """
+    if isinstance(path, (list, tuple)):
+        formats = {infer_file_format(file_path) for file_path in path}
+        if len(formats) != 1:
+            raise ValueError(f"Files of different formats: {sorted(formats)}")
+        return formats.pop()
+
+    extension = os.path.splitext(str(path).rstrip('/'))[1].lower()
+    if extension in FILE_FORMAT_EXTENSIONS:
+        return FILE_FORMAT_EXTENSIONS[extension]
+    if extension == '':
+        return 'parquet'
+
+    raise ValueError(
+        f"Cannot infer the format of '{path}', "
+        f"available extensions: {list(FILE_FORMAT_EXTENSIONS.keys())}"
+    )
+
+
+def _open_input(path: str, filesystem: Optional[FileSystem] = None):
+    """
+    Helper to open a file for reading on the local or given filesystem
+    """
+    if filesystem is None:
+        return open(path, 'rb')
+    return filesystem.open_input_stream(path)
+
+
+def _read_text_batches(
+    path: str,
+    file_format: str,
+    batch_rows: int,
+    filesystem: Optional[FileSystem] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Helper to read a CSV or JSON-lines file by chunks of rows,
+    values are kept as strings (e.g. leading zeros of the phones)
+    """
+    with _open_input(path, filesystem) as file:
+        if file_format == 'csv':
+            # * Only the empty fields are missing, not `NA`, `null`, ...
+            reader = pd.read_csv(
+                file,
+                dtype=str,
+                keep_default_na=False,
+                na_values=[''],
+                chunksize=batch_rows
+            )
+        else:
+            reader = pd.read_json(
+                file,
+                lines=True,
+                dtype=False,
+                convert_dates=False,
+                chunksize=batch_rows
+            )
+
+        for data in reader:
+            yield data
+
+
+def read_batches(
+    input_path: Union[str, List[str]],
+    file_format: Optional[str] = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    columns: Optional[List[str]] = None,
+    filesystem: Optional[FileSystem] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the data batch by batch
+
+    Parameters
+    ----------
+    input_path : Union[str, List[str]]
+        The file, directory (Parquet only) or list of files to read from
+    file_format : Optional[str], optional
+        The format of the input ('parquet', 'csv' or 'jsonl'),
+        by default inferred from the extension
+    batch_rows : int, optional
+        The maximum number of rows per batch, by default `DEFAULT_BATCH_ROWS`
+    columns : Optional[List[str]], optional
+        The columns to read from the input, by default all columns are read
+    filesystem : Optional[FileSystem], optional
+        The filesystem of the input paths, by default the local filesystem
+
+    Yields
+    ------
+    pd.DataFrame
+        The non-empty batches of the input
+    """
+    file_format = file_format or infer_file_format(input_path)
+
+    if file_format == 'parquet':
+        dataset = ds.dataset(input_path, format='parquet', filesystem=filesystem)
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_rows):
+            if batch.num_rows > 0:
+                yield batch.to_pandas()
+        return
+
+    if file_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown file format '{file_format}'")
+
+    paths = input_path if isinstance(input_path, (list, tuple)) else [input_path]
+    for path in paths:
+        for data in _read_text_batches(path, file_format, batch_rows, filesystem):
+            if data.shape[0] == 0:
+                continue
+            if columns is not None:
+                data = data[columns]
+            yield data
+
+
+class BatchWriter:
+    """
+    Incremental writer of the processed batches to one Parquet, CSV or JSON-lines file
+
+    * The output schema (Parquet) is set by the first batch and widened
+    when a later batch holds other types or new columns
+    (the rows already written are copied to the widened schema)
+    * The columns (CSV & JSON-lines) are set by the first batch,
+    a later batch with new columns raises a `ValueError`
+    * Empty batches are skipped, the output of no batch is
+    an empty file with `empty_schema`
+
+    Examples
+    --------
+    >>> with BatchWriter('output.csv') as writer:
+    ...     for data in read_batches('input.jsonl', batch_rows=100_000):
+    ...         writer.write(process(data))
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_format: Optional[str] = None,
+        filesystem: Optional[FileSystem] = None,
+        empty_schema: Optional[pa.Schema] = None
+    ) -> None:
+        self.path = path
+        self.file_format = file_format or infer_file_format(path)
+        if self.file_format not in ('parquet', 'csv', 'jsonl'):
+            raise ValueError(f"Unknown file format '{self.file_format}'")
+
+        self.filesystem = filesystem
+        self.empty_schema = empty_schema or pa.schema([])
+        self.n_rows = 0
+        self.__parquet_writer: Optional[pq.ParquetWriter] = None
+        self.__sink = None
+        self.__columns: Optional[List[str]] = None
+
+    def __open_sink(self):
+        if self.filesystem is None:
+            return open(self.path, 'wb')
+        return self.filesystem.open_output_stream(self.path)
+
+    def __open_parquet_writer(self, schema: pa.Schema) -> None:
+        self.__parquet_writer = pq.ParquetWriter(
+            self.path,
+            schema,
+            filesystem=self.filesystem
+        )
+
+    def __widen_parquet(self, schema: pa.Schema) -> None:
+        """
+        Copy the row groups already written to a file of the widened schema
+        """
+        self.__parquet_writer.close()
+        directory, name = os.path.split(self.path)
+        written_path = os.path.join(directory, f'.{name}.tmp')
+        if self.filesystem is None:
+            os.replace(self.path, written_path)
+        else:
+            self.filesystem.move(self.path, written_path)
+
+        self.__open_parquet_writer(schema)
+        written_file = pq.ParquetFile(
+            written_path if self.filesystem is None
+            else self.filesystem.open_input_file(written_path)
+        )
+        for i in range(written_file.num_row_groups):
+            self.__parquet_writer.write_table(
+                _conform_table(written_file.read_row_group(i), schema)
+            )
+
+        if self.filesystem is None:
+            os.remove(written_path)
+        else:
+            self.filesystem.delete_file(written_path)
+
+    def __write_parquet(self, data: pd.DataFrame) -> None:
+        if self.__parquet_writer is None:
+            table = _to_output_table(data)
+            self.__open_parquet_writer(table.schema)
+        else:
+            table = _to_output_table(data, self.__parquet_writer.schema)
+            if not table.schema.equals(self.__parquet_writer.schema):
+                self.__widen_parquet(table.schema)
+
+        self.__parquet_writer.write_table(table)
+
+    def __write_text(self, data: pd.DataFrame) -> None:
+        is_first = self.__sink is None
+        if is_first:
+            self.__sink = self.__open_sink()
+            self.__columns = list(data.columns)
+        new_columns = [col for col in data.columns if col not in self.__columns]
+        if len(new_columns) > 0:
+            raise ValueError(
+                f"Columns {new_columns} are not in the {self.file_format} output, "
+                f"whose columns are set by the first batch: {self.__columns}"
+            )
+        data = data.reindex(columns=self.__columns)
+
+        if self.file_format == 'csv':
+            text = data.to_csv(index=False, header=is_first)
+        else:
+            text = data.to_json(
+                orient='records',
+                lines=True,
+                force_ascii=False,
+                date_format='iso'
+            )
+            if not text.endswith('\n'):
+                text += '\n'
+
+        self.__sink.write(text.encode('utf-8'))
+
+    def __write_empty(self) -> None:
+        if self.file_format == 'parquet':
+            self.__open_parquet_writer(self.empty_schema)
+        else:
+            self.__sink = self.__open_sink()
+            if self.file_format == 'csv' and len(self.empty_schema) > 0:
+                self.__sink.write(
+                    pd.DataFrame(columns=self.empty_schema.names)
+                    .to_csv(index=False).encode('utf-8')
+                )
+
+    def write(self, data: pd.DataFrame) -> int:
+        """
+        Append the batch to the output
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The processed batch
+
+        Returns
+        -------
+        int
+            The number of rows written
+        """
+        if data.shape[0] == 0:
+            return 0
+
+        if self.file_format == 'parquet':
+            self.__write_parquet(data)
+        else:
+            self.__write_text(data)
+        self.n_rows += data.shape[0]
+
+        return data.shape[0]
+
+    def close(self) -> None:
+        if self.__parquet_writer is None and self.__sink is None:
+            self.__write_empty()
+        if self.__parquet_writer is not None:
+            self.__parquet_writer.close()
+            self.__parquet_writer = None
+        if self.__sink is not None:
+            self.__sink.close()
+            self.__sink = None
+
+    def __enter__(self) -> 'BatchWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def stream_file(
+    input_path: Union[str, List[str]],
+    output_path: str,
+    process: Callable[[pd.DataFrame], pd.DataFrame],
+    input_format: Optional[str] = None,
+    output_format: Optional[str] = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    columns: Optional[List[str]] = None,
+    filesystem: Optional[FileSystem] = None
+) -> int:
+    """
+    Process Parquet, CSV or JSON-lines data by batches and write the results incrementally
+
+    Parameters
+    ----------
+    input_path : Union[str, List[str]]
+        The file, directory (Parquet only) or list of files to read from
+    output_path : str
+        The file to write the processed data to
+    process : Callable[[pd.DataFrame], pd.DataFrame]
+        The function receiving and returning a batch
+    input_format : Optional[str], optional
+        The format of the input ('parquet', 'csv' or 'jsonl'),
+        by default inferred from the extension
+    output_format : Optional[str], optional
+        The format of the output, by default inferred from the extension
+    batch_rows : int, optional
+        The maximum number of rows per batch, by default `DEFAULT_BATCH_ROWS`
+    columns : Optional[List[str]], optional
+        The columns to read from the input, by default all columns are read
+    filesystem : Optional[FileSystem], optional
+        The filesystem of the input & output paths (e.g. `HadoopFileSystem`),
+        by default the local filesystem
+
+    Returns
+    -------
+    int
+        The number of processed rows written to `output_path`,
+        an input without rows gives an empty output of the input schema
+    """
+    empty_schema = read_schema(input_path, input_format, columns, filesystem)
+    with BatchWriter(output_path, output_format, filesystem, empty_schema) as writer:
+        for data in read_batches(
+            input_path,
+            file_format=input_format,
+            batch_rows=batch_rows,
+            columns=columns,
+            filesystem=filesystem
+        ):
+            writer.write(process(data))
+
+    return writer.n_rows
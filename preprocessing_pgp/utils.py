@@ -1,21 +1,44 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import threading
 import multiprocessing as mp
-from functools import partial
+from time import perf_counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from functools import partial, wraps
 from typing import (
+    Any,
     Callable,
+    Dict,
+    Iterator,
     List,
+    Optional,
     Union,
     Tuple
 )
 
 import pandas as pd
 import numpy as np
-from unidecode import unidecode
+import pyarrow as pa
+import pyarrow.compute as pc
 from tqdm import tqdm
+from halo import Halo
 
+from preprocessing_pgp.deaccent import remove_accent_series
 from preprocessing_pgp.const import (
-    N_PROCESSES
+    N_PROCESSES,
+    SHARED_MEMORY_DIR
 )
 
+try:
+    import resource
+except ImportError:  # * Not available on Windows
+    resource = None
+
 
 tqdm.pandas()
 
@@ -68,6 +91,210 @@ def extract_null_values(
     return non_null_data, null_data
 
 
+def select_input_columns(
+    data: pd.DataFrame,
+    columns: List[str]
+) -> pd.DataFrame:
+    """
+    Light copy of the columns needed by a stage, indexed by row positions
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The input data
+    columns : List[str]
+        The columns to keep
+
+    Returns
+    -------
+    pd.DataFrame
+        The selected columns with a `RangeIndex` of the row positions
+    """
+    return pd.DataFrame({col: data[col].values for col in columns})
+
+
+def compact_new_columns(
+    result: pd.DataFrame,
+    input_index: pd.Index,
+    new_cols: List[str],
+    flag_cols: List[str] = None,
+    category_cols: List[str] = None
+) -> pd.DataFrame:
+    """
+    Keep only the derived columns of a stage's result,
+    aligned to the input index with compact dtypes
+
+    Parameters
+    ----------
+    result : pd.DataFrame
+        The stage's result, indexed by the row positions of the input
+    input_index : pd.Index
+        The index of the input data
+    new_cols : List[str]
+        The derived columns to return
+    flag_cols : List[str], optional
+        The indicator columns, returned as `bool`
+        (or nullable `boolean` when missing values remain), by default None
+    category_cols : List[str], optional
+        The low-cardinality label columns, returned as `category`, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        The derived columns in the same row order & index as the input data
+    """
+    new_data = result\
+        .reindex(columns=new_cols)\
+        .reindex(np.arange(len(input_index)))
+
+    for col in flag_cols or []:
+        if new_data[col].isna().any():
+            new_data[col] = new_data[col].astype('boolean')
+        else:
+            new_data[col] = new_data[col].astype(bool)
+
+    for col in category_cols or []:
+        new_data[col] = new_data[col].astype('category')
+
+    new_data.index = input_index
+
+    return new_data
+
+
+# ? ARROW INPUTS
+ARROW_DATA_TYPES = (pa.Table, pa.RecordBatch, pa.ChunkedArray, pa.Array)
+
+
+def is_arrow_data(data: Any) -> bool:
+    """
+    Check whether the input is an Arrow `Table`, `RecordBatch`, `ChunkedArray` or `Array`
+    """
+    return isinstance(data, ARROW_DATA_TYPES)
+
+
+def to_arrow_table(
+    data: Union[pa.Table, pa.RecordBatch, pa.ChunkedArray, pa.Array],
+    column: str
+) -> pa.Table:
+    """
+    Convert the Arrow input to a table,
+    a single `ChunkedArray` or `Array` becomes the `column` of the table
+
+    Parameters
+    ----------
+    data : Union[pa.Table, pa.RecordBatch, pa.ChunkedArray, pa.Array]
+        The Arrow input
+    column : str
+        The column processed by the stage
+
+    Returns
+    -------
+    pa.Table
+        The input as a table, having the `column`
+    """
+    if isinstance(data, pa.Table):
+        table = data
+    elif isinstance(data, pa.RecordBatch):
+        table = pa.Table.from_batches([data])
+    else:
+        table = pa.table({column: data})
+
+    if column not in table.column_names:
+        raise KeyError(f"Column '{column}' not found in the Arrow input")
+
+    return table
+
+
+def arrow_string_column(
+    table: pa.Table,
+    column: str
+) -> pa.ChunkedArray:
+    """
+    Get the column of the table as Arrow strings,
+    decoding dictionary & null-typed columns
+    """
+    values = table[column]
+    if pa.types.is_dictionary(values.type):
+        values = values.cast(values.type.value_type)
+    if not (pa.types.is_string(values.type) or pa.types.is_large_string(values.type)):
+        values = values.cast(pa.string())
+
+    return values
+
+
+def map_arrow_unique(
+    values: pa.ChunkedArray,
+    func: Callable[[str], Any],
+    value_type: pa.DataType
+) -> pa.ChunkedArray:
+    """
+    Apply a Python function on each unique non-null value only,
+    null values stay null
+
+    Parameters
+    ----------
+    values : pa.ChunkedArray
+        The input values
+    func : Callable[[str], Any]
+        The function to apply on a single value
+    value_type : pa.DataType
+        The Arrow type of the function's outputs
+
+    Returns
+    -------
+    pa.ChunkedArray
+        The function's outputs aligned to the input values
+    """
+    unique_values = pc.unique(values.drop_null())
+    unique_outputs = pa.array(
+        [func(value) for value in unique_values.to_pylist()],
+        type=value_type
+    )
+    value_ids = pc.index_in(values, value_set=unique_values)
+
+    return pc.take(unique_outputs, value_ids)
+
+
+def build_arrow_output(
+    table: pa.Table,
+    new_columns: Dict[str, Union[pa.Array, pa.ChunkedArray]],
+    replaced_columns: Dict[str, Union[pa.Array, pa.ChunkedArray]] = None,
+    return_only_new_columns: bool = False
+) -> pa.Table:
+    """
+    Build the Arrow output of a stage in the same row order as the input
+
+    Parameters
+    ----------
+    table : pa.Table
+        The input table
+    new_columns : Dict[str, Union[pa.Array, pa.ChunkedArray]]
+        The derived columns appended to the input
+    replaced_columns : Dict[str, Union[pa.Array, pa.ChunkedArray]], optional
+        The input columns replaced by their processed version, by default None
+    return_only_new_columns : bool, optional
+        Whether to return only the derived columns, by default False
+
+    Returns
+    -------
+    pa.Table
+        The output table
+    """
+    if return_only_new_columns:
+        return pa.table(new_columns)
+
+    for col, values in (replaced_columns or {}).items():
+        table = table.set_column(
+            table.column_names.index(col), col, values)
+
+    for col, values in new_columns.items():
+        if col in table.column_names:
+            table = table.drop([col])
+        table = table.append_column(col, values)
+
+    return table
+
+
 def apply_multi_process(
     func: Callable,
     series: Union[pd.Series, str, np.ndarray],
@@ -98,10 +325,271 @@ def apply_multi_process(
     return output
 
 
+def _chunk_bounds(
+    n_rows: int,
+    n_chunks: int
+) -> List[Tuple[int, int]]:
+    """
+    Split `n_rows` into `n_chunks` contiguous ranges,
+    sized the same way as `np.array_split`
+    """
+    base_size, n_bigger = divmod(n_rows, n_chunks)
+    bounds = []
+    start = 0
+    for i in range(n_chunks):
+        stop = start + base_size + (1 if i < n_bigger else 0)
+        bounds.append((start, stop))
+        start = stop
+
+    return bounds
+
+
+def _is_arrow_compatible(data: pd.DataFrame) -> bool:
+    """
+    Whether the column names of the dataframe survive the Arrow round-trip
+    """
+    return data.columns.is_unique\
+        and all(isinstance(col, str) for col in data.columns)
+
+
+def _null_values(
+    data: pd.DataFrame
+) -> Optional[Dict[str, Any]]:
+    """
+    Missing value of each object column holding other missing values than None
+    (e.g. NaN read from CSV), Arrow gives them all back as None
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        The missing value to restore by column,
+        None if a column mixes several kinds of missing values
+    """
+    null_values = {}
+    for col in data.columns[data.dtypes == object]:
+        nulls = data[col][data[col].isna()]
+        if nulls.empty:
+            continue
+        null_kinds = {
+            'nan' if isinstance(value, float) else type(value).__name__
+            for value in nulls
+        }
+        if len(null_kinds) > 1:
+            return None
+        if nulls.iloc[0] is not None:
+            null_values[col] = nulls.iloc[0]
+
+    return null_values
+
+
+def _write_arrow_file(
+    data: pd.DataFrame,
+    path: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Write the dataframe (without index) to an Arrow IPC file
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        The missing values to restore when reading back (`_null_values`),
+        None if the dataframe cannot be represented in Arrow format:
+        non-string or duplicated column names, mixed missing values,
+        object columns of other values than text or values of unsupported types
+    """
+    if not _is_arrow_compatible(data):
+        return None
+
+    null_values = _null_values(data)
+    if null_values is None:
+        return None
+
+    try:
+        table = pa.Table.from_pandas(data, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+    # * Object columns only stay object when Arrow reads them as text:
+    # ints & None would come back as float64, bools without None as bool
+    for col in data.columns[data.dtypes == object]:
+        arrow_type = table.schema.field(col).type
+        if not (pa.types.is_string(arrow_type)
+                or pa.types.is_large_string(arrow_type)
+                or pa.types.is_binary(arrow_type)
+                or pa.types.is_null(arrow_type)):
+            return None
+
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    return null_values
+
+
+def _read_arrow_file(
+    path: str,
+    start: int = 0,
+    stop: Optional[int] = None,
+    null_values: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Memory-map an Arrow IPC file and convert the rows `[start, stop)` to pandas,
+    with the missing values given by `_write_arrow_file` restored
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        if stop is not None:
+            table = table.slice(start, stop - start)
+        data = table.to_pandas()
+
+    for col, null_value in (null_values or {}).items():
+        data[col] = data[col].where(data[col].notna(), null_value)
+
+    return data
+
+
+def _new_columns(
+    result: pd.DataFrame,
+    chunk: pd.DataFrame
+) -> List[str]:
+    """
+    Columns of `result` that are either added or modified compared to `chunk`
+    """
+    return [
+        col for col in result.columns
+        if col not in chunk.columns
+        or not result[col].equals(chunk[col])
+    ]
+
+
+def _assemble_columns(
+    base: pd.DataFrame,
+    columns: List[str],
+    new_data: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Build the output frame in `columns` order,
+    taking new columns from `new_data` and the others from `base`
+    """
+    new_data = new_data.set_axis(base.index, axis=0)
+    final_columns: Dict[str, pd.Series] = {
+        col: new_data[col] if col in new_data.columns else base[col]
+        for col in columns
+    }
+
+    return pd.DataFrame(final_columns, index=base.index)
+
+
+def _shared_chunk_worker(
+    task: Tuple[int, int, int, pd.Index],
+    func: Callable,
+    input_path: str,
+    null_values: Dict[str, Any],
+    work_dir: str,
+    **kwargs
+) -> Tuple[
+    Optional[List[str]],
+    Optional[str],
+    Optional[Dict[str, Any]],
+    Optional[pd.DataFrame]
+]:
+    """
+    Process one chunk of a memory-mapped Arrow file and
+    send back only the newly computed columns
+    """
+    chunk_id, start, stop, index = task
+    chunk = _read_arrow_file(input_path, start, stop, null_values)
+    chunk.index = index
+
+    result = func(chunk, **kwargs)
+
+    if len(result) != len(chunk) or not result.index.equals(index)\
+            or not _is_arrow_compatible(result):
+        # * Row-changing function or columns not supported by Arrow:
+        # * return the whole result as it is
+        return None, None, None, result
+
+    # * `func` may have modified its input before returning it or a copy,
+    # * the changes are found against the pristine chunk
+    chunk = _read_arrow_file(input_path, start, stop, null_values)
+    chunk.index = index
+
+    new_cols = _new_columns(result, chunk)
+    output_path = os.path.join(work_dir, f'output_{chunk_id}.arrow')
+    output_null_values = _write_arrow_file(result[new_cols], output_path)
+    if output_null_values is not None:
+        return list(result.columns), output_path, output_null_values, None
+
+    return list(result.columns), None, None, result[new_cols]
+
+
+def _parallelize_shared(
+    data: pd.DataFrame,
+    func: Callable,
+    n_cores: int,
+    **kwargs
+) -> Optional[pd.DataFrame]:
+    """
+    Multi-processing through an Arrow IPC file in shared memory,
+    returns None if the data cannot be represented in Arrow format
+    """
+    shm_dir = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+    work_dir = tempfile.mkdtemp(prefix='pgp_', dir=shm_dir)
+    try:
+        input_path = os.path.join(work_dir, 'input.arrow')
+        null_values = _write_arrow_file(data, input_path)
+        if null_values is None:
+            return None
+
+        tasks = [
+            (chunk_id, start, stop, data.index[start:stop])
+            for chunk_id, (start, stop)
+            in enumerate(_chunk_bounds(data.shape[0], n_cores))
+        ]
+        with mp.Pool(n_cores) as pool:
+            outputs = pool.map(
+                partial(
+                    _shared_chunk_worker,
+                    func=func,
+                    input_path=input_path,
+                    null_values=null_values,
+                    work_dir=work_dir,
+                    **kwargs
+                ),
+                tasks
+            )
+
+        new_data = [
+            _read_arrow_file(output_path, null_values=output_null_values)
+            if output_path is not None else result
+            for _, output_path, output_null_values, result in outputs
+        ]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if any(columns is None for columns, _, _, _ in outputs):
+        # * Some chunks changed their rows, assemble each chunk separately
+        return pd.concat([
+            result if columns is None
+            else _assemble_columns(data.iloc[start:stop], columns, chunk_data)
+            for (columns, _, _, result), chunk_data, (_, start, stop, _)
+            in zip(outputs, new_data, tasks)
+        ])
+
+    return _assemble_columns(
+        data,
+        outputs[0][0],
+        pd.concat(new_data, ignore_index=True)
+    )
+
+
 def parallelize_dataframe(
     data: pd.DataFrame,
     func: Callable,
     n_cores: int = N_PROCESSES,
+    transport: str = 'shared',
+    checkpoint_dir: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
     **kwargs
 ) -> pd.DataFrame:
     """
@@ -116,6 +604,22 @@ def parallelize_dataframe(
         input must contains the `dataframe` as the required argument
     n_cores : int
         The number of cores used to run parallel, by default half the cores will be used
+    transport : str
+        How the chunks are moved between processes, by default 'shared':
+
+        * 'shared': the data is written once to an Arrow IPC file in shared memory,
+        each worker memory-maps its own row range and writes back only
+        the columns added or modified by `func`;
+        the data not representable in Arrow (non-string or duplicated column names,
+        object columns mixing None & NaN, ...) falls back to 'pickle'
+        * 'pickle': the chunks and the full results are pickled through the pool
+    checkpoint_dir : Optional[str], optional
+        The local directory where each finished chunk is checkpointed,
+        a re-run of the same job skips the finished chunks (`run_checkpointed`),
+        by default None (no checkpoint)
+    chunk_rows : Optional[int], optional
+        The number of rows per checkpointed chunk,
+        by default the data is split into `n_cores` chunks
     **kwargs
         Additional arguments for the function
 
@@ -124,6 +628,28 @@ def parallelize_dataframe(
     pd.DataFrame
         Fully processed dataframe
     """
+    if transport not in ('shared', 'pickle'):
+        raise ValueError(
+            f"transport must be 'shared' or 'pickle', got '{transport}'")
+
+    if checkpoint_dir is not None:
+        from preprocessing_pgp.checkpoint import run_checkpointed
+
+        return run_checkpointed(
+            data,
+            func,
+            checkpoint_dir,
+            chunk_rows=chunk_rows or max(-(-data.shape[0] // n_cores), 1),
+            n_cores=n_cores,
+            keep_parts=False,
+            **kwargs
+        )
+
+    if transport == 'shared' and not is_empty_dataframe(data):
+        final_data = _parallelize_shared(data, func, n_cores, **kwargs)
+        if final_data is not None:
+            return final_data
+
     sub_data = np.array_split(data.copy(), n_cores)
 
     with mp.Pool(n_cores) as pool:
@@ -179,7 +705,7 @@ def remove_non_accent_names(
     """
     print("Decoding names...")
     names = names_df[name_col].copy()
-    de_names = names.progress_apply(unidecode)
+    de_names = remove_accent_series(names)
 
     with_accent_mask = names != de_names
 
@@ -200,3 +726,240 @@ def remove_non_accent_names(
     without_accent_names_df = names_df[~with_accent_mask].copy()
 
     return clean_names_df, without_accent_names_df
+
+
+# ? INSTRUMENTATION
+@dataclass
+class StageMetrics:
+    """
+    Performance metrics recorded for one run of a stage
+
+    * `stage`: name of the stage
+    * `wall_time`: running time in seconds
+    * `rows_in`, `rows_out`: number of records in & out of the stage
+    * `peak_rss_delta_mb`: increase of the process peak RSS during the stage
+    * `cache_hits`, `cache_misses`: lookups of the caches used by the stage
+    * `display`: whether the stage is reported on the console
+    """
+    stage: str
+    wall_time: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    peak_rss_delta_mb: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    display: bool = True
+
+    @property
+    def rows_per_sec(self) -> Optional[float]:
+        """
+        Throughput of the stage based on the input records
+        """
+        if self.rows_in is None or self.wall_time <= 0:
+            return None
+        return self.rows_in / self.wall_time
+
+    @property
+    def cache_hit_rate(self) -> Optional[float]:
+        """
+        Ratio of cache hits over all cache lookups
+        """
+        n_lookups = self.cache_hits + self.cache_misses
+        if n_lookups == 0:
+            return None
+        return self.cache_hits / n_lookups
+
+    def record_cache(self, hits: int, misses: int) -> None:
+        """
+        Add the cache lookups to the metrics
+        """
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def to_dict(self) -> Dict:
+        """
+        Metrics as a flat dictionary, including the derived metrics
+        """
+        metrics = asdict(self)
+        metrics.pop('display')
+        metrics['rows_per_sec'] = self.rows_per_sec
+        metrics['cache_hit_rate'] = self.cache_hit_rate
+
+        return metrics
+
+
+class ConsoleSink:
+    """
+    Sink printing the running time of displayed stages to stdout
+    """
+
+    def __call__(self, metrics: StageMetrics) -> None:
+        if not metrics.display:
+            return
+        wall_time = int(metrics.wall_time)
+        print(f"{metrics.stage} takes {wall_time//60}m{wall_time%60}s")
+        sep_display()
+
+
+class LoggingSink:
+    """
+    Sink sending the metrics to a logger
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        level: int = logging.INFO
+    ) -> None:
+        self.logger = logger or logging.getLogger('preprocessing_pgp')
+        self.level = level
+
+    def __call__(self, metrics: StageMetrics) -> None:
+        self.logger.log(self.level, json.dumps(metrics.to_dict()))
+
+
+class JsonLinesSink:
+    """
+    Sink appending the metrics as JSON lines to a file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def __call__(self, metrics: StageMetrics) -> None:
+        with self.__lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(metrics.to_dict()) + '\n')
+
+
+class MemorySink:
+    """
+    Sink collecting the metrics in memory
+    """
+
+    def __init__(self) -> None:
+        self.records: List[StageMetrics] = []
+
+    def __call__(self, metrics: StageMetrics) -> None:
+        self.records.append(metrics)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        All collected metrics as a dataframe, one stage run per row
+        """
+        return pd.DataFrame([metrics.to_dict() for metrics in self.records])
+
+
+METRIC_SINKS: List[Callable[[StageMetrics], None]] = [ConsoleSink()]
+
+
+def add_metric_sink(sink: Callable[[StageMetrics], None]) -> None:
+    """
+    Register a sink receiving the metrics of every stage
+    """
+    METRIC_SINKS.append(sink)
+
+
+def remove_metric_sink(sink: Callable[[StageMetrics], None]) -> None:
+    """
+    Unregister a sink, does nothing if the sink is not registered
+    """
+    if sink in METRIC_SINKS:
+        METRIC_SINKS.remove(sink)
+
+
+def _peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process in MB
+    """
+    if resource is None:
+        return 0.0
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':  # * Reported in bytes instead of KB
+        return peak_rss / 1024 ** 2
+
+    return peak_rss / 1024
+
+
+@contextmanager
+def track_stage(
+    stage: str,
+    rows_in: Optional[int] = None,
+    display: bool = True
+) -> Iterator[StageMetrics]:
+    """
+    Context manager measuring the performance of the enclosed stage
+    and sending the metrics to all registered sinks
+
+    Parameters
+    ----------
+    stage : str
+        The name of the stage
+    rows_in : Optional[int], optional
+        The number of records going into the stage, by default None
+    display : bool, optional
+        Whether the stage is reported on the console, by default True
+
+    Yields
+    ------
+    StageMetrics
+        The metrics of the stage, `rows_out` and the cache lookups
+        can be filled inside the context
+
+    Examples
+    --------
+    >>> with track_stage('Cleansing', rows_in=data.shape[0]) as metrics:
+    ...     cleaned_data = clean_vi_address(data, 'address')
+    ...     metrics.rows_out = cleaned_data.shape[0]
+    """
+    metrics = StageMetrics(stage, rows_in=rows_in, display=display)
+    start_rss = _peak_rss_mb()
+    start_time = perf_counter()
+
+    yield metrics
+
+    metrics.wall_time = perf_counter() - start_time
+    metrics.peak_rss_delta_mb = _peak_rss_mb() - start_rss
+
+    for sink in METRIC_SINKS:
+        sink(metrics)
+
+
+def instrument_stage(text: str) -> Callable:
+    """
+    Decorator tracking a dataframe processing function as a stage,
+    with a spinner when the output is an interactive terminal
+
+    * The first argument of the function is counted as `rows_in`
+    * The returned dataframe is counted as `rows_out`
+
+    Parameters
+    ----------
+    text : str
+        The name of the stage, also shown in the spinner
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            data = args[0] if len(args) > 0 else next(iter(kwargs.values()), None)
+            rows_in = len(data) if isinstance(data, pd.DataFrame) else None
+
+            spinner = Halo(
+                text=text,
+                color='cyan',
+                spinner='dots7',
+                text_color='magenta'
+            ) if sys.stdout.isatty() else nullcontext()
+            with track_stage(text, rows_in=rows_in, display=False) as metrics:
+                with spinner:
+                    result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    metrics.rows_out = result.shape[0]
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -6,6 +6,8 @@ Testing for basic cases of address extractions
 
 # import pytest
 
+import pandas as pd
+
 from preprocessing_pgp.address import (
     level_extractor,
     preprocess
@@ -173,3 +175,47 @@ class TestLevelExtraction:
             cleaned_addr)
 
         assert remained_address.find('658/11 truong cong dinh') != -1
+
+
+class TestAddressCleaner:
+    """
+    Class for testing the vectorized address cleansing
+    """
+
+    cleaner = preprocess.VietnameseAddressCleaner()
+
+    addresses = pd.Series(
+        [
+            '12 Trương Công Định, P.14, Q. Tân Bình, TP.HCM',
+            'so 007 ap 3 p 07 q 012 brvt',
+            'ba ria vung tau tp: vung tau',
+            None,
+            'phan rang thap cham, Ninh Thuận!!',
+            '12 Trương Công Định, P.14, Q. Tân Bình, TP.HCM',
+        ],
+        index=[5, 3, 3, 8, 1, 0]
+    )
+
+    def test_same_as_row_cleaning(self):
+        """
+        Vectorized cleaning gives the same addresses as cleaning each address
+        """
+        cleaned_addresses = self.cleaner.clean_addresses(self.addresses)
+
+        expected_addresses = [
+            self.cleaner.clean_address(address)
+            if address is not None else None
+            for address in self.addresses
+        ]
+
+        assert cleaned_addresses.tolist() == expected_addresses
+        assert cleaned_addresses.index.equals(self.addresses.index)
+
+    def test_first_keyword_wins(self):
+        """
+        Only the first keyword changing the address is applied
+        """
+        cleaned_address = self.cleaner.clean_addresses(
+            pd.Series(['tp.hcm x.yen'])).iloc[0]
+
+        assert cleaned_address == 'tp hcm xyen'
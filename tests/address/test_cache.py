@@ -0,0 +1,63 @@
+"""
+Tests for the memo cache of address parse results
+"""
+
+from preprocessing_pgp.address.cache import AddressParseCache
+
+
+def make_result(address: str):
+    """
+    Fake parse result of an address
+    """
+    return (address.lower(), {1: None}, '', {1: None}, {1: None})
+
+
+class TestAddressParseCache:
+    """
+    Class for testing the bounded LRU address cache
+    """
+
+    def test_hits_and_misses(self):
+        """
+        Lookups are counted as hits & misses
+        """
+        cache = AddressParseCache(max_size=10)
+        cache.put('Ha Noi', make_result('Ha Noi'))
+
+        assert cache.get('Ha Noi') == make_result('Ha Noi')
+        assert cache.get('Hue') is None
+        assert cache.get_many(['Ha Noi', 'Da Nang']) == {
+            'Ha Noi': make_result('Ha Noi')
+        }
+        assert (cache.hits, cache.misses) == (2, 2)
+        assert cache.hit_rate == 0.5
+
+    def test_evict_least_recently_used(self):
+        """
+        The least recently used address is evicted when the cache is full
+        """
+        cache = AddressParseCache(max_size=2)
+        cache.put('a', make_result('a'))
+        cache.put('b', make_result('b'))
+        cache.get('a')
+        cache.put('c', make_result('c'))
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert len(cache) == 2
+
+    def test_persist_between_runs(self, tmp_path):
+        """
+        The cache is saved to & loaded back from a local file
+        """
+        path = str(tmp_path / 'address_cache.pkl')
+        cache = AddressParseCache(max_size=10, path=path)
+        cache.put_many({address: make_result(address)
+                        for address in ['a', 'b', 'c']})
+        cache.save()
+
+        loaded_cache = AddressParseCache(max_size=2, path=path)
+
+        assert len(loaded_cache) == 2
+        assert loaded_cache.get('c') == make_result('c')
+        assert 'a' not in loaded_cache
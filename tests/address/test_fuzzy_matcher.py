@@ -0,0 +1,86 @@
+"""
+Tests for the fuzzy fallback of the address level extraction
+"""
+
+import pandas as pd
+
+from preprocessing_pgp.address.fuzzy_matcher import (
+    LevelFuzzyMatcher,
+    edit_distance
+)
+
+
+def make_location_dict() -> pd.DataFrame:
+    """
+    Small location dictionary with two cities having the same district name
+    """
+    locations = [
+        ('Thành phố Hồ Chí Minh', 'ho chi minh', 'Quận Tân Bình', 'tan binh',
+         'Phường Nguyễn An Ninh', 'nguyen an ninh'),
+        ('Thành phố Hồ Chí Minh', 'ho chi minh', 'Quận Tân Bình', 'tan binh',
+         'Phường Bảy Hiền', 'bay hien'),
+        ('Thành phố Hà Nội', 'ha noi', 'Quận Ba Đình', 'ba dinh',
+         'Phường Kim Mã', 'kim ma'),
+        ('Tỉnh Bình Dương', 'binh duong', 'Thành phố Tân Bình', 'tan binh',
+         'Phường Nguyễn An Ninh', 'nguyen an ninh'),
+    ]
+    return pd.DataFrame([
+        {
+            'lv1': lv1, 'lv1_norm': lv1_norm, 'lv1_prefix_im': lv1.lower(),
+            'lv2': lv2, 'lv2_norm': lv2_norm, 'lv2_prefix_im': lv2.lower(),
+            'lv3': lv3, 'lv3_norm': lv3_norm, 'lv3_prefix_im': lv3.lower()
+        }
+        for lv1, lv1_norm, lv2, lv2_norm, lv3, lv3_norm in locations
+    ])
+
+
+class TestLevelFuzzyMatcher:
+    """
+    Class for testing the symmetric-delete fuzzy matching of address levels
+    """
+
+    matcher = LevelFuzzyMatcher(make_location_dict())
+
+    def test_edit_distance(self):
+        """
+        Substitution, insertion & transposition each count as one edit
+        """
+        assert edit_distance('ho chi mnh', 'ho chi minh', 2) == 1
+        assert edit_distance('ho chi mihn', 'ho chi minh', 2) == 1
+        assert edit_distance('ha noi', 'ho chi minh', 2) == 3
+
+    def test_misspelled_city(self):
+        """
+        Misspelled city is corrected and removed from the remained address
+        """
+        pattern, remained_address, method, best_pattern =\
+            self.matcher.match('12 le loi ho chi mnh', level=1)
+
+        assert pattern == 'ho chi minh'
+        assert remained_address == '12 le loi'
+        assert method == 'lv1_norm'
+        assert best_pattern == 'Thành phố Hồ Chí Minh'
+
+    def test_pruned_by_parent(self):
+        """
+        Only the wards of the found district & city are matched
+        """
+        _, _, _, best_pattern = self.matcher.match(
+            '12 le loi nguyen an nnh', level=3,
+            parents={1: 'Tỉnh Bình Dương', 2: 'Thành phố Tân Bình'})
+        assert best_pattern == 'Phường Nguyễn An Ninh'
+
+        pattern, _, _, _ = self.matcher.match(
+            '12 le loi nguyen an nnh', level=3,
+            parents={1: 'Thành phố Hà Nội', 2: 'Quận Ba Đình'})
+        assert pattern is None
+
+    def test_no_parent_found(self):
+        """
+        Lower levels are not guessed without any parent level
+        """
+        pattern, remained_address, _, _ = self.matcher.match(
+            '12 le loi nguyen an nnh', level=3)
+
+        assert pattern is None
+        assert remained_address == '12 le loi nguyen an nnh'
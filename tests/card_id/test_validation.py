@@ -2,6 +2,9 @@
 Tests for card id validator
 """
 
+import pandas as pd
+import pyarrow as pa
+
 from preprocessing_pgp.card import (
     validation
 )
@@ -155,3 +158,81 @@ class TestPersonalIDValidator:
         is_valid = validation.PersonalIDValidator.is_valid_card(card_id)
 
         assert is_valid
+
+
+class TestVerifyCardNewColumns:
+    """
+    Class for testing the derived-columns-only output of card verification
+    """
+
+    data = pd.DataFrame(
+        {
+            'card_id': ['079090002002', None, 'abc', '079090002002'],
+            'name': ['a', 'b', 'c', 'd']
+        },
+        index=[7, 3, 3, 1]
+    )
+
+    def test_aligned_to_input_index(self):
+        """
+        Derived columns come back in the input order & index, even duplicated
+        """
+        new_data = validation.verify_card(
+            self.data, print_info=False, return_only_new_columns=True)
+
+        assert new_data.index.tolist() == [7, 3, 3, 1]
+        assert 'card_id' not in new_data.columns
+        assert 'name' not in new_data.columns
+        assert new_data['is_valid'].tolist() == [True, False, False, True]
+
+    def test_flags_are_bool(self):
+        """
+        Validator flags are returned as `bool`
+        """
+        new_data = validation.verify_card(
+            self.data, print_info=False, return_only_new_columns=True)
+
+        for col in ['is_valid', 'is_personal_id', 'is_passport', 'is_driver_license']:
+            assert new_data[col].dtype == bool
+
+
+class TestVerifyCardArrow:
+    """
+    Class for testing card verification on Arrow inputs
+    """
+
+    card_ids = ['079090002002', None, 'abc', ' 079-090 002002 ']
+
+    def test_same_as_pandas(self):
+        """
+        Arrow table gives the same validators as the DataFrame, in the input order
+        """
+        table = pa.table({'card_id': self.card_ids, 'name': ['a', 'b', 'c', 'd']})
+
+        arrow_data = validation.verify_card(table)
+        pandas_data = validation.verify_card(
+            pd.DataFrame({'card_id': self.card_ids}),
+            print_info=False,
+            return_only_new_columns=True
+        )
+
+        assert isinstance(arrow_data, pa.Table)
+        assert arrow_data.column_names == [
+            'card_id', 'name', 'clean_card_id',
+            'is_valid', 'is_personal_id', 'is_passport', 'is_driver_license'
+        ]
+        for col in pandas_data.columns:
+            assert arrow_data[col].to_pylist() ==\
+                pandas_data[col].where(pandas_data[col].notna(), None).tolist()
+
+    def test_chunked_array_input(self):
+        """
+        A single chunked array is processed as the card id column
+        """
+        card_ids = pa.chunked_array([self.card_ids[:2], self.card_ids[2:]])
+
+        arrow_data = validation.verify_card(
+            card_ids, return_only_new_columns=True)
+
+        assert arrow_data['is_valid'].to_pylist() == [True, False, False, True]
+        assert arrow_data['is_valid'].type == pa.bool_()
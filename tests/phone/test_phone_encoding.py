@@ -0,0 +1,94 @@
+"""
+Tests for the uint64 encoding & sorted index of the phones
+"""
+
+import numpy as np
+import pandas as pd
+
+from preprocessing_pgp.phone.encoding import (
+    PhoneIndex,
+    decode_phones,
+    encode_phones,
+    merge_on_phone
+)
+
+
+class TestPhoneEncoding:
+    """
+    Class for testing the packing of the phones into uint64
+    """
+
+    def test_round_trip(self):
+        """
+        Leading zeros & lengths are kept through the encoding
+        """
+        phones = pd.Series(['0912345678', '02838123456', '84912345678', '0'])
+
+        codes = encode_phones(phones)
+
+        assert codes.dtype == np.uint64
+        assert len(set(codes)) == 4
+        assert decode_phones(codes).tolist() == phones.tolist()
+
+    def test_non_encodable(self):
+        """
+        Missing & non-digit phones are encoded as 0 and decoded as None
+        """
+        codes = encode_phones(pd.Series([None, np.nan, '', 'abc', '1' * 16]))
+
+        assert (codes == 0).all()
+        assert decode_phones(codes).isna().all()
+
+
+class TestPhoneIndex:
+    """
+    Class for testing the sorted key -> row index of the phones
+    """
+
+    index_phones = pd.Series(['0912345678', None, '0912345678', '02838123456'])
+    query_phones = pd.Series(['02838123456', '0987654321', None, '0912345678'])
+
+    def test_lookup(self):
+        """
+        Each phone is found at its first source row
+        """
+        phone_index = PhoneIndex.from_phones(self.index_phones)
+
+        assert phone_index.lookup(self.query_phones).tolist() == [3, -1, -1, 0]
+        assert phone_index.contains(self.query_phones).tolist() ==\
+            [True, False, False, True]
+
+    def test_join_duplicates(self):
+        """
+        All the source rows of a duplicated phone are joined
+        """
+        phone_index = PhoneIndex.from_phones(self.index_phones)
+
+        query_positions, index_rows = phone_index.join(self.query_phones)
+
+        assert query_positions.tolist() == [0, 3, 3]
+        assert index_rows.tolist() == [3, 0, 2]
+
+    def test_memory_mapped(self, tmp_path):
+        """
+        The index is saved & loaded back memory-mapped
+        """
+        PhoneIndex.from_phones(self.index_phones).save(str(tmp_path))
+
+        phone_index = PhoneIndex.load(str(tmp_path))
+
+        assert isinstance(phone_index.keys, np.memmap)
+        assert phone_index.lookup(self.query_phones).tolist() == [3, -1, -1, 0]
+
+    def test_merge_on_phone(self):
+        """
+        The merge matches the pandas left merge on valid phones
+        """
+        left = pd.DataFrame({'phone': self.query_phones, 'id': range(4)})
+        right = pd.DataFrame({'phone': self.index_phones, 'is_valid': range(4)})
+        right = right[right['phone'].notna()]
+
+        merged_data = merge_on_phone(left, right)
+        expected_data = left.merge(right, how='left', on='phone')
+
+        pd.testing.assert_frame_equal(merged_data, expected_data)
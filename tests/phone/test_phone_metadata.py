@@ -0,0 +1,52 @@
+"""
+Tests for the vectorized metadata of the phones
+"""
+
+import pandas as pd
+
+from preprocessing_pgp.phone.metadata import PhoneMetadataEngine
+
+
+class TestPhoneMetadata:
+    """
+    Class for testing the type, vendor & tail class of the phones
+    """
+
+    engine = PhoneMetadataEngine(
+        mobile_vendors={'090': 'Mobifone', '091': 'Vinaphone'},
+        landline_regions={'024': 'Hà Nội', '0243': 'Hà Nội (cũ)', '0236': 'Đà Nẵng'}
+    )
+
+    def test_type_vendor(self):
+        """
+        Landlines are matched on their longest prefix before the mobiles
+        """
+        phones = pd.Series(
+            ['0901234567', '02431234567', '02401234567', '02361234567',
+             '0991234567', None],
+            index=range(10, 16)
+        )
+
+        metadata = self.engine.extract(phones)
+
+        assert metadata.index.equals(phones.index)
+        assert metadata['phone_type'].iloc[:4].tolist() ==\
+            ['mobile phone', 'landline', 'landline', 'landline']
+        assert metadata['phone_vendor'].iloc[:4].tolist() ==\
+            ['Mobifone', 'Hà Nội (cũ)', 'Hà Nội', 'Đà Nẵng']
+        assert metadata[['phone_type', 'phone_vendor']].iloc[4].isna().all()
+        assert metadata.iloc[5].isna().all()
+
+    def test_tail_class(self):
+        """
+        Tail classes are given in priority order on the last digits
+        """
+        phones = pd.Series([
+            '0900055555', '0900054444', '0900012333', '0900012345',
+            '0900098765', '0900001000', '0900012000', '1111', '0901'
+        ])
+
+        assert self.engine.extract(phones)['tail_phone_type'].tolist() == [
+            'Ngũ Quý', 'Tứ Quý', 'Tam Hoa', 'Số Tiến',
+            'Số Lùi', 'Tam Hoa', 'Tam Hoa', 'Tứ Quý', 'Số Thường'
+        ]
@@ -0,0 +1,15 @@
+"""
+The scripts of `preprocessing_pgp/pre` import each other as top-level modules
+"""
+
+import os
+import sys
+
+PRE_UTILS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', 'preprocessing_pgp', 'pre', 'utils'
+)
+
+for path in [PRE_UTILS_DIR, os.path.join(PRE_UTILS_DIR, 'email2info')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,153 @@
+"""
+Parity of the one-scan customer type matcher with the per-type str.contains loop
+"""
+
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pytest
+from unidecode import unidecode
+
+from customer_type_matcher import (
+    CTYPE_NAMES,
+    CTYPE_PRIORITY,
+    EXCLUDE_KWS,
+    MIN_WORDS,
+    CustomerTypeMatcher
+)
+
+# lv1 keywords as in the config: accented, 'not at the end' keywords, regex & overlapping keywords
+TYPE_KWS = {
+    'company': ['Công ty', 'cty', 'tnhh', 'cổ phần', 'tập đoàn'],
+    'biz': ['cửa hàng', 'shop', 'đại lý', 'tiệm', 'hkd'],
+    'edu': ['trường', 'đại học(?!$)', 'mầm non', 'học viện', 'th(pt|cs)'],
+    'medical': ['bệnh viện', 'phòng khám', 'nha khoa', 'khoa', 'y tế']
+}
+NAMES = [
+    'Công ty TNHH ABC', 'cong ty co phan xyz', 'Ngân hàng TMCP Công Thương', 'Bệnh viện Đại học Y Dược',
+    'Đại học', 'Trường Đại học Bách Khoa', 'Đại học Bách Khoa Hà Nội', 'Học viện Ngân hàng',
+    'Cửa hàng điện thoại', 'Shop Quần Áo', 'shopee', 'Nguyễn Văn An', 'Trần Thị Khoa', 'Khoa',
+    'Nha Khoa Kim', 'Phòng khám đa khoa', 'Trường THPT Lê Lợi', 'THCS Lê Lợi', 'thpt', 'Mầm non Hoa Sen',
+    'Đại lý vé máy bay', 'Tiệm vàng Kim Thành', 'Bệnh viện Ngân hàng', 'cty tnhh benh vien',
+    'Trung tâm Y tế quận 1', 'Trường mầm non', 'Lê Đại Học', 'tap doan vingroup', 'HKD Nguyễn Văn B',
+    '  Công   ty  ABC ', 'Nguyễn Thị Hà', None, 'Dai hoc dai hoc', 'truong dai hoc'
+]
+
+
+class FakeConfig:
+    """
+    The customer type config, keywords by type
+    """
+
+    def get(self, section, ctype, key):
+        return TYPE_KWS[ctype] if key == 'lv1' else []
+
+
+def run_extract_customer_type(profile, type_name, lv1_kws, name_col='name', exclude_regex=None):
+    """
+    One type of the previous loop: rows matching its keywords (& no exclusion) get the type
+    """
+    profile_opt = profile.copy()
+
+    conditions = profile_opt['{}_en'.format(name_col)].str.contains(
+        '|'.join([unidecode(kw) for kw in lv1_kws]), regex=True, na=False, case=False)
+    if exclude_regex:
+        conditions = conditions & ~profile_opt['{}_en'.format(name_col)].str.contains(
+            exclude_regex, regex=True, na=False, case=False)
+
+    profile = profile[~conditions]
+    profile_opt = profile_opt[conditions]
+    profile_opt['customer_type'] = type_name
+
+    return pd.concat([profile, profile_opt], ignore_index=True)
+
+
+def extract_by_type_loop(names):
+    """
+    The customer type before the matcher: str.contains over the rows left, type after type
+    """
+    profile = pd.DataFrame({'name': names})
+    profile['name_en'] = profile['name'].apply(lambda name: unidecode(
+        unicodedata.normalize('NFKD', ' '.join(name.split()))).lower() if isinstance(name, str) else name)
+    profile['name_len'] = profile['name_en'].apply(
+        lambda name: len(name.split(' ')) if isinstance(name, str) else 0)
+
+    exclude_regexes = {'company': 'benh vien|ngan hang', 'biz': None, 'edu': None, 'medical': None}
+
+    profile_opt = profile.assign(customer_type=None).copy()
+    for ctype in ['company', 'biz', 'edu', 'medical']:
+        exclude_cond = profile_opt['customer_type'].notna()
+        if ctype == 'edu':
+            exclude_cond = exclude_cond | (profile_opt['name_len'] < 4)
+
+        profile_exclude = profile_opt[exclude_cond]
+        profile_opt = profile_opt[~exclude_cond]
+
+        profile_opt = pd.concat([
+            run_extract_customer_type(
+                profile_opt, CTYPE_NAMES[ctype], TYPE_KWS[ctype], exclude_regex=exclude_regexes[ctype]),
+            profile_exclude,
+        ], ignore_index=True)
+
+    return profile_opt[['name', 'name_en', 'name_len', 'customer_type']]
+
+
+@pytest.mark.filterwarnings('ignore:This pattern is interpreted as a regular expression')
+class TestCustomerTypeMatcher:
+    """
+    Class for testing the matcher against the per-type str.contains loop
+    """
+
+    matcher = CustomerTypeMatcher.FromConfig(FakeConfig())
+
+    def test_parity(self):
+        """
+        Same type for every name of the sample
+        """
+        expected = extract_by_type_loop(NAMES)
+        types = self.matcher.MatchMany(expected['name_en'], expected['name_len'])
+
+        assert types == expected['customer_type'].tolist()
+        assert expected['customer_type'].notna().sum() > 20
+
+    def test_special_keywords(self):
+        """
+        'Not at the end' keywords, exclusions, minimum words & overlapping keywords
+        """
+        assert self.matcher.Match('dai hoc') is None
+        assert self.matcher.Match('le dai hoc') is None
+        assert self.matcher.Match('dai hoc bach khoa ha noi') == CTYPE_NAMES['edu']
+        assert self.matcher.Match('dai hoc bach') is None
+        assert self.matcher.Match('cong ty tnhh benh vien') == CTYPE_NAMES['medical']
+        assert self.matcher.Match('nha khoa kim') == CTYPE_NAMES['medical']
+        assert self.matcher.Match('shop cong ty') == CTYPE_NAMES['company']
+        assert self.matcher.Match('truong thcs le loi') == CTYPE_NAMES['edu']
+        assert self.matcher.Match(None) is None
+
+    def test_parity_random(self):
+        """
+        Same type on random word sequences over the keywords & personal names
+        """
+        rng = np.random.default_rng(0)
+        words = ['cong', 'ty', 'cty', 'tnhh', 'co', 'phan', 'shop', 'dai', 'hoc', 'ly', 'truong', 'thpt',
+                 'benh', 'vien', 'ngan', 'hang', 'nha', 'khoa', 'y', 'te', 'mam', 'non', 'an', 'nguyen',
+                 'van', 'tiem', 'hkd', 'thcs', 'hoc vien', 'phong', 'kham']
+        names = [
+            ' '.join(rng.choice(words, size=rng.integers(1, 8)))
+            for _ in range(2000)
+        ]
+
+        expected = extract_by_type_loop(names)
+        types = self.matcher.MatchMany(expected['name_en'], expected['name_len'])
+
+        assert types == expected['customer_type'].tolist()
+
+    def test_exclusion_plain_text(self):
+        with pytest.raises(ValueError):
+            CustomerTypeMatcher(
+                {'company': ['cong ty']}, exclude_kws={'company': ['benh (vien|xa)']})
+
+    def test_priority(self):
+        assert list(TYPE_KWS) == CTYPE_PRIORITY
+        assert set(EXCLUDE_KWS) | set(MIN_WORDS) <= set(CTYPE_PRIORITY)
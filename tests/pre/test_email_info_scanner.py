@@ -0,0 +1,151 @@
+"""
+Parity of the one-pass email info scanner with the extraction one info after the other
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('sklearn')
+
+from email_extract_2021_08_31 import EmailCDP
+from email_info_scanner import KeywordAutomaton
+
+EMAIL_NAMES = [
+    'nguyenvanan1990', 'nguyen.van.an1990', 'tranthilan_2205199', 'lehung12031985',
+    'minh0912345678', 'tuan84912345678na', 'lan.hanoi', 'hanoi_lan', 'hcm.boy', 'ngheanquangnam',
+    'quangngai2k', 'abc2580', 'vananh98', 'thuy.3.5.97', 'hoang_0387654321_hn', 'ba.dinh.1975',
+    'phamminhtuan', 'tuannguyen', 'anh_nguyen_van', 'lan', 'x', '1990', '84357123456', 'na.na',
+    'dienchau_na', 'hanoiquangnam12', 'hochiminh200305', 'qn_qng', 'thi.thuy.ngan', 'vo2001'
+]
+
+
+@pytest.fixture(scope='module')
+def email_cdp(tmp_path_factory):
+    """
+    EmailCDP built on small name, location & group dictionaries
+    """
+    dict_dir = tmp_path_factory.mktemp('email_dict')
+    paths = {
+        'lastname_json': str(dict_dir / 'vn_name_db.json'),
+        'boy_name_db': str(dict_dir / 'bnames_db.txt'),
+        'girl_name_db': str(dict_dir / 'gnames_db.txt'),
+        'loc_vn_dict': str(dict_dir / 'dvhc_dict.parquet'),
+        'group_dict': str(dict_dir / 'email_group_dict.parquet')
+    }
+    with open(paths['lastname_json'], 'w', encoding='utf-8') as file:
+        json.dump([{'last_name_group': name} for name in ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Võ']], file)
+    pd.Series(['Văn An', 'Mạnh Hùng', 'Quang Minh', 'Anh Tuấn', 'Minh Hoàng']).to_csv(paths['boy_name_db'], header=False, index=False)
+    pd.Series(['Thị Lan', 'Thu Thủy', 'Kim Ngân', 'Vân Anh']).to_csv(paths['girl_name_db'], header=False, index=False)
+    pd.DataFrame({
+        'DVHC_LV1_NORM': ['Thanh pho Ha Noi', 'Tinh Nghe An', 'Thanh pho Ho Chi Minh', 'Tinh Quang Nam', 'Tinh Quang Ngai'],
+        'DVHC_LV2_NORM': ['Quan Ba Dinh', 'Huyen Dien Chau', 'Quan 1', 'Huyen Duy Xuyen', 'Huyen Son Tinh']
+    }).to_parquet(paths['loc_vn_dict'])
+    pd.DataFrame({
+        'Domain': ['gmail.com', 'fpt.com.vn'],
+        'EmailGroup': ['personal', 'company']
+    }).to_parquet(paths['group_dict'])
+
+    config_path = str(dict_dir / 'config_path.json')
+    with open(config_path, 'w', encoding='utf-8') as file:
+        json.dump({'ref_dir': [{'name': name, 'dir': path} for name, path in paths.items()]}, file)
+
+    email_cdp = EmailCDP(config_path)
+    email_cdp.create_dict_for_extraction()
+
+    return email_cdp
+
+
+def make_emails():
+    """
+    Emails of the sample names, with repeated names on other domains
+    """
+    domains = ['gmail.com', 'fpt.com.vn', 'yahoo.com']
+    names = EMAIL_NAMES + EMAIL_NAMES[:10]
+    emails = [
+        f'{name}_autoemail@{domains[i % 3]}' if i % 11 == 5 else f'{name}@{domains[i % 3]}'
+        for i, name in enumerate(names)
+    ]
+
+    return pd.DataFrame({
+        'key': range(len(names)),
+        'email': emails,
+        'email_name': [email.split('@')[0] for email in emails]
+    })
+
+
+def extract_one_by_one(email_cdp, df, information_list):
+    """
+    The extraction before the scanner: each info extracted on the frame & merged on the key
+    """
+    df_info_full = df.copy()
+    for info in information_list:
+        df_info = email_cdp.info_list[info](df.copy(), 'email', 'email_name', 'key')
+        df_info_full = pd.merge(df_info_full.drop(columns=['email', 'email_name']), df_info, on=['key'], how='left')
+
+    return df_info_full
+
+
+class TestEmailInfoScanner:
+    """
+    Class for testing the scanner against the extractors of each info
+    """
+
+    @pytest.mark.parametrize('information_list', [
+        ['yob'],
+        ['phone'],
+        ['address'],
+        ['yob', 'phone', 'address'],
+        ['username', 'yob', 'phone', 'address', 'group', 'automail'],
+        ['automail', 'address', 'username', 'group']
+    ])
+    def test_parity(self, email_cdp, information_list):
+        """
+        Same frame as the extraction one info after the other
+        """
+        df = make_emails()
+
+        expected = extract_one_by_one(email_cdp, df, information_list)
+        scanned = email_cdp.extract_information(df.copy(), information_list)
+
+        assert email_cdp.scanner is not None
+        pd.testing.assert_frame_equal(scanned, expected, check_dtype=False)
+
+    def test_empty_information_list(self, email_cdp):
+        """
+        Nothing asked gives back the frame as it is
+        """
+        df = make_emails()
+
+        pd.testing.assert_frame_equal(email_cdp.extract_information(df, []), df)
+
+    def test_found_info(self, email_cdp):
+        """
+        The sample finds years of birth, phones & addresses
+        """
+        scanned = email_cdp.extract_information(make_emails(), ['yob', 'phone', 'address'])
+
+        assert scanned['year_of_birth'].notna().sum() >= 5
+        assert scanned['phone'].notna().sum() >= 3
+        assert scanned['address'].notna().sum() >= 5
+
+
+class TestKeywordAutomaton:
+    """
+    Class for testing the keyword automaton against the lookahead alternation
+    """
+
+    def test_first_match(self):
+        """
+        Leftmost keyword followed by a word boundary, first listed one on ties
+        """
+        keywords = ['hanoi', 'ha', 'noi', 'na', 'nghean', 'an']
+        automaton = KeywordAutomaton(keywords)
+        pattern = '(?=(' + '\\b|'.join(keywords) + '\\b))'
+
+        for text in ['hanoi', 'xhanoi_na', 'ngheanha', 'ha_noi', 'nothing', 'an.ha', '', 'na9', 'ha ']:
+            matches = pd.Series([text]).str.extractall(pattern)
+            expected = matches[0].iloc[0] if matches.shape[0] > 0 else None
+
+            assert automaton.first_match(text) == expected
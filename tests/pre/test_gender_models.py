@@ -0,0 +1,102 @@
+"""
+Tests for the gender model registry & the folding of the NBSVM classifiers
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+import gender_models
+
+NAMES = [
+    'nguyen van an', 'tran van hung', 'le minh tuan', 'pham duc manh', 'hoang van nam', 'vo quang huy',
+    'nguyen thi lan', 'tran thi thuy', 'le thi ngan', 'pham thu trang', 'hoang thi mai', 'vo ngoc anh',
+    'do van long', 'bui thi hoa', 'dang minh duc', 'ngo thi huong', 'duong van tai', 'ly thu ha'
+]
+GENDERS = np.array([1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 1, 0])
+TEST_NAMES = ['nguyen van minh', 'tran thi ngoc', 'le duc', 'thu', 'an thi', 'zz']
+
+
+@pytest.fixture
+def nbsvm_pipeline():
+    """
+    TF-IDF & NBSVM pipeline fitted on a toy corpus
+    """
+    pytest.importorskip('sklearn')
+    pytest.importorskip('imblearn')
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+
+    from nbsvm_gender import NBSVMClassifier
+
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(analyzer='char_wb', ngram_range=(1, 3))),
+        ('nbsvm', NBSVMClassifier(C=4, max_iter=1000))
+    ]).fit(NAMES, GENDERS)
+
+
+class TestFoldModel:
+    """
+    Class for testing the NBSVM folded into a logistic regression
+    """
+
+    def test_same_predictions(self, nbsvm_pipeline):
+        """
+        The folded model predicts the same classes & probabilities
+        """
+        folded_model = gender_models.FoldModel(nbsvm_pipeline)
+
+        assert type(folded_model.steps[-1][1]).__name__ == 'LogisticRegression'
+        assert (folded_model.predict(TEST_NAMES) == nbsvm_pipeline.predict(TEST_NAMES)).all()
+        np.testing.assert_allclose(
+            folded_model.predict_proba(TEST_NAMES),
+            nbsvm_pipeline.predict_proba(TEST_NAMES)
+        )
+
+    def test_pipeline_untouched(self, nbsvm_pipeline):
+        """
+        The pipeline given is not modified by the folding
+        """
+        nbsvm = nbsvm_pipeline.steps[-1][1]
+
+        folded_model = gender_models.FoldModel(nbsvm_pipeline)
+
+        assert nbsvm_pipeline.steps[-1][1] is nbsvm
+        assert folded_model.steps[0][1] is nbsvm_pipeline.steps[0][1]
+        assert type(gender_models.FoldModel(nbsvm)).__name__ == 'LogisticRegression'
+
+
+class TestLoadModel:
+    """
+    Class for testing the models loaded once per process
+    """
+
+    @pytest.fixture(autouse=True)
+    def clear_models(self):
+        gender_models.ClearModels()
+        yield
+        gender_models.ClearModels()
+
+    def test_loaded_once(self, tmp_path):
+        """
+        Each model is read once, later loads give back the same object
+        """
+        paths = [str(tmp_path / 'accented.pkl'), str(tmp_path / 'non_accented.pkl')]
+        for i, path in enumerate(paths):
+            with open(path, 'wb') as file:
+                pickle.dump({'model': i}, file)
+
+        read_paths = []
+
+        def opener(path):
+            read_paths.append(path)
+            return gender_models.ReadLocalFile(path)
+
+        models = [gender_models.LoadModel(path, opener=opener) for path in paths * 3]
+
+        assert read_paths == paths
+        assert models[0] is models[2] is models[4]
+        assert models[1] == {'model': 1}
+        assert gender_models.LoadModel(paths[0], opener=opener, fold=False) == {'model': 0}
+        assert len(read_paths) == 3
@@ -0,0 +1,98 @@
+"""
+Parity of the trie segmenter with the dynamic programming over substrings
+"""
+
+from math import log
+
+import numpy as np
+import pandas as pd
+
+from name_segmenter import NameSegmenter
+
+NAMES = [
+    'nguyen', 'tran', 'le', 'pham', 'hoang', 'vo', 'van', 'thi', 'an', 'anh', 'vananh', 'lan',
+    'hung', 'manhhung', 'minh', 'tuan', 'anhtuan', 'thuy', 'ngan', 'kim', 'kimngan', 'ha', 'hai',
+    'h', 'a', 'n', 'ng', 'nguy', 'en', 'oang', 'tu'
+]
+EMAIL_NAMES = [
+    'nguyenvananh', 'tranthilan', 'lehung1990', 'phamminhtuan', 'hoanganhtuan', 'vokimngan',
+    'nguyen_van_an', 'anhnguyen', 'hahaha', 'zzz', '', 'x1y2', 'thuyngan', 'ng', 'tuananhtuan',
+    'lannguyenvananhhung', 'hoangthikimnganh', 'nguyenn', 'minhminh', 'a.b.c'
+]
+
+
+def make_wordcost(names):
+    """
+    Zipf costs of the names, as built by Email2Username
+    """
+    return dict((k, log((i+1)*log(len(names)))) for i, k in enumerate(names))
+
+
+def segment_by_substrings(s, wordcost):
+    """
+    The segmentation before the trie: best match of every prefix over its substrings
+    """
+    maxword = max(len(x) for x in wordcost)
+
+    def best_match(i):
+        candidates = enumerate(reversed(cost[max(0, i-maxword):i]))
+        return min((c + wordcost.get(s[i-k-1:i], 9e999), k+1) for k, c in candidates)
+
+    cost = [0]
+    for i in range(1, len(s)+1):
+        c, k = best_match(i)
+        cost.append(c)
+
+    out = []
+    i = len(s)
+    while i > 0:
+        c, k = best_match(i)
+        assert c == cost[i]
+        out.append(s[i-k:i])
+        i -= k
+
+    return " ".join(reversed(out))
+
+
+class TestNameSegmenter:
+    """
+    Class for testing the segmentation against the substring dynamic programming
+    """
+
+    wordcost = make_wordcost(NAMES)
+
+    def test_parity(self):
+        """
+        Same segmentation on the sample, ties & uncovered characters included
+        """
+        segmenter = NameSegmenter(self.wordcost)
+
+        for s in EMAIL_NAMES:
+            assert segmenter.segment(s) == segment_by_substrings(s, self.wordcost)
+
+    def test_parity_random(self):
+        """
+        Same segmentation on random concatenations of names & noise
+        """
+        rng = np.random.default_rng(0)
+        segmenter = NameSegmenter(self.wordcost)
+        pieces = NAMES + ['x', '1', '_', 'q']
+
+        for _ in range(300):
+            s = ''.join(rng.choice(pieces, size=rng.integers(1, 6)))
+            assert segmenter.segment(s) == segment_by_substrings(s, self.wordcost)
+
+    def test_segment_many(self):
+        """
+        The batch keeps the index & nulls, each unique string is segmented once
+        """
+        segmenter = NameSegmenter(self.wordcost, max_cache_size=5)
+        strings = pd.Series(EMAIL_NAMES + [None] + EMAIL_NAMES[:3], index=range(100, 124))
+
+        segmented = segmenter.segment_many(strings)
+
+        assert segmented.index.tolist() == strings.index.tolist()
+        assert segmented.isna().tolist() == strings.isna().tolist()
+        assert segmented.dropna().tolist() ==\
+            [segment_by_substrings(s, self.wordcost) for s in strings.dropna()]
+        assert len(segmenter.cache) <= 5
@@ -0,0 +1,162 @@
+"""
+Parity of the vectorized phone metadata with the string rules of MetaDataPhone
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from phone_metadata import PhoneMetadata
+
+# head-code tables as read by MetaDataPhone: '0' + NewSubPhone, MaVung
+MOBILE_VENDORS = {
+    **dict.fromkeys(['086', '096', '097', '098', '032', '033', '034', '035', '036', '037', '038', '039'], 'Viettel'),
+    **dict.fromkeys(['090', '093', '070', '076', '077', '078', '079', '089'], 'Mobifone'),
+    **dict.fromkeys(['091', '094', '081', '082', '083', '084', '085', '088'], 'Vinaphone'),
+    **dict.fromkeys(['092', '056', '058'], 'Vietnamobile'),
+    **dict.fromkeys(['099', '059'], 'Gmobile')
+}
+LANDLINE_REGIONS = {
+    '0203': 'Quảng Ninh', '0204': 'Bắc Giang', '0236': 'Đà Nẵng', '0251': 'Đồng Nai', '0292': 'Cần Thơ',
+    '0222': 'Bắc Ninh', '0220': 'Hải Dương', '0225': 'Hải Phòng', '0274': 'Bình Dương', '0296': 'An Giang'
+}
+# older MaVung table: codes of 3 digits beside the codes of 4 digits
+OLD_LANDLINE_REGIONS = {**LANDLINE_REGIONS, '028': 'Thành phố Hồ Chí Minh', '061': 'Đồng Nai', '064': 'Vũng Tàu'}
+
+PHONES = [
+    '02439998888', '02412345678', '02838221234', '02873004321', '02363822222', '02513456789', '0203111',
+    '0912345678', '0987654321', '0901234567', '0888888888', '0569999999', '0991230000', '0321234567',
+    '0613822123', '0643852000', '0123456789', '0199999999', '0271234567', '028', '02', '0', '1900',
+    None, '0937654321', '0977777777', '0703210987'
+]
+
+
+def metadata_by_strings(valid_phone, subphone_vn, df_subtele_vn):
+    """
+    Phone type, vendor & tail class by the string rules of MetaDataPhone before the vectorized pass
+    """
+    valid_phone = valid_phone.copy()
+    valid_phone['phone_type'] = None
+
+    # phone_type
+    valid_phone.loc[valid_phone['phone'].str[:3] == '024', 'phone_type'] = 'landline'
+    valid_phone.loc[valid_phone['phone'].str[:3].isin(df_subtele_vn['sub_phone'].unique()), 'phone_type'] = 'landline'
+    valid_phone.loc[valid_phone['phone'].str[:3].isin(subphone_vn['sub_phone'].unique()) &
+                    valid_phone['phone_type'].isna(), 'phone_type'] = 'mobile phone'
+
+    # add vender
+    valid_phone_landline = valid_phone[valid_phone['phone_type'] == 'landline'].copy()
+    valid_phone_mobile = valid_phone[valid_phone['phone_type'] == 'mobile phone'].copy()
+    valid_phone_none = valid_phone[valid_phone['phone_type'].isna()].copy()
+
+    valid_phone_landline['sub_phone'] = valid_phone_landline['phone'].str[:4].astype(str)
+    valid_phone_landline = valid_phone_landline.merge(df_subtele_vn, how='left', on=['sub_phone'])
+    valid_phone_landline.loc[(valid_phone_landline['phone'].str[:3] == '024') &
+                             valid_phone_landline['phone_vendor'].isna(), 'phone_vendor'] = 'Hà Nội'
+    valid_phone_landline.loc[(valid_phone_landline['phone'].str[:3] == '028') &
+                             valid_phone_landline['phone_vendor'].isna(), 'phone_vendor'] = 'Thành phố Hồ Chí Minh'
+
+    valid_phone_mobile['sub_phone'] = valid_phone_mobile['phone'].str[:3]
+    valid_phone_mobile = valid_phone_mobile.merge(subphone_vn, how='left', on=['sub_phone'])
+
+    valid_phone = pd.concat([valid_phone_landline, valid_phone_mobile, valid_phone_none], ignore_index=True)
+    valid_phone = valid_phone.drop(columns=['sub_phone'])
+
+    # beauty phone
+    dict_beauty_phone = {
+        'Ngũ Quý': ['00000', '11111', '22222', '33333', '44444', '55555', '66666', '77777', '88888', '99999'],
+        'Tứ Quý': ['0000', '1111', '2222', '3333', '4444', '5555', '6666', '7777', '8888', '9999'],
+        'Tam Hoa': ['000', '111', '222', '333', '444', '555', '666', '777', '888', '999'],
+        'Số Tiến': ['0123', '1234', '2345', '3456', '4567', '5678', '6789'],
+        'Số Lùi': ['3210', '4321', '5432', '6543', '7654', '8765', '9876']
+    }
+
+    valid_phone['tail_phone_type'] = None
+    for name_case, format_case in dict_beauty_phone.items():
+        size_case = len(format_case[0])
+        valid_phone.loc[valid_phone['tail_phone_type'].isna() &
+                        valid_phone['phone'].str[-size_case:].isin(format_case), 'tail_phone_type'] = name_case
+
+    valid_phone.loc[valid_phone['tail_phone_type'].isna() & valid_phone['phone'].notna(), 'tail_phone_type'] = 'Số Thường'
+
+    return valid_phone
+
+
+def metadata_by_arrays(valid_phone, mobile_vendors, landline_regions):
+    """
+    Phone type, vendor & tail class as MetaDataPhone assigns them now
+    """
+    valid_phone = valid_phone.copy()
+    metadata = PhoneMetadata(valid_phone['phone'], mobile_vendors, landline_regions)
+    for col in metadata.columns:
+        valid_phone[col] = metadata[col].astype(object).where(metadata[col].notna(), None)
+
+    return valid_phone
+
+
+def head_tables(mobile_vendors, landline_regions):
+    subphone_vn = pd.DataFrame(list(mobile_vendors.items()), columns=['sub_phone', 'phone_vendor'])
+    df_subtele_vn = pd.DataFrame(list(landline_regions.items()), columns=['sub_phone', 'phone_vendor'])
+    return subphone_vn, df_subtele_vn
+
+
+def assert_same_metadata(phones, mobile_vendors, landline_regions):
+    valid_phone = pd.DataFrame({'uid': range(len(phones)), 'phone': phones})
+
+    expected = metadata_by_strings(valid_phone, *head_tables(mobile_vendors, landline_regions))
+    result = metadata_by_arrays(valid_phone, mobile_vendors, landline_regions)
+
+    # the string rules reorder the rows
+    expected = expected.sort_values('uid').set_index('uid')
+    result = result.set_index('uid')
+    columns = ['phone', 'phone_type', 'phone_vendor', 'tail_phone_type']
+    expected = expected[columns].astype(object).where(expected[columns].notna(), None)
+    pd.testing.assert_frame_equal(result[columns], expected)
+
+
+class TestPhoneMetadata:
+    """
+    Class for testing the vectorized phone metadata against the string rules
+    """
+
+    @pytest.mark.parametrize('landline_regions', [LANDLINE_REGIONS, OLD_LANDLINE_REGIONS],
+                             ids=['4-digit-codes', 'with-3-digit-codes'])
+    def test_same_as_string_rules(self, landline_regions):
+        """
+        Test the type, vendor and tail class of known, unknown, short and missing phones
+        """
+        assert_same_metadata(PHONES, MOBILE_VENDORS, landline_regions)
+
+    @pytest.mark.parametrize('landline_regions', [LANDLINE_REGIONS, OLD_LANDLINE_REGIONS],
+                             ids=['4-digit-codes', 'with-3-digit-codes'])
+    def test_same_as_string_rules_random(self, landline_regions):
+        """
+        Test random phones drawn around the head codes of the tables
+        """
+        rng = np.random.default_rng(47)
+        heads = [*MOBILE_VENDORS, *landline_regions, '024', '028', '012', '0', '']
+        phones = [head + ''.join(rng.choice(list('0123456789'), size=rng.integers(0, 9)))
+                  for head in rng.choice(heads, size=2000)]
+        phones = [phone if phone else None for phone in phones]
+
+        assert_same_metadata(phones, MOBILE_VENDORS, landline_regions)
+
+    def test_028_without_code(self):
+        """
+        Test 028 numbers stay untyped when no table has a code for them
+        """
+        valid_phone = pd.DataFrame({'uid': [0, 1], 'phone': ['02838221234', '02412345678']})
+        result = metadata_by_arrays(valid_phone, MOBILE_VENDORS, LANDLINE_REGIONS)
+
+        assert result['phone_type'].tolist() == [None, 'landline']
+        assert result['phone_vendor'].tolist() == [None, 'Hà Nội']
+
+    def test_028_with_code(self):
+        """
+        Test 028 numbers are landlines when the table has their code, the region from the 4 first digits only
+        """
+        valid_phone = pd.DataFrame({'uid': [0], 'phone': ['02838221234']})
+        result = metadata_by_arrays(valid_phone, MOBILE_VENDORS, {**LANDLINE_REGIONS, '028': 'TP HCM'})
+
+        assert result['phone_type'].tolist() == ['landline']
+        assert result['phone_vendor'].tolist() == ['Thành phố Hồ Chí Minh']
@@ -0,0 +1,141 @@
+"""
+Tests for the row fingerprints & the differencing of the daily snapshots
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from profile_diff import (
+    FINGERPRINT_COL,
+    INFO_COLUMNS_KEY,
+    DifferenceFingerprint,
+    DifferenceProfile,
+    FingerprintProfile,
+    LoadFingerprint,
+    SaveFingerprint
+)
+
+INFO_COLUMNS = ['uid', 'name', 'score']
+
+
+class TestFingerprintProfile:
+    """
+    Class for testing the hash of the profile rows
+    """
+
+    def test_big_ids(self):
+        """
+        Integer ids above 2 ** 53 keep distinct fingerprints
+        """
+        profile = pd.DataFrame({
+            'uid': np.array([2 ** 53, 2 ** 53 + 1, 2 ** 62 + 1, 2 ** 62], dtype=np.int64),
+            'name': 'a',
+            'score': 1.5
+        })
+
+        assert len(set(FingerprintProfile(profile, INFO_COLUMNS))) == 4
+
+    def test_nulls_in_batch(self):
+        """
+        A row hashes the same in a batch read as integers or as floats (batch with nulls)
+        """
+        int_batch = pd.DataFrame({'uid': [7, 8], 'name': ['a', 'b'], 'score': [1.5, 2.0]})
+        float_batch = pd.DataFrame({'uid': [7.0, np.nan], 'name': ['a', 'b'], 'score': [1.5, 2.0]})
+        nullable_batch = int_batch.astype({'uid': 'Int64'})
+
+        int_fingerprints = FingerprintProfile(int_batch, INFO_COLUMNS)
+        float_fingerprints = FingerprintProfile(float_batch, INFO_COLUMNS)
+
+        assert int_fingerprints[0] == float_fingerprints[0]
+        assert int_fingerprints[1] != float_fingerprints[1]
+        assert (FingerprintProfile(nullable_batch, INFO_COLUMNS) == int_fingerprints).all()
+
+    def test_numbers_by_value(self):
+        """
+        Fractions, infinities & nulls are told apart from the integers
+        """
+        profile = pd.DataFrame({
+            'uid': [7.0, 7.5, np.inf, -np.inf, np.nan, 0.0],
+            'name': 'a',
+            'score': 1.0
+        })
+
+        assert len(set(FingerprintProfile(profile, INFO_COLUMNS))) == 6
+
+    def test_column_order(self):
+        """
+        The row hash follows the order of the info columns, not the index
+        """
+        profile = pd.DataFrame({'uid': [1], 'name': ['1'], 'score': [1.0]})
+        shifted_profile = profile.set_axis([10])
+
+        assert FingerprintProfile(profile, INFO_COLUMNS) !=\
+            FingerprintProfile(profile, ['name', 'uid', 'score'])
+        assert FingerprintProfile(profile, INFO_COLUMNS) ==\
+            FingerprintProfile(shifted_profile, INFO_COLUMNS)
+
+
+class TestDifference:
+    """
+    Class for testing the differencing & the sidecar of the fingerprints
+    """
+
+    @pytest.mark.parametrize('method', ['hash', 'sort'])
+    def test_difference(self, method):
+        """
+        Only the rows changed or new since yesterday are kept
+        """
+        yesterday = pd.DataFrame({'uid': [1, 2, 3], 'name': ['a', 'b', 'c'], 'score': [1.0, 2.0, 3.0]})
+        now = pd.DataFrame({'uid': [1, 2, 4], 'name': ['a', 'x', 'd'], 'score': [1.0, 2.0, np.nan]})
+        yesterday_fingerprints = np.unique(FingerprintProfile(yesterday, INFO_COLUMNS))
+
+        difference = DifferenceProfile(now, yesterday_fingerprints, info_columns=INFO_COLUMNS, method=method)
+
+        assert difference['uid'].tolist() == [2, 4]
+        assert DifferenceFingerprint(
+            FingerprintProfile(now, INFO_COLUMNS), np.array([], dtype=np.uint64), method=method
+        ).all()
+
+    def test_methods_agree(self):
+        """
+        The hash & sort-merge differencing give the same mask
+        """
+        rng = np.random.default_rng(0)
+        now_fingerprints = rng.integers(0, 1000, 5000).astype(np.uint64)
+        yesterday_fingerprints = np.unique(rng.integers(0, 1000, 800).astype(np.uint64))
+
+        is_new = DifferenceFingerprint(now_fingerprints, yesterday_fingerprints, method='hash')
+
+        assert (is_new == DifferenceFingerprint(now_fingerprints, yesterday_fingerprints, method='sort')).all()
+        assert (is_new == ~np.isin(now_fingerprints, yesterday_fingerprints)).all()
+        with pytest.raises(ValueError):
+            DifferenceFingerprint(now_fingerprints, yesterday_fingerprints, method='merge')
+
+    def test_save_load(self, tmp_path):
+        """
+        The sidecar is read back sorted & unique, only for the same info columns
+        """
+        path = str(tmp_path / 'fingerprint' / 'd=2023-01-01.parquet')
+        fingerprints = np.array([5, 3, 5, 2 ** 64 - 1], dtype=np.uint64)
+
+        SaveFingerprint(fingerprints, path, INFO_COLUMNS)
+
+        assert LoadFingerprint(path, INFO_COLUMNS).tolist() == [3, 5, 2 ** 64 - 1]
+        assert LoadFingerprint(path, ['uid', 'name']) is None
+        assert LoadFingerprint(str(tmp_path / 'missing.parquet'), INFO_COLUMNS) is None
+
+    def test_load_old_version(self, tmp_path):
+        """
+        A sidecar of the float64 hashes (no version) is not reused
+        """
+        path = str(tmp_path / 'd=2023-01-01.parquet')
+        table = pa.table({FINGERPRINT_COL: pa.array([1, 2], type=pa.uint64())})
+        pq.write_table(
+            table.replace_schema_metadata({INFO_COLUMNS_KEY: '["uid", "name", "score"]'}),
+            path
+        )
+
+        assert LoadFingerprint(path, INFO_COLUMNS) is None
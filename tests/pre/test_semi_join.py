@@ -0,0 +1,136 @@
+"""
+Tests for the semi-join of the parquet sources with a set of keys
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+import semi_join
+from semi_join import HashKeys, KeyFilter, ScanSemiJoin
+
+N_KEYS = 20000
+
+
+def make_keys(n_keys, prefix='09', seed=0):
+    """
+    Distinct phone-like keys
+    """
+    rng = np.random.default_rng(seed)
+    numbers = rng.choice(10 ** 8, size=n_keys, replace=False)
+
+    return pd.Series([f'{prefix}{number:08d}' for number in numbers])
+
+
+class TestKeyFilter:
+    """
+    Class for testing the membership of the key filter against `isin`
+    """
+
+    keys = make_keys(N_KEYS)
+    # half of the values are keys, with repeats, nulls & empty strings
+    values = pd.concat([
+        keys.sample(5000, replace=True, random_state=1),
+        make_keys(5000, prefix='08', seed=2),
+        pd.Series([None, '', '09', keys[0] + ' '])
+    ], ignore_index=True)
+
+    @pytest.mark.parametrize('method', ['bloom', 'sorted'])
+    def test_contains(self, method):
+        """
+        Exact membership, same as `isin` on the keys
+        """
+        key_filter = KeyFilter(pd.concat([self.keys, pd.Series([None])]), method=method)
+
+        assert len(key_filter) == N_KEYS
+        assert (key_filter.Contains(self.values) ==
+                self.values.isin(self.keys).to_numpy()).all()
+
+    @pytest.mark.parametrize('method', ['bloom', 'sorted'])
+    def test_may_contain(self, method):
+        """
+        The prefilter never misses a key & lets through few other values
+        """
+        key_filter = KeyFilter(self.keys, method=method)
+        other_values = make_keys(N_KEYS, prefix='08', seed=3)
+
+        assert key_filter.MayContain(self.keys).all()
+        # ~1% false positives expected at 10 bits per key & 7 hashes
+        assert key_filter.MayContain(other_values).mean() < 0.03
+
+    def test_collisions(self, monkeypatch):
+        """
+        Distinct keys of the same hash are still told apart
+        """
+        monkeypatch.setattr(semi_join, 'HashKeys', lambda values: HashKeys(values) & np.uint64(7))
+        key_filter = KeyFilter(self.keys.head(50))
+
+        assert (key_filter.Contains(self.values) ==
+                self.values.isin(self.keys.head(50)).to_numpy()).all()
+
+    def test_arrow_input(self):
+        """
+        Arrow chunked & dictionary arrays are read as strings
+        """
+        key_filter = KeyFilter(pa.chunked_array([self.keys[:10].tolist(), self.keys[10:20].tolist()]))
+        values = pa.array(self.values.head(100).tolist()).dictionary_encode()
+
+        assert (key_filter.Contains(values) ==
+                self.values.head(100).isin(self.keys[:20]).to_numpy()).all()
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            KeyFilter(self.keys, method='hash')
+
+
+class TestScanSemiJoin:
+    """
+    Class for testing the scan of a parquet source against a pandas `isin` filter
+    """
+
+    data = pd.DataFrame({
+        'phone': make_keys(3000, seed=4).where(lambda phones: phones.index % 7 != 0),
+        'source': ['fo', 'fplay', 'sendo'] * 1000,
+        'n_orders': np.arange(3000)
+    })
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = str(tmp_path / 'raw.parquet')
+        self.data.to_parquet(path, row_group_size=700)
+        return path
+
+    def test_scan(self, path):
+        """
+        Same rows as `isin` on the whole source, whatever the batch size
+        """
+        keys = pd.concat([self.data['phone'].dropna().sample(500, random_state=5), make_keys(100, prefix='08')])
+        expected = self.data[self.data['phone'].isin(keys)]
+
+        result = ScanSemiJoin(path, 'phone', KeyFilter(keys), columns=['n_orders'], batch_rows=256)
+
+        assert result.columns.tolist() == ['phone', 'n_orders']
+        assert sorted(result['n_orders']) == sorted(expected['n_orders'])
+
+    def test_filter(self, path):
+        """
+        The pushed down filter applies before the semi-join
+        """
+        keys = self.data['phone'].dropna()
+        expected = self.data[self.data['phone'].isin(keys) & (self.data['source'] == 'fo')]
+
+        result = ScanSemiJoin(path, 'phone', KeyFilter(keys), filter=ds.field('source') == 'fo')
+
+        assert result.shape == expected.shape
+        assert sorted(result['n_orders']) == sorted(expected['n_orders'])
+
+    def test_no_match(self, path):
+        """
+        An empty result keeps the columns of the source
+        """
+        result = ScanSemiJoin(path, 'phone', KeyFilter(make_keys(10, prefix='08')), columns=['source'])
+
+        assert result.shape == (0, 2)
+        assert result.columns.tolist() == ['phone', 'source']
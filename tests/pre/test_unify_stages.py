@@ -0,0 +1,149 @@
+"""
+Tests for the stages of the unify engine without I/O: final columns & batches
+"""
+
+import pandas as pd
+import pyarrow as pa
+
+from unify_stages import (
+    FinalizeProfile,
+    LatestBatches,
+    LatestRowPositions,
+    LoadTables,
+    MergeSchemas,
+    RunHook,
+    UnifyBatches
+)
+
+SPEC = {
+    'f_group': 'ftel',
+    'id_column': 'contract_ftel',
+    'latest_by': ['last_active'],
+    'unify_columns': ['contract_ftel', 'phone', 'name', 'gender', 'customer_type'],
+    'empty_columns': ['gender'],
+    'phone_key_column': 'contract_phone_ftel',
+    'batch_rows': 2
+}
+
+
+def make_profile():
+    """
+    Raw profile: 2 rows of contract A, the latest one last
+    """
+    return pd.DataFrame({
+        'contract_ftel': ['A', 'B', 'A', 'C', 'D'],
+        'phone': ['0912345678', None, '0987654321', '0901111111', '0902222222'],
+        'name': ['An', 'Binh', 'An Nguyen', None, 'Cong ty ABC'],
+        'gender': ['M', 'F', 'M', None, None],
+        'customer_type': [None, None, None, None, 'Cong ty'],
+        'last_active': ['2023-01-01', '2023-01-03', '2023-01-05', '2023-01-02', '2023-01-04']
+    })
+
+
+def unify_batch(batch, spec=SPEC, hooks=None, n_calls=None):
+    """
+    Stand-in for UnifyProfile: the hooks then the final columns
+    """
+    if n_calls is not None:
+        n_calls.append(batch.shape[0])
+    batch = RunHook(batch, spec, hooks or {}, 'location')
+
+    return FinalizeProfile(batch, spec)
+
+
+class TestUnifyStages:
+    """
+    Class for testing the column mapping & the concatenation of the batches
+    """
+
+    def test_finalize_profile(self):
+        """
+        Final columns in the spec order, empty columns, 'Ca nhan' & phone key
+        """
+        profile = make_profile().drop(columns=['last_active'])
+        profile['extra'] = 1
+
+        result = FinalizeProfile(profile, SPEC)
+
+        assert result.columns.tolist() == SPEC['unify_columns'] + ['contract_phone_ftel']
+        assert result['gender'].isna().all()
+        assert result['customer_type'].tolist() ==\
+            ['Ca nhan', 'Ca nhan', 'Ca nhan', None, 'Cong ty']
+        assert result['contract_phone_ftel'].tolist() ==\
+            ['A-0912345678', 'B', 'A-0987654321', 'C-0901111111', 'D-0902222222']
+
+    def test_unify_batches(self):
+        """
+        The batches of the latest rows are concatenated in order
+        """
+        n_calls = []
+
+        result = UnifyBatches(make_profile(), SPEC, lambda batch: unify_batch(batch, n_calls=n_calls))
+
+        assert n_calls == [2, 2]
+        assert result.index.tolist() == [0, 1, 2, 3]
+        assert result.columns.tolist() == SPEC['unify_columns'] + ['contract_phone_ftel']
+        assert sorted(result['contract_ftel']) == ['A', 'B', 'C', 'D']
+        assert result.set_index('contract_ftel').loc['A', 'phone'] == '0987654321'
+
+    def test_unify_batches_empty(self):
+        """
+        No batch: the final columns without rows
+        """
+        result = UnifyBatches(make_profile().iloc[:0], SPEC, unify_batch)
+
+        assert result.empty
+        assert result.columns.tolist() == SPEC['unify_columns']
+
+    def test_latest_batches(self):
+        """
+        Raw batches keep the latest row of each id only, in scan order
+        """
+        profile = make_profile()
+        latest_rows = LatestRowPositions(profile[['contract_ftel', 'last_active']], SPEC)
+        raw_batches = [profile.iloc[start:start + 2] for start in range(0, profile.shape[0], 2)]
+
+        batches = list(LatestBatches(raw_batches, SPEC, latest_rows))
+
+        assert latest_rows.tolist() == [1, 2, 3, 4]
+        assert [batch['contract_ftel'].tolist() for batch in batches] == [['B'], ['A', 'C'], ['D']]
+        assert all(batch.index.tolist() == list(range(batch.shape[0])) for batch in batches)
+        assert all('last_active' not in batch.columns for batch in batches)
+        # * Whole batches without latest_by
+        assert len(list(LatestBatches(raw_batches, SPEC))) == 3
+
+    def test_tables_loaded_once(self):
+        """
+        The side tables are loaded once and shared by the hooks of every batch
+        """
+        n_loads = []
+
+        def tables(spec):
+            n_loads.append(1)
+            return {'norm_phone': {'0912345678': '0912345678', '0987654321': '0987000000'}}
+
+        def location(profile, spec):
+            profile['phone'] = profile['phone'].map(spec['tables']['norm_phone'])
+            return profile
+
+        hooks = {'tables': tables, 'location': location}
+        spec = dict(SPEC, tables=LoadTables(SPEC, hooks))
+
+        result = UnifyBatches(make_profile(), spec, lambda batch: unify_batch(batch, spec, hooks))
+
+        assert n_loads == [1]
+        assert result.set_index('contract_ftel').loc['A', 'phone'] == '0987000000'
+        assert LoadTables(SPEC, {}) == {}
+
+    def test_merge_schemas(self):
+        """
+        Types over the batches: non-null, float64 for mixed numbers, string for all null
+        """
+        schemas = [
+            pa.schema([('name', pa.null()), ('age', pa.int64()), ('note', pa.null())]),
+            pa.schema([('name', pa.string()), ('age', pa.float64()), ('note', pa.null())])
+        ]
+
+        schema = MergeSchemas(schemas)
+
+        assert schema == pa.schema([('name', pa.string()), ('age', pa.float64()), ('note', pa.string())])
@@ -0,0 +1,96 @@
+"""
+Parity of the username assembly on exploded tokens with the per-column updates
+"""
+
+import numpy as np
+import pandas as pd
+
+from username_assembler import assemble_usernames
+
+LASTNAME_LIST = pd.Series(['nguyen', 'tran', 'le', 'pham', 'hoang', 'vo', 'ha'])
+FIRSTNAME_LIST = pd.Series(['van', 'thi', 'an', 'anh', 'vananh', 'lan', 'hung', 'minh', 'tuan', 'hoang', 'ha', 'ngan'])
+NORM_NAME_DICT = {
+    'nguyen': 'Nguyen', 'tran': 'Tran', 'le': 'Le', 'pham': 'Pham', 'hoang': 'Hoang', 'vo': 'Vo',
+    'ha': 'Ha', 'van': 'Van', 'thi': 'Thi', 'an': 'An', 'anh': 'Anh', 'vananh': 'Van Anh',
+    'lan': 'Lan', 'hung': 'Hung', 'minh': 'Minh', 'tuan': 'Tuan', 'ngan': 'Ngan'
+}
+CANDIDATES = [
+    'nguyen van anh', 'tran thi lan', 'le hung 1 9 9 0', 'anh tuan nguyen', 'minh pham tuan le',
+    'vananh', 'x y z', '', 'hoang', 'ha minh', 'an nguyen tran thi', 'tuan anh', 'q nguyen',
+    'van le van tran', 'hung hung pham', 'l e', 'nguyen', 'thi ngan vo ha'
+]
+
+
+def assemble_by_columns(candidates, lastname_list, firstname_list, norm_name_dict):
+    """
+    The assembly before the exploded tokens: masked updates for each token column
+    """
+    df = pd.DataFrame({'username_candidate': candidates})
+    df['username'] = ''
+    df['last_name_fill'] = False
+    df['first_name_found'] = np.nan
+    test = df['username_candidate'].astype(str).str.split(' ', expand=True)
+    for col in test.columns:
+        username_valid = test[col].str.len()>1
+        lastname_condition = ((test[col].isin(lastname_list)))
+        lastname_case_1 = username_valid & lastname_condition & ((df['username'].str.len() == 0) | (df['last_name_fill'] == False))
+        lastname_case_2 = username_valid & lastname_condition & (df['username'].str.len() != 0) & (df['last_name_fill'] == True)
+
+        firstname_condition = (test[col].isin(firstname_list)) & (~lastname_condition)
+        firstname_case_1 = username_valid & firstname_condition & (df['last_name_fill']== False)
+        firstname_case_2 = username_valid & firstname_condition & (df['last_name_fill']== True)
+        test.loc[username_valid, col] = test.loc[username_valid, col].map(norm_name_dict)
+        df.loc[lastname_case_1, 'username'] = test.loc[lastname_case_1, col] + df.loc[lastname_case_1, 'username']
+        df.loc[lastname_case_2, 'username'] +=  ' ' + test.loc[lastname_case_2, col]
+        df.loc[lastname_case_1, 'last_name_fill'] = True
+        df.loc[firstname_case_1 & (df['first_name_found'].notna()), 'first_name_found'] += ' ' + test.loc[firstname_case_1 & (df['first_name_found'].notna()),col]
+
+        df.loc[firstname_case_1 & (df['first_name_found'].isna()), 'first_name_found'] = test.loc[firstname_case_1 & (df['first_name_found'].isna()), col]
+        df.loc[firstname_case_2, 'username'] = df.loc[firstname_case_2, 'username'] + ' ' + test.loc[firstname_case_2, col]
+    df.loc[df['first_name_found'].notna(), 'username'] += ' ' + df.loc[df['first_name_found'].notna(), 'first_name_found']
+    df['username'] = df['username'].astype(str).str.strip()
+    df.loc[df['username'].astype(str).str.len() <= 1, 'username'] = np.nan
+
+    return df['username']
+
+
+class TestAssembleUsernames:
+    """
+    Class for testing the assembly against the per-column updates
+    """
+
+    def test_parity(self):
+        """
+        Same usernames on the sample: last names first, first names found before them at the end
+        """
+        usernames = assemble_usernames(CANDIDATES, LASTNAME_LIST, FIRSTNAME_LIST, NORM_NAME_DICT)
+        expected = assemble_by_columns(CANDIDATES, LASTNAME_LIST, FIRSTNAME_LIST, NORM_NAME_DICT)
+
+        assert usernames.fillna('<na>').tolist() == expected.fillna('<na>').tolist()
+        assert usernames[0] == 'Nguyen Van Anh'
+        assert usernames[3] == 'Nguyen Anh Tuan'
+
+    def test_parity_random(self):
+        """
+        Same usernames on random token sequences
+        """
+        rng = np.random.default_rng(0)
+        tokens = list(NORM_NAME_DICT) + ['x', '1', 'zz']
+        candidates = [
+            ' '.join(rng.choice(tokens, size=rng.integers(1, 7)))
+            for _ in range(500)
+        ]
+
+        usernames = assemble_usernames(candidates, LASTNAME_LIST, FIRSTNAME_LIST, NORM_NAME_DICT)
+        expected = assemble_by_columns(candidates, LASTNAME_LIST, FIRSTNAME_LIST, NORM_NAME_DICT)
+
+        assert usernames.fillna('<na>').tolist() == expected.fillna('<na>').tolist()
+
+    def test_index(self):
+        """
+        The usernames keep the index of the candidates, an empty batch gives an empty result
+        """
+        candidates = pd.Series(CANDIDATES[:3], index=[7, 3, 5])
+
+        assert assemble_usernames(candidates, LASTNAME_LIST, FIRSTNAME_LIST, NORM_NAME_DICT).index.tolist() == [7, 3, 5]
+        assert assemble_usernames(pd.Series([], dtype=object), LASTNAME_LIST, FIRSTNAME_LIST, NORM_NAME_DICT).shape[0] == 0
@@ -0,0 +1,187 @@
+"""
+Tests for the incremental store of the phone & email validation results
+"""
+
+import os
+from glob import glob
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from validity_store import ValidityStore
+
+
+def make_results(phones, is_valid=True, note=None):
+    """
+    Validation results of the raw phones
+    """
+    return pd.DataFrame({
+        'phone_raw': phones,
+        'phone': [phone.lstrip('+84') for phone in phones],
+        'is_phone_valid': is_valid,
+        'note': note
+    })
+
+
+class TestValidityStore:
+    """
+    Class for testing the append, membership & export of the store
+    """
+
+    def test_new_values(self, tmp_path):
+        """
+        Only the values never stored are new
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        assert store.Append(make_results(['0912345678', '0987654321']), '2023-01-01') == 2
+
+        new_values = store.NewValues(
+            pd.Series(['0912345678', '0901111111', None, '0901111111'])
+        )
+
+        assert new_values.tolist() == ['0901111111']
+        assert store.Contains(['0987654321', '0900000000', None]).tolist() ==\
+            [True, False, False]
+
+    def test_append_skips_stored_values(self, tmp_path):
+        """
+        A value already stored keeps its first result
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        store.Append(make_results(['0912345678']), '2023-01-01')
+
+        n_appended = store.Append(
+            make_results(['0912345678', '0901111111'], is_valid=False),
+            '2023-01-02'
+        )
+        stored = store.Read().set_index('phone_raw')
+
+        assert n_appended == 1
+        assert stored.loc['0912345678', 'is_phone_valid']
+        assert not stored.loc['0901111111', 'is_phone_valid']
+        assert store.Runs() == ['2023-01-01', '2023-01-02']
+
+    def test_null_column_in_first_run(self, tmp_path):
+        """
+        A column full of null in the first run takes values in the next ones
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        store.Append(make_results(['0912345678']), '2023-01-01')
+        store.Append(make_results(['0901111111'], note='landline'), '2023-01-02')
+
+        stored = store.Read().set_index('phone_raw')
+
+        assert stored.loc['0901111111', 'note'] == 'landline'
+        assert pd.isna(stored.loc['0912345678', 'note'])
+
+    def test_compact(self, tmp_path):
+        """
+        The index files merged above `max_runs` keep the membership
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw',
+                              n_buckets=1, max_runs=3)
+        phones = [f'09{i:08d}' for i in range(10)]
+        for i, phone in enumerate(phones):
+            store.Append(make_results([phone]), f'2023-01-{i + 1:02d}')
+
+        assert len(glob(str(tmp_path / 'phone' / 'index' / '*' / '*.arrow'))) <= 3
+        assert store.Contains(phones).all()
+
+        store.Compact()
+
+        assert len(glob(str(tmp_path / 'phone' / 'index' / '*' / '*.arrow'))) == 1
+        assert store.Contains(phones).all()
+        assert store.NewValues(phones + ['0800000000']).tolist() == ['0800000000']
+
+    def test_interrupted_run(self, tmp_path):
+        """
+        The rows written again by the rerun of an interrupted run
+        are read & exported once
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        store.Append(make_results(['0912345678']), '2023-01-01')
+        # * Run interrupted between the data & the index
+        store.Append(make_results(['0901111111', '0902222222']), '2023-01-02')
+        for index_path in glob(str(tmp_path / 'phone' / 'index' / '*' / '2023-01-02-*.arrow')):
+            os.remove(index_path)
+        store.Append(make_results(['0901111111', '0902222222']), '2023-01-02')
+
+        assert len(store.Dataset().to_table()) == 5
+        assert sorted(store.Read()['phone_raw']) ==\
+            ['0901111111', '0902222222', '0912345678']
+        assert sorted(store.Lookup(['0901111111'])['phone_raw']) == ['0901111111']
+
+        export_path = str(tmp_path / 'valid_phone_latest.parquet')
+        store.Export(export_path, columns=['phone', 'is_phone_valid'],
+                     filter=ds.field('is_phone_valid') == True, batch_rows=2)
+        exported = pq.read_table(export_path).to_pandas()
+
+        assert exported.columns.tolist() == ['phone', 'is_phone_valid']
+        assert sorted(exported['phone']) == ['0901111111', '0902222222', '0912345678']
+
+    def test_new_column(self, tmp_path):
+        """
+        A column added after the first run is stored, null for the older rows
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        store.Append(make_results(['0912345678']), '2023-01-01')
+        results = make_results(['0901111111'])
+        results['phone_vendor'] = 'Mobifone'
+        store.Append(results, '2023-01-02')
+
+        stored = store.Read().set_index('phone_raw')
+        looked_up = store.Lookup(['0912345678', '0901111111']).set_index('phone_raw')
+
+        assert store.Schema().names[-1] == 'phone_vendor'
+        assert stored.loc['0901111111', 'phone_vendor'] == 'Mobifone'
+        assert pd.isna(stored.loc['0912345678', 'phone_vendor'])
+        assert looked_up.loc['0901111111', 'phone_vendor'] == 'Mobifone'
+
+    def test_export_only_changed_snapshots(self, tmp_path):
+        """
+        A snapshot is rewritten only when the store changed since its last export
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        store.Append(make_results(['0912345678']), '2023-01-01')
+        export_path = str(tmp_path / 'valid_phone_latest.parquet')
+        valid_path = str(tmp_path / 'valid_phone_product.parquet')
+        valid_filter = ds.field('is_phone_valid') == True
+
+        assert store.Export(export_path)
+        assert store.Export(valid_path, columns=['phone'], filter=valid_filter)
+        assert not store.Export(export_path)
+        assert not store.Export(valid_path, columns=['phone'], filter=valid_filter)
+        # * Other columns of the same path
+        assert store.Export(export_path, columns=['phone'])
+
+        store.Append(make_results(['0901111111']), '2023-01-02')
+
+        assert store.Export(export_path, columns=['phone'])
+        assert sorted(pq.read_table(export_path).column('phone').to_pylist()) ==\
+            ['0901111111', '0912345678']
+
+        os.remove(valid_path)
+
+        assert store.Export(valid_path, columns=['phone'], filter=valid_filter)
+
+    def test_rerun_keys_once_per_run(self, tmp_path, monkeypatch):
+        """
+        The exports of an unchanged store share the pass on the keys
+        """
+        store = ValidityStore(str(tmp_path / 'phone'), 'phone_raw', n_buckets=4)
+        store.Append(make_results(['0912345678', '0901111111']), '2023-01-01')
+        key_scans = []
+        dataset = store.Dataset
+
+        def counting_dataset():
+            key_scans.append(1)
+            return dataset()
+
+        monkeypatch.setattr(store, 'Dataset', counting_dataset)
+        store.Export(str(tmp_path / 'all.parquet'))
+        store.Export(str(tmp_path / 'valid.parquet'), columns=['phone'],
+                     filter=ds.field('is_phone_valid') == True)
+
+        # * 1 scan per export + 1 pass on the keys
+        assert len(key_scans) == 3
@@ -0,0 +1,106 @@
+"""
+Tests for the checkpointed & resumable chunk runner
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from preprocessing_pgp.checkpoint import run_checkpointed
+from preprocessing_pgp.utils import parallelize_dataframe
+
+
+def add_name_length(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the length of the names
+    """
+    data = data.copy()
+    data['name_length'] = data['name'].str.len()
+    return data
+
+
+class FailingNameLength:
+    """
+    Name length recording the processed chunks, failing from a given row
+    """
+
+    def __init__(self, fail_from: int = None) -> None:
+        self.fail_from = fail_from
+        self.starts = []
+
+    def __call__(self, data: pd.DataFrame) -> pd.DataFrame:
+        start = data.index[0]
+        if self.fail_from is not None and start >= self.fail_from:
+            raise RuntimeError(f'Failed at row {start}')
+        self.starts.append(start)
+        return add_name_length(data)
+
+
+class TestCheckpoint:
+    """
+    Class for testing the chunks are checkpointed & skipped on re-run
+    """
+
+    data = pd.DataFrame({
+        'name': ['an', None, 'binh', 'cuong', 'dung'] * 20,
+        'id': range(100)
+    })
+
+    def test_same_as_full_processing(self, tmp_path):
+        """
+        The chunked output is the same as processing at once
+        """
+        output = run_checkpointed(
+            self.data, add_name_length, str(tmp_path), chunk_rows=30
+        )
+
+        pd.testing.assert_frame_equal(output, add_name_length(self.data))
+        assert os.listdir(tmp_path) == []
+
+    def test_resume(self, tmp_path):
+        """
+        A re-run after a failure only processes the unfinished chunks
+        """
+        failing_func = FailingNameLength(fail_from=60)
+        with pytest.raises(RuntimeError):
+            run_checkpointed(self.data, failing_func, str(tmp_path), chunk_rows=30)
+        assert failing_func.starts == [0, 30]
+
+        resumed_func = FailingNameLength()
+        output = run_checkpointed(
+            self.data, resumed_func, str(tmp_path), chunk_rows=30
+        )
+
+        assert resumed_func.starts == [60, 90]
+        pd.testing.assert_frame_equal(output, add_name_length(self.data))
+
+    def test_changed_input(self, tmp_path):
+        """
+        The parts of another input are not reused
+        """
+        with pytest.raises(RuntimeError):
+            run_checkpointed(
+                self.data, FailingNameLength(fail_from=60),
+                str(tmp_path), chunk_rows=30
+            )
+
+        changed_data = self.data.assign(name=self.data['name'].str.upper())
+        changed_func = FailingNameLength()
+        output = run_checkpointed(
+            changed_data, changed_func, str(tmp_path), chunk_rows=30
+        )
+
+        assert changed_func.starts == [0, 30, 60, 90]
+        pd.testing.assert_frame_equal(output, add_name_length(changed_data))
+
+    def test_parallelize(self, tmp_path):
+        """
+        The parallel runner gives the same output with checkpoints
+        """
+        output = parallelize_dataframe(
+            self.data, add_name_length, n_cores=2,
+            checkpoint_dir=str(tmp_path), chunk_rows=25
+        )
+
+        pd.testing.assert_frame_equal(output, add_name_length(self.data))
@@ -0,0 +1,113 @@
+"""
+Tests for the command line streaming batch job
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from preprocessing_pgp.__main__ import main
+from preprocessing_pgp.phone.extractor import extract_valid_phone
+
+
+class TestCommandLine:
+    """
+    Class for testing the stages run over files from the command line
+    """
+
+    data = pd.DataFrame({
+        'id': [str(i) for i in range(40)],
+        'phone': ['0912345678', '84912345678', None, '012345'] * 10,
+        'card_id': ['001099012345', None, '123', 'B1234567'] * 10
+    })
+
+    @pytest.mark.parametrize('input_name, output_name', [
+        ('input.csv', 'output.jsonl'),
+        ('input.jsonl', 'output.parquet'),
+        ('input.parquet', 'output.csv')
+    ])
+    def test_formats(self, tmp_path, input_name, output_name):
+        """
+        Each format is read & written batch by batch with the same output
+        """
+        input_path = str(tmp_path / input_name)
+        output_path = str(tmp_path / output_name)
+        if input_name.endswith('.csv'):
+            self.data.to_csv(input_path, index=False)
+        elif input_name.endswith('.jsonl'):
+            self.data.to_json(input_path, orient='records', lines=True)
+        else:
+            self.data.to_parquet(input_path)
+
+        assert main([
+            'phone', '--input', input_path, '--output', output_path,
+            '--column', 'phone', '--batch-rows', '7'
+        ]) == 0
+
+        if output_name.endswith('.csv'):
+            output = pd.read_csv(output_path, dtype={'id': str, 'phone': str})
+        elif output_name.endswith('.jsonl'):
+            output = pd.read_json(output_path, lines=True, dtype=False)
+        else:
+            output = pd.read_parquet(output_path)
+        expected_output = extract_valid_phone(
+            self.data, phone_col='phone', print_info=False
+        ).sort_values('id', key=lambda ids: ids.astype(int))
+
+        assert output['id'].tolist() == self.data['id'].tolist()
+        assert output['is_phone_valid'].tolist() ==\
+            expected_output['is_phone_valid'].tolist()
+
+    def test_chain_summary(self, tmp_path):
+        """
+        Chained stages add all their columns & are timed in the summary
+        """
+        input_path = str(tmp_path / 'input.parquet')
+        output_path = str(tmp_path / 'output.parquet')
+        summary_path = str(tmp_path / 'summary.json')
+        self.data.to_parquet(input_path)
+
+        main([
+            'phone:phone', 'card:card_id',
+            '--input', input_path, '--output', output_path,
+            '--batch-rows', '16', '--summary', summary_path
+        ])
+
+        output = pd.read_parquet(output_path)
+        with open(summary_path, encoding='utf-8') as file:
+            summary = json.load(file)
+
+        assert output.shape[0] == 40
+        assert {'is_phone_valid', 'is_personal_id'} <= set(output.columns)
+        assert summary['rows'] == 40
+        assert [stage['stage'] for stage in summary['by_stage']] ==\
+            ['read', 'phone:phone', 'card:card_id', 'write']
+        assert summary['by_stage'][1]['batches'] == 3
+        assert summary['by_stage'][1]['rows_in'] == 40
+
+    def test_empty_input(self, tmp_path):
+        """
+        An input without rows gives an output with the input columns only
+        """
+        input_path = str(tmp_path / 'input.csv')
+        output_path = str(tmp_path / 'output.parquet')
+        self.data.head(0).to_csv(input_path, index=False)
+
+        assert main([
+            'phone', '--input', input_path, '--output', output_path,
+            '--column', 'phone'
+        ]) == 0
+
+        output = pd.read_parquet(output_path)
+
+        assert output.shape == (0, 3)
+        assert output.columns.tolist() == self.data.columns.tolist()
+
+    def test_unknown_stage(self, tmp_path):
+        """
+        Unknown stages are refused before reading the input
+        """
+        with pytest.raises(SystemExit):
+            main(['gender', '--input', 'input.csv',
+                  '--output', str(tmp_path / 'output.csv')])
@@ -0,0 +1,94 @@
+"""
+Tests for the Vietnamese de-accent functions against `unidecode`
+"""
+
+import unicodedata
+
+import pandas as pd
+import pyarrow as pa
+from unidecode import unidecode
+
+from preprocessing_pgp.address.const import LOCATION_CODE_DICT
+from preprocessing_pgp.deaccent import (
+    VI_ACCENT_TABLE,
+    is_accented,
+    remove_accent,
+    remove_accent_arrow,
+    remove_accent_series
+)
+from preprocessing_pgp.name.const import RULE_BASED_PATH
+
+
+def load_project_texts():
+    """
+    Names & locations of the project's dictionaries,
+    in composed & decomposed forms
+    """
+    texts = []
+    for element_name in ['lastname', 'middlename', 'firstname']:
+        name_dict = pd.read_parquet(
+            f'{RULE_BASED_PATH}/{element_name}_dict.parquet')
+        texts.extend(name_dict['with_accent'].dropna().tolist())
+    for level in ['city_vi', 'district_vi', 'ward_vi']:
+        texts.extend(LOCATION_CODE_DICT[level].dropna().tolist())
+
+    decomposed_texts = [unicodedata.normalize('NFD', text) for text in texts]
+
+    return texts + decomposed_texts
+
+
+class TestDeaccent:
+    """
+    Class for testing the de-accent functions give the same outputs as `unidecode`
+    """
+
+    texts = load_project_texts()
+
+    def test_accent_table(self):
+        """
+        Each letter of the table is translated as `unidecode` does
+        """
+        for code_point, letter in VI_ACCENT_TABLE.items():
+            assert letter == unidecode(chr(code_point))
+
+    def test_project_texts(self):
+        """
+        Names & locations are de-accented as `unidecode` does
+        """
+        for text in self.texts:
+            assert remove_accent(text) == unidecode(text)
+            assert is_accented(text) == (unidecode(text) != text)
+
+    def test_unidecode_fallback(self):
+        """
+        Non Vietnamese characters fall back to `unidecode`
+        """
+        texts = ['Phở Hà Nội – 東京', 'Ōsaka Straße', 'Nguyễn 😀', 'Tran Van A', '']
+        for text in texts:
+            assert remove_accent(text) == unidecode(text)
+
+    def test_series(self):
+        """
+        Series are de-accented element-wise, missing values stay missing
+        """
+        texts = pd.Series([*self.texts[:100], None, *self.texts[:100]])
+        texts.index = texts.index + 10
+        de_texts = remove_accent_series(texts)
+
+        assert de_texts.index.equals(texts.index)
+        assert de_texts.isna().sum() == 1
+        assert de_texts.dropna().tolist() == texts.dropna().map(unidecode).tolist()
+
+    def test_arrow(self):
+        """
+        Arrow arrays are de-accented element-wise, nulls stay null
+        """
+        texts = [*self.texts[:100], None, 'Ha Noi']
+        de_texts = remove_accent_arrow(pa.chunked_array([texts[:50], texts[50:]]))
+
+        assert de_texts.to_pylist() == [
+            unidecode(text) if text is not None else None
+            for text in texts
+        ]
+        ascii_texts = pa.array(['Ha Noi', None])
+        assert remove_accent_arrow(ascii_texts) is ascii_texts
@@ -0,0 +1,70 @@
+"""
+Tests for the per-stage performance instrumentation
+"""
+
+import json
+
+import pandas as pd
+
+from preprocessing_pgp.utils import (
+    JsonLinesSink,
+    MemorySink,
+    add_metric_sink,
+    instrument_stage,
+    remove_metric_sink,
+    track_stage
+)
+
+
+@instrument_stage('Keeping short names')
+def keep_short_names(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Only keep the records with short names
+    """
+    return data[data['name'].str.len() < 4]
+
+
+class TestTrackStage:
+    """
+    Class for testing the stage metrics sent to the sinks
+    """
+
+    def test_context_manager_metrics(self):
+        """
+        Metrics recorded inside the context are sent to the sinks
+        """
+        sink = MemorySink()
+        add_metric_sink(sink)
+        try:
+            with track_stage('Cleansing', rows_in=10) as metrics:
+                metrics.rows_out = 8
+                metrics.record_cache(hits=3, misses=1)
+        finally:
+            remove_metric_sink(sink)
+
+        assert len(sink.records) == 1
+        record = sink.records[0]
+        assert record.stage == 'Cleansing'
+        assert record.rows_in == 10
+        assert record.rows_out == 8
+        assert record.cache_hit_rate == 0.75
+        assert record.wall_time >= 0
+
+    def test_decorator_count_rows(self, tmp_path):
+        """
+        Decorated stages count the rows of the input & output dataframes
+        """
+        path = tmp_path / 'metrics.jsonl'
+        sink = JsonLinesSink(str(path))
+        add_metric_sink(sink)
+        try:
+            keep_short_names(pd.DataFrame({'name': ['an', 'binh', 'em']}))
+        finally:
+            remove_metric_sink(sink)
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+
+        assert len(records) == 1
+        assert records[0]['stage'] == 'Keeping short names'
+        assert records[0]['rows_in'] == 3
+        assert records[0]['rows_out'] == 2
@@ -0,0 +1,161 @@
+"""
+Tests for multi-processing dataframe utilities
+"""
+
+import numpy as np
+import pandas as pd
+
+from preprocessing_pgp.utils import parallelize_dataframe
+
+
+def add_length(data: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Add the length of the column and upper case it
+    """
+    data = data.copy()
+    data[f'{col}_length'] = data[col].str.len()
+    data[col] = data[col].str.upper()
+    return data
+
+
+def add_length_inplace(data: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Add the length of the column directly to the input data
+    """
+    data[f'{col}_length'] = data[col].str.len()
+    return data
+
+
+def upper_inplace_then_copy(data: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Upper case the column of the input data and return a copy
+    """
+    data[col] = data[col].str.upper()
+    return data.copy()
+
+
+def fill_missing(data: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Mark the records with missing value, keeping the missing values as they are
+    """
+    data = data.copy()
+    data['is_missing'] = data[col].map(lambda value: isinstance(value, float))
+    data[f'{col}_copy'] = data[col]
+    return data
+
+
+def keep_long(data: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Only keep the records with long value
+    """
+    return data[data[col].str.len() > 3]
+
+
+class TestParallelizeDataframe:
+    """
+    Class for testing the chunk transports of parallelize dataframe
+    """
+
+    data = pd.DataFrame(
+        {
+            'name': ['an', 'binh', 'cuong', 'dung', 'em', 'giang'] * 5,
+            'id': range(30)
+        },
+        index=range(100, 130)
+    )
+
+    def test_shared_same_as_pickle(self):
+        """
+        Shared transport gives the same output as pickling the chunks
+        """
+        shared = parallelize_dataframe(
+            self.data, add_length, n_cores=3, col='name')
+        pickled = parallelize_dataframe(
+            self.data, add_length, n_cores=3, transport='pickle', col='name')
+
+        pd.testing.assert_frame_equal(shared, pickled)
+
+    def test_shared_keep_index_when_filtering(self):
+        """
+        Functions changing the number of rows keep the original index
+        """
+        shared = parallelize_dataframe(
+            self.data, keep_long, n_cores=3, col='name')
+
+        pd.testing.assert_frame_equal(shared, keep_long(self.data, 'name'))
+
+    def test_shared_inplace_function(self):
+        """
+        Columns added in place to the chunks are sent back
+        """
+        shared = parallelize_dataframe(
+            self.data, add_length_inplace, n_cores=3, col='name')
+
+        assert 'name_length' not in self.data.columns
+        pd.testing.assert_frame_equal(
+            shared, add_length_inplace(self.data.copy(), 'name'))
+
+    def test_shared_inplace_function_returning_copy(self):
+        """
+        Columns modified in place before returning a copy are sent back
+        """
+        shared = parallelize_dataframe(
+            self.data, upper_inplace_then_copy, n_cores=3, col='name')
+
+        assert shared['name'].tolist() == self.data['name'].str.upper().tolist()
+
+    def test_shared_non_string_columns(self):
+        """
+        Non-string column names go through the pickle transport
+        """
+        data = pd.DataFrame({0: self.data['name'], 'name': self.data['name']})
+        shared = parallelize_dataframe(data, add_length, n_cores=3, col=0)
+
+        pd.testing.assert_frame_equal(shared, add_length(data, 0))
+
+    def test_shared_duplicated_columns(self):
+        """
+        Duplicated column names go through the pickle transport
+        """
+        data = pd.concat([self.data, self.data[['id']]], axis=1)
+        shared = parallelize_dataframe(data, add_length, n_cores=3, col='name')
+
+        pd.testing.assert_frame_equal(shared, add_length(data, 'name'))
+
+    def test_shared_keep_missing_values(self):
+        """
+        NaN of the object columns stay NaN in the workers & in the output
+        """
+        data = self.data.copy()
+        data['name'] = data['name'].where(data['id'] % 4 != 0, np.nan)
+        shared = parallelize_dataframe(data, fill_missing, n_cores=3, col='name')
+
+        pd.testing.assert_frame_equal(shared, fill_missing(data, 'name'))
+        assert shared['is_missing'].sum() == 8
+        assert all(isinstance(value, float) for value in shared['name_copy'] if pd.isna(value))
+
+    def test_shared_mixed_missing_values(self):
+        """
+        Object columns mixing None & NaN go through the pickle transport
+        """
+        data = self.data.copy()
+        data['name'] = data['name'].astype(object)
+        data.loc[data['id'] % 4 == 0, 'name'] = np.nan
+        data.loc[data['id'] % 4 == 1, 'name'] = None
+        shared = parallelize_dataframe(data, fill_missing, n_cores=3, col='name')
+
+        pd.testing.assert_frame_equal(shared, fill_missing(data, 'name'))
+
+    def test_shared_object_values(self):
+        """
+        Object columns of numbers, booleans or lists reach the chunks as they are
+        """
+        data = self.data.copy()
+        data['code'] = pd.Series([1, None, 3] * 10, index=data.index, dtype=object)
+        data['flag'] = pd.Series([True, False] * 15, index=data.index, dtype=object)
+        data['tokens'] = data['name'].str.split('n')
+        shared = parallelize_dataframe(data, fill_missing, n_cores=3, col='code')
+
+        pd.testing.assert_frame_equal(shared, fill_missing(data, 'code'))
+        assert shared['code_copy'].tolist()[:3] == [1, None, 3]
+        assert shared['is_missing'].sum() == 0
@@ -0,0 +1,124 @@
+"""
+Tests for the declarative multi-stage profile pipeline
+"""
+
+import pandas as pd
+import pytest
+
+from preprocessing_pgp.card.validation import verify_card
+from preprocessing_pgp.deaccent import remove_accent_series
+from preprocessing_pgp.email.validator import process_validate_email
+from preprocessing_pgp.phone.extractor import extract_valid_phone
+from preprocessing_pgp.name.preprocess import preprocess_df
+from preprocessing_pgp.name.type.extractor import TypeExtractor
+from preprocessing_pgp.pipeline import PipelineStage, ProfilePipeline
+
+
+def by_id(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Records in the order of their id, stages may reorder & re-index them
+    """
+    return data\
+        .sort_values('id', key=lambda ids: ids.astype(int))\
+        .reset_index(drop=True)
+
+
+def run_in_chain(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    The phone, card & email stages called one after the other
+    """
+    data = extract_valid_phone(data, phone_col='phone', print_info=False)
+    data = verify_card(data, card_col='card_id', print_info=False)
+    data = process_validate_email(data, email_col='email', n_cores=1)
+
+    return by_id(data)
+
+
+class TestProfilePipeline:
+    """
+    Class for testing the stages run by the pipeline
+    """
+
+    data = pd.DataFrame({
+        'id': [str(i) for i in range(40)],
+        'phone': ['0912345678', '84912345678', None, '012345'] * 10,
+        'other_phone': ['0283456789', None, '0987654321', 'abc'] * 10,
+        'card_id': ['001099012345', None, '123', 'B1234567'] * 10,
+        'email': ['nguyenvanan@gmail.com', None, 'an@', 'an.nguyen@yahoo.com'] * 10
+    }, index=range(100, 140))
+
+    stages = [('phone', 'phone'), ('card', 'card_id'), ('email', 'email')]
+
+    @pytest.mark.parametrize('n_workers', [1, 3])
+    def test_same_as_stages_in_chain(self, n_workers):
+        """
+        Independent stages give the same output as the stages called in chain,
+        whatever the number of workers
+        """
+        processed_data = ProfilePipeline(self.stages, n_workers=n_workers)\
+            .run(self.data)
+        chained_data = run_in_chain(self.data)
+
+        assert processed_data.index.equals(self.data.index)
+        assert set(processed_data.columns) == set(chained_data.columns)
+        pd.testing.assert_frame_equal(
+            by_id(processed_data).astype(str),
+            chained_data[processed_data.columns].astype(str)
+        )
+
+    def test_stages_read_input_columns(self):
+        """
+        A stage processes the input column, not the output of another stage
+        """
+        processed_data = ProfilePipeline([
+            ('phone', 'phone'),
+            PipelineStage('card', 'phone')
+        ]).run(self.data)
+        card_data = by_id(verify_card(
+            self.data, card_col='phone', print_info=False))
+
+        assert processed_data['is_personal_id'].tolist() ==\
+            card_data['is_personal_id'].tolist()
+
+    @pytest.mark.parametrize('n_workers', [1, 2])
+    def test_output_column_collision(self, n_workers):
+        """
+        On the output columns of several stages, the last declared stage wins
+        """
+        phone_data = by_id(extract_valid_phone(
+            self.data, phone_col='phone', print_info=False))
+        other_phone_data = by_id(extract_valid_phone(
+            self.data, phone_col='other_phone', print_info=False))
+
+        for stages, expected_data in [
+            ([('phone', 'phone'), ('phone', 'other_phone')], other_phone_data),
+            ([('phone', 'other_phone'), ('phone', 'phone')], phone_data)
+        ]:
+            processed_data = ProfilePipeline(stages, n_workers=n_workers)\
+                .run(self.data)
+
+            assert processed_data['is_phone_valid'].tolist() ==\
+                expected_data['is_phone_valid'].tolist()
+
+    def test_type_once_per_name(self, monkeypatch):
+        """
+        Each unique name is typed once, with the same types as typing every record
+        """
+        data = pd.DataFrame({
+            'name': ['Nguyễn Văn An', 'Công ty TNHH ABC', None, 'nguyen van an', 'Trường THPT Lê Lợi'] * 4
+        })
+        clean_data = preprocess_df(data[data['name'].notna()], name_col='name')
+        de_names = remove_accent_series(clean_data['name']).str.lower()
+        type_extractor = TypeExtractor()
+        expected_types = de_names.apply(type_extractor.extract_type).reindex(data.index)
+
+        typed_names = []
+        extract_type = TypeExtractor.extract_type
+        monkeypatch.setattr(
+            TypeExtractor, 'extract_type',
+            lambda self, name, level='lv1': typed_names.append(name) or extract_type(self, name, level)
+        )
+        processed_data = ProfilePipeline([('type', 'name')]).run(data)
+
+        assert processed_data['customer_type'].tolist() == expected_types.tolist()
+        assert sorted(typed_names) == sorted(de_names.unique())
@@ -0,0 +1,80 @@
+"""
+Tests for the micro-batching enrichment service
+"""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from preprocessing_pgp.phone.extractor import extract_valid_phone
+from preprocessing_pgp.service import EnrichmentService, LocalServiceClient
+
+
+class TestEnrichmentService:
+    """
+    Class for testing the single-record requests through micro-batches
+    """
+
+    phones = ['0912345678', '84912345678', '012345', None, '0283 8123456'] * 10
+
+    def test_same_as_batch_processing(self):
+        """
+        Each record gets the same output as the batched stage function
+        """
+        service = EnrichmentService([('phone', 'phone')], max_latency_ms=50)
+        with LocalServiceClient(service) as client:
+            profiles = client.process_many(
+                [{'phone': phone, 'id': i} for i, phone in enumerate(self.phones)]
+            )
+
+        expected_data = extract_valid_phone(
+            pd.DataFrame({'phone': self.phones, 'id': range(len(self.phones))}),
+            phone_col='phone',
+            print_info=False
+        ).sort_values('id')
+        expected_data = expected_data.astype(object)\
+            .where(expected_data.notna(), None)
+
+        assert [
+            {col: profile[col] for col in expected_data.columns}
+            for profile in profiles
+        ] == expected_data.to_dict('records')
+
+    def test_micro_batches(self):
+        """
+        Concurrent requests are coalesced up to the maximum batch size
+        """
+        service = EnrichmentService(
+            [('phone', 'phone')],
+            max_batch_size=16,
+            max_latency_ms=1000
+        )
+        with LocalServiceClient(service) as client:
+            client.process_many([{'phone': phone} for phone in self.phones])
+            client.process({'phone': '0912345678'})
+
+        stats = service.stats['phone:phone']
+        assert stats.n_records == len(self.phones) + 1
+        assert stats.max_batch_size == 16
+        assert stats.n_batches == 5
+
+    def test_skipped_stages(self):
+        """
+        Stages whose field is missing from the profile are not run
+        """
+        service = EnrichmentService([('phone', 'phone'), ('card', 'card_id')])
+        with LocalServiceClient(service) as client:
+            profile = client.process({'phone': '0912345678'})
+
+        assert profile['is_phone_valid']
+        assert 'is_valid' not in profile
+        assert service.stats['card:card_id'].n_batches == 0
+
+    def test_not_started(self):
+        """
+        Requests are refused before the service is started
+        """
+        service = EnrichmentService([('phone', 'phone')])
+        with pytest.raises(RuntimeError):
+            asyncio.run(service.process({'phone': '0912345678'}))
@@ -0,0 +1,122 @@
+"""
+Tests for streaming Parquet data through stages
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from preprocessing_pgp.streaming import BatchWriter, stream_parquet
+
+
+def add_name_length(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the length of the names, None names have missing length
+    """
+    data = data.copy()
+    data['name_length'] = data['name'].str.len()
+    data['note'] = None
+    return data
+
+
+class TestStreamParquet:
+    """
+    Class for testing the batch by batch Parquet processing
+    """
+
+    def test_same_as_full_processing(self, tmp_path):
+        """
+        Streaming by small batches gives the same output as processing at once
+        """
+        data = pd.DataFrame({
+            'name': ['an', None, 'binh', 'cuong', 'dung'] * 20,
+            'id': range(100)
+        })
+        input_path = str(tmp_path / 'input.parquet')
+        output_path = str(tmp_path / 'output.parquet')
+        data.to_parquet(input_path, row_group_size=30)
+
+        n_rows = stream_parquet(
+            input_path,
+            output_path,
+            add_name_length,
+            batch_rows=7
+        )
+        streamed_data = pd.read_parquet(output_path)
+
+        assert n_rows == 100
+        pd.testing.assert_frame_equal(
+            streamed_data.drop(columns=['note']),
+            add_name_length(data).drop(columns=['note'])
+        )
+        assert streamed_data['note'].isna().all()
+
+    def test_widen_schema(self, tmp_path):
+        """
+        Later batches with floats, text or new columns widen the output schema
+        """
+        input_path = str(tmp_path / 'input.parquet')
+        output_path = str(tmp_path / 'output.parquet')
+        pd.DataFrame({'id': range(9)}).to_parquet(input_path)
+
+        def add_score(data: pd.DataFrame) -> pd.DataFrame:
+            data = data.copy()
+            first_id = data['id'].iloc[0]
+            data['score'] = data['id'] * (1 if first_id < 3 else 0.5)
+            data['code'] = data['id'] if first_id < 6 else data['id'].astype(str) + 'x'
+            if first_id >= 6:
+                data['note'] = 'late'
+            return data
+
+        n_rows = stream_parquet(input_path, output_path, add_score, batch_rows=3)
+        streamed_data = pd.read_parquet(output_path)
+
+        assert n_rows == 9
+        assert streamed_data['score'].tolist() ==\
+            [0, 1, 2, 1.5, 2, 2.5, 3, 3.5, 4]
+        assert streamed_data['code'].tolist() ==\
+            ['0', '1', '2', '3', '4', '5', '6x', '7x', '8x']
+        assert streamed_data['note'].tolist() == [None] * 6 + ['late'] * 3
+
+    def test_empty_input(self, tmp_path):
+        """
+        An input without rows gives an empty output of the input schema
+        """
+        input_path = str(tmp_path / 'input.parquet')
+        output_path = str(tmp_path / 'output.parquet')
+        pd.DataFrame({'name': pd.Series([], dtype=object), 'id': []})\
+            .to_parquet(input_path)
+
+        n_rows = stream_parquet(input_path, output_path, add_name_length)
+        streamed_data = pd.read_parquet(output_path)
+
+        assert n_rows == 0
+        assert streamed_data.shape == (0, 2)
+        assert streamed_data.columns.tolist() == ['name', 'id']
+
+
+class TestBatchWriter:
+    """
+    Class for testing the incremental writer of the text formats
+    """
+
+    def test_text_new_columns(self, tmp_path):
+        """
+        Columns first seen in a later batch are not silently dropped
+        """
+        with pytest.raises(ValueError, match='note'):
+            with BatchWriter(str(tmp_path / 'output.csv')) as writer:
+                writer.write(pd.DataFrame({'id': [1, 2]}))
+                writer.write(pd.DataFrame({'id': [3], 'note': ['late']}))
+
+    def test_text_empty_output(self, tmp_path):
+        """
+        A CSV without batch has the header of the empty schema
+        """
+        output_path = str(tmp_path / 'output.csv')
+        with BatchWriter(output_path,
+                         empty_schema=pa.schema([('name', pa.string())])):
+            pass
+
+        with open(output_path, 'r', encoding='utf-8') as file:
+            assert file.read().strip() == 'name'